@@ -21,6 +21,18 @@ def version_callback(value: bool):
         raise typer.Exit()
 
 
+def load_secret_key():
+    if os.getenv("ANSWERAI_SECRET_KEY") is None:
+        typer.echo(
+            "Loading ANSWERAI_SECRET_KEY from file, not provided as an environment variable."
+        )
+        if not KEY_FILE.exists():
+            typer.echo(f"Generating a new secret key and saving it to {KEY_FILE}")
+            KEY_FILE.write_bytes(base64.b64encode(random.randbytes(12)))
+        typer.echo(f"Loading ANSWERAI_SECRET_KEY from {KEY_FILE}")
+        os.environ["ANSWERAI_SECRET_KEY"] = KEY_FILE.read_text()
+
+
 @app.command()
 def main(
     version: Annotated[
@@ -36,15 +48,7 @@ def serve(
     port: int = 8080,
 ):
     os.environ["FROM_INIT_PY"] = "true"
-    if os.getenv("ANSWERAI_SECRET_KEY") is None:
-        typer.echo(
-            "Loading ANSWERAI_SECRET_KEY from file, not provided as an environment variable."
-        )
-        if not KEY_FILE.exists():
-            typer.echo(f"Generating a new secret key and saving it to {KEY_FILE}")
-            KEY_FILE.write_bytes(base64.b64encode(random.randbytes(12)))
-        typer.echo(f"Loading ANSWERAI_SECRET_KEY from {KEY_FILE}")
-        os.environ["ANSWERAI_SECRET_KEY"] = KEY_FILE.read_text()
+    load_secret_key()
 
     if os.getenv("USE_CUDA_DOCKER", "false") == "true":
         typer.echo(
@@ -84,6 +88,20 @@ def serve(
     )
 
 
+@app.command()
+def worker(
+    concurrency: Optional[int] = None,
+    processes: int = 1,
+):
+    """Process the queued file uploads, with INGESTION_WORKER_MODE=external."""
+    os.environ["FROM_INIT_PY"] = "true"
+    load_secret_key()
+
+    from answer_ai.retrieval.ingestion import run_worker
+
+    run_worker(concurrency=concurrency, processes=processes)
+
+
 @app.command()
 def dev(
     host: str = "0.0.0.0",
@@ -2157,6 +2157,44 @@ Ensure that the tools are effectively utilized to achieve the highest-quality an
 
 VECTOR_DB = os.environ.get("VECTOR_DB", "chroma")
 
+# Persistent BM25 index per collection, used by hybrid search
+ENABLE_RAG_BM25_INDEX = (
+    os.environ.get("ENABLE_RAG_BM25_INDEX", "True").lower() == "true"
+)
+RAG_BM25_INDEX_DIR = os.environ.get("RAG_BM25_INDEX_DIR", f"{DATA_DIR}/vector_db/bm25")
+
+ENABLE_RAG_EMBEDDING_STORE = (
+    os.environ.get("ENABLE_RAG_EMBEDDING_STORE", "True").lower() == "true"
+)
+RAG_EMBEDDING_STORE_PATH = os.environ.get(
+    "RAG_EMBEDDING_STORE_PATH", f"{DATA_DIR}/vector_db/embeddings.db"
+)
+# Least recently used chunk embeddings are removed past this, 0 keeps them all
+RAG_EMBEDDING_STORE_MAX_ENTRIES = int(
+    os.environ.get("RAG_EMBEDDING_STORE_MAX_ENTRIES", "1000000")
+)
+# Chunks of a document embedded and inserted at a time, bounds the memory used
+# to add large documents to a collection
+RAG_EMBEDDING_WINDOW_SIZE = max(
+    1, int(os.environ.get("RAG_EMBEDDING_WINDOW_SIZE", "256"))
+)
+
+# Threads shared by the vector DB backends without an async driver, bounds
+# how many of their blocking calls the async retrieval paths run at once
+VECTOR_DB_THREAD_POOL_SIZE = max(
+    1, int(os.environ.get("VECTOR_DB_THREAD_POOL_SIZE", "16"))
+)
+
+# Collection aliases are reloaded at this interval (seconds), a collection
+# swapped in by a reindex is used by every process after at most this long
+VECTOR_DB_ALIAS_REFRESH_INTERVAL = float(
+    os.environ.get("VECTOR_DB_ALIAS_REFRESH_INTERVAL", "5")
+)
+# Files processed at once by a knowledge reindex
+KNOWLEDGE_REINDEX_CONCURRENCY = max(
+    1, int(os.environ.get("KNOWLEDGE_REINDEX_CONCURRENCY", "4"))
+)
+
 # Chroma
 CHROMA_DATA_PATH = f"{DATA_DIR}/vector_db"
 
@@ -2342,6 +2380,17 @@ else:
     except Exception:
         PGVECTOR_IVFFLAT_LISTS = 100
 
+# Rows copied and committed at a time by inserts and upserts
+PGVECTOR_INSERT_BATCH_SIZE = os.environ.get("PGVECTOR_INSERT_BATCH_SIZE", 5000)
+
+if PGVECTOR_INSERT_BATCH_SIZE == "":
+    PGVECTOR_INSERT_BATCH_SIZE = 5000
+else:
+    try:
+        PGVECTOR_INSERT_BATCH_SIZE = max(1, int(PGVECTOR_INSERT_BATCH_SIZE))
+    except Exception:
+        PGVECTOR_INSERT_BATCH_SIZE = 5000
+
 # Pinecone
 PINECONE_API_KEY = os.environ.get("PINECONE_API_KEY", None)
 PINECONE_ENVIRONMENT = os.environ.get("PINECONE_ENVIRONMENT", None)
@@ -2768,6 +2817,31 @@ RAG_EMBEDDING_PREFIX_FIELD_NAME = os.environ.get(
     "RAG_EMBEDDING_PREFIX_FIELD_NAME", None
 )
 
+# Requests in flight per remote embedding endpoint, lowered while rate limited
+RAG_EMBEDDING_CONCURRENCY = int(os.environ.get("RAG_EMBEDDING_CONCURRENCY", "8"))
+# Estimated tokens per remote embedding request, 0 only limits by batch size
+RAG_EMBEDDING_BATCH_MAX_TOKENS = int(
+    os.environ.get("RAG_EMBEDDING_BATCH_MAX_TOKENS", "100000")
+)
+RAG_EMBEDDING_MAX_RETRIES = int(os.environ.get("RAG_EMBEDDING_MAX_RETRIES", "5"))
+
+# Number of query embeddings kept in memory, 0 disables the cache
+RAG_EMBEDDING_CACHE_SIZE = int(os.environ.get("RAG_EMBEDDING_CACHE_SIZE", "4096"))
+RAG_EMBEDDING_CACHE_TTL = int(os.environ.get("RAG_EMBEDDING_CACHE_TTL", "86400"))
+ENABLE_RAG_EMBEDDING_CACHE_REDIS = (
+    os.environ.get("ENABLE_RAG_EMBEDDING_CACHE_REDIS", "False").lower() == "true"
+)
+
+# Pairs scored by a local reranking model in one forward pass. Concurrent
+# queries are batched together for up to RAG_RERANKING_BATCH_WAIT seconds
+RAG_RERANKING_BATCH_SIZE = max(1, int(os.environ.get("RAG_RERANKING_BATCH_SIZE", "64")))
+RAG_RERANKING_BATCH_WAIT = float(os.environ.get("RAG_RERANKING_BATCH_WAIT", "0.01"))
+# Forward passes of local reranking models run at once
+RAG_RERANKING_THREADS = max(1, int(os.environ.get("RAG_RERANKING_THREADS", "1")))
+# Number of reranking scores kept in memory, 0 disables the cache
+RAG_RERANKING_CACHE_SIZE = int(os.environ.get("RAG_RERANKING_CACHE_SIZE", "16384"))
+RAG_RERANKING_CACHE_TTL = int(os.environ.get("RAG_RERANKING_CACHE_TTL", "3600"))
+
 RAG_RERANKING_ENGINE = PersistentConfig(
     "RAG_RERANKING_ENGINE",
     "rag.reranking_engine",
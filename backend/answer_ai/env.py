@@ -328,6 +328,12 @@ DATABASE_ENABLE_SQLITE_WAL = (
     os.environ.get("DATABASE_ENABLE_SQLITE_WAL", "False").lower() == "true"
 )
 
+# Use an asyncio engine (asyncpg) for the async table methods on PostgreSQL,
+# they fall back to running the sync queries in a thread when disabled
+DATABASE_ENABLE_ASYNC = (
+    os.environ.get("DATABASE_ENABLE_ASYNC", "True").lower() == "true"
+)
+
 DATABASE_USER_ACTIVE_STATUS_UPDATE_INTERVAL = os.environ.get(
     "DATABASE_USER_ACTIVE_STATUS_UPDATE_INTERVAL", None
 )
@@ -339,6 +345,15 @@ if DATABASE_USER_ACTIVE_STATUS_UPDATE_INTERVAL is not None:
     except Exception:
         DATABASE_USER_ACTIVE_STATUS_UPDATE_INTERVAL = 0.0
 
+# Seconds authenticated users and API keys are cached in memory, 0 disables it
+AUTH_USER_CACHE_TTL = float(os.environ.get("AUTH_USER_CACHE_TTL", "10"))
+
+# Seconds between batched writes of the last active time of users, 0 writes
+# it on each request
+USER_LAST_ACTIVE_FLUSH_INTERVAL = float(
+    os.environ.get("USER_LAST_ACTIVE_FLUSH_INTERVAL", "10")
+)
+
 # Enable public visibility of active user count (when disabled, only admins can see it)
 ENABLE_PUBLIC_ACTIVE_USERS_COUNT = (
     os.environ.get("ENABLE_PUBLIC_ACTIVE_USERS_COUNT", "True").lower() == "true"
@@ -352,6 +367,57 @@ ENABLE_REALTIME_CHAT_SAVE = (
     os.environ.get("ENABLE_REALTIME_CHAT_SAVE", "False").lower() == "true"
 )
 
+# Realtime saves are buffered and written at most once per interval (seconds),
+# or sooner once this many bytes of message updates are pending
+REALTIME_CHAT_SAVE_FLUSH_INTERVAL = os.environ.get(
+    "REALTIME_CHAT_SAVE_FLUSH_INTERVAL", "1.0"
+)
+try:
+    REALTIME_CHAT_SAVE_FLUSH_INTERVAL = float(REALTIME_CHAT_SAVE_FLUSH_INTERVAL)
+except ValueError:
+    REALTIME_CHAT_SAVE_FLUSH_INTERVAL = 1.0
+
+REALTIME_CHAT_SAVE_FLUSH_BYTES = os.environ.get(
+    "REALTIME_CHAT_SAVE_FLUSH_BYTES", "16384"
+)
+try:
+    REALTIME_CHAT_SAVE_FLUSH_BYTES = int(REALTIME_CHAT_SAVE_FLUSH_BYTES)
+except ValueError:
+    REALTIME_CHAT_SAVE_FLUSH_BYTES = 16384
+
+# Uploaded files are processed by ingestion workers from a job queue in the
+# database. "local" runs a worker in each app process, "external" leaves the
+# queue to `answerai worker` processes.
+INGESTION_WORKER_MODE = os.environ.get("INGESTION_WORKER_MODE", "local").lower()
+if INGESTION_WORKER_MODE not in ("local", "external"):
+    INGESTION_WORKER_MODE = "local"
+
+INGESTION_WORKER_CONCURRENCY = os.environ.get("INGESTION_WORKER_CONCURRENCY", "2")
+try:
+    INGESTION_WORKER_CONCURRENCY = max(1, int(INGESTION_WORKER_CONCURRENCY))
+except ValueError:
+    INGESTION_WORKER_CONCURRENCY = 2
+
+INGESTION_JOB_MAX_ATTEMPTS = os.environ.get("INGESTION_JOB_MAX_ATTEMPTS", "3")
+try:
+    INGESTION_JOB_MAX_ATTEMPTS = max(1, int(INGESTION_JOB_MAX_ATTEMPTS))
+except ValueError:
+    INGESTION_JOB_MAX_ATTEMPTS = 3
+
+# Seconds a worker holds a job without renewing it before another worker
+# takes it over, e.g. after a crash
+INGESTION_JOB_LEASE = os.environ.get("INGESTION_JOB_LEASE", "300")
+try:
+    INGESTION_JOB_LEASE = max(10, int(INGESTION_JOB_LEASE))
+except ValueError:
+    INGESTION_JOB_LEASE = 300
+
+INGESTION_POLL_INTERVAL = os.environ.get("INGESTION_POLL_INTERVAL", "1.0")
+try:
+    INGESTION_POLL_INTERVAL = float(INGESTION_POLL_INTERVAL)
+except ValueError:
+    INGESTION_POLL_INTERVAL = 1.0
+
 ENABLE_QUERIES_CACHE = os.environ.get("ENABLE_QUERIES_CACHE", "False").lower() == "true"
 
 ####################################
@@ -556,6 +622,13 @@ else:
     except Exception:
         MODELS_CACHE_TTL = 1
 
+# Seconds the model list of a connection is served before it is refreshed in
+# the background, 0 to fetch it on every request
+try:
+    MODEL_LIST_CACHE_TTL = float(os.environ.get("MODEL_LIST_CACHE_TTL", "60"))
+except ValueError:
+    MODEL_LIST_CACHE_TTL = 60.0
+
 
 ####################################
 # CHAT
@@ -650,6 +723,14 @@ try:
 except ValueError:
     WEBSOCKET_REDIS_LOCK_TIMEOUT = 60
 
+# Seconds a websocket session is kept without a heartbeat, dropping sessions
+# left by a process which died, 0 keeps them
+WEBSOCKET_SESSION_TTL = int(os.environ.get("WEBSOCKET_SESSION_TTL", "600"))
+
+# Updates of a collaborative document merged into its snapshot at once, 0
+# keeps every update
+YDOC_COMPACTION_THRESHOLD = int(os.environ.get("YDOC_COMPACTION_THRESHOLD", "200"))
+
 WEBSOCKET_SENTINEL_HOSTS = os.environ.get("WEBSOCKET_SENTINEL_HOSTS", "")
 WEBSOCKET_SENTINEL_PORT = os.environ.get("WEBSOCKET_SENTINEL_PORT", "26379")
 WEBSOCKET_SERVER_LOGGING = (
@@ -686,6 +767,51 @@ AIOHTTP_CLIENT_SESSION_SSL = (
     os.environ.get("AIOHTTP_CLIENT_SESSION_SSL", "True").lower() == "true"
 )
 
+# Connections kept open to each LLM backend, 0 for no limit
+try:
+    AIOHTTP_CLIENT_POOL_SIZE = max(
+        0, int(os.environ.get("AIOHTTP_CLIENT_POOL_SIZE", "100"))
+    )
+except ValueError:
+    AIOHTTP_CLIENT_POOL_SIZE = 100
+
+# Seconds an idle backend connection is kept for reuse
+try:
+    AIOHTTP_CLIENT_POOL_KEEPALIVE_TIMEOUT = float(
+        os.environ.get("AIOHTTP_CLIENT_POOL_KEEPALIVE_TIMEOUT", "30")
+    )
+except ValueError:
+    AIOHTTP_CLIENT_POOL_KEEPALIVE_TIMEOUT = 30.0
+
+# Backend picked for a model served by several connections: least_requests,
+# latency or random
+LLM_ROUTING_POLICY = os.environ.get("LLM_ROUTING_POLICY", "least_requests")
+
+# Prefer the Ollama backends which have the model loaded
+ENABLE_LLM_ROUTING_MODEL_AFFINITY = (
+    os.environ.get("ENABLE_LLM_ROUTING_MODEL_AFFINITY", "True").lower() == "true"
+)
+
+# Consecutive failures after which a backend is left out, 0 to never leave it out
+try:
+    LLM_ROUTING_EJECT_FAILURES = int(os.environ.get("LLM_ROUTING_EJECT_FAILURES", "3"))
+except ValueError:
+    LLM_ROUTING_EJECT_FAILURES = 3
+
+# Seconds a failing backend is left out for, unless it answers again
+try:
+    LLM_ROUTING_EJECT_DURATION = float(
+        os.environ.get("LLM_ROUTING_EJECT_DURATION", "30")
+    )
+except ValueError:
+    LLM_ROUTING_EJECT_DURATION = 30.0
+
+# Balance requests for a model listed by several OpenAI connections, instead
+# of sending them all to the first one
+ENABLE_OPENAI_API_ROUTING = (
+    os.environ.get("ENABLE_OPENAI_API_ROUTING", "False").lower() == "true"
+)
+
 AIOHTTP_CLIENT_TIMEOUT_MODEL_LIST = os.environ.get(
     "AIOHTTP_CLIENT_TIMEOUT_MODEL_LIST",
     os.environ.get("AIOHTTP_CLIENT_TIMEOUT_OPENAI_MODEL_LIST", "10"),
@@ -1,7 +1,8 @@
 import os
 import json
 import logging
-from contextlib import contextmanager
+import importlib.util
+from contextlib import asynccontextmanager, contextmanager
 from typing import Any, Optional
 
 from answer_ai.internal.wrappers import register_connection
@@ -14,9 +15,17 @@ from answer_ai.env import (
     DATABASE_POOL_SIZE,
     DATABASE_POOL_TIMEOUT,
     DATABASE_ENABLE_SQLITE_WAL,
+    DATABASE_ENABLE_ASYNC,
 )
 from peewee_migrate import Router
 from sqlalchemy import Dialect, create_engine, MetaData, event, types
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import scoped_session, sessionmaker
 from sqlalchemy.pool import QueuePool, NullPool
@@ -158,3 +167,74 @@ def get_session():
 
 
 get_db = contextmanager(get_session)
+
+
+####################
+# Async engine
+#
+# Runs next to the sync engine for the async table methods (`a`-prefixed),
+# so hot paths can query without blocking the event loop. Only used with
+# PostgreSQL (asyncpg): on SQLite an async read holds its lock across awaits,
+# and a sync write on the event loop thread then waits on it until the busy
+# timeout. Otherwise `async_engine` is None and those methods run in a thread.
+####################
+
+ASYNC_DRIVERS = {
+    "postgresql": ("postgresql+asyncpg", "asyncpg"),
+}
+
+
+def get_async_database_url(url: str) -> Optional[str]:
+    url = make_url(url)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver is None:
+        return None
+
+    drivername, module = driver
+    if importlib.util.find_spec(module) is None:
+        log.info(f"{module} is not installed, async database access is disabled")
+        return None
+
+    query = dict(url.query)
+    if drivername.startswith("postgresql") and "sslmode" in query:
+        # asyncpg takes `ssl` instead of libpq's `sslmode`
+        query["ssl"] = query.pop("sslmode")
+
+    return url.set(drivername=drivername, query=query).render_as_string(
+        hide_password=False
+    )
+
+
+def create_async_database_engine(url: str) -> AsyncEngine:
+    if isinstance(DATABASE_POOL_SIZE, int):
+        if DATABASE_POOL_SIZE > 0:
+            return create_async_engine(
+                url,
+                pool_size=DATABASE_POOL_SIZE,
+                max_overflow=DATABASE_POOL_MAX_OVERFLOW,
+                pool_timeout=DATABASE_POOL_TIMEOUT,
+                pool_recycle=DATABASE_POOL_RECYCLE,
+                pool_pre_ping=True,
+            )
+        return create_async_engine(url, pool_pre_ping=True, poolclass=NullPool)
+    return create_async_engine(url, pool_pre_ping=True)
+
+
+ASYNC_DATABASE_URL = (
+    get_async_database_url(SQLALCHEMY_DATABASE_URL) if DATABASE_ENABLE_ASYNC else None
+)
+
+async_engine: Optional[AsyncEngine] = None
+AsyncSessionLocal: Optional[async_sessionmaker[AsyncSession]] = None
+
+if ASYNC_DATABASE_URL:
+    async_engine = create_async_database_engine(ASYNC_DATABASE_URL)
+    AsyncSessionLocal = async_sessionmaker(
+        bind=async_engine, autoflush=False, expire_on_commit=False
+    )
+
+
+@asynccontextmanager
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -101,8 +101,17 @@ from answer_ai.routers.retrieval import (
     get_ef,
     get_rf,
 )
-
-from answer_ai.internal.db import Session, engine
+from answer_ai.retrieval.embedding_scheduler import EMBEDDING_SCHEDULER
+from answer_ai.utils.backend_routing import BACKEND_ROUTER
+from answer_ai.utils.http_client import HTTP_CLIENT_POOL
+from answer_ai.utils.model_catalog import MODEL_CATALOG
+from answer_ai.utils.auth_cache import AUTH_USER_CACHE, LAST_ACTIVE_WRITER
+from answer_ai.utils.model_access import MODEL_ACCESS_INDEX
+from answer_ai.retrieval.ingestion import INGESTION_WORKER
+from answer_ai.retrieval.reindex import KNOWLEDGE_REINDEXER
+from answer_ai.retrieval.vector.factory import VECTOR_DB_CLIENT
+
+from answer_ai.internal.db import Session, async_engine, engine
 
 from answer_ai.models.functions import Functions
 from answer_ai.models.models import Models
@@ -476,6 +485,7 @@ from answer_ai.env import (
     AIOHTTP_CLIENT_SESSION_SSL,
     ENABLE_STAR_SESSIONS_MIDDLEWARE,
     ENABLE_PUBLIC_ACTIVE_USERS_COUNT,
+    INGESTION_WORKER_MODE,
 )
 
 
@@ -596,6 +606,18 @@ async def lifespan(app: FastAPI):
         app.state.redis_task_command_listener = asyncio.create_task(
             redis_task_command_listener(app)
         )
+        app.state.model_catalog_listener = asyncio.create_task(
+            MODEL_CATALOG.listen(app)
+        )
+        app.state.auth_user_cache_listener = asyncio.create_task(
+            AUTH_USER_CACHE.listen(app)
+        )
+        app.state.model_access_listener = asyncio.create_task(
+            MODEL_ACCESS_INDEX.listen(app)
+        )
+        app.state.vector_aliases_listener = asyncio.create_task(
+            VECTOR_DB_CLIENT.listen(app)
+        )
 
     if THREAD_POOL_SIZE and THREAD_POOL_SIZE > 0:
         limiter = anyio.to_thread.current_default_thread_limiter()
@@ -603,6 +625,17 @@ async def lifespan(app: FastAPI):
 
     asyncio.create_task(periodic_usage_pool_cleanup())
 
+    EMBEDDING_SCHEDULER.start()
+    HTTP_CLIENT_POOL.start()
+    MODEL_CATALOG.start()
+    LAST_ACTIVE_WRITER.start()
+
+    if INGESTION_WORKER_MODE == "local":
+        app.state.ingestion_worker_task = asyncio.create_task(INGESTION_WORKER.run(app))
+
+    # Resume a knowledge reindex interrupted by a restart
+    KNOWLEDGE_REINDEXER.start(app)
+
     if app.state.config.ENABLE_BASE_MODELS_CACHE:
         await get_all_models(
             Request(
@@ -629,6 +662,28 @@ async def lifespan(app: FastAPI):
     if hasattr(app.state, "redis_task_command_listener"):
         app.state.redis_task_command_listener.cancel()
 
+    if hasattr(app.state, "model_catalog_listener"):
+        app.state.model_catalog_listener.cancel()
+
+    if hasattr(app.state, "auth_user_cache_listener"):
+        app.state.auth_user_cache_listener.cancel()
+
+    if hasattr(app.state, "model_access_listener"):
+        app.state.model_access_listener.cancel()
+
+    if hasattr(app.state, "vector_aliases_listener"):
+        app.state.vector_aliases_listener.cancel()
+
+    if hasattr(app.state, "ingestion_worker_task"):
+        app.state.ingestion_worker_task.cancel()
+
+    await EMBEDDING_SCHEDULER.close()
+    await HTTP_CLIENT_POOL.close()
+    await LAST_ACTIVE_WRITER.close()
+
+    if async_engine is not None:
+        await async_engine.dispose()
+
 
 app = FastAPI(
     title="ANSWERAI",
@@ -1683,7 +1738,7 @@ async def chat_completion(
             if metadata.get("chat_id") and metadata.get("message_id"):
                 try:
                     if not metadata["chat_id"].startswith("local:"):
-                        Chats.upsert_message_to_chat_by_id_and_message_id(
+                        Chats.upsert_chat_message_by_id_and_message_id(
                             metadata["chat_id"],
                             metadata["message_id"],
                             {
@@ -1716,7 +1771,7 @@ async def chat_completion(
                 # Update the chat message with the error
                 try:
                     if not metadata["chat_id"].startswith("local:"):
-                        Chats.upsert_message_to_chat_by_id_and_message_id(
+                        Chats.upsert_chat_message_by_id_and_message_id(
                             metadata["chat_id"],
                             metadata["message_id"],
                             {
@@ -2333,6 +2388,18 @@ async def get_opensearch_xml():
     return Response(content=xml_content, media_type="application/xml")
 
 
+@app.get("/api/http/pool")
+async def get_http_pool_stats(user=Depends(get_admin_user)):
+    """Connection pool statistics of the LLM backends, to size the pool."""
+    return HTTP_CLIENT_POOL.get_stats()
+
+
+@app.get("/api/backends/routing")
+async def get_backend_routing_stats(user=Depends(get_admin_user)):
+    """Requests in flight, latency and health of the LLM backends."""
+    return BACKEND_ROUTER.get_stats()
+
+
 @app.get("/health")
 async def healthcheck():
     return {"status": True}
@@ -0,0 +1,49 @@
+"""Add ingestion_job table
+
+Revision ID: 5b7e2d9c4a13
+Revises: 8d1e4c2b9f6a
+Create Date: 2026-01-26 09:12:44.207381
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5b7e2d9c4a13"
+down_revision: Union[str, None] = "8d1e4c2b9f6a"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "ingestion_job",
+        sa.Column("id", sa.Text(), primary_key=True),
+        sa.Column(
+            "file_id",
+            sa.Text(),
+            sa.ForeignKey("file.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("user_id", sa.Text(), nullable=False),
+        sa.Column("status", sa.Text(), nullable=False),
+        sa.Column("stage", sa.Text(), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("worker_id", sa.Text(), nullable=True),
+        sa.Column("locked_until", sa.BigInteger(), nullable=True),
+        sa.Column("run_after", sa.BigInteger(), nullable=False),
+        sa.Column("created_at", sa.BigInteger(), nullable=False),
+        sa.Column("updated_at", sa.BigInteger(), nullable=False),
+        # indexes
+        sa.Index("ingestion_job_file_id_idx", "file_id"),
+        sa.Index("ingestion_job_status_run_after_idx", "status", "run_after"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("ingestion_job")
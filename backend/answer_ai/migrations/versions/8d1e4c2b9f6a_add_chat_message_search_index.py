@@ -0,0 +1,109 @@
+"""Add chat_message search index
+
+Revision ID: 8d1e4c2b9f6a
+Revises: f3b2a7c81d4e
+Create Date: 2026-01-19 14:22:51.604113
+
+"""
+
+import logging
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "8d1e4c2b9f6a"
+down_revision: Union[str, None] = "f3b2a7c81d4e"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+log = logging.getLogger(__name__)
+
+# Only the first characters of a message are indexed on PostgreSQL, a tsvector
+# is limited to 1MB and an oversized one would make the insert fail
+POSTGRES_TSVECTOR_SQL = "to_tsvector('simple', left(coalesce(content, ''), 262144))"
+
+SQLITE_TRIGGERS = {
+    "chat_message_fts_insert": """
+        CREATE TRIGGER chat_message_fts_insert AFTER INSERT ON chat_message BEGIN
+            INSERT INTO chat_message_fts (rowid, content)
+            VALUES (new.rowid, new.content);
+        END
+    """,
+    "chat_message_fts_delete": """
+        CREATE TRIGGER chat_message_fts_delete AFTER DELETE ON chat_message BEGIN
+            INSERT INTO chat_message_fts (chat_message_fts, rowid, content)
+            VALUES ('delete', old.rowid, old.content);
+        END
+    """,
+    "chat_message_fts_update": """
+        CREATE TRIGGER chat_message_fts_update AFTER UPDATE OF content ON chat_message BEGIN
+            INSERT INTO chat_message_fts (chat_message_fts, rowid, content)
+            VALUES ('delete', old.rowid, old.content);
+            INSERT INTO chat_message_fts (rowid, content)
+            VALUES (new.rowid, new.content);
+        END
+    """,
+}
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+
+    if conn.dialect.name == "sqlite":
+        # External content FTS5 table over chat_message.content, kept current
+        # by triggers. `INSERT INTO chat_message_fts (chat_message_fts)
+        # VALUES ('rebuild')` rebuilds it from chat_message.
+        try:
+            conn.execute(
+                sa.text(
+                    "CREATE VIRTUAL TABLE chat_message_fts USING fts5("
+                    "content, content='chat_message', content_rowid='rowid', "
+                    "tokenize='unicode61 remove_diacritics 2')"
+                )
+            )
+        except sa.exc.OperationalError as e:
+            # SQLite built without FTS5, chat search keeps scanning messages
+            log.warning(f"Chat search index not created: {e}")
+            return
+
+        for trigger_sql in SQLITE_TRIGGERS.values():
+            conn.execute(sa.text(trigger_sql))
+
+        conn.execute(
+            sa.text(
+                "INSERT INTO chat_message_fts (chat_message_fts) VALUES ('rebuild')"
+            )
+        )
+
+    elif conn.dialect.name == "postgresql":
+        op.add_column(
+            "chat_message",
+            sa.Column(
+                "content_tsv",
+                postgresql.TSVECTOR(),
+                sa.Computed(POSTGRES_TSVECTOR_SQL, persisted=True),
+            ),
+        )
+        op.create_index(
+            "chat_message_content_tsv_idx",
+            "chat_message",
+            ["content_tsv"],
+            postgresql_using="gin",
+        )
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+
+    if conn.dialect.name == "sqlite":
+        for trigger_name in SQLITE_TRIGGERS:
+            conn.execute(sa.text(f"DROP TRIGGER IF EXISTS {trigger_name}"))
+        conn.execute(sa.text("DROP TABLE IF EXISTS chat_message_fts"))
+
+    elif conn.dialect.name == "postgresql":
+        op.drop_index("chat_message_content_tsv_idx", table_name="chat_message")
+        op.drop_column("chat_message", "content_tsv")
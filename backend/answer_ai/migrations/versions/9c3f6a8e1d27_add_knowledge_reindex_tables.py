@@ -0,0 +1,68 @@
+"""Add knowledge_reindex and vector_collection_alias tables
+
+Revision ID: 9c3f6a8e1d27
+Revises: 5b7e2d9c4a13
+Create Date: 2026-02-02 16:05:31.418926
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "9c3f6a8e1d27"
+down_revision: Union[str, None] = "5b7e2d9c4a13"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "vector_collection_alias",
+        sa.Column("name", sa.Text(), primary_key=True),
+        sa.Column("collection_name", sa.Text(), nullable=False),
+        sa.Column("updated_at", sa.BigInteger(), nullable=False),
+    )
+
+    op.create_table(
+        "knowledge_reindex",
+        sa.Column("id", sa.Text(), primary_key=True),
+        sa.Column("user_id", sa.Text(), nullable=False),
+        sa.Column("status", sa.Text(), nullable=False),
+        sa.Column("worker_id", sa.Text(), nullable=True),
+        sa.Column("locked_until", sa.BigInteger(), nullable=True),
+        sa.Column("data", sa.JSON(), nullable=True),
+        sa.Column("created_at", sa.BigInteger(), nullable=False),
+        sa.Column("updated_at", sa.BigInteger(), nullable=False),
+    )
+
+    op.create_table(
+        "knowledge_reindex_file",
+        sa.Column(
+            "reindex_id",
+            sa.Text(),
+            sa.ForeignKey("knowledge_reindex.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("knowledge_id", sa.Text(), primary_key=True),
+        sa.Column("file_id", sa.Text(), primary_key=True),
+        sa.Column("status", sa.Text(), nullable=False),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("updated_at", sa.BigInteger(), nullable=False),
+        # indexes
+        sa.Index(
+            "knowledge_reindex_file_status_idx",
+            "reindex_id",
+            "knowledge_id",
+            "status",
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("knowledge_reindex_file")
+    op.drop_table("knowledge_reindex")
+    op.drop_table("vector_collection_alias")
@@ -0,0 +1,176 @@
+"""Add chat_message table
+
+Revision ID: f3b2a7c81d4e
+Revises: c440947495f3
+Create Date: 2026-01-12 10:41:07.318245
+
+"""
+
+import time
+import uuid
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.sql import table, column
+
+
+# revision identifiers, used by Alembic.
+revision: str = "f3b2a7c81d4e"
+down_revision: Union[str, None] = "c440947495f3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 500
+
+
+chat_table = table(
+    "chat",
+    column("id", sa.String()),
+    column("chat", sa.JSON()),
+)
+
+chat_message_table = table(
+    "chat_message",
+    column("id", sa.Text()),
+    column("chat_id", sa.Text()),
+    column("message_id", sa.Text()),
+    column("parent_id", sa.Text()),
+    column("role", sa.Text()),
+    column("content", sa.Text()),
+    column("data", sa.JSON()),
+    column("created_at", sa.BigInteger()),
+    column("updated_at", sa.BigInteger()),
+)
+
+
+def _iter_chats(conn):
+    last_id = None
+    while True:
+        query = sa.select(chat_table.c.id, chat_table.c.chat).order_by(chat_table.c.id)
+        if last_id is not None:
+            query = query.where(chat_table.c.id > last_id)
+
+        rows = conn.execute(query.limit(BATCH_SIZE)).fetchall()
+        if not rows:
+            break
+
+        yield from rows
+        last_id = rows[-1].id
+
+
+def _get_created_at(message: dict, now: int) -> int:
+    # Messages carry their own creation time (in seconds), if any
+    timestamp = message.get("timestamp")
+    if isinstance(timestamp, (int, float)) and not isinstance(timestamp, bool):
+        return int(timestamp)
+    return now
+
+
+def upgrade() -> None:
+    op.create_table(
+        "chat_message",
+        sa.Column("id", sa.Text(), primary_key=True),
+        sa.Column(
+            "chat_id",
+            sa.Text(),
+            sa.ForeignKey("chat.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("message_id", sa.Text(), nullable=False),
+        sa.Column("parent_id", sa.Text(), nullable=True),
+        sa.Column("role", sa.Text(), nullable=True),
+        sa.Column("content", sa.Text(), nullable=True),
+        sa.Column("data", sa.JSON(), nullable=True),
+        sa.Column("created_at", sa.BigInteger(), nullable=False),
+        sa.Column("updated_at", sa.BigInteger(), nullable=False),
+        # indexes
+        sa.Index("chat_message_chat_id_idx", "chat_id"),
+        # unique constraints
+        sa.UniqueConstraint(
+            "chat_id", "message_id", name="uq_chat_message_chat_id_message_id"
+        ),
+    )
+
+    # Backfill: move every chat's history.messages into chat_message
+    conn = op.get_bind()
+    now = int(time.time())
+
+    for row in _iter_chats(conn):
+        chat = row.chat if isinstance(row.chat, dict) else None
+        history = (chat or {}).get("history")
+        if not isinstance(history, dict):
+            continue
+
+        messages_map = history.get("messages")
+        if not isinstance(messages_map, dict):
+            continue
+
+        if messages_map:
+            values = []
+            for message_id, message in messages_map.items():
+                message = message if isinstance(message, dict) else {}
+                content = message.get("content")
+                values.append(
+                    {
+                        "id": str(uuid.uuid4()),
+                        "chat_id": row.id,
+                        "message_id": message_id,
+                        "parent_id": message.get("parentId"),
+                        "role": message.get("role"),
+                        "content": (
+                            content.replace("\x00", "")
+                            if isinstance(content, str)
+                            else None
+                        ),
+                        "data": message,
+                        "created_at": _get_created_at(message, now),
+                        "updated_at": now,
+                    }
+                )
+            conn.execute(sa.insert(chat_message_table), values)
+
+        chat = {key: value for key, value in chat.items() if key != "messages"}
+        chat["history"] = {
+            key: value for key, value in history.items() if key != "messages"
+        }
+        conn.execute(
+            sa.update(chat_table).where(chat_table.c.id == row.id).values(chat=chat)
+        )
+
+
+def downgrade() -> None:
+    # Fold the messages back into the chat JSON before dropping the table
+    conn = op.get_bind()
+
+    for row in _iter_chats(conn):
+        chat = row.chat if isinstance(row.chat, dict) else None
+        history = (chat or {}).get("history")
+        if not isinstance(history, dict) or "messages" in history:
+            continue
+
+        messages = conn.execute(
+            sa.select(chat_message_table.c.message_id, chat_message_table.c.data).where(
+                chat_message_table.c.chat_id == row.id
+            )
+        ).fetchall()
+        messages_map = {message.message_id: message.data for message in messages}
+
+        # Rebuild the linear list of the current branch
+        messages_list = []
+        message = messages_map.get(history.get("currentId"))
+        while message:
+            messages_list.insert(0, message)
+            parent_id = message.get("parentId")
+            message = messages_map.get(parent_id) if parent_id else None
+
+        chat = {
+            **chat,
+            "history": {**history, "messages": messages_map},
+            "messages": chat.get("messages", messages_list),
+        }
+        conn.execute(
+            sa.update(chat_table).where(chat_table.c.id == row.id).values(chat=chat)
+        )
+
+    op.drop_table("chat_message")
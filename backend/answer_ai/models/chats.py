@@ -1,13 +1,19 @@
+import asyncio
 import logging
 import json
+import re
 import time
 import uuid
 from typing import Optional
 
-from answer_ai.internal.db import Base, get_db
+from answer_ai.internal.db import AsyncSessionLocal, Base, get_async_db, get_db
 from answer_ai.models.tags import TagModel, Tag, Tags
 from answer_ai.models.folders import Folders
-from answer_ai.utils.misc import sanitize_data_for_db, sanitize_text_for_db
+from answer_ai.utils.misc import (
+    get_message_list,
+    sanitize_data_for_db,
+    sanitize_text_for_db,
+)
 
 from pydantic import BaseModel, ConfigDict
 from sqlalchemy import (
@@ -21,7 +27,8 @@ from sqlalchemy import (
     Index,
     UniqueConstraint,
 )
-from sqlalchemy import or_, func, select, and_, text
+from sqlalchemy import or_, func, select, and_, inspect, text
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.sql import exists
 from sqlalchemy.sql.expression import bindparam
 
@@ -116,6 +123,52 @@ class ChatFileModel(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class ChatMessage(Base):
+    """
+    One row per entry of a chat's ``history.messages`` map.
+
+    The ``chat.chat`` JSON blob keeps everything else (title, models, params,
+    ``history.currentId``...) and is re-assembled with these rows on read.
+    """
+
+    __tablename__ = "chat_message"
+
+    id = Column(Text, unique=True, primary_key=True)
+    chat_id = Column(Text, ForeignKey("chat.id", ondelete="CASCADE"), nullable=False)
+    message_id = Column(Text, nullable=False)
+
+    parent_id = Column(Text, nullable=True)
+    role = Column(Text, nullable=True)
+    content = Column(Text, nullable=True)
+    data = Column(JSON, nullable=True)
+
+    created_at = Column(BigInteger, nullable=False)
+    updated_at = Column(BigInteger, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint(
+            "chat_id", "message_id", name="uq_chat_message_chat_id_message_id"
+        ),
+        Index("chat_message_chat_id_idx", "chat_id"),
+    )
+
+
+class ChatMessageModel(BaseModel):
+    id: str
+    chat_id: str
+    message_id: str
+
+    parent_id: Optional[str] = None
+    role: Optional[str] = None
+    content: Optional[str] = None
+    data: Optional[dict] = None
+
+    created_at: int
+    updated_at: int
+
+    model_config = ConfigDict(from_attributes=True)
+
+
 ####################
 # Forms
 ####################
@@ -238,6 +291,199 @@ class ChatTable:
 
         return changed
 
+    ####################
+    # Message storage
+    #
+    # `history.messages` lives in the `chat_message` table, one row per message.
+    # The `chat.chat` blob is stored without it (and without the derived
+    # top-level `messages` list), so saving a single message never rewrites
+    # the whole chat. Chats that still carry `history.messages` in the blob
+    # (not yet normalized) are served as-is.
+    ####################
+
+    def _is_normalized(self, chat: Optional[dict]) -> bool:
+        history = (chat or {}).get("history")
+        return isinstance(history, dict) and "messages" not in history
+
+    def _split_chat(self, chat: dict) -> tuple[dict, Optional[dict]]:
+        """
+        Split `history.messages` out of a chat blob.
+        Returns the blob to store and the messages map, or None when the chat
+        has no `history.messages` to normalize.
+        """
+        history = chat.get("history")
+        if not isinstance(history, dict) or "messages" not in history:
+            return chat, None
+
+        messages_map = history.get("messages")
+        if not isinstance(messages_map, dict):
+            return chat, None
+
+        chat = {key: value for key, value in chat.items() if key != "messages"}
+        chat["history"] = {
+            key: value for key, value in history.items() if key != "messages"
+        }
+        return chat, messages_map
+
+    def _assemble_chat(self, chat: dict, messages_map: dict) -> dict:
+        history = {**chat.get("history", {}), "messages": messages_map}
+        chat = {**chat, "history": history}
+        if "messages" not in chat:
+            chat["messages"] = get_message_list(messages_map, history.get("currentId"))
+        return chat
+
+    def _get_message_values(
+        self, chat_id: str, message_id: str, message: dict, now: int
+    ) -> dict:
+        content = message.get("content")
+        return {
+            "chat_id": chat_id,
+            "message_id": message_id,
+            "parent_id": message.get("parentId"),
+            "role": message.get("role"),
+            "content": content if isinstance(content, str) else None,
+            "data": message,
+            "updated_at": now,
+        }
+
+    def _get_message_created_at(self, message: dict, now: int) -> int:
+        # Messages carry their own creation time (in seconds), if any
+        timestamp = message.get("timestamp")
+        if isinstance(timestamp, (int, float)) and not isinstance(timestamp, bool):
+            return int(timestamp)
+        return now
+
+    def _insert_chat_messages(self, db, chat_id: str, messages_map: dict) -> None:
+        now = int(time.time())
+        db.add_all(
+            [
+                ChatMessage(
+                    id=str(uuid.uuid4()),
+                    created_at=self._get_message_created_at(message, now),
+                    **self._get_message_values(chat_id, message_id, message, now),
+                )
+                for message_id, message in messages_map.items()
+            ]
+        )
+
+    def _sync_chat_messages(self, db, chat_id: str, messages_map: dict) -> None:
+        """Make the `chat_message` rows of a chat match `messages_map`."""
+        now = int(time.time())
+        existing = {
+            row.message_id: row
+            for row in db.query(ChatMessage).filter_by(chat_id=chat_id).all()
+        }
+
+        for message_id, message in messages_map.items():
+            row = existing.pop(message_id, None)
+            if row is None:
+                db.add(
+                    ChatMessage(
+                        id=str(uuid.uuid4()),
+                        created_at=self._get_message_created_at(message, now),
+                        **self._get_message_values(chat_id, message_id, message, now),
+                    )
+                )
+            elif row.data != message:
+                for key, value in self._get_message_values(
+                    chat_id, message_id, message, now
+                ).items():
+                    setattr(row, key, value)
+
+        if existing:
+            db.query(ChatMessage).filter(
+                ChatMessage.id.in_([row.id for row in existing.values()])
+            ).delete(synchronize_session=False)
+
+    def _delete_chat_messages(self, db, chat_ids) -> None:
+        # Explicit delete: SQLite does not enforce the ON DELETE CASCADE by default
+        db.query(ChatMessage).filter(ChatMessage.chat_id.in_(chat_ids)).delete(
+            synchronize_session=False
+        )
+
+    def _copy_chat_messages(self, db, from_chat_id: str, to_chat_id: str) -> None:
+        now = int(time.time())
+        rows = db.query(ChatMessage).filter_by(chat_id=from_chat_id).all()
+        db.add_all(
+            [
+                ChatMessage(
+                    id=str(uuid.uuid4()),
+                    chat_id=to_chat_id,
+                    message_id=row.message_id,
+                    parent_id=row.parent_id,
+                    role=row.role,
+                    content=row.content,
+                    data=row.data,
+                    created_at=now,
+                    updated_at=now,
+                )
+                for row in rows
+            ]
+        )
+
+    def _normalize_chat_row(self, db, chat_item) -> None:
+        """Move a not-yet-normalized chat's messages into `chat_message`."""
+        chat = chat_item.chat or {}
+        chat, messages_map = self._split_chat(chat)
+        if messages_map is None:
+            # No usable `history.messages` (legacy chat), start an empty map
+            history = chat.get("history")
+            history = history if isinstance(history, dict) else {}
+            chat = {
+                **chat,
+                "history": {
+                    key: value for key, value in history.items() if key != "messages"
+                },
+            }
+            messages_map = {}
+
+        self._sync_chat_messages(db, chat_item.id, messages_map)
+        chat_item.chat = chat
+
+    def _to_chat_models(self, db, chat_items) -> list[ChatModel]:
+        chats = [ChatModel.model_validate(chat_item) for chat_item in chat_items]
+
+        chat_ids = [chat.id for chat in chats if self._is_normalized(chat.chat)]
+        messages_maps = {chat_id: {} for chat_id in chat_ids}
+
+        # Batched to stay below the bound-parameter limit of the database
+        for idx in range(0, len(chat_ids), 500):
+            rows = (
+                db.query(ChatMessage.chat_id, ChatMessage.message_id, ChatMessage.data)
+                .filter(ChatMessage.chat_id.in_(chat_ids[idx : idx + 500]))
+                .all()
+            )
+            for row in rows:
+                messages_maps[row.chat_id][row.message_id] = row.data
+
+        for chat in chats:
+            if chat.id in messages_maps:
+                chat.chat = self._assemble_chat(chat.chat, messages_maps[chat.id])
+        return chats
+
+    def _to_chat_model(self, db, chat_item) -> ChatModel:
+        return self._to_chat_models(db, [chat_item])[0]
+
+    async def _ato_chat_models(self, db, chat_items) -> list[ChatModel]:
+        chats = [ChatModel.model_validate(chat_item) for chat_item in chat_items]
+
+        chat_ids = [chat.id for chat in chats if self._is_normalized(chat.chat)]
+        messages_maps = {chat_id: {} for chat_id in chat_ids}
+
+        for idx in range(0, len(chat_ids), 500):
+            result = await db.execute(
+                select(
+                    ChatMessage.chat_id, ChatMessage.message_id, ChatMessage.data
+                ).where(ChatMessage.chat_id.in_(chat_ids[idx : idx + 500]))
+            )
+            for row in result:
+                messages_maps[row.chat_id][row.message_id] = row.data
+
+        for chat in chats:
+            if chat.id in messages_maps:
+                chat.chat = self._assemble_chat(chat.chat, messages_maps[chat.id])
+        return chats
+
     def insert_new_chat(self, user_id: str, form_data: ChatForm) -> Optional[ChatModel]:
         with get_db() as db:
             id = str(uuid.uuid4())
@@ -258,10 +504,16 @@ class ChatTable:
             )
 
             chat_item = Chat(**chat.model_dump())
+            chat_item.chat, messages_map = self._split_chat(chat.chat)
             db.add(chat_item)
+            db.flush()
+
+            if messages_map:
+                self._insert_chat_messages(db, id, messages_map)
+
             db.commit()
             db.refresh(chat_item)
-            return ChatModel.model_validate(chat_item) if chat_item else None
+            return self._to_chat_model(db, chat_item) if chat_item else None
 
     def _chat_import_form_to_chat_model(
         self, user_id: str, form_data: ChatImportForm
@@ -293,44 +545,70 @@ class ChatTable:
     ) -> list[ChatModel]:
         with get_db() as db:
             chats = []
+            messages_maps = {}
 
             for form_data in chat_import_forms:
                 chat = self._chat_import_form_to_chat_model(user_id, form_data)
-                chats.append(Chat(**chat.model_dump()))
+                chat_item = Chat(**chat.model_dump())
+                chat_item.chat, messages_map = self._split_chat(chat.chat)
+                if messages_map:
+                    messages_maps[chat.id] = messages_map
+                chats.append(chat_item)
 
             db.add_all(chats)
+            db.flush()
+
+            for chat_id, messages_map in messages_maps.items():
+                self._insert_chat_messages(db, chat_id, messages_map)
+
             db.commit()
-            return [ChatModel.model_validate(chat) for chat in chats]
+            return self._to_chat_models(db, chats)
 
     def update_chat_by_id(self, id: str, chat: dict) -> Optional[ChatModel]:
         try:
             with get_db() as db:
                 chat_item = db.get(Chat, id)
-                chat_item.chat = self._clean_null_bytes(chat)
-                chat_item.title = (
-                    self._clean_null_bytes(chat["title"])
-                    if "title" in chat
-                    else "New Chat"
-                )
+                chat = self._clean_null_bytes(chat)
+
+                # A chat without `history.messages` leaves the stored messages untouched
+                chat, messages_map = self._split_chat(chat)
+                if messages_map is not None:
+                    self._sync_chat_messages(db, id, messages_map)
+                elif not self._is_normalized(chat) and self._is_normalized(
+                    chat_item.chat
+                ):
+                    chat = {**chat, "history": chat_item.chat["history"]}
+
+                chat_item.chat = chat
+                chat_item.title = chat["title"] if "title" in chat else "New Chat"
 
                 chat_item.updated_at = int(time.time())
 
                 db.commit()
                 db.refresh(chat_item)
 
-                return ChatModel.model_validate(chat_item)
+                return self._to_chat_model(db, chat_item)
         except Exception:
             return None
 
     def update_chat_title_by_id(self, id: str, title: str) -> Optional[ChatModel]:
-        chat = self.get_chat_by_id(id)
-        if chat is None:
-            return None
+        try:
+            with get_db() as db:
+                chat_item = db.get(Chat, id)
+                if chat_item is None:
+                    return None
 
-        chat = chat.chat
-        chat["title"] = title
+                title = self._clean_null_bytes(title)
+                chat_item.chat = {**(chat_item.chat or {}), "title": title}
+                chat_item.title = title
+                chat_item.updated_at = int(time.time())
 
-        return self.update_chat_by_id(id, chat)
+                db.commit()
+                db.refresh(chat_item)
+
+                return self._to_chat_model(db, chat_item)
+        except Exception:
+            return None
 
     def update_chat_tags_by_id(
         self, id: str, tags: list[str], user
@@ -353,93 +631,419 @@ class ChatTable:
         return self.get_chat_by_id(id)
 
     def get_chat_title_by_id(self, id: str) -> Optional[str]:
-        chat = self.get_chat_by_id(id)
-        if chat is None:
-            return None
+        with get_db() as db:
+            chat_item = db.get(Chat, id)
+            if chat_item is None:
+                return None
+
+            return (chat_item.chat or {}).get("title", "New Chat")
+
+    async def aget_chat_title_by_id(self, id: str) -> Optional[str]:
+        if AsyncSessionLocal is None:
+            return await asyncio.to_thread(self.get_chat_title_by_id, id)
+
+        async with get_async_db() as db:
+            chat_item = await db.get(Chat, id)
+            if chat_item is None:
+                return None
 
-        return chat.chat.get("title", "New Chat")
+            return (chat_item.chat or {}).get("title", "New Chat")
 
     def get_messages_map_by_chat_id(self, id: str) -> Optional[dict]:
-        chat = self.get_chat_by_id(id)
-        if chat is None:
-            return None
+        with get_db() as db:
+            chat_item = db.get(Chat, id)
+            if chat_item is None:
+                return None
+
+            if not self._is_normalized(chat_item.chat):
+                return (chat_item.chat or {}).get("history", {}).get(
+                    "messages", {}
+                ) or {}
+
+            rows = (
+                db.query(ChatMessage.message_id, ChatMessage.data)
+                .filter_by(chat_id=id)
+                .all()
+            )
+            return {row.message_id: row.data for row in rows}
+
+    async def aget_messages_map_by_chat_id(self, id: str) -> Optional[dict]:
+        if AsyncSessionLocal is None:
+            return await asyncio.to_thread(self.get_messages_map_by_chat_id, id)
+
+        async with get_async_db() as db:
+            chat_item = await db.get(Chat, id)
+            if chat_item is None:
+                return None
 
-        return chat.chat.get("history", {}).get("messages", {}) or {}
+            if not self._is_normalized(chat_item.chat):
+                return (chat_item.chat or {}).get("history", {}).get(
+                    "messages", {}
+                ) or {}
+
+            result = await db.execute(
+                select(ChatMessage.message_id, ChatMessage.data).where(
+                    ChatMessage.chat_id == id
+                )
+            )
+            return {row.message_id: row.data for row in result}
 
     def get_message_by_id_and_message_id(
         self, id: str, message_id: str
     ) -> Optional[dict]:
-        chat = self.get_chat_by_id(id)
-        if chat is None:
+        with get_db() as db:
+            chat_item = db.get(Chat, id)
+            if chat_item is None:
+                return None
+
+            if not self._is_normalized(chat_item.chat):
+                return (
+                    (chat_item.chat or {})
+                    .get("history", {})
+                    .get("messages", {})
+                    .get(message_id, {})
+                )
+
+            row = (
+                db.query(ChatMessage.data)
+                .filter_by(chat_id=id, message_id=message_id)
+                .first()
+            )
+            return (row.data or {}) if row else {}
+
+    async def aget_message_by_id_and_message_id(
+        self, id: str, message_id: str
+    ) -> Optional[dict]:
+        if AsyncSessionLocal is None:
+            return await asyncio.to_thread(
+                self.get_message_by_id_and_message_id, id, message_id
+            )
+
+        async with get_async_db() as db:
+            chat_item = await db.get(Chat, id)
+            if chat_item is None:
+                return None
+
+            if not self._is_normalized(chat_item.chat):
+                return (
+                    (chat_item.chat or {})
+                    .get("history", {})
+                    .get("messages", {})
+                    .get(message_id, {})
+                )
+
+            data = await db.scalar(
+                select(ChatMessage.data).where(
+                    ChatMessage.chat_id == id, ChatMessage.message_id == message_id
+                )
+            )
+            return data or {}
+
+    def _get_or_normalize_chat_item(self, db, id: str):
+        chat_item = db.get(Chat, id)
+        if chat_item is not None and not self._is_normalized(chat_item.chat):
+            self._normalize_chat_row(db, chat_item)
+            db.flush()
+        return chat_item
+
+    def upsert_chat_message_by_id_and_message_id(
+        self, id: str, message_id: str, message: dict
+    ) -> Optional[dict]:
+        """
+        Merge `message` into a single message of a chat and make it the current one.
+        Only the message row is written (plus the chat row when `currentId` moves),
+        returns the merged message or None if the chat does not exist.
+        """
+        # Sanitize message content for null characters before upserting
+        message = self._clean_null_bytes(message)
+
+        with get_db() as db:
+            try:
+                return self._upsert_chat_message(db, id, message_id, message)
+            except IntegrityError:
+                # A concurrent first write inserted the same message, merge into it
+                db.rollback()
+                return self._upsert_chat_message(db, id, message_id, message)
+
+    def _upsert_chat_message(
+        self, db, id: str, message_id: str, message: dict
+    ) -> Optional[dict]:
+        chat_item = self._get_or_normalize_chat_item(db, id)
+        if chat_item is None:
             return None
 
-        return chat.chat.get("history", {}).get("messages", {}).get(message_id, {})
+        now = int(time.time())
+        # Row lock so concurrent merges into the same message don't drop updates
+        row = (
+            db.query(ChatMessage)
+            .filter_by(chat_id=id, message_id=message_id)
+            .with_for_update()
+            .first()
+        )
+
+        if row is None:
+            message = {**message}
+            db.add(
+                ChatMessage(
+                    id=str(uuid.uuid4()),
+                    created_at=self._get_message_created_at(message, now),
+                    **self._get_message_values(id, message_id, message, now),
+                )
+            )
+        else:
+            message = {**(row.data or {}), **message}
+            for key, value in self._get_message_values(
+                id, message_id, message, now
+            ).items():
+                setattr(row, key, value)
+
+        history = chat_item.chat.get("history", {})
+        if history.get("currentId") != message_id:
+            chat_item.chat = {
+                **chat_item.chat,
+                "history": {**history, "currentId": message_id},
+            }
+            chat_item.updated_at = now
+        elif chat_item.updated_at != now:
+            chat_item.updated_at = now
+
+        db.commit()
+        return message
 
     def upsert_message_to_chat_by_id_and_message_id(
         self, id: str, message_id: str, message: dict
     ) -> Optional[ChatModel]:
-        chat = self.get_chat_by_id(id)
-        if chat is None:
+        if (
+            self.upsert_chat_message_by_id_and_message_id(id, message_id, message)
+            is None
+        ):
             return None
 
-        # Sanitize message content for null characters before upserting
-        if isinstance(message.get("content"), str):
-            message["content"] = sanitize_text_for_db(message["content"])
-
-        chat = chat.chat
-        history = chat.get("history", {})
+        return self.get_chat_by_id(id)
 
-        if message_id in history.get("messages", {}):
-            history["messages"][message_id] = {
-                **history["messages"][message_id],
-                **message,
-            }
-        else:
-            history["messages"][message_id] = message
+    def _update_message_data_by_id_and_message_id(
+        self, id: str, message_id: str, update_fn, upsert: bool = False
+    ) -> Optional[dict]:
+        with get_db() as db:
+            try:
+                return self._update_message_data(
+                    db, id, message_id, update_fn, upsert=upsert
+                )
+            except IntegrityError:
+                # A concurrent first write inserted the same message, update it
+                db.rollback()
+                return self._update_message_data(
+                    db, id, message_id, update_fn, upsert=upsert
+                )
 
-        history["currentId"] = message_id
+    def _update_message_data(
+        self, db, id: str, message_id: str, update_fn, upsert: bool = False
+    ) -> Optional[dict]:
+        chat_item = self._get_or_normalize_chat_item(db, id)
+        if chat_item is None:
+            return None
 
-        chat["history"] = history
-        return self.update_chat_by_id(id, chat)
+        # Row lock so concurrent merges into the same message don't drop updates
+        row = (
+            db.query(ChatMessage)
+            .filter_by(chat_id=id, message_id=message_id)
+            .with_for_update()
+            .first()
+        )
+        now = int(time.time())
+        if row is None:
+            if not upsert:
+                return {}
+
+            row = ChatMessage(id=str(uuid.uuid4()))
+            db.add(row)
+
+        message = update_fn({**(row.data or {})})
+        if row.created_at is None:
+            row.created_at = self._get_message_created_at(message, now)
+        for key, value in self._get_message_values(
+            id, message_id, message, now
+        ).items():
+            setattr(row, key, value)
+
+        chat_item.updated_at = now
+        db.commit()
+        return message
 
     def add_message_status_to_chat_by_id_and_message_id(
         self, id: str, message_id: str, status: dict
     ) -> Optional[ChatModel]:
-        chat = self.get_chat_by_id(id)
-        if chat is None:
-            return None
+        status = self._clean_null_bytes(status)
 
-        chat = chat.chat
-        history = chat.get("history", {})
+        def update_fn(message: dict) -> dict:
+            message["statusHistory"] = message.get("statusHistory", []) + [status]
+            return message
 
-        if message_id in history.get("messages", {}):
-            status_history = history["messages"][message_id].get("statusHistory", [])
-            status_history.append(status)
-            history["messages"][message_id]["statusHistory"] = status_history
+        if (
+            self._update_message_data_by_id_and_message_id(id, message_id, update_fn)
+            is None
+        ):
+            return None
 
-        chat["history"] = history
-        return self.update_chat_by_id(id, chat)
+        return self.get_chat_by_id(id)
 
     def add_message_files_by_id_and_message_id(
         self, id: str, message_id: str, files: list[dict]
     ) -> list[dict]:
-        chat = self.get_chat_by_id(id)
-        if chat is None:
+        files = self._clean_null_bytes(files)
+
+        def update_fn(message: dict) -> dict:
+            message["files"] = message.get("files", []) + files
+            return message
+
+        message = self._update_message_data_by_id_and_message_id(
+            id, message_id, update_fn
+        )
+        if message is None:
+            return None
+
+        return message.get("files", [])
+
+    def _get_append_statement(
+        self,
+        dialect_name: str,
+        content: Optional[str],
+        append: dict[str, list],
+        prepend: dict[str, list],
+    ):
+        """
+        Build an UPDATE appending to a message's JSON `data` in place, or None
+        when the dialect can't express it.
+        """
+        fields = [*append.keys(), *prepend.keys()]
+        if not all(re.fullmatch(r"[A-Za-z_][A-Za-z0-9_]*", field) for field in fields):
+            return None
+
+        params = {}
+        if dialect_name == "sqlite":
+            # SQLite JSON1 has no way to insert at the front of an array
+            if prepend:
+                return None
+
+            data_sql = "COALESCE(data, '{}')"
+            if content:
+                data_sql = (
+                    f"json_set({data_sql}, '$.content', "
+                    "COALESCE(json_extract(data, '$.content'), '') || :content)"
+                )
+            for idx, (field, items) in enumerate(append.items()):
+                values_sql = ", ".join(
+                    f"'$[#]', json(:append_{idx}_{item_idx})"
+                    for item_idx in range(len(items))
+                )
+                data_sql = (
+                    f"json_set({data_sql}, '$.{field}', json_insert("
+                    f"COALESCE(json_extract(data, '$.{field}'), json('[]')), "
+                    f"{values_sql}))"
+                )
+                params.update(
+                    {
+                        f"append_{idx}_{item_idx}": json.dumps(item)
+                        for item_idx, item in enumerate(items)
+                    }
+                )
+
+        elif dialect_name == "postgresql":
+
+            def get_array_sql(field: str) -> str:
+                return (
+                    f"COALESCE(CASE WHEN jsonb_typeof(data::jsonb->'{field}') = 'array' "
+                    f"THEN data::jsonb->'{field}' END, '[]'::jsonb)"
+                )
+
+            data_sql = "COALESCE(data::jsonb, '{}'::jsonb)"
+            if content:
+                data_sql = (
+                    f"jsonb_set({data_sql}, '{{content}}', "
+                    "to_jsonb(COALESCE(data->>'content', '') || :content))"
+                )
+            for idx, (field, items) in enumerate(append.items()):
+                data_sql = (
+                    f"jsonb_set({data_sql}, '{{{field}}}', "
+                    f"{get_array_sql(field)} || CAST(:append_{idx} AS jsonb))"
+                )
+                params[f"append_{idx}"] = json.dumps(items)
+            for idx, (field, items) in enumerate(prepend.items()):
+                data_sql = (
+                    f"jsonb_set({data_sql}, '{{{field}}}', "
+                    f"CAST(:prepend_{idx} AS jsonb) || {get_array_sql(field)})"
+                )
+                params[f"prepend_{idx}"] = json.dumps(items)
+            data_sql = f"({data_sql})::json"
+        else:
             return None
 
-        chat = chat.chat
-        history = chat.get("history", {})
+        content_sql = "content"
+        if content:
+            content_sql = "COALESCE(content, '') || :content"
+            params["content"] = content
 
-        message_files = []
+        return text(
+            f"UPDATE chat_message SET data = {data_sql}, content = {content_sql}, "
+            "updated_at = :updated_at "
+            "WHERE chat_id = :chat_id AND message_id = :message_id"
+        ).bindparams(**params)
 
-        if message_id in history.get("messages", {}):
-            message_files = history["messages"][message_id].get("files", [])
-            message_files = message_files + files
-            history["messages"][message_id]["files"] = message_files
+    def append_to_message_by_id_and_message_id(
+        self,
+        id: str,
+        message_id: str,
+        content: Optional[str] = None,
+        append: Optional[dict[str, list]] = None,
+        prepend: Optional[dict[str, list]] = None,
+        upsert: bool = False,
+    ) -> bool:
+        """
+        Append to a single message without loading the chat: `content` is
+        concatenated to the message content, the lists in `append` / `prepend`
+        are added after / before the existing values of those fields.
+        Done in SQL with the database's JSON functions where possible, returns
+        False if the chat does not exist. A message not stored yet is skipped,
+        unless `upsert` is set.
+        """
+        content = sanitize_text_for_db(content) if content else None
+        append = self._clean_null_bytes(append or {})
+        prepend = self._clean_null_bytes(prepend or {})
+        if not (content or append or prepend):
+            return True
 
-        chat["history"] = history
-        self.update_chat_by_id(id, chat)
-        return message_files
+        with get_db() as db:
+            statement = self._get_append_statement(
+                db.bind.dialect.name, content, append, prepend
+            )
+            if statement is not None:
+                now = int(time.time())
+                result = db.execute(
+                    statement,
+                    {"chat_id": id, "message_id": message_id, "updated_at": now},
+                )
+                if result.rowcount:
+                    db.query(Chat).filter_by(id=id).update({"updated_at": now})
+                    db.commit()
+                    return True
+                db.rollback()
+
+        # Message not stored yet (or no JSON support), merge it in Python
+        def update_fn(message: dict) -> dict:
+            if content:
+                message["content"] = (message.get("content") or "") + content
+            for field, items in append.items():
+                message[field] = (message.get(field) or []) + items
+            for field, items in prepend.items():
+                message[field] = items + (message.get(field) or [])
+            return message
+
+        return (
+            self._update_message_data_by_id_and_message_id(
+                id, message_id, update_fn, upsert=upsert
+            )
+            is not None
+        )
 
     def insert_shared_chat_by_chat_id(self, chat_id: str) -> Optional[ChatModel]:
         with get_db() as db:
@@ -464,6 +1068,8 @@ class ChatTable:
             )
             shared_result = Chat(**shared_chat.model_dump())
             db.add(shared_result)
+            db.flush()
+            self._copy_chat_messages(db, chat_id, shared_chat.id)
             db.commit()
             db.refresh(shared_result)
 
@@ -474,7 +1080,11 @@ class ChatTable:
                 .update({"share_id": shared_chat.id})
             )
             db.commit()
-            return shared_chat if (shared_result and result) else None
+            return (
+                self._to_chat_model(db, shared_result)
+                if (shared_result and result)
+                else None
+            )
 
     def update_shared_chat_by_chat_id(self, chat_id: str) -> Optional[ChatModel]:
         try:
@@ -493,16 +1103,22 @@ class ChatTable:
                 shared_chat.pinned = chat.pinned
                 shared_chat.folder_id = chat.folder_id
                 shared_chat.updated_at = int(time.time())
+
+                self._delete_chat_messages(db, [shared_chat.id])
+                self._copy_chat_messages(db, chat_id, shared_chat.id)
                 db.commit()
                 db.refresh(shared_chat)
 
-                return ChatModel.model_validate(shared_chat)
+                return self._to_chat_model(db, shared_chat)
         except Exception:
             return None
 
     def delete_shared_chat_by_chat_id(self, chat_id: str) -> bool:
         try:
             with get_db() as db:
+                self._delete_chat_messages(
+                    db, select(Chat.id).where(Chat.user_id == f"shared-{chat_id}")
+                )
                 db.query(Chat).filter_by(user_id=f"shared-{chat_id}").delete()
                 db.commit()
 
@@ -528,7 +1144,7 @@ class ChatTable:
                 chat.share_id = share_id
                 db.commit()
                 db.refresh(chat)
-                return ChatModel.model_validate(chat)
+                return self._to_chat_model(db, chat)
         except Exception:
             return None
 
@@ -540,7 +1156,7 @@ class ChatTable:
                 chat.updated_at = int(time.time())
                 db.commit()
                 db.refresh(chat)
-                return ChatModel.model_validate(chat)
+                return self._to_chat_model(db, chat)
         except Exception:
             return None
 
@@ -553,7 +1169,7 @@ class ChatTable:
                 chat.updated_at = int(time.time())
                 db.commit()
                 db.refresh(chat)
-                return ChatModel.model_validate(chat)
+                return self._to_chat_model(db, chat)
         except Exception:
             return None
 
@@ -604,7 +1220,7 @@ class ChatTable:
                 query = query.limit(limit)
 
             all_chats = query.all()
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_models(db, all_chats)
 
     def get_chat_list_by_user_id(
         self,
@@ -643,7 +1259,7 @@ class ChatTable:
                 query = query.limit(limit)
 
             all_chats = query.all()
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_models(db, all_chats)
 
     def get_chat_title_id_list_by_user_id(
         self,
@@ -690,6 +1306,60 @@ class ChatTable:
                 for chat in all_chats
             ]
 
+    async def aget_chat_title_id_list_by_user_id(
+        self,
+        user_id: str,
+        include_archived: bool = False,
+        include_folders: bool = False,
+        include_pinned: bool = False,
+        skip: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> list[ChatTitleIdResponse]:
+        if AsyncSessionLocal is None:
+            return await asyncio.to_thread(
+                self.get_chat_title_id_list_by_user_id,
+                user_id,
+                include_archived=include_archived,
+                include_folders=include_folders,
+                include_pinned=include_pinned,
+                skip=skip,
+                limit=limit,
+            )
+
+        async with get_async_db() as db:
+            query = select(Chat.id, Chat.title, Chat.updated_at, Chat.created_at).where(
+                Chat.user_id == user_id
+            )
+
+            if not include_folders:
+                query = query.where(Chat.folder_id == None)
+
+            if not include_pinned:
+                query = query.where(or_(Chat.pinned == False, Chat.pinned == None))
+
+            if not include_archived:
+                query = query.where(Chat.archived == False)
+
+            query = query.order_by(Chat.updated_at.desc())
+
+            if skip:
+                query = query.offset(skip)
+            if limit:
+                query = query.limit(limit)
+
+            result = await db.execute(query)
+            return [
+                ChatTitleIdResponse.model_validate(
+                    {
+                        "id": chat.id,
+                        "title": chat.title,
+                        "updated_at": chat.updated_at,
+                        "created_at": chat.created_at,
+                    }
+                )
+                for chat in result
+            ]
+
     def get_chat_list_by_chat_ids(
         self, chat_ids: list[str], skip: int = 0, limit: int = 50
     ) -> list[ChatModel]:
@@ -701,7 +1371,7 @@ class ChatTable:
                 .order_by(Chat.updated_at.desc())
                 .all()
             )
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_models(db, all_chats)
 
     def get_chat_by_id(self, id: str) -> Optional[ChatModel]:
         try:
@@ -714,7 +1384,25 @@ class ChatTable:
                     db.commit()
                     db.refresh(chat_item)
 
-                return ChatModel.model_validate(chat_item)
+                return self._to_chat_model(db, chat_item)
+        except Exception:
+            return None
+
+    async def aget_chat_by_id(self, id: str) -> Optional[ChatModel]:
+        if AsyncSessionLocal is None:
+            return await asyncio.to_thread(self.get_chat_by_id, id)
+
+        try:
+            async with get_async_db() as db:
+                chat_item = await db.get(Chat, id)
+                if chat_item is None:
+                    return None
+
+                if self._sanitize_chat_row(chat_item):
+                    await db.commit()
+                    await db.refresh(chat_item)
+
+                return (await self._ato_chat_models(db, [chat_item]))[0]
         except Exception:
             return None
 
@@ -736,7 +1424,22 @@ class ChatTable:
         try:
             with get_db() as db:
                 chat = db.query(Chat).filter_by(id=id, user_id=user_id).first()
-                return ChatModel.model_validate(chat)
+                return self._to_chat_model(db, chat)
+        except Exception:
+            return None
+
+    async def aget_chat_by_id_and_user_id(
+        self, id: str, user_id: str
+    ) -> Optional[ChatModel]:
+        if AsyncSessionLocal is None:
+            return await asyncio.to_thread(self.get_chat_by_id_and_user_id, id, user_id)
+
+        try:
+            async with get_async_db() as db:
+                chat = await db.scalar(
+                    select(Chat).where(Chat.id == id, Chat.user_id == user_id)
+                )
+                return (await self._ato_chat_models(db, [chat]))[0]
         except Exception:
             return None
 
@@ -747,7 +1450,7 @@ class ChatTable:
                 # .limit(limit).offset(skip)
                 .order_by(Chat.updated_at.desc())
             )
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_models(db, all_chats)
 
     def get_chats_by_user_id(
         self, user_id: str, skip: Optional[int] = None, limit: Optional[int] = None
@@ -770,7 +1473,7 @@ class ChatTable:
 
             return ChatListResponse(
                 **{
-                    "items": [ChatModel.model_validate(chat) for chat in all_chats],
+                    "items": self._to_chat_models(db, all_chats),
                     "total": total,
                 }
             )
@@ -782,7 +1485,7 @@ class ChatTable:
                 .filter_by(user_id=user_id, pinned=True, archived=False)
                 .order_by(Chat.updated_at.desc())
             )
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_models(db, all_chats)
 
     def get_archived_chats_by_user_id(self, user_id: str) -> list[ChatModel]:
         with get_db() as db:
@@ -791,7 +1494,70 @@ class ChatTable:
                 .filter_by(user_id=user_id, archived=True)
                 .order_by(Chat.updated_at.desc())
             )
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_models(db, all_chats)
+
+    ####################
+    # Message search
+    #
+    # Message contents are indexed by the database: an FTS5 table
+    # (`chat_message_fts`, kept current by triggers) on SQLite and a generated
+    # `content_tsv` column with a GIN index on PostgreSQL. Every search word
+    # is matched as a prefix of a word in the message. Without the index
+    # (e.g. SQLite built without FTS5) messages are scanned with LIKE.
+    ####################
+
+    _search_index: Optional[bool] = None
+
+    def _has_search_index(self, db) -> bool:
+        if ChatTable._search_index is None:
+            inspector = inspect(db.get_bind())
+            if db.bind.dialect.name == "sqlite":
+                ChatTable._search_index = inspector.has_table("chat_message_fts")
+            else:
+                ChatTable._search_index = any(
+                    column["name"] == "content_tsv"
+                    for column in inspector.get_columns("chat_message")
+                )
+        return ChatTable._search_index
+
+    def _get_message_search_clause(self, db, search_text: str):
+        """Clause matching chats that have a message containing `search_text`."""
+        words = re.findall(r"\w+", search_text)
+
+        if words and self._has_search_index(db):
+            if db.bind.dialect.name == "sqlite":
+                return text(
+                    """
+                    Chat.id IN (
+                        SELECT message.chat_id
+                        FROM chat_message_fts
+                        JOIN chat_message AS message
+                        ON message.rowid = chat_message_fts.rowid
+                        WHERE chat_message_fts MATCH :content_query
+                    )
+                    """
+                ).bindparams(content_query=" ".join(f'"{word}"*' for word in words))
+
+            return text(
+                """
+                Chat.id IN (
+                    SELECT message.chat_id
+                    FROM chat_message AS message
+                    WHERE message.content_tsv @@ to_tsquery('simple', :content_query)
+                )
+                """
+            ).bindparams(content_query=" & ".join(f"{word}:*" for word in words))
+
+        return text(
+            """
+            EXISTS (
+                SELECT 1
+                FROM chat_message AS message
+                WHERE message.chat_id = Chat.id
+                AND LOWER(message.content) LIKE '%' || :content_key || '%'
+            )
+            """
+        ).bindparams(content_key=search_text)
 
     def get_chats_by_user_id_and_search_text(
         self,
@@ -888,19 +1654,11 @@ class ChatTable:
             # Check if the database dialect is either 'sqlite' or 'postgresql'
             dialect_name = db.bind.dialect.name
             if dialect_name == "sqlite":
-                # SQLite case: using JSON1 extension for JSON searching
-                sqlite_content_sql = (
-                    "EXISTS ("
-                    "    SELECT 1 "
-                    "    FROM json_each(Chat.chat, '$.messages') AS message "
-                    "    WHERE LOWER(message.value->>'content') LIKE '%' || :content_key || '%'"
-                    ")"
-                )
-                sqlite_content_clause = text(sqlite_content_sql)
                 query = query.filter(
                     or_(
-                        Chat.title.ilike(bindparam("title_key")), sqlite_content_clause
-                    ).params(title_key=f"%{search_text}%", content_key=search_text)
+                        Chat.title.ilike(bindparam("title_key")),
+                        self._get_message_search_clause(db, search_text),
+                    ).params(title_key=f"%{search_text}%")
                 )
 
                 # Check if there are any tags to filter, it should have all the tags
@@ -934,32 +1692,18 @@ class ChatTable:
                     )
 
             elif dialect_name == "postgresql":
-                # PostgreSQL doesn't allow null bytes in text. We filter those out by checking
-                # the JSON representation for \u0000 before attempting text extraction
-
-                # Safety filter: JSON field must not contain \u0000
-                query = query.filter(text("Chat.chat::text NOT LIKE '%\\\\u0000%'"))
+                # PostgreSQL doesn't allow null bytes in text. Message contents are
+                # sanitized when written to chat_message, so only the title needs a check
 
                 # Safety filter: title must not contain actual null bytes
                 query = query.filter(text("Chat.title::text NOT LIKE '%\\x00%'"))
 
-                postgres_content_sql = """
-                EXISTS (
-                    SELECT 1
-                    FROM json_array_elements(Chat.chat->'messages') AS message
-                    WHERE json_typeof(message->'content') = 'string'
-                    AND LOWER(message->>'content') LIKE '%' || :content_key || '%'
-                )
-                """
-
-                postgres_content_clause = text(postgres_content_sql)
-
                 query = query.filter(
                     or_(
                         Chat.title.ilike(bindparam("title_key")),
-                        postgres_content_clause,
+                        self._get_message_search_clause(db, search_text),
                     )
-                ).params(title_key=f"%{search_text}%", content_key=search_text.lower())
+                ).params(title_key=f"%{search_text}%")
 
                 # Check if there are any tags to filter, it should have all the tags
                 if "none" in tag_ids:
@@ -1001,7 +1745,7 @@ class ChatTable:
             log.info(f"The number of chats: {len(all_chats)}")
 
             # Validate and return chats
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_models(db, all_chats)
 
     def get_chats_by_folder_id_and_user_id(
         self, folder_id: str, user_id: str, skip: int = 0, limit: int = 60
@@ -1019,7 +1763,7 @@ class ChatTable:
                 query = query.limit(limit)
 
             all_chats = query.all()
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_models(db, all_chats)
 
     def get_chats_by_folder_ids_and_user_id(
         self, folder_ids: list[str], user_id: str
@@ -1034,7 +1778,7 @@ class ChatTable:
             query = query.order_by(Chat.updated_at.desc())
 
             all_chats = query.all()
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_models(db, all_chats)
 
     def update_chat_folder_id_by_id_and_user_id(
         self, id: str, user_id: str, folder_id: str
@@ -1047,7 +1791,7 @@ class ChatTable:
                 chat.pinned = False
                 db.commit()
                 db.refresh(chat)
-                return ChatModel.model_validate(chat)
+                return self._to_chat_model(db, chat)
         except Exception:
             return None
 
@@ -1086,7 +1830,7 @@ class ChatTable:
 
             all_chats = query.all()
             log.debug(f"all_chats: {all_chats}")
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_models(db, all_chats)
 
     def add_chat_tag_by_id_and_user_id_and_tag_name(
         self, id: str, user_id: str, tag_name: str
@@ -1107,7 +1851,7 @@ class ChatTable:
 
                 db.commit()
                 db.refresh(chat)
-                return ChatModel.model_validate(chat)
+                return self._to_chat_model(db, chat)
         except Exception:
             return None
 
@@ -1193,6 +1937,7 @@ class ChatTable:
     def delete_chat_by_id(self, id: str) -> bool:
         try:
             with get_db() as db:
+                self._delete_chat_messages(db, [id])
                 db.query(Chat).filter_by(id=id).delete()
                 db.commit()
 
@@ -1203,6 +1948,9 @@ class ChatTable:
     def delete_chat_by_id_and_user_id(self, id: str, user_id: str) -> bool:
         try:
             with get_db() as db:
+                self._delete_chat_messages(
+                    db, select(Chat.id).where(Chat.id == id, Chat.user_id == user_id)
+                )
                 db.query(Chat).filter_by(id=id, user_id=user_id).delete()
                 db.commit()
 
@@ -1215,6 +1963,9 @@ class ChatTable:
             with get_db() as db:
                 self.delete_shared_chats_by_user_id(user_id)
 
+                self._delete_chat_messages(
+                    db, select(Chat.id).where(Chat.user_id == user_id)
+                )
                 db.query(Chat).filter_by(user_id=user_id).delete()
                 db.commit()
 
@@ -1227,6 +1978,12 @@ class ChatTable:
     ) -> bool:
         try:
             with get_db() as db:
+                self._delete_chat_messages(
+                    db,
+                    select(Chat.id).where(
+                        Chat.user_id == user_id, Chat.folder_id == folder_id
+                    ),
+                )
                 db.query(Chat).filter_by(user_id=user_id, folder_id=folder_id).delete()
                 db.commit()
 
@@ -1254,6 +2011,9 @@ class ChatTable:
                 chats_by_user = db.query(Chat).filter_by(user_id=user_id).all()
                 shared_chat_ids = [f"shared-{chat.id}" for chat in chats_by_user]
 
+                self._delete_chat_messages(
+                    db, select(Chat.id).where(Chat.user_id.in_(shared_chat_ids))
+                )
                 db.query(Chat).filter(Chat.user_id.in_(shared_chat_ids)).delete()
                 db.commit()
 
@@ -1347,7 +2107,7 @@ class ChatTable:
                 .all()
             )
 
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_models(db, all_chats)
 
 
 Chats = ChatTable()
@@ -7,6 +7,7 @@ import uuid
 from answer_ai.internal.db import Base, get_db
 
 from answer_ai.models.files import FileMetadataResponse
+from answer_ai.utils.model_access import MODEL_ACCESS_INDEX
 
 
 from pydantic import BaseModel, ConfigDict
@@ -274,6 +275,20 @@ class GroupTable:
 
             return group_user_ids
 
+    def get_user_group_ids_map(self) -> dict[str, set[str]]:
+        with get_db() as db:
+            user_group_ids: dict[str, set[str]] = {}
+            # Joined with the groups, as SQLite only cascades deletes with
+            # foreign keys enabled
+            for group_id, user_id in (
+                db.query(GroupMember.group_id, GroupMember.user_id)
+                .join(Group, Group.id == GroupMember.group_id)
+                .all()
+            ):
+                user_group_ids.setdefault(user_id, set()).add(group_id)
+
+            return user_group_ids
+
     def set_group_user_ids_by_id(self, group_id: str, user_ids: list[str]) -> None:
         with get_db() as db:
             # Delete existing members
@@ -294,6 +309,7 @@ class GroupTable:
 
             db.add_all(new_members)
             db.commit()
+            MODEL_ACCESS_INDEX.invalidate()
 
     def get_group_member_count_by_id(self, id: str) -> int:
         with get_db() as db:
@@ -326,6 +342,7 @@ class GroupTable:
             with get_db() as db:
                 db.query(Group).filter_by(id=id).delete()
                 db.commit()
+                MODEL_ACCESS_INDEX.invalidate()
                 return True
         except Exception:
             return False
@@ -335,6 +352,7 @@ class GroupTable:
             try:
                 db.query(Group).delete()
                 db.commit()
+                MODEL_ACCESS_INDEX.invalidate()
 
                 return True
             except Exception:
@@ -362,6 +380,7 @@ class GroupTable:
                     )
 
                 db.commit()
+                MODEL_ACCESS_INDEX.invalidate()
                 return True
 
             except Exception:
@@ -453,6 +472,7 @@ class GroupTable:
                     )
 
                 db.commit()
+                MODEL_ACCESS_INDEX.invalidate()
                 return True
 
             except Exception as e:
@@ -491,6 +511,7 @@ class GroupTable:
                 group.updated_at = now
                 db.commit()
                 db.refresh(group)
+                MODEL_ACCESS_INDEX.invalidate()
 
                 return GroupModel.model_validate(group)
 
@@ -521,6 +542,7 @@ class GroupTable:
 
                 db.commit()
                 db.refresh(group)
+                MODEL_ACCESS_INDEX.invalidate()
                 return GroupModel.model_validate(group)
 
         except Exception as e:
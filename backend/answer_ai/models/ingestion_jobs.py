@@ -0,0 +1,223 @@
+import logging
+import time
+import uuid
+from typing import Optional
+
+from answer_ai.internal.db import Base, get_db
+from pydantic import BaseModel, ConfigDict
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    ForeignKey,
+    Index,
+    Integer,
+    Text,
+    and_,
+    or_,
+)
+
+log = logging.getLogger(__name__)
+
+####################
+# Ingestion Job DB Schema
+####################
+
+
+class IngestionJob(Base):
+    __tablename__ = "ingestion_job"
+
+    id = Column(Text, primary_key=True, unique=True)
+    file_id = Column(Text, ForeignKey("file.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(Text, nullable=False)
+
+    # pending -> running -> (deleted when done, or back to pending to retry)
+    status = Column(Text, nullable=False)
+    # queued, loading, splitting, embedding, inserting
+    stage = Column(Text, nullable=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+
+    worker_id = Column(Text, nullable=True)
+    locked_until = Column(BigInteger, nullable=True)
+    run_after = Column(BigInteger, nullable=False)
+
+    created_at = Column(BigInteger, nullable=False)
+    updated_at = Column(BigInteger, nullable=False)
+
+    __table_args__ = (
+        Index("ingestion_job_file_id_idx", "file_id"),
+        Index("ingestion_job_status_run_after_idx", "status", "run_after"),
+    )
+
+
+class IngestionJobModel(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: str
+    file_id: str
+    user_id: str
+
+    status: str
+    stage: str
+    attempts: int = 0
+    error: Optional[str] = None
+
+    worker_id: Optional[str] = None
+    locked_until: Optional[int] = None
+    run_after: int
+
+    created_at: int  # timestamp in epoch
+    updated_at: int  # timestamp in epoch
+
+
+####################
+# Forms
+####################
+
+
+class IngestionJobsTable:
+    """
+    Durable queue of the files waiting to be processed.
+
+    A worker claims a job with a compare-and-swap update, which holds it for
+    a lease it renews while the job runs. Jobs of a crashed worker are taken
+    over once their lease expires. Finished jobs are deleted, the outcome is
+    kept in the file data.
+    """
+
+    def insert_new_job(self, file_id: str, user_id: str) -> IngestionJobModel:
+        with get_db() as db:
+            now = int(time.time())
+            job = IngestionJob(
+                id=str(uuid.uuid4()),
+                file_id=file_id,
+                user_id=user_id,
+                status="pending",
+                stage="queued",
+                attempts=0,
+                run_after=now,
+                created_at=now,
+                updated_at=now,
+            )
+            db.add(job)
+            db.commit()
+            db.refresh(job)
+            return IngestionJobModel.model_validate(job)
+
+    def get_job_by_file_id(self, file_id: str) -> Optional[IngestionJobModel]:
+        with get_db() as db:
+            job = (
+                db.query(IngestionJob)
+                .filter_by(file_id=file_id)
+                .order_by(IngestionJob.created_at.desc())
+                .first()
+            )
+            return IngestionJobModel.model_validate(job) if job else None
+
+    def claim_next_job(
+        self, worker_id: str, lease: int, max_tries: int = 5
+    ) -> Optional[IngestionJobModel]:
+        with get_db() as db:
+            for _ in range(max_tries):
+                now = int(time.time())
+                job = (
+                    db.query(IngestionJob)
+                    .filter(
+                        or_(
+                            and_(
+                                IngestionJob.status == "pending",
+                                IngestionJob.run_after <= now,
+                            ),
+                            and_(
+                                IngestionJob.status == "running",
+                                IngestionJob.locked_until < now,
+                            ),
+                        )
+                    )
+                    .order_by(IngestionJob.run_after)
+                    .first()
+                )
+                if job is None:
+                    return None
+
+                # Only one worker wins the job, the others see no row updated
+                claimed = (
+                    db.query(IngestionJob)
+                    .filter(
+                        IngestionJob.id == job.id,
+                        IngestionJob.status == job.status,
+                        IngestionJob.attempts == job.attempts,
+                    )
+                    .update(
+                        {
+                            "status": "running",
+                            "attempts": job.attempts + 1,
+                            "worker_id": worker_id,
+                            "locked_until": now + lease,
+                            "updated_at": now,
+                        },
+                        synchronize_session=False,
+                    )
+                )
+                db.commit()
+
+                if claimed:
+                    db.expire_all()
+                    job = db.get(IngestionJob, job.id)
+                    return IngestionJobModel.model_validate(job) if job else None
+            return None
+
+    def _update_claimed_job(self, id: str, worker_id: str, values: dict) -> bool:
+        with get_db() as db:
+            updated = (
+                db.query(IngestionJob)
+                .filter_by(id=id, worker_id=worker_id, status="running")
+                .update(
+                    {**values, "updated_at": int(time.time())},
+                    synchronize_session=False,
+                )
+            )
+            db.commit()
+            return updated > 0
+
+    def renew_job_lease(self, id: str, worker_id: str, lease: int) -> bool:
+        return self._update_claimed_job(
+            id, worker_id, {"locked_until": int(time.time()) + lease}
+        )
+
+    def update_job_stage(self, id: str, worker_id: str, stage: str) -> bool:
+        return self._update_claimed_job(id, worker_id, {"stage": stage})
+
+    def retry_job(self, id: str, worker_id: str, error: str, delay: int) -> bool:
+        return self._update_claimed_job(
+            id,
+            worker_id,
+            {
+                "status": "pending",
+                "stage": "queued",
+                "error": error,
+                "worker_id": None,
+                "locked_until": None,
+                "run_after": int(time.time()) + delay,
+            },
+        )
+
+    def delete_job(self, id: str, worker_id: Optional[str] = None) -> bool:
+        with get_db() as db:
+            query = db.query(IngestionJob).filter_by(id=id)
+            if worker_id is not None:
+                query = query.filter_by(worker_id=worker_id)
+            deleted = query.delete(synchronize_session=False)
+            db.commit()
+            return deleted > 0
+
+    def delete_jobs_by_file_id(self, file_id: str) -> bool:
+        with get_db() as db:
+            db.query(IngestionJob).filter_by(file_id=file_id).delete(
+                synchronize_session=False
+            )
+            db.commit()
+            return True
+
+
+IngestionJobs = IngestionJobsTable()
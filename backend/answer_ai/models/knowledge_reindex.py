@@ -0,0 +1,281 @@
+import logging
+import time
+import uuid
+from typing import Optional
+
+from answer_ai.internal.db import Base, get_db
+from pydantic import BaseModel, ConfigDict
+from sqlalchemy import (
+    JSON,
+    BigInteger,
+    Column,
+    ForeignKey,
+    Index,
+    Text,
+    and_,
+    func,
+    or_,
+)
+
+log = logging.getLogger(__name__)
+
+####################
+# Knowledge Reindex DB Schema
+####################
+
+
+class KnowledgeReindex(Base):
+    __tablename__ = "knowledge_reindex"
+
+    id = Column(Text, primary_key=True, unique=True)
+    user_id = Column(Text, nullable=False)
+
+    # pending, running, completed, failed
+    status = Column(Text, nullable=False)
+    worker_id = Column(Text, nullable=True)
+    locked_until = Column(BigInteger, nullable=True)
+
+    # retired: replaced collections, deleted once no process uses them
+    # skipped: knowledge bases kept on their current collection, with the ids
+    # of their files that failed
+    data = Column(JSON, nullable=True)
+
+    created_at = Column(BigInteger, nullable=False)
+    updated_at = Column(BigInteger, nullable=False)
+
+
+class KnowledgeReindexFile(Base):
+    """Checkpoint of a file reindexed in a knowledge base."""
+
+    __tablename__ = "knowledge_reindex_file"
+
+    reindex_id = Column(
+        Text,
+        ForeignKey("knowledge_reindex.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    knowledge_id = Column(Text, primary_key=True)
+    file_id = Column(Text, primary_key=True)
+
+    # pending, running, completed, failed, removed
+    status = Column(Text, nullable=False)
+    error = Column(Text, nullable=True)
+
+    updated_at = Column(BigInteger, nullable=False)
+
+    __table_args__ = (
+        Index(
+            "knowledge_reindex_file_status_idx", "reindex_id", "knowledge_id", "status"
+        ),
+    )
+
+
+class KnowledgeReindexModel(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: str
+    user_id: str
+
+    status: str
+    worker_id: Optional[str] = None
+    locked_until: Optional[int] = None
+
+    data: Optional[dict] = None
+
+    created_at: int  # timestamp in epoch
+    updated_at: int  # timestamp in epoch
+
+
+####################
+# Forms
+####################
+
+
+class KnowledgeReindexProgressResponse(KnowledgeReindexModel):
+    files: dict[str, int] = {}
+
+
+class KnowledgeReindexTable:
+    def insert_new_reindex(
+        self, user_id: str, files: list[tuple[str, str]]
+    ) -> KnowledgeReindexModel:
+        """Create a reindex of the given (knowledge id, file id) pairs."""
+        with get_db() as db:
+            now = int(time.time())
+            reindex = KnowledgeReindex(
+                id=str(uuid.uuid4()),
+                user_id=user_id,
+                status="pending",
+                data={"retired": []},
+                created_at=now,
+                updated_at=now,
+            )
+            db.add(reindex)
+            db.flush()
+
+            db.add_all(
+                [
+                    KnowledgeReindexFile(
+                        reindex_id=reindex.id,
+                        knowledge_id=knowledge_id,
+                        file_id=file_id,
+                        status="pending",
+                        updated_at=now,
+                    )
+                    for knowledge_id, file_id in dict.fromkeys(files)
+                ]
+            )
+            db.commit()
+            db.refresh(reindex)
+            return KnowledgeReindexModel.model_validate(reindex)
+
+    def get_reindex_by_id(self, id: str) -> Optional[KnowledgeReindexModel]:
+        with get_db() as db:
+            reindex = db.get(KnowledgeReindex, id)
+            return KnowledgeReindexModel.model_validate(reindex) if reindex else None
+
+    def get_latest_reindex(self) -> Optional[KnowledgeReindexModel]:
+        with get_db() as db:
+            reindex = (
+                db.query(KnowledgeReindex)
+                .order_by(KnowledgeReindex.created_at.desc())
+                .first()
+            )
+            return KnowledgeReindexModel.model_validate(reindex) if reindex else None
+
+    def get_active_reindex(self) -> Optional[KnowledgeReindexModel]:
+        with get_db() as db:
+            reindex = (
+                db.query(KnowledgeReindex)
+                .filter(KnowledgeReindex.status.in_(["pending", "running"]))
+                .order_by(KnowledgeReindex.created_at)
+                .first()
+            )
+            return KnowledgeReindexModel.model_validate(reindex) if reindex else None
+
+    def claim_reindex(
+        self, id: str, worker_id: str, lease: int
+    ) -> Optional[KnowledgeReindexModel]:
+        """Take the reindex over if it is pending or its lease expired."""
+        with get_db() as db:
+            now = int(time.time())
+            claimed = (
+                db.query(KnowledgeReindex)
+                .filter(
+                    KnowledgeReindex.id == id,
+                    or_(
+                        KnowledgeReindex.status == "pending",
+                        and_(
+                            KnowledgeReindex.status == "running",
+                            or_(
+                                KnowledgeReindex.locked_until.is_(None),
+                                KnowledgeReindex.locked_until < now,
+                            ),
+                        ),
+                    ),
+                )
+                .update(
+                    {
+                        "status": "running",
+                        "worker_id": worker_id,
+                        "locked_until": now + lease,
+                        "updated_at": now,
+                    },
+                    synchronize_session=False,
+                )
+            )
+            db.commit()
+            if not claimed:
+                return None
+
+            reindex = db.get(KnowledgeReindex, id)
+            return KnowledgeReindexModel.model_validate(reindex) if reindex else None
+
+    def update_reindex_by_id(
+        self, id: str, worker_id: str, updated: dict
+    ) -> Optional[KnowledgeReindexModel]:
+        """Update a reindex held by `worker_id`, returns None once it lost it."""
+        with get_db() as db:
+            count = (
+                db.query(KnowledgeReindex)
+                .filter_by(id=id, worker_id=worker_id, status="running")
+                .update(
+                    {**updated, "updated_at": int(time.time())},
+                    synchronize_session=False,
+                )
+            )
+            db.commit()
+            if not count:
+                return None
+
+            reindex = db.get(KnowledgeReindex, id)
+            return KnowledgeReindexModel.model_validate(reindex) if reindex else None
+
+    def get_knowledge_ids(self, reindex_id: str) -> list[str]:
+        with get_db() as db:
+            rows = (
+                db.query(KnowledgeReindexFile.knowledge_id)
+                .filter_by(reindex_id=reindex_id)
+                .distinct()
+                .order_by(KnowledgeReindexFile.knowledge_id)
+                .all()
+            )
+            return [row.knowledge_id for row in rows]
+
+    def get_file_statuses(self, reindex_id: str, knowledge_id: str) -> dict[str, str]:
+        with get_db() as db:
+            rows = (
+                db.query(KnowledgeReindexFile.file_id, KnowledgeReindexFile.status)
+                .filter_by(reindex_id=reindex_id, knowledge_id=knowledge_id)
+                .all()
+            )
+            return {row.file_id: row.status for row in rows}
+
+    def add_files(self, reindex_id: str, knowledge_id: str, file_ids: list[str]):
+        with get_db() as db:
+            now = int(time.time())
+            db.add_all(
+                [
+                    KnowledgeReindexFile(
+                        reindex_id=reindex_id,
+                        knowledge_id=knowledge_id,
+                        file_id=file_id,
+                        status="pending",
+                        updated_at=now,
+                    )
+                    for file_id in file_ids
+                ]
+            )
+            db.commit()
+
+    def update_file_status(
+        self,
+        reindex_id: str,
+        knowledge_id: str,
+        file_ids: list[str],
+        status: str,
+        error: Optional[str] = None,
+    ) -> None:
+        with get_db() as db:
+            db.query(KnowledgeReindexFile).filter(
+                KnowledgeReindexFile.reindex_id == reindex_id,
+                KnowledgeReindexFile.knowledge_id == knowledge_id,
+                KnowledgeReindexFile.file_id.in_(file_ids),
+            ).update(
+                {"status": status, "error": error, "updated_at": int(time.time())},
+                synchronize_session=False,
+            )
+            db.commit()
+
+    def get_progress(self, reindex_id: str) -> dict[str, int]:
+        with get_db() as db:
+            rows = (
+                db.query(KnowledgeReindexFile.status, func.count())
+                .filter_by(reindex_id=reindex_id)
+                .group_by(KnowledgeReindexFile.status)
+                .all()
+            )
+            return {status: count for status, count in rows}
+
+
+KnowledgeReindexes = KnowledgeReindexTable()
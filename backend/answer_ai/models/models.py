@@ -18,6 +18,7 @@ from sqlalchemy import BigInteger, Column, Text, JSON, Boolean
 
 
 from answer_ai.utils.access_control import has_access
+from answer_ai.utils.model_access import MODEL_ACCESS_INDEX
 
 
 log = logging.getLogger(__name__)
@@ -166,6 +167,7 @@ class ModelsTable:
                 db.add(result)
                 db.commit()
                 db.refresh(result)
+                MODEL_ACCESS_INDEX.invalidate()
 
                 if result:
                     return ModelModel.model_validate(result)
@@ -390,6 +392,7 @@ class ModelsTable:
                 result = db.query(Model).filter_by(id=id).update(data)
 
                 db.commit()
+                MODEL_ACCESS_INDEX.invalidate()
 
                 model = db.get(Model, id)
                 db.refresh(model)
@@ -403,6 +406,7 @@ class ModelsTable:
             with get_db() as db:
                 db.query(Model).filter_by(id=id).delete()
                 db.commit()
+                MODEL_ACCESS_INDEX.invalidate()
 
                 return True
         except Exception:
@@ -413,6 +417,7 @@ class ModelsTable:
             with get_db() as db:
                 db.query(Model).delete()
                 db.commit()
+                MODEL_ACCESS_INDEX.invalidate()
 
                 return True
         except Exception:
@@ -454,6 +459,7 @@ class ModelsTable:
                         db.delete(model)
 
                 db.commit()
+                MODEL_ACCESS_INDEX.invalidate()
 
                 return [
                     ModelModel.model_validate(model) for model in db.query(Model).all()
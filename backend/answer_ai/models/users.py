@@ -1,7 +1,14 @@
+import asyncio
 import time
 from typing import Optional
 
-from answer_ai.internal.db import Base, JSONField, get_db
+from answer_ai.internal.db import (
+    AsyncSessionLocal,
+    Base,
+    JSONField,
+    get_async_db,
+    get_db,
+)
 
 
 from answer_ai.env import DATABASE_USER_ACTIVE_STATUS_UPDATE_INTERVAL
@@ -10,6 +17,7 @@ from answer_ai.models.chats import Chats
 from answer_ai.models.groups import Groups, GroupMember
 from answer_ai.models.channels import ChannelMember
 
+from answer_ai.utils.auth_cache import AUTH_USER_CACHE
 from answer_ai.utils.misc import throttle
 
 
@@ -25,6 +33,8 @@ from sqlalchemy import (
     exists,
     select,
     cast,
+    update,
+    bindparam,
 )
 from sqlalchemy import or_, case
 from sqlalchemy.dialects.postgresql import JSONB
@@ -275,6 +285,17 @@ class UsersTable:
         except Exception:
             return None
 
+    async def aget_user_by_id(self, id: str) -> Optional[UserModel]:
+        if AsyncSessionLocal is None:
+            return await asyncio.to_thread(self.get_user_by_id, id)
+
+        try:
+            async with get_async_db() as db:
+                user = await db.get(User, id)
+                return UserModel.model_validate(user)
+        except Exception:
+            return None
+
     def get_user_by_api_key(self, api_key: str) -> Optional[UserModel]:
         try:
             with get_db() as db:
@@ -499,6 +520,24 @@ class UsersTable:
         except Exception:
             return None
 
+    async def aget_user_webhook_url_by_id(self, id: str) -> Optional[str]:
+        if AsyncSessionLocal is None:
+            return await asyncio.to_thread(self.get_user_webhook_url_by_id, id)
+
+        try:
+            async with get_async_db() as db:
+                settings = await db.scalar(select(User.settings).where(User.id == id))
+                if settings is None:
+                    return None
+
+                return (
+                    settings.get("ui", {})
+                    .get("notifications", {})
+                    .get("webhook_url", None)
+                )
+        except Exception:
+            return None
+
     def get_num_users_active_today(self) -> Optional[int]:
         with get_db() as db:
             current_timestamp = int(datetime.datetime.now().timestamp())
@@ -513,6 +552,7 @@ class UsersTable:
             with get_db() as db:
                 db.query(User).filter_by(id=id).update({"role": role})
                 db.commit()
+                AUTH_USER_CACHE.invalidate(id)
                 user = db.query(User).filter_by(id=id).first()
                 return UserModel.model_validate(user)
         except Exception:
@@ -527,6 +567,7 @@ class UsersTable:
                     {**form_data.model_dump(exclude_none=True)}
                 )
                 db.commit()
+                AUTH_USER_CACHE.invalidate(id)
 
                 user = db.query(User).filter_by(id=id).first()
                 return UserModel.model_validate(user)
@@ -542,6 +583,7 @@ class UsersTable:
                     {"profile_image_url": profile_image_url}
                 )
                 db.commit()
+                AUTH_USER_CACHE.invalidate(id)
 
                 user = db.query(User).filter_by(id=id).first()
                 return UserModel.model_validate(user)
@@ -562,6 +604,21 @@ class UsersTable:
         except Exception:
             return None
 
+    def update_last_active_by_ids(self, last_active: dict[str, int]) -> None:
+        """Write the last active time of many users, by user id."""
+        with get_db() as db:
+            # Core update, users deleted meanwhile are skipped
+            db.execute(
+                update(User.__table__)
+                .where(User.__table__.c.id == bindparam("user_id"))
+                .values(last_active_at=bindparam("last_active_at")),
+                [
+                    {"user_id": id, "last_active_at": last_active_at}
+                    for id, last_active_at in last_active.items()
+                ],
+            )
+            db.commit()
+
     def update_user_oauth_by_id(
         self, id: str, provider: str, sub: str
     ) -> Optional[UserModel]:
@@ -588,6 +645,7 @@ class UsersTable:
                 # Persist updated JSON
                 db.query(User).filter_by(id=id).update({"oauth": oauth})
                 db.commit()
+                AUTH_USER_CACHE.invalidate(id)
 
                 return UserModel.model_validate(user)
 
@@ -599,6 +657,7 @@ class UsersTable:
             with get_db() as db:
                 db.query(User).filter_by(id=id).update(updated)
                 db.commit()
+                AUTH_USER_CACHE.invalidate(id)
 
                 user = db.query(User).filter_by(id=id).first()
                 return UserModel.model_validate(user)
@@ -619,6 +678,7 @@ class UsersTable:
 
                 db.query(User).filter_by(id=id).update({"settings": user_settings})
                 db.commit()
+                AUTH_USER_CACHE.invalidate(id)
 
                 user = db.query(User).filter_by(id=id).first()
                 return UserModel.model_validate(user)
@@ -637,6 +697,7 @@ class UsersTable:
                     # Delete User
                     db.query(User).filter_by(id=id).delete()
                     db.commit()
+                AUTH_USER_CACHE.invalidate(id)
 
                 return True
             else:
@@ -668,6 +729,7 @@ class UsersTable:
                 )
                 db.add(new_api_key)
                 db.commit()
+                AUTH_USER_CACHE.invalidate(id)
 
                 return True
 
@@ -679,6 +741,7 @@ class UsersTable:
             with get_db() as db:
                 db.query(ApiKey).filter_by(user_id=id).delete()
                 db.commit()
+                AUTH_USER_CACHE.invalidate(id)
                 return True
         except Exception:
             return False
@@ -714,5 +777,19 @@ class UsersTable:
                 return user.last_active_at >= three_minutes_ago
             return False
 
+    async def ais_user_active(self, user_id: str) -> bool:
+        if AsyncSessionLocal is None:
+            return await asyncio.to_thread(self.is_user_active, user_id)
+
+        async with get_async_db() as db:
+            last_active_at = await db.scalar(
+                select(User.last_active_at).where(User.id == user_id)
+            )
+            if last_active_at:
+                # Consider user active if last_active_at within the last 3 minutes
+                three_minutes_ago = int(time.time()) - 180
+                return last_active_at >= three_minutes_ago
+            return False
+
 
 Users = UsersTable()
@@ -0,0 +1,54 @@
+import time
+
+from answer_ai.internal.db import Base, get_db
+from sqlalchemy import BigInteger, Column, Text
+
+####################
+# Vector Collection Alias DB Schema
+####################
+
+
+class VectorCollectionAlias(Base):
+    __tablename__ = "vector_collection_alias"
+
+    name = Column(Text, primary_key=True)
+    collection_name = Column(Text, nullable=False)
+    updated_at = Column(BigInteger, nullable=False)
+
+
+####################
+# Forms
+####################
+
+
+class VectorCollectionAliasesTable:
+    def get_aliases(self) -> dict[str, str]:
+        with get_db() as db:
+            return {
+                alias.name: alias.collection_name
+                for alias in db.query(VectorCollectionAlias).all()
+            }
+
+    def set_alias(self, name: str, collection_name: str) -> None:
+        with get_db() as db:
+            db.merge(
+                VectorCollectionAlias(
+                    name=name,
+                    collection_name=collection_name,
+                    updated_at=int(time.time()),
+                )
+            )
+            db.commit()
+
+    def delete_alias(self, name: str) -> None:
+        with get_db() as db:
+            db.query(VectorCollectionAlias).filter_by(name=name).delete()
+            db.commit()
+
+    def delete_all_aliases(self) -> None:
+        with get_db() as db:
+            db.query(VectorCollectionAlias).delete()
+            db.commit()
+
+
+VectorCollectionAliases = VectorCollectionAliasesTable()
@@ -0,0 +1,577 @@
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from answer_ai.config import ENABLE_RAG_BM25_INDEX, RAG_BM25_INDEX_DIR
+from answer_ai.retrieval.vector.main import GetResult
+
+log = logging.getLogger(__name__)
+
+# Okapi BM25 parameters, same as rank_bm25 (used by langchain's BM25Retriever)
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Terms are stored per field: the chunk text, and the metadata text that is
+# only scored when enriched texts are enabled
+CONTENT_FIELD = 0
+METADATA_FIELD = 1
+
+# Chunks added per transaction when building an index
+BUILD_BATCH_SIZE = 20000
+
+# Seconds after which a build not done is taken as interrupted
+BUILD_TIMEOUT = 3600
+
+
+def tokenize(text: str) -> list[str]:
+    return re.findall(r"\w+", text.lower())
+
+
+def get_metadata_text(metadata: dict) -> str:
+    """Metadata added to a chunk's text for BM25 when enriched texts are enabled."""
+    metadata_parts = []
+
+    # Add filename (repeat twice for extra weight in BM25 scoring)
+    if metadata.get("name"):
+        filename = metadata["name"]
+        filename_tokens = filename.replace("_", " ").replace("-", " ").replace(".", " ")
+        metadata_parts.append(
+            f"Filename: {filename} {filename_tokens} {filename_tokens}"
+        )
+
+    # Add title if available
+    if metadata.get("title"):
+        metadata_parts.append(f"Title: {metadata['title']}")
+
+    # Add document section headings if available (from markdown splitter)
+    if metadata.get("headings") and isinstance(metadata["headings"], list):
+        headings = " > ".join(str(h) for h in metadata["headings"])
+        metadata_parts.append(f"Section: {headings}")
+
+    # Add source URL/path if available
+    if metadata.get("source"):
+        metadata_parts.append(f"Source: {metadata['source']}")
+
+    # Add snippet for web search results
+    if metadata.get("snippet"):
+        metadata_parts.append(f"Snippet: {metadata['snippet']}")
+
+    return " ".join(metadata_parts)
+
+
+def get_term_counts(text: str) -> dict[str, int]:
+    counts = {}
+    for term in tokenize(text):
+        counts[term] = counts.get(term, 0) + 1
+    return counts
+
+
+class BM25Index:
+    """
+    BM25 index of one collection, stored in a SQLite file.
+
+    Postings are read per query term, so a search never loads the collection
+    into memory. Chunks are added and removed incrementally.
+    """
+
+    def __init__(self, path: Path, bulk: bool = False):
+        self.path = path
+        # For a new file being built: no durability needed until it is moved in place
+        self.bulk = bulk
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        if self.bulk:
+            conn.execute("PRAGMA journal_mode = OFF")
+            conn.execute("PRAGMA synchronous = OFF")
+            conn.execute("PRAGMA cache_size = -262144")
+        return conn
+
+    def create(self) -> None:
+        with closing(self._connect()) as conn, conn:
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS doc (
+                    rowid INTEGER PRIMARY KEY,
+                    id TEXT NOT NULL UNIQUE,
+                    length INTEGER NOT NULL,
+                    metadata_length INTEGER NOT NULL,
+                    text TEXT,
+                    metadata TEXT
+                );
+                CREATE TABLE IF NOT EXISTS posting (
+                    term TEXT NOT NULL,
+                    field INTEGER NOT NULL,
+                    doc INTEGER NOT NULL,
+                    tf INTEGER NOT NULL,
+                    PRIMARY KEY (term, field, doc)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS posting_doc_idx ON posting (doc);
+                CREATE TABLE IF NOT EXISTS stats (
+                    id INTEGER PRIMARY KEY CHECK (id = 0),
+                    count INTEGER NOT NULL,
+                    length INTEGER NOT NULL,
+                    metadata_length INTEGER NOT NULL
+                );
+                INSERT OR IGNORE INTO stats VALUES (0, 0, 0, 0);
+                """
+            )
+
+    def _update_stats(
+        self, conn: sqlite3.Connection, count: int, length: int, metadata_length: int
+    ) -> None:
+        conn.execute(
+            "UPDATE stats SET count = count + ?, length = length + ?, "
+            "metadata_length = metadata_length + ?",
+            (count, length, metadata_length),
+        )
+
+    def _remove_docs(self, conn: sqlite3.Connection, where: str, params) -> int:
+        rows = conn.execute(
+            f"SELECT rowid, length, metadata_length FROM doc WHERE {where}", params
+        ).fetchall()
+        self._update_stats(
+            conn,
+            -len(rows),
+            -sum(row[1] for row in rows),
+            -sum(row[2] for row in rows),
+        )
+
+        rowids = [row[0] for row in rows]
+        for idx in range(0, len(rowids), 500):
+            batch = rowids[idx : idx + 500]
+            placeholders = ",".join("?" * len(batch))
+            conn.execute(f"DELETE FROM posting WHERE doc IN ({placeholders})", batch)
+            conn.execute(f"DELETE FROM doc WHERE rowid IN ({placeholders})", batch)
+        return len(rowids)
+
+    def add(self, items: list[dict], replace: bool = True) -> None:
+        """Add (or replace) chunks given as {"id", "text", "metadata"} dicts."""
+        with closing(self._connect()) as conn, conn:
+            if replace:
+                for idx in range(0, len(items), 500):
+                    batch = items[idx : idx + 500]
+                    ids = [item["id"] for item in batch]
+                    self._remove_docs(conn, f"id IN ({','.join('?' * len(ids))})", ids)
+
+            postings = []
+            total_length = total_metadata_length = 0
+            for item in items:
+                text = item.get("text") or ""
+                metadata = item.get("metadata") or {}
+
+                content_counts = get_term_counts(text)
+                metadata_counts = get_term_counts(get_metadata_text(metadata))
+
+                length = sum(content_counts.values())
+                metadata_length = sum(metadata_counts.values())
+
+                rowid = conn.execute(
+                    "INSERT INTO doc (id, length, metadata_length, text, metadata) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (
+                        item["id"],
+                        length,
+                        metadata_length,
+                        text,
+                        json.dumps(metadata, default=str),
+                    ),
+                ).lastrowid
+                total_length += length
+                total_metadata_length += metadata_length
+
+                postings.extend(
+                    (term, field, rowid, tf)
+                    for field, counts in (
+                        (CONTENT_FIELD, content_counts),
+                        (METADATA_FIELD, metadata_counts),
+                    )
+                    for term, tf in counts.items()
+                )
+
+            self._update_stats(conn, len(items), total_length, total_metadata_length)
+
+            conn.executemany(
+                "INSERT INTO posting (term, field, doc, tf) VALUES (?, ?, ?, ?)",
+                postings,
+            )
+
+    def remove(
+        self, ids: Optional[list[str]] = None, filter: Optional[dict] = None
+    ) -> int:
+        """Remove the chunks with the given ids or metadata, returns how many."""
+        if not ids and not filter:
+            # The whole index only goes with `delete_collection`
+            return 0
+
+        with closing(self._connect()) as conn, conn:
+            if ids:
+                removed = 0
+                for idx in range(0, len(ids), 500):
+                    batch = ids[idx : idx + 500]
+                    removed += self._remove_docs(
+                        conn, f"id IN ({','.join('?' * len(batch))})", batch
+                    )
+                return removed
+
+            where = " AND ".join("json_extract(metadata, ?) = ?" for _ in filter.keys())
+            params = [
+                param
+                for key, value in filter.items()
+                for param in (f'$."{key}"', value)
+            ]
+            return self._remove_docs(conn, where, params)
+
+    def search(
+        self, query: str, k: int, enriched: bool = False
+    ) -> tuple[list[str], list[dict]]:
+        """Texts and metadatas of the top `k` chunks for the query, best first."""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return [], []
+
+        max_field = METADATA_FIELD if enriched else CONTENT_FIELD
+        metadata_weight = 1 if enriched else 0
+        placeholders = ",".join("?" * len(terms))
+
+        with closing(self._connect()) as conn:
+            count, total_length = conn.execute(
+                "SELECT count, length + ? * metadata_length FROM stats",
+                (metadata_weight,),
+            ).fetchone()
+            if not count:
+                return [], []
+            avgdl = total_length / count or 1
+
+            dfs = conn.execute(
+                f"SELECT term, COUNT(DISTINCT doc) FROM posting "
+                f"WHERE term IN ({placeholders}) AND field <= ? GROUP BY term",
+                (*terms, max_field),
+            ).fetchall()
+            if not dfs:
+                return [], []
+
+            query_terms = [
+                (term, math.log(1 + (count - df + 0.5) / (df + 0.5)))
+                for term, df in dfs
+            ]
+
+            rows = conn.execute(
+                f"""
+                WITH query_term (term, idf) AS (
+                    VALUES {",".join("(?, ?)" for _ in query_terms)}
+                ),
+                term_frequency AS (
+                    SELECT posting.doc, query_term.idf, SUM(posting.tf) AS tf
+                    FROM query_term
+                    JOIN posting ON posting.term = query_term.term
+                    WHERE posting.field <= ?
+                    GROUP BY posting.doc, posting.term
+                )
+                SELECT doc.text, doc.metadata, SUM(
+                    term_frequency.idf * term_frequency.tf * ({BM25_K1} + 1) / (
+                        term_frequency.tf + {BM25_K1} * (
+                            1 - {BM25_B} + {BM25_B}
+                            * (doc.length + ? * doc.metadata_length) / ?
+                        )
+                    )
+                ) AS score
+                FROM term_frequency
+                JOIN doc ON doc.rowid = term_frequency.doc
+                GROUP BY term_frequency.doc
+                ORDER BY score DESC
+                LIMIT ?
+                """,
+                (
+                    *[param for query_term in query_terms for param in query_term],
+                    max_field,
+                    metadata_weight,
+                    avgdl,
+                    k,
+                ),
+            ).fetchall()
+
+        return (
+            [text or "" for text, _, _ in rows],
+            [json.loads(metadata or "{}") for _, metadata, _ in rows],
+        )
+
+
+class BM25IndexStore:
+    """
+    BM25 indexes of the vector DB collections, one file per collection.
+
+    An index is built in the background from the vector DB the first time a
+    collection is searched, then kept current by the writes done through this
+    store. A build is recorded in a journal file next to the index, shared by
+    all the processes using the store: writes made while it is being built are
+    recorded there and replayed on the index once done, writes to a
+    collection without an index are skipped. When disabled, no index is used
+    and the existing ones are removed, as they would go stale.
+    """
+
+    def __init__(self, path: str, enabled: bool = True):
+        self.path = Path(path)
+        self.enabled = enabled
+        self.locks: dict[str, threading.Lock] = {}
+
+        if not self.enabled:
+            self.reset()
+
+    def _get_path(self, collection_name: str) -> Path:
+        return self.path / f"{hashlib.sha256(collection_name.encode()).hexdigest()}.db"
+
+    def _get_journal_path(self, collection_name: str) -> Path:
+        return self._get_path(collection_name).with_suffix(".journal.db")
+
+    def _get_lock(self, collection_name: str) -> threading.Lock:
+        return self.locks.setdefault(collection_name, threading.Lock())
+
+    def _connect_journal(self, path: Path) -> sqlite3.Connection:
+        # Only opens an existing journal, a finished build removes it
+        conn = sqlite3.connect(
+            f"file:{path}?mode=rw",
+            uri=True,
+            timeout=30,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        conn.executescript(
+            f"""
+            CREATE TABLE IF NOT EXISTS build (
+                id INTEGER PRIMARY KEY CHECK (id = 0),
+                started_at REAL NOT NULL,
+                done INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS write (
+                seq INTEGER PRIMARY KEY,
+                write TEXT NOT NULL,
+                kwargs TEXT NOT NULL
+            );
+            INSERT OR IGNORE INTO build VALUES (0, {time.time()}, 0);
+            """
+        )
+        return conn
+
+    def _is_building(self, conn: sqlite3.Connection) -> bool:
+        started_at, done = conn.execute("SELECT started_at, done FROM build").fetchone()
+        # A build not done in time was interrupted (its process exited)
+        return not done and time.time() - started_at < BUILD_TIMEOUT
+
+    def get(self, collection_name: str) -> Optional[BM25Index]:
+        if not self.enabled:
+            return None
+
+        path = self._get_path(collection_name)
+        return BM25Index(path) if path.exists() else None
+
+    def begin_build(self, collection_name: str) -> bool:
+        """
+        Record that the index of a collection is about to be built, before
+        reading its items from the vector DB. Returns False if it is already
+        being built (by any process).
+        """
+        if not self.enabled:
+            return False
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        journal_path = self._get_journal_path(collection_name)
+        for _ in range(2):
+            try:
+                # Exclusive creation: only one process builds an index at a time
+                journal_path.open("x").close()
+            except FileExistsError:
+                try:
+                    with closing(self._connect_journal(journal_path)) as conn:
+                        if self._is_building(conn):
+                            return False
+                except sqlite3.Error:
+                    pass
+                journal_path.unlink(missing_ok=True)
+                continue
+
+            self._connect_journal(journal_path).close()
+            return True
+        return False
+
+    def abort_build(self, collection_name: str) -> None:
+        self._get_journal_path(collection_name).unlink(missing_ok=True)
+
+    def build(
+        self, collection_name: str, result: Optional[GetResult]
+    ) -> Optional[BM25Index]:
+        """
+        Build the index of a collection from all of its items, read after
+        `begin_build`. Returns None if it was deleted while building.
+        """
+        path = self._get_path(collection_name)
+        journal_path = self._get_journal_path(collection_name)
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+
+        try:
+            tmp_path.unlink(missing_ok=True)
+            index = BM25Index(tmp_path, bulk=True)
+            index.create()
+
+            if result and result.ids:
+                items = [
+                    {"id": id, "text": text, "metadata": metadata}
+                    for id, text, metadata in zip(
+                        result.ids[0], result.documents[0], result.metadatas[0]
+                    )
+                ]
+                for idx in range(0, len(items), BUILD_BATCH_SIZE):
+                    index.add(items[idx : idx + BUILD_BATCH_SIZE], replace=False)
+
+            try:
+                conn = self._connect_journal(journal_path)
+            except sqlite3.OperationalError:
+                # Reset meanwhile
+                return None
+
+            with closing(conn):
+                # Writers wait on the journal until the index is in place
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    writes = [
+                        (write, json.loads(kwargs))
+                        for write, kwargs in conn.execute(
+                            "SELECT write, kwargs FROM write ORDER BY seq"
+                        )
+                    ]
+                    if any(write == "delete_collection" for write, _ in writes):
+                        # Deleted meanwhile, what was read from the vector DB is stale
+                        return None
+
+                    for write, kwargs in writes:
+                        getattr(index, write)(**kwargs)
+                    os.replace(tmp_path, path)
+                finally:
+                    conn.execute("UPDATE build SET done = 1")
+                    conn.execute("COMMIT")
+            return BM25Index(path)
+        finally:
+            journal_path.unlink(missing_ok=True)
+            tmp_path.unlink(missing_ok=True)
+
+    def build_in_background(
+        self, collection_name: str, result: Optional[GetResult]
+    ) -> None:
+        def build():
+            try:
+                self.build(collection_name, result)
+            except Exception as e:
+                log.exception(f"Failed to build BM25 index of {collection_name}: {e}")
+
+        threading.Thread(target=build, daemon=True).start()
+
+    def _journal_write(self, collection_name: str, write: str, kwargs: dict) -> bool:
+        """Record a write in the journal of a build in progress, if any."""
+        journal_path = self._get_journal_path(collection_name)
+        if not journal_path.exists():
+            return False
+
+        try:
+            conn = self._connect_journal(journal_path)
+        except sqlite3.OperationalError:
+            # Build done meanwhile
+            return False
+
+        with closing(conn):
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if not self._is_building(conn):
+                    return False
+                conn.execute(
+                    "INSERT INTO write (write, kwargs) VALUES (?, ?)",
+                    (write, json.dumps(kwargs, default=str)),
+                )
+                return True
+            finally:
+                conn.execute("COMMIT")
+
+    def _write(self, collection_name: str, write: str, **kwargs) -> None:
+        if not self.enabled:
+            return
+
+        with self._get_lock(collection_name):
+            if write == "delete_collection":
+                self._journal_write(collection_name, write, kwargs)
+                self._get_path(collection_name).unlink(missing_ok=True)
+            elif not self._journal_write(collection_name, write, kwargs):
+                index = self.get(collection_name)
+                if index is not None:
+                    getattr(index, write)(**kwargs)
+
+    def insert(self, collection_name: str, items: list[dict]) -> None:
+        self._write(collection_name, "add", items=items)
+
+    def delete(
+        self,
+        collection_name: str,
+        ids: Optional[list[str]] = None,
+        filter: Optional[dict] = None,
+    ) -> None:
+        self._write(collection_name, "remove", ids=ids, filter=filter)
+
+    def delete_collection(self, collection_name: str) -> None:
+        self._write(collection_name, "delete_collection")
+
+    def reset(self) -> None:
+        # Also removes the journals, so builds in progress are dropped
+        for path in self.path.glob("*.db"):
+            path.unlink(missing_ok=True)
+
+
+def rank_texts(
+    texts: list[str], metadatas: list[dict], query: str, k: int
+) -> tuple[list[str], list[dict]]:
+    """
+    Top `k` texts for the query, for a collection without an index yet.
+    Tokenized and scored as `BM25Index.search` does, so a query ranks the
+    same whether the index was built or not.
+    """
+    terms = list(dict.fromkeys(tokenize(query)))
+    if not terms or not texts:
+        return [], []
+
+    columns = {term: idx for idx, term in enumerate(terms)}
+    tf = np.zeros((len(texts), len(terms)))
+    lengths = np.zeros(len(texts))
+    for row, text in enumerate(texts):
+        tokens = tokenize(text or "")
+        lengths[row] = len(tokens)
+        for token in tokens:
+            column = columns.get(token)
+            if column is not None:
+                tf[row, column] += 1
+
+    count = len(texts)
+    df = np.count_nonzero(tf, axis=0)
+    idf = np.log(1 + (count - df + 0.5) / (df + 0.5))
+    avgdl = lengths.sum() / count or 1
+    scores = (
+        idf
+        * tf
+        * (BM25_K1 + 1)
+        / (tf + BM25_K1 * (1 - BM25_B + BM25_B * lengths[:, None] / avgdl))
+    ).sum(axis=1)
+
+    # Only texts with a query term, best first
+    matched = np.flatnonzero(tf.any(axis=1))
+    top = matched[np.argsort(-scores[matched], kind="stable")][:k]
+    return [texts[i] for i in top], [metadatas[i] for i in top]
+
+
+BM25_INDEX_STORE = BM25IndexStore(RAG_BM25_INDEX_DIR, enabled=ENABLE_RAG_BM25_INDEX)
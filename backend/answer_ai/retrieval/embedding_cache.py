@@ -0,0 +1,134 @@
+import base64
+import hashlib
+import logging
+import time
+from array import array
+from collections import OrderedDict
+from typing import Optional
+
+from answer_ai.config import (
+    ENABLE_RAG_EMBEDDING_CACHE_REDIS,
+    RAG_EMBEDDING_CACHE_SIZE,
+    RAG_EMBEDDING_CACHE_TTL,
+)
+from answer_ai.env import REDIS_KEY_PREFIX
+from answer_ai.utils.redis import get_redis_client
+
+log = logging.getLogger(__name__)
+
+
+def encode_embedding(embedding: array) -> str:
+    return base64.b64encode(embedding.tobytes()).decode()
+
+
+def decode_embedding(value: str) -> array:
+    embedding = array("f")
+    embedding.frombytes(base64.b64decode(value))
+    return embedding
+
+
+class EmbeddingCache:
+    """
+    Bounded cache of embeddings keyed by (engine, model, prefix, text).
+
+    Entries are kept in an in-process LRU that expires them after `ttl`
+    seconds. With a Redis client, entries are also written to Redis so other
+    workers and restarted processes get them too. Embeddings are stored as
+    float32, a 1024 dimensions embedding takes 4KB.
+    """
+
+    def __init__(self, size: int, ttl: int, redis=None):
+        self.size = size
+        self.ttl = ttl
+        self.redis = redis
+        self.entries: OrderedDict[str, tuple[float, array]] = OrderedDict()
+
+        self.hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0
+
+    def get_key(self, engine: str, model: str, prefix: Optional[str], text: str) -> str:
+        key = "\x00".join((engine, model, prefix or "", text))
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def _get_redis_key(self, key: str) -> str:
+        return f"{REDIS_KEY_PREFIX}:embedding:{key}"
+
+    def _put(self, key: str, embedding: array) -> None:
+        self.entries[key] = (time.monotonic() + self.ttl, embedding)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    async def get_many(self, keys: list[str]) -> dict[str, list[float]]:
+        found = {}
+        now = time.monotonic()
+        for key in keys:
+            entry = self.entries.get(key)
+            if entry is None:
+                continue
+            expires_at, embedding = entry
+            if expires_at < now:
+                del self.entries[key]
+                continue
+            self.entries.move_to_end(key)
+            found[key] = embedding.tolist()
+
+        missing = [key for key in dict.fromkeys(keys) if key not in found]
+        if missing and self.redis is not None:
+            try:
+                values = await self.redis.mget(
+                    [self._get_redis_key(key) for key in missing]
+                )
+            except Exception as e:
+                log.debug(f"Failed to read embeddings from Redis: {e}")
+                values = []
+
+            for key, value in zip(missing, values):
+                if value is None:
+                    continue
+                embedding = decode_embedding(value)
+                self._put(key, embedding)
+                found[key] = embedding.tolist()
+                self.redis_hits += 1
+
+        self.hits += sum(1 for key in keys if key in found)
+        self.misses += sum(1 for key in keys if key not in found)
+        return found
+
+    async def set_many(self, embeddings: dict[str, list[float]]) -> None:
+        values = {}
+        for key, embedding in embeddings.items():
+            embedding = array("f", embedding)
+            self._put(key, embedding)
+            values[key] = encode_embedding(embedding)
+
+        if values and self.redis is not None:
+            try:
+                async with self.redis.pipeline(transaction=False) as pipe:
+                    for key, value in values.items():
+                        pipe.set(self._get_redis_key(key), value, ex=self.ttl)
+                    await pipe.execute()
+            except Exception as e:
+                log.debug(f"Failed to write embeddings to Redis: {e}")
+
+    def get_stats(self) -> dict:
+        return {
+            "size": len(self.entries),
+            "hits": self.hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+        }
+
+
+EMBEDDING_CACHE = EmbeddingCache(
+    size=RAG_EMBEDDING_CACHE_SIZE,
+    ttl=RAG_EMBEDDING_CACHE_TTL,
+    redis=(
+        get_redis_client(async_mode=True) if ENABLE_RAG_EMBEDDING_CACHE_REDIS else None
+    ),
+)
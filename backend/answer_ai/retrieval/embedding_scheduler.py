@@ -0,0 +1,274 @@
+import asyncio
+import email.utils
+import logging
+import random
+import time
+import weakref
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Optional
+
+import aiohttp
+from yarl import URL
+
+from answer_ai.config import (
+    RAG_EMBEDDING_BATCH_MAX_TOKENS,
+    RAG_EMBEDDING_CONCURRENCY,
+    RAG_EMBEDDING_MAX_RETRIES,
+)
+
+log = logging.getLogger(__name__)
+
+# Rough token count of a text, embedding APIs limit the tokens per request
+CHARS_PER_TOKEN = 4
+
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def get_retry_after(headers) -> Optional[float]:
+    value = headers.get("Retry-After")
+    if not value:
+        return None
+
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+        return max(date.timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def get_backoff(attempt: int) -> float:
+    return min(BACKOFF_MAX, BACKOFF_BASE * 2**attempt) * random.uniform(0.5, 1.0)
+
+
+class EndpointState:
+    """
+    Requests in flight to one embedding endpoint.
+
+    The concurrency limit is adaptive: halved when the endpoint rate limits
+    us, raised by one after as many successful requests, up to `max_limit`.
+    """
+
+    def __init__(self, max_limit: int):
+        self.max_limit = max_limit
+        self.limit = max_limit
+        self.in_flight = 0
+        self.succeeded = 0
+        self.paused_until = 0.0
+        self.released = asyncio.Event()
+
+    async def acquire(self) -> None:
+        while True:
+            delay = self.paused_until - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+
+            if self.in_flight < self.limit:
+                self.in_flight += 1
+                return
+
+            self.released.clear()
+            await self.released.wait()
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self.released.set()
+
+    def on_success(self) -> None:
+        self.succeeded += 1
+        if self.limit < self.max_limit and self.succeeded >= self.limit:
+            self.limit += 1
+            self.succeeded = 0
+
+    def on_rate_limited(self, retry_after: float) -> None:
+        self.limit = max(1, self.limit // 2)
+        self.succeeded = 0
+        self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+
+
+class EmbeddingScheduler:
+    """
+    Sends the requests of the remote embedding engines (Ollama, OpenAI, Azure
+    OpenAI).
+
+    Texts are grouped in batches bounded by count and by estimated tokens,
+    and requests are sent through a pooled session with a bounded, adaptive
+    number of requests in flight per endpoint. Rate limited (429) and failed
+    (5xx, connection error) requests are retried after their Retry-After or a
+    backoff, and a batch too large for the endpoint (413) is split in two.
+
+    Sync code, like document ingestion in a worker thread, runs its requests
+    through `run_sync` on the application loop so they share the same limits.
+    """
+
+    def __init__(self, concurrency: int, max_batch_tokens: int, max_retries: int):
+        self.concurrency = max(1, concurrency)
+        self.max_batch_tokens = max_batch_tokens
+        self.max_retries = max_retries
+
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.session: Optional[aiohttp.ClientSession] = None
+        # Asyncio state is bound to a loop, so it is kept per loop
+        self.endpoints: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, dict[str, EndpointState]
+        ] = weakref.WeakKeyDictionary()
+
+    def start(self) -> None:
+        self.loop = asyncio.get_running_loop()
+
+    async def close(self) -> None:
+        if self.session is not None:
+            await self.session.close()
+        self.session = None
+        self.loop = None
+
+    def run_sync(self, coro: Awaitable):
+        loop = self.loop
+        try:
+            asyncio.get_running_loop()
+            in_loop = True
+        except RuntimeError:
+            in_loop = False
+
+        if loop is not None and loop.is_running() and not in_loop:
+            return asyncio.run_coroutine_threadsafe(coro, loop).result()
+        return asyncio.run(coro)
+
+    @asynccontextmanager
+    async def get_session(self):
+        if asyncio.get_running_loop() is not self.loop:
+            # Another loop than the application's one, the pool can't be used
+            async with aiohttp.ClientSession(trust_env=True) as session:
+                yield session
+            return
+
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(trust_env=True)
+        yield self.session
+
+    def _get_endpoint(self, url: str) -> EndpointState:
+        endpoints = self.endpoints.setdefault(asyncio.get_running_loop(), {})
+        origin = str(URL(url).origin())
+        if origin not in endpoints:
+            endpoints[origin] = EndpointState(self.concurrency)
+        return endpoints[origin]
+
+    def get_batches(self, texts: list[str], batch_size: int) -> list[list[str]]:
+        batches = []
+        batch = []
+        batch_tokens = 0
+        for text in texts:
+            tokens = len(text) // CHARS_PER_TOKEN + 1
+            if batch and (
+                len(batch) >= batch_size
+                or (
+                    self.max_batch_tokens > 0
+                    and batch_tokens + tokens > self.max_batch_tokens
+                )
+            ):
+                batches.append(batch)
+                batch = []
+                batch_tokens = 0
+
+            batch.append(text)
+            batch_tokens += tokens
+
+        if batch:
+            batches.append(batch)
+        return batches
+
+    async def post(self, url: str, headers: dict, json: dict) -> dict:
+        endpoint = self._get_endpoint(url)
+
+        attempt = 0
+        while True:
+            retry_after = None
+            await endpoint.acquire()
+            try:
+                async with self.get_session() as session:
+                    async with session.post(url, headers=headers, json=json) as r:
+                        if r.status in RETRY_STATUSES and attempt < self.max_retries:
+                            retry_after = get_retry_after(r.headers)
+                            if retry_after is None:
+                                retry_after = get_backoff(attempt)
+                            if r.status == 429:
+                                endpoint.on_rate_limited(retry_after)
+                            log.warning(
+                                f"Embedding request to {url} failed with {r.status}, "
+                                f"retrying in {retry_after:.1f}s"
+                            )
+                        else:
+                            r.raise_for_status()
+                            data = await r.json()
+                            endpoint.on_success()
+                            return data
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if attempt >= self.max_retries:
+                    raise
+                retry_after = get_backoff(attempt)
+                log.warning(
+                    f"Embedding request to {url} failed: {e!r}, "
+                    f"retrying in {retry_after:.1f}s"
+                )
+            finally:
+                endpoint.release()
+
+            attempt += 1
+            await asyncio.sleep(retry_after)
+
+    async def embed(
+        self,
+        texts: list[str],
+        embed_batch: Callable[[list[str]], Awaitable[list]],
+        batch_size: Optional[int] = None,
+        sequential: bool = False,
+    ) -> list:
+        """
+        Embed texts in batches with `embed_batch`, which sends its requests
+        through `post`. Raises if a batch fails.
+        """
+
+        async def _embed_batch(batch: list[str]) -> list:
+            try:
+                return await embed_batch(batch)
+            except aiohttp.ClientResponseError as e:
+                if e.status != 413 or len(batch) == 1:
+                    raise
+
+            log.debug(f"Embedding batch of {len(batch)} texts too large, splitting")
+            middle = len(batch) // 2
+            return [
+                *(await _embed_batch(batch[:middle])),
+                *(await _embed_batch(batch[middle:])),
+            ]
+
+        batches = self.get_batches(texts, batch_size or len(texts) or 1)
+        if sequential:
+            results = [await _embed_batch(batch) for batch in batches]
+        else:
+            results = await asyncio.gather(*[_embed_batch(batch) for batch in batches])
+
+        embeddings = []
+        for batch, result in zip(batches, results):
+            if not isinstance(result, list) or len(result) != len(batch):
+                raise Exception(
+                    f"Got {len(result) if isinstance(result, list) else 'no'} "
+                    f"embeddings for a batch of {len(batch)} texts"
+                )
+            embeddings.extend(result)
+        return embeddings
+
+
+EMBEDDING_SCHEDULER = EmbeddingScheduler(
+    concurrency=RAG_EMBEDDING_CONCURRENCY,
+    max_batch_tokens=RAG_EMBEDDING_BATCH_MAX_TOKENS,
+    max_retries=RAG_EMBEDDING_MAX_RETRIES,
+)
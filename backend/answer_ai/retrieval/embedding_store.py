@@ -0,0 +1,144 @@
+import hashlib
+import logging
+import sqlite3
+import time
+from array import array
+from contextlib import closing
+from pathlib import Path
+from typing import Optional
+
+from answer_ai.config import (
+    ENABLE_RAG_EMBEDDING_STORE,
+    RAG_EMBEDDING_STORE_MAX_ENTRIES,
+    RAG_EMBEDDING_STORE_PATH,
+)
+
+log = logging.getLogger(__name__)
+
+# Keys looked up per query, below SQLite's variable limit
+LOOKUP_BATCH_SIZE = 500
+
+
+class EmbeddingStore:
+    """
+    Embeddings of document chunks, keyed by a hash of the chunk text and the
+    model that embedded it, stored in a SQLite file.
+
+    Re-uploading a file, reindexing a knowledge base or adding the same file
+    to several knowledge bases reuses the stored embeddings instead of
+    embedding the chunks again. Embeddings are stored as float32 and the
+    least recently used ones are removed past `max_entries`.
+    """
+
+    def __init__(self, path: str, enabled: bool = True, max_entries: int = 0):
+        self.path = Path(path)
+        self.enabled = enabled
+        self.max_entries = max_entries
+
+        if self.enabled:
+            self.create()
+        else:
+            self.reset()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        return conn
+
+    def create(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS embedding (
+                    key BLOB PRIMARY KEY,
+                    used_at INTEGER NOT NULL,
+                    vector BLOB NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS embedding_used_at_idx
+                    ON embedding (used_at);
+                """
+            )
+
+    def get_key(
+        self, engine: str, model: str, prefix: Optional[str], text: str
+    ) -> bytes:
+        key = "\x00".join((engine, model, prefix or "", text))
+        return hashlib.sha256(key.encode()).digest()
+
+    def get_many(self, keys: list[bytes]) -> dict[bytes, list[float]]:
+        if not self.enabled or not keys:
+            return {}
+
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        with closing(self._connect()) as conn, conn:
+            for i in range(0, len(keys), LOOKUP_BATCH_SIZE):
+                batch = keys[i : i + LOOKUP_BATCH_SIZE]
+                placeholders = ", ".join("?" * len(batch))
+                rows = conn.execute(
+                    f"SELECT key, vector FROM embedding WHERE key IN ({placeholders})",
+                    batch,
+                ).fetchall()
+                for key, vector in rows:
+                    embedding = array("f")
+                    embedding.frombytes(vector)
+                    found[key] = embedding.tolist()
+
+            found_keys = list(found)
+            now = int(time.time())
+            for i in range(0, len(found_keys), LOOKUP_BATCH_SIZE):
+                batch = found_keys[i : i + LOOKUP_BATCH_SIZE]
+                placeholders = ", ".join("?" * len(batch))
+                conn.execute(
+                    f"UPDATE embedding SET used_at = ? WHERE key IN ({placeholders})",
+                    [now, *batch],
+                )
+        return found
+
+    def put_many(self, embeddings: dict[bytes, list[float]]) -> None:
+        if not self.enabled or not embeddings:
+            return
+
+        now = int(time.time())
+        with closing(self._connect()) as conn, conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO embedding (key, used_at, vector) "
+                "VALUES (?, ?, ?)",
+                (
+                    (key, now, array("f", embedding).tobytes())
+                    for key, embedding in embeddings.items()
+                ),
+            )
+
+            if self.max_entries > 0:
+                (count,) = conn.execute("SELECT count(*) FROM embedding").fetchone()
+                if count > self.max_entries:
+                    conn.execute(
+                        "DELETE FROM embedding WHERE key IN ("
+                        "SELECT key FROM embedding ORDER BY used_at LIMIT ?)",
+                        (count - self.max_entries,),
+                    )
+
+    def reset(self) -> None:
+        if self.enabled:
+            with closing(self._connect()) as conn:
+                with conn:
+                    conn.execute("DELETE FROM embedding")
+                conn.execute("VACUUM")
+        else:
+            # Not used when disabled, free its space
+            for path in (
+                self.path,
+                self.path.with_name(f"{self.path.name}-wal"),
+                self.path.with_name(f"{self.path.name}-shm"),
+            ):
+                path.unlink(missing_ok=True)
+
+
+EMBEDDING_STORE = EmbeddingStore(
+    RAG_EMBEDDING_STORE_PATH,
+    enabled=ENABLE_RAG_EMBEDDING_STORE,
+    max_entries=RAG_EMBEDDING_STORE_MAX_ENTRIES,
+)
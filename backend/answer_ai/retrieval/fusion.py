@@ -0,0 +1,48 @@
+import numpy as np
+
+# Constant of reciprocal rank fusion, same as LangChain's EnsembleRetriever
+RRF_C = 60
+
+
+def reciprocal_rank_fusion(
+    rankings: list[list[str]], weights: list[float], c: int = RRF_C
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Fuse ranked lists of keys by weighted reciprocal rank: a key scores the
+    sum of `weight / (rank + c)` over the lists it is ranked in.
+
+    Returns the positions of the fused keys in the concatenation of the
+    lists, at their first occurrence, best first, and their scores. Keys of
+    equal score keep the order of their first occurrence, so the order is
+    the same as EnsembleRetriever's.
+    """
+    keys = [key for ranking in rankings for key in ranking]
+    if not keys:
+        return np.empty(0, dtype=np.intp), np.empty(0)
+
+    _, first, inverse = np.unique(
+        np.array(keys, dtype=object), return_index=True, return_inverse=True
+    )
+    contributions = np.concatenate(
+        [
+            weight / (np.arange(1, len(ranking) + 1) + c)
+            for ranking, weight in zip(rankings, weights)
+        ]
+    )
+    scores = np.zeros(len(first))
+    np.add.at(scores, inverse.reshape(-1), contributions)
+
+    # Unique keys in order of first occurrence, then stably by score
+    by_occurrence = np.argsort(first, kind="stable")
+    ranked = by_occurrence[np.argsort(-scores[by_occurrence], kind="stable")]
+    return first[ranked], scores[ranked]
+
+
+def cosine_similarity(query_embedding: list[float], embeddings: list) -> np.ndarray:
+    """Cosine similarity of the query embedding with each of the embeddings."""
+    query = np.asarray(query_embedding, dtype=np.float32)
+    matrix = np.asarray(embeddings, dtype=np.float32).reshape(-1, len(query))
+
+    query = query / max(np.linalg.norm(query), 1e-12)
+    norms = np.maximum(np.linalg.norm(matrix, axis=1), 1e-12)
+    return (matrix @ query) / norms
@@ -0,0 +1,285 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import socket
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from typing import Optional
+
+from fastapi import FastAPI, Request
+from starlette.datastructures import Headers
+
+from answer_ai.constants import ERROR_MESSAGES
+from answer_ai.env import (
+    INGESTION_JOB_LEASE,
+    INGESTION_JOB_MAX_ATTEMPTS,
+    INGESTION_POLL_INTERVAL,
+    INGESTION_WORKER_CONCURRENCY,
+)
+from answer_ai.models.files import Files
+from answer_ai.models.ingestion_jobs import IngestionJobModel, IngestionJobs
+from answer_ai.models.users import Users
+
+log = logging.getLogger(__name__)
+
+RETRY_DELAY_BASE = 10
+RETRY_DELAY_MAX = 300
+
+# Errors failing the same way on every attempt, the file is marked as failed
+# without retrying
+NON_RETRYABLE_ERRORS = (
+    ERROR_MESSAGES.DUPLICATE_CONTENT,
+    ERROR_MESSAGES.EMPTY_CONTENT,
+    ERROR_MESSAGES.PANDOC_NOT_INSTALLED,
+)
+
+# (job id, worker id) of the job processed by the current worker thread
+CURRENT_JOB: ContextVar[Optional[tuple[str, str]]] = ContextVar(
+    "ingestion_job", default=None
+)
+
+
+def report_ingestion_stage(stage: str) -> None:
+    """
+    Record the stage (loading, splitting, embedding, inserting) reached by
+    the ingestion job running in this thread, if any.
+    """
+    job = CURRENT_JOB.get()
+    if job is None:
+        return
+
+    try:
+        IngestionJobs.update_job_stage(*job, stage)
+    except Exception as e:
+        log.warning(f"Failed to update the stage of ingestion job {job[0]}: {e}")
+
+
+class IngestionError(Exception):
+    """Error of a file that can't be processed, not retried."""
+
+
+def get_error(e: Exception) -> str:
+    return str(e.detail) if hasattr(e, "detail") else str(e)
+
+
+def is_retryable_error(e: Exception) -> bool:
+    return (
+        not isinstance(e, IngestionError) and get_error(e) not in NON_RETRYABLE_ERRORS
+    )
+
+
+def get_retry_delay(attempts: int) -> int:
+    return min(RETRY_DELAY_MAX, RETRY_DELAY_BASE * 2 ** max(attempts - 1, 0))
+
+
+def get_request(app: FastAPI) -> Request:
+    # Request of the app for code expecting one, jobs are not run from a request
+    return Request(
+        {
+            "type": "http",
+            "asgi.version": "3.0",
+            "asgi.spec_version": "2.0",
+            "method": "POST",
+            "path": "/internal/ingestion",
+            "query_string": b"",
+            "headers": Headers({}).raw,
+            "client": ("127.0.0.1", 12345),
+            "server": ("127.0.0.1", 80),
+            "scheme": "http",
+            "app": app,
+        }
+    )
+
+
+class IngestionWorker:
+    """
+    Processes the uploaded files queued in `IngestionJobs`.
+
+    Up to `concurrency` jobs run at once in a thread pool, while the worker
+    loop renews their lease. A failed job is retried with a growing delay
+    until it has been attempted `max_attempts` times, then the file is marked
+    as failed. Errors of the file itself (duplicate or empty content, type
+    not supported...) fail it right away.
+    """
+
+    def __init__(
+        self,
+        concurrency: int,
+        lease: int,
+        max_attempts: int,
+        poll_interval: float,
+    ):
+        self.concurrency = concurrency
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+
+        self.id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.wakeup: Optional[asyncio.Event] = None
+
+    def notify(self) -> None:
+        """Wake the worker up for a new job, safe to call from any thread."""
+        loop = self.loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self.wakeup.set)
+
+    async def run(self, app: FastAPI) -> None:
+        self.loop = asyncio.get_running_loop()
+        self.wakeup = asyncio.Event()
+
+        executor = ThreadPoolExecutor(self.concurrency, thread_name_prefix="ingestion")
+        slots = asyncio.Semaphore(self.concurrency)
+        tasks = set()
+
+        log.info(f"Ingestion worker {self.id} started with {self.concurrency} threads")
+        try:
+            while True:
+                await slots.acquire()
+                self.wakeup.clear()
+
+                try:
+                    job = await asyncio.to_thread(
+                        IngestionJobs.claim_next_job, self.id, self.lease
+                    )
+                except Exception as e:
+                    log.exception(f"Failed to claim an ingestion job: {e}")
+                    job = None
+
+                if job is None:
+                    slots.release()
+                    try:
+                        await asyncio.wait_for(
+                            self.wakeup.wait(), timeout=self.poll_interval
+                        )
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                task = asyncio.create_task(self.run_job(app, job, executor))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                task.add_done_callback(lambda _: slots.release())
+        finally:
+            self.loop = None
+            for task in tasks:
+                task.cancel()
+            # Jobs still running in a thread are taken over once their lease expires
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    async def run_job(
+        self, app: FastAPI, job: IngestionJobModel, executor: ThreadPoolExecutor
+    ) -> None:
+        if job.attempts > self.max_attempts:
+            # Taken over from workers that died while processing it
+            await asyncio.to_thread(
+                self.fail_job, job, job.error or "Ingestion worker stopped"
+            )
+            return
+
+        log.info(
+            f"Processing file {job.file_id} (job {job.id}, attempt {job.attempts})"
+        )
+        renew_task = asyncio.create_task(self.renew_lease(job))
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                executor, self.process_job, app, job
+            )
+        except Exception as e:
+            error = get_error(e)
+            log.error(f"Error processing file {job.file_id}: {error}")
+            await asyncio.to_thread(
+                self.fail_job, job, error, retry=is_retryable_error(e)
+            )
+        else:
+            await asyncio.to_thread(IngestionJobs.delete_job, job.id, self.id)
+        finally:
+            renew_task.cancel()
+
+    async def renew_lease(self, job: IngestionJobModel) -> None:
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            try:
+                renewed = await asyncio.to_thread(
+                    IngestionJobs.renew_job_lease, job.id, self.id, self.lease
+                )
+                if not renewed:
+                    log.warning(f"Lost the lease of ingestion job {job.id}")
+                    return
+            except Exception as e:
+                log.warning(f"Failed to renew ingestion job {job.id}: {e}")
+
+    def process_job(self, app: FastAPI, job: IngestionJobModel) -> None:
+        from answer_ai.routers.files import process_uploaded_file
+
+        file = Files.get_file_by_id(job.file_id)
+        user = Users.get_user_by_id(job.user_id)
+        if file is None or user is None:
+            log.info(f"File {job.file_id} of ingestion job {job.id} no longer exists")
+            return
+
+        token = CURRENT_JOB.set((job.id, self.id))
+        try:
+            process_uploaded_file(get_request(app), file, user)
+        finally:
+            CURRENT_JOB.reset(token)
+
+    def fail_job(self, job: IngestionJobModel, error: str, retry: bool = True) -> None:
+        if retry and job.attempts < self.max_attempts:
+            delay = get_retry_delay(job.attempts)
+            log.info(f"Retrying ingestion job {job.id} in {delay}s")
+            IngestionJobs.retry_job(job.id, self.id, error, delay)
+            return
+
+        Files.update_file_data_by_id(job.file_id, {"status": "failed", "error": error})
+        IngestionJobs.delete_job(job.id, self.id)
+
+
+INGESTION_WORKER = IngestionWorker(
+    concurrency=INGESTION_WORKER_CONCURRENCY,
+    lease=INGESTION_JOB_LEASE,
+    max_attempts=INGESTION_JOB_MAX_ATTEMPTS,
+    poll_interval=INGESTION_POLL_INTERVAL,
+)
+
+
+def run_worker(concurrency: Optional[int] = None, processes: int = 1) -> None:
+    """
+    Run ingestion workers outside of the app, see INGESTION_WORKER_MODE.
+    Each process runs its own worker with `concurrency` threads.
+    """
+    if processes > 1:
+        workers = [
+            multiprocessing.Process(target=run_worker, args=(concurrency, 1))
+            for _ in range(processes)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return
+
+    # The app holds the configuration and the models used to process files
+    from answer_ai.main import app
+    from answer_ai.retrieval.embedding_scheduler import EMBEDDING_SCHEDULER
+
+    worker = IngestionWorker(
+        concurrency=concurrency or INGESTION_WORKER_CONCURRENCY,
+        lease=INGESTION_JOB_LEASE,
+        max_attempts=INGESTION_JOB_MAX_ATTEMPTS,
+        poll_interval=INGESTION_POLL_INTERVAL,
+    )
+
+    async def main():
+        EMBEDDING_SCHEDULER.start()
+        try:
+            await worker.run(app)
+        finally:
+            await EMBEDDING_SCHEDULER.close()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -12,6 +12,9 @@ log = logging.getLogger(__name__)
 
 
 class ColBERT(BaseReranker):
+    # Scores the documents of a single query per call
+    single_query = True
+
     def __init__(self, name, **kwargs) -> None:
         log.info("ColBERT: Loading model", name)
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
@@ -1,4 +1,5 @@
 import logging
+import aiohttp
 import requests
 from typing import Optional, List, Tuple
 from urllib.parse import quote
@@ -7,6 +8,7 @@ from urllib.parse import quote
 from answer_ai.env import ENABLE_FORWARD_USER_INFO_HEADERS
 from answer_ai.retrieval.models.base_reranker import BaseReranker
 from answer_ai.utils.headers import include_user_info_headers
+from answer_ai.utils.http_client import HTTP_CLIENT_POOL
 
 
 log = logging.getLogger(__name__)
@@ -25,9 +27,7 @@ class ExternalReranker(BaseReranker):
         self.model = model
         self.timeout = timeout
 
-    def predict(
-        self, sentences: List[Tuple[str, str]], user=None
-    ) -> Optional[List[float]]:
+    def _get_request(self, sentences: List[Tuple[str, str]], user=None):
         query = sentences[0][0]
         docs = [i[1] for i in sentences]
 
@@ -38,17 +38,32 @@ class ExternalReranker(BaseReranker):
             "top_n": len(docs),
         }
 
-        try:
-            log.info(f"ExternalReranker:predict:model {self.model}")
-            log.info(f"ExternalReranker:predict:query {query}")
+        log.info(f"ExternalReranker:predict:model {self.model}")
+        log.info(f"ExternalReranker:predict:query {query}")
+
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.api_key}",
+        }
 
-            headers = {
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {self.api_key}",
-            }
+        if ENABLE_FORWARD_USER_INFO_HEADERS and user:
+            headers = include_user_info_headers(headers, user)
 
-            if ENABLE_FORWARD_USER_INFO_HEADERS and user:
-                headers = include_user_info_headers(headers, user)
+        return headers, payload
+
+    def _get_scores(self, data: dict) -> Optional[List[float]]:
+        if "results" in data:
+            sorted_results = sorted(data["results"], key=lambda x: x["index"])
+            return [result["relevance_score"] for result in sorted_results]
+        else:
+            log.error("No results found in external reranking response")
+            return None
+
+    def predict(
+        self, sentences: List[Tuple[str, str]], user=None
+    ) -> Optional[List[float]]:
+        try:
+            headers, payload = self._get_request(sentences, user=user)
 
             r = requests.post(
                 f"{self.url}",
@@ -58,14 +73,28 @@ class ExternalReranker(BaseReranker):
             )
 
             r.raise_for_status()
-            data = r.json()
-
-            if "results" in data:
-                sorted_results = sorted(data["results"], key=lambda x: x["index"])
-                return [result["relevance_score"] for result in sorted_results]
-            else:
-                log.error("No results found in external reranking response")
-                return None
+            return self._get_scores(r.json())
+
+        except Exception as e:
+            log.exception(f"Error in external reranking: {e}")
+            return None
+
+    async def apredict(
+        self, sentences: List[Tuple[str, str]], user=None
+    ) -> Optional[List[float]]:
+        """Same as `predict`, through the pooled session of the reranker's origin."""
+        try:
+            headers, payload = self._get_request(sentences, user=user)
+
+            async with HTTP_CLIENT_POOL.session(self.url) as session:
+                async with session.post(
+                    self.url,
+                    headers=headers,
+                    json=payload,
+                    timeout=aiohttp.ClientTimeout(total=self.timeout),
+                ) as r:
+                    r.raise_for_status()
+                    return self._get_scores(await r.json())
 
         except Exception as e:
             log.exception(f"Error in external reranking: {e}")
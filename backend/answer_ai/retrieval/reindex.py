@@ -0,0 +1,398 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from typing import Optional
+
+from fastapi import FastAPI, Request
+
+from answer_ai.config import (
+    KNOWLEDGE_REINDEX_CONCURRENCY,
+    VECTOR_DB_ALIAS_REFRESH_INTERVAL,
+)
+from answer_ai.models.files import FileModel
+from answer_ai.models.knowledge import Knowledges
+from answer_ai.models.knowledge_reindex import (
+    KnowledgeReindexes,
+    KnowledgeReindexModel,
+)
+from answer_ai.models.users import UserModel, Users
+from answer_ai.retrieval.bm25 import BM25_INDEX_STORE
+from answer_ai.retrieval.ingestion import get_request, get_retry_delay
+from answer_ai.retrieval.vector.factory import VECTOR_DB_CLIENT
+from answer_ai.utils.misc import calculate_sha256_string
+
+log = logging.getLogger(__name__)
+
+# Seconds a process holds a reindex without renewing it before another one
+# resumes it
+REINDEX_LEASE = 300
+
+# Times a file is tried before its knowledge base keeps its current index
+REINDEX_FILE_ATTEMPTS = 3
+
+
+def get_shadow_collection_name(knowledge_id: str, reindex_id: str) -> str:
+    return f"{knowledge_id}-{reindex_id[:8]}"
+
+
+class KnowledgeReindexer:
+    """
+    Reindexes every knowledge base in the background.
+
+    Each knowledge base is rebuilt into a shadow collection while queries keep
+    using the current one, then the shadow collection is swapped in through a
+    collection alias. Files are processed `concurrency` at a time and their
+    progress is checkpointed in `KnowledgeReindexes`, so an interrupted
+    reindex is resumed where it stopped, by the next process to start.
+    Failed files are tried again, a knowledge base with files still failing
+    keeps its current collection and is reported in the reindex `skipped`.
+    """
+
+    def __init__(self, concurrency: int, lease: int, grace: float):
+        self.concurrency = concurrency
+        self.lease = lease
+        # Delay before deleting a replaced collection, other processes may
+        # still use it until they reload the aliases
+        self.grace = grace
+
+        self.id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.task: Optional[asyncio.Task] = None
+
+    def create(self, user_id: str) -> KnowledgeReindexModel:
+        """Create a reindex of all knowledge bases, unless one is running."""
+        reindex = KnowledgeReindexes.get_active_reindex()
+        if reindex is not None:
+            return reindex
+
+        files = [
+            (knowledge_base.id, file.id)
+            for knowledge_base in Knowledges.get_knowledge_bases()
+            for file in Knowledges.get_files_by_id(knowledge_base.id)
+        ]
+        log.info(f"Reindexing {len(files)} knowledge base files")
+        return KnowledgeReindexes.insert_new_reindex(user_id, files)
+
+    def start(self, app: FastAPI) -> None:
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.resume(app))
+
+    async def resume(self, app: FastAPI) -> None:
+        """Run the active reindex, once free if another process holds it."""
+        while True:
+            reindex = await asyncio.to_thread(KnowledgeReindexes.get_active_reindex)
+            if reindex is None:
+                return
+
+            locked_until = reindex.locked_until or 0
+            if reindex.status == "running" and locked_until >= time.time():
+                await asyncio.sleep(max(locked_until - time.time(), 1))
+                continue
+
+            await self.run(app, reindex.id)
+
+    async def run(self, app: FastAPI, id: str) -> None:
+        reindex = await asyncio.to_thread(
+            KnowledgeReindexes.claim_reindex, id, self.id, self.lease
+        )
+        if reindex is None:
+            return
+
+        log.info(f"Running knowledge reindex {id}")
+        renew_task = asyncio.create_task(self.renew_lease(id))
+        try:
+            user = await asyncio.to_thread(Users.get_user_by_id, reindex.user_id)
+            if user is None:
+                raise Exception(f"User {reindex.user_id} of the reindex not found")
+
+            request = get_request(app)
+            knowledge_ids = await asyncio.to_thread(
+                KnowledgeReindexes.get_knowledge_ids, id
+            )
+            for knowledge_id in knowledge_ids:
+                await self.reindex_knowledge(request, reindex, knowledge_id, user)
+
+            reindex = await asyncio.to_thread(KnowledgeReindexes.get_reindex_by_id, id)
+            retired = (reindex.data or {}).get("retired", [])
+            if retired:
+                await asyncio.sleep(self.grace)
+                for collection_name in retired:
+                    await asyncio.to_thread(self.delete_collection, collection_name)
+
+            await asyncio.to_thread(
+                KnowledgeReindexes.update_reindex_by_id,
+                id,
+                self.id,
+                {"status": "completed", "locked_until": None},
+            )
+            log.info(f"Knowledge reindex {id} completed")
+        except Exception as e:
+            log.exception(f"Knowledge reindex {id} failed: {e}")
+            await asyncio.to_thread(
+                KnowledgeReindexes.update_reindex_by_id,
+                id,
+                self.id,
+                {
+                    "status": "failed",
+                    "locked_until": None,
+                    "data": {**(reindex.data or {}), "error": str(e)},
+                },
+            )
+        finally:
+            renew_task.cancel()
+
+    async def renew_lease(self, id: str) -> None:
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            try:
+                renewed = await asyncio.to_thread(
+                    KnowledgeReindexes.update_reindex_by_id,
+                    id,
+                    self.id,
+                    {"locked_until": int(time.time()) + self.lease},
+                )
+                if renewed is None:
+                    log.warning(f"Lost the lease of knowledge reindex {id}")
+                    return
+            except Exception as e:
+                log.warning(f"Failed to renew knowledge reindex {id}: {e}")
+
+    async def reindex_knowledge(
+        self,
+        request: Request,
+        reindex: KnowledgeReindexModel,
+        knowledge_id: str,
+        user: UserModel,
+    ) -> None:
+        shadow_name = get_shadow_collection_name(knowledge_id, reindex.id)
+        if VECTOR_DB_CLIENT.resolve(knowledge_id) == shadow_name:
+            # Swapped in before the reindex was interrupted
+            return
+
+        knowledge = await asyncio.to_thread(
+            Knowledges.get_knowledge_by_id, knowledge_id
+        )
+        if knowledge is None:
+            await asyncio.to_thread(self.delete_collection, shadow_name)
+            return
+
+        attempts = {}
+        while True:
+            statuses, files = await asyncio.to_thread(
+                self.sync_files, reindex.id, knowledge_id, shadow_name
+            )
+            todo = [
+                (files[file_id], status)
+                for file_id, status in statuses.items()
+                if file_id in files
+                and (
+                    status in ("pending", "running")
+                    or (
+                        status == "failed"
+                        and attempts.get(file_id, 1) < REINDEX_FILE_ATTEMPTS
+                    )
+                )
+            ]
+            if not todo:
+                break
+
+            retried = [
+                attempts.get(file.id, 1) for file, status in todo if status == "failed"
+            ]
+            if retried:
+                await asyncio.sleep(get_retry_delay(max(retried)))
+            for file, status in todo:
+                if status == "failed":
+                    attempts[file.id] = attempts.get(file.id, 1) + 1
+
+            # Files added meanwhile are picked up by the next round
+            semaphore = asyncio.Semaphore(self.concurrency)
+
+            async def reindex_file(file: FileModel, status: str):
+                async with semaphore:
+                    await asyncio.to_thread(
+                        self.reindex_file,
+                        request,
+                        reindex.id,
+                        knowledge_id,
+                        shadow_name,
+                        file,
+                        status,
+                        user,
+                    )
+
+            await asyncio.gather(*[reindex_file(*item) for item in todo])
+
+        completed = sum(1 for status in statuses.values() if status == "completed")
+        log.info(
+            f"Reindexed {completed}/{len(statuses)} files of knowledge base {knowledge_id}"
+        )
+
+        failed = [file_id for file_id, status in statuses.items() if status == "failed"]
+        if failed:
+            # Swapping in would drop the failed files from the knowledge base
+            log.warning(
+                f"{len(failed)} files of knowledge base {knowledge_id} could not be "
+                "reindexed, keeping its current index"
+            )
+            await asyncio.to_thread(self.delete_collection, shadow_name)
+            await asyncio.to_thread(self.skip_knowledge, reindex, knowledge_id, failed)
+            return
+
+        if statuses and not completed:
+            log.warning(
+                f"No file of knowledge base {knowledge_id} could be reindexed, "
+                "keeping its current index"
+            )
+            await asyncio.to_thread(self.delete_collection, shadow_name)
+            return
+
+        await asyncio.to_thread(
+            self.swap_collection, reindex, knowledge_id, shadow_name
+        )
+
+    def sync_files(
+        self, reindex_id: str, knowledge_id: str, shadow_name: str
+    ) -> tuple[dict[str, str], dict[str, FileModel]]:
+        """
+        Align the checkpoint with the files of the knowledge base, which may
+        have changed since the reindex started.
+        """
+        statuses = KnowledgeReindexes.get_file_statuses(reindex_id, knowledge_id)
+        files = {file.id: file for file in Knowledges.get_files_by_id(knowledge_id)}
+
+        added = [file_id for file_id in files if file_id not in statuses]
+        if added:
+            KnowledgeReindexes.add_files(reindex_id, knowledge_id, added)
+            statuses.update({file_id: "pending" for file_id in added})
+
+        removed = [
+            file_id
+            for file_id, status in statuses.items()
+            if file_id not in files and status != "removed"
+        ]
+        if removed:
+            if VECTOR_DB_CLIENT.client.has_collection(shadow_name):
+                for file_id in removed:
+                    VECTOR_DB_CLIENT.client.delete(
+                        shadow_name, filter={"file_id": file_id}
+                    )
+            KnowledgeReindexes.update_file_status(
+                reindex_id, knowledge_id, removed, "removed"
+            )
+            statuses.update({file_id: "removed" for file_id in removed})
+
+        return statuses, files
+
+    def reindex_file(
+        self,
+        request: Request,
+        reindex_id: str,
+        knowledge_id: str,
+        shadow_name: str,
+        file: FileModel,
+        status: str,
+        user: UserModel,
+    ) -> None:
+        from answer_ai.routers.retrieval import (
+            get_file_collection_docs,
+            save_docs_to_vector_db,
+        )
+
+        try:
+            if status in (
+                "running",
+                "failed",
+            ) and VECTOR_DB_CLIENT.client.has_collection(shadow_name):
+                # Partly added before the reindex was interrupted, or failed
+                VECTOR_DB_CLIENT.client.delete(shadow_name, filter={"file_id": file.id})
+
+            KnowledgeReindexes.update_file_status(
+                reindex_id, knowledge_id, [file.id], "running"
+            )
+            save_docs_to_vector_db(
+                request,
+                docs=get_file_collection_docs(file),
+                collection_name=shadow_name,
+                metadata={
+                    "file_id": file.id,
+                    "name": file.filename,
+                    "hash": calculate_sha256_string(
+                        (file.data or {}).get("content", "")
+                    ),
+                },
+                add=True,
+                user=user,
+            )
+            KnowledgeReindexes.update_file_status(
+                reindex_id, knowledge_id, [file.id], "completed"
+            )
+        except Exception as e:
+            log.error(f"Error reindexing file {file.filename} (ID: {file.id}): {e}")
+            KnowledgeReindexes.update_file_status(
+                reindex_id, knowledge_id, [file.id], "failed", str(e)
+            )
+
+    def swap_collection(
+        self, reindex: KnowledgeReindexModel, knowledge_id: str, shadow_name: str
+    ) -> None:
+        current_name = VECTOR_DB_CLIENT.resolve(knowledge_id)
+        VECTOR_DB_CLIENT.set_alias(knowledge_id, shadow_name)
+        # Rebuilt from the new collection on the next search, which is made
+        # through the knowledge base id
+        BM25_INDEX_STORE.delete_collection(knowledge_id)
+        BM25_INDEX_STORE.delete_collection(shadow_name)
+        log.info(f"Swapped in {shadow_name} for knowledge base {knowledge_id}")
+
+        reindex = KnowledgeReindexes.get_reindex_by_id(reindex.id)
+        data = reindex.data or {}
+        # Skipped by an earlier run of this reindex
+        skipped = {
+            id: file_ids
+            for id, file_ids in data.get("skipped", {}).items()
+            if id != knowledge_id
+        }
+        retired = data.get("retired", [])
+        if current_name != shadow_name:
+            retired = [*retired, current_name]
+        KnowledgeReindexes.update_reindex_by_id(
+            reindex.id,
+            self.id,
+            {"data": {**data, "retired": retired, "skipped": skipped}},
+        )
+
+    def skip_knowledge(
+        self, reindex: KnowledgeReindexModel, knowledge_id: str, file_ids: list[str]
+    ) -> None:
+        reindex = KnowledgeReindexes.get_reindex_by_id(reindex.id)
+        data = reindex.data or {}
+        KnowledgeReindexes.update_reindex_by_id(
+            reindex.id,
+            self.id,
+            {
+                "data": {
+                    **data,
+                    "skipped": {**data.get("skipped", {}), knowledge_id: file_ids},
+                }
+            },
+        )
+
+    def delete_collection(self, collection_name: str) -> None:
+        try:
+            if VECTOR_DB_CLIENT.client.has_collection(collection_name):
+                VECTOR_DB_CLIENT.client.delete_collection(collection_name)
+        except Exception as e:
+            log.warning(f"Failed to delete collection {collection_name}: {e}")
+
+        # The index of a knowledge base id, now an alias, is of its new collection
+        if VECTOR_DB_CLIENT.resolve(collection_name) == collection_name:
+            BM25_INDEX_STORE.delete_collection(collection_name)
+
+
+KNOWLEDGE_REINDEXER = KnowledgeReindexer(
+    concurrency=KNOWLEDGE_REINDEX_CONCURRENCY,
+    lease=REINDEX_LEASE,
+    grace=VECTOR_DB_ALIAS_REFRESH_INTERVAL * 2,
+)
@@ -0,0 +1,216 @@
+import asyncio
+import hashlib
+import logging
+import time
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from answer_ai.config import (
+    RAG_RERANKING_BATCH_SIZE,
+    RAG_RERANKING_BATCH_WAIT,
+    RAG_RERANKING_CACHE_SIZE,
+    RAG_RERANKING_CACHE_TTL,
+    RAG_RERANKING_THREADS,
+)
+
+log = logging.getLogger(__name__)
+
+
+class PendingBatch:
+    """Pairs waiting to be scored together by one reranking model."""
+
+    def __init__(self):
+        self.requests: list[tuple[list[tuple[str, str]], asyncio.Future]] = []
+        self.size = 0
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class RerankingService:
+    """
+    Scores (query, document) pairs with the reranking model.
+
+    Scores are cached by (model, query, document) in an in-process LRU, so
+    the documents of a query already reranked are not scored again. Pairs of
+    concurrent queries to a local model are batched together: a batch is
+    scored once it holds `batch_size` pairs, or `batch_wait` seconds after
+    its first request, in one forward pass. Forward passes run in a pool of
+    `threads` threads, the CPU budget of reranking. Models scoring a single
+    query at a time (ColBERT) are batched per query.
+
+    The external engine is called through the pooled session of its origin.
+    """
+
+    def __init__(
+        self,
+        batch_size: int,
+        batch_wait: float,
+        threads: int,
+        cache_size: int,
+        cache_ttl: int,
+    ):
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+
+        self.executor = ThreadPoolExecutor(
+            max_workers=threads, thread_name_prefix="reranking"
+        )
+        self.entries: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self.tasks: set[asyncio.Task] = set()
+        # Asyncio state is bound to a loop, so it is kept per loop
+        self.batches: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, dict[tuple[int, Optional[str]], PendingBatch]
+        ] = weakref.WeakKeyDictionary()
+
+        self.hits = 0
+        self.misses = 0
+        self.forward_passes = 0
+
+    def get_key(self, model: str, query: str, document: str) -> str:
+        key = "\x00".join((model, query, document))
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def get_cached(self, keys: list[str]) -> dict[str, float]:
+        found = {}
+        now = time.monotonic()
+        for key in keys:
+            entry = self.entries.get(key)
+            if entry is None:
+                continue
+            expires_at, score = entry
+            if expires_at < now:
+                del self.entries[key]
+                continue
+            self.entries.move_to_end(key)
+            found[key] = score
+        return found
+
+    def set_cached(self, scores: dict[str, float]) -> None:
+        expires_at = time.monotonic() + self.cache_ttl
+        for key, score in scores.items():
+            self.entries[key] = (expires_at, score)
+            self.entries.move_to_end(key)
+        while len(self.entries) > self.cache_size:
+            self.entries.popitem(last=False)
+
+    async def rerank(
+        self,
+        reranker,
+        model: str,
+        query: str,
+        documents: list[str],
+        user=None,
+    ) -> Optional[list[float]]:
+        """Scores of the documents for the query, None if the model failed."""
+        if not documents:
+            return []
+
+        if self.cache_size <= 0:
+            return await self.score(reranker, query, documents, user=user)
+
+        keys = [self.get_key(model, query, document) for document in documents]
+        scores = self.get_cached(keys)
+
+        missing = {key: document for key, document in zip(keys, documents)}
+        for key in scores:
+            missing.pop(key, None)
+        self.hits += len(keys) - len(missing)
+        self.misses += len(missing)
+
+        if missing:
+            missing_scores = await self.score(
+                reranker, query, list(missing.values()), user=user
+            )
+            if missing_scores is None or len(missing_scores) != len(missing):
+                return None
+
+            missing_scores = dict(zip(missing, missing_scores))
+            self.set_cached(missing_scores)
+            scores.update(missing_scores)
+
+        return [scores[key] for key in keys]
+
+    async def score(
+        self, reranker, query: str, documents: list[str], user=None
+    ) -> Optional[list[float]]:
+        pairs = [(query, document) for document in documents]
+
+        if hasattr(reranker, "apredict"):
+            # External engine
+            return await reranker.apredict(pairs, user=user)
+
+        # Models scoring pairs of any query can batch several queries
+        group = query if getattr(reranker, "single_query", False) else None
+        try:
+            return await self.predict_batched(reranker, group, pairs)
+        except Exception as e:
+            log.exception(f"Error in reranking: {e}")
+            return None
+
+    async def predict_batched(
+        self, reranker, group: Optional[str], pairs: list[tuple[str, str]]
+    ) -> list[float]:
+        loop = asyncio.get_running_loop()
+        batches = self.batches.setdefault(loop, {})
+        batch_key = (id(reranker), group)
+
+        batch = batches.get(batch_key)
+        if batch is None:
+            batch = batches[batch_key] = PendingBatch()
+            batch.timer = loop.call_later(
+                self.batch_wait, self.flush, loop, reranker, batch_key
+            )
+
+        future = loop.create_future()
+        batch.requests.append((pairs, future))
+        batch.size += len(pairs)
+        if batch.size >= self.batch_size:
+            self.flush(loop, reranker, batch_key)
+
+        return await future
+
+    def flush(self, loop: asyncio.AbstractEventLoop, reranker, batch_key) -> None:
+        batch = self.batches.get(loop, {}).pop(batch_key, None)
+        if batch is None:
+            return
+
+        batch.timer.cancel()
+        task = loop.create_task(self.run_batch(reranker, batch))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def run_batch(self, reranker, batch: PendingBatch) -> None:
+        pairs = [pair for pairs, _ in batch.requests for pair in pairs]
+        try:
+            self.forward_passes += 1
+            scores = await asyncio.get_running_loop().run_in_executor(
+                self.executor, reranker.predict, pairs
+            )
+            scores = scores.tolist() if not isinstance(scores, list) else scores
+            if len(scores) != len(pairs):
+                raise Exception(
+                    f"Got {len(scores)} reranking scores for {len(pairs)} pairs"
+                )
+        except Exception as e:
+            for _, future in batch.requests:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        start = 0
+        for pairs, future in batch.requests:
+            if not future.done():
+                future.set_result(scores[start : start + len(pairs)])
+            start += len(pairs)
+
+
+RERANKING_SERVICE = RerankingService(
+    batch_size=RAG_RERANKING_BATCH_SIZE,
+    batch_wait=RAG_RERANKING_BATCH_WAIT,
+    threads=RAG_RERANKING_THREADS,
+    cache_size=RAG_RERANKING_CACHE_SIZE,
+    cache_ttl=RAG_RERANKING_CACHE_TTL,
+)
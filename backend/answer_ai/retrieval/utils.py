@@ -2,22 +2,15 @@ import logging
 import os
 from typing import Awaitable, Optional, Union
 
-import requests
-import aiohttp
 import asyncio
 import hashlib
-from concurrent.futures import ThreadPoolExecutor
-import time
+import inspect
 import re
 
 from urllib.parse import quote
+
+import numpy as np
 from huggingface_hub import snapshot_download
-from langchain_classic.retrievers import (
-    ContextualCompressionRetriever,
-    EnsembleRetriever,
-)
-from langchain_community.retrievers import BM25Retriever
-from langchain_core.documents import Document
 
 from answer_ai.config import VECTOR_DB
 from answer_ai.retrieval.vector.factory import VECTOR_DB_CLIENT
@@ -30,7 +23,18 @@ from answer_ai.models.knowledge import Knowledges
 from answer_ai.models.chats import Chats
 from answer_ai.models.notes import Notes
 
-from answer_ai.retrieval.vector.main import GetResult
+from answer_ai.retrieval.vector.main import GetResult, SearchResult
+from answer_ai.retrieval.bm25 import (
+    BM25_INDEX_STORE,
+    BM25Index,
+    rank_texts,
+    get_metadata_text,
+)
+from answer_ai.retrieval.embedding_cache import EMBEDDING_CACHE
+from answer_ai.retrieval.embedding_scheduler import EMBEDDING_SCHEDULER
+from answer_ai.retrieval.embedding_store import EMBEDDING_STORE
+from answer_ai.retrieval.fusion import cosine_similarity, reciprocal_rank_fusion
+from answer_ai.retrieval.reranking import RERANKING_SERVICE
 from answer_ai.utils.access_control import has_access
 from answer_ai.utils.headers import include_user_info_headers
 from answer_ai.utils.misc import get_message_list
@@ -52,12 +56,6 @@ from answer_ai.config import (
 log = logging.getLogger(__name__)
 
 
-from typing import Any
-
-from langchain_core.callbacks import CallbackManagerForRetrieverRun
-from langchain_core.retrievers import BaseRetriever
-
-
 def is_youtube_url(url: str) -> bool:
     youtube_regex = r"^(https?://)?(www\.)?(youtube\.com|youtu\.be)/.+$"
     return re.match(youtube_regex, url) is not None
@@ -86,59 +84,32 @@ def get_content_from_url(request, url: str) -> str:
     return content, docs
 
 
-class VectorSearchRetriever(BaseRetriever):
-    collection_name: Any
-    embedding_function: Any
-    top_k: int
-
-    def _get_relevant_documents(
-        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
-    ) -> list[Document]:
-        """Get documents relevant to a query.
-
-        Args:
-            query: String to find relevant documents for.
-            run_manager: The callback handler to use.
-
-        Returns:
-            List of relevant documents.
-        """
-        return []
-
-    async def _aget_relevant_documents(
-        self,
-        query: str,
-        *,
-        run_manager: CallbackManagerForRetrieverRun,
-    ) -> list[Document]:
-        embedding = await self.embedding_function(query, RAG_EMBEDDING_QUERY_PREFIX)
+def query_doc(
+    collection_name: str, query_embedding: list[float], k: int, user: UserModel = None
+):
+    try:
+        log.debug(f"query_doc:doc {collection_name}")
         result = VECTOR_DB_CLIENT.search(
-            collection_name=self.collection_name,
-            vectors=[embedding],
-            limit=self.top_k,
+            collection_name=collection_name,
+            vectors=[query_embedding],
+            limit=k,
         )
 
-        ids = result.ids[0]
-        metadatas = result.metadatas[0]
-        documents = result.documents[0]
+        if result:
+            log.info(f"query_doc:result {result.ids} {result.metadatas}")
 
-        results = []
-        for idx in range(len(ids)):
-            results.append(
-                Document(
-                    metadata=metadatas[idx],
-                    page_content=documents[idx],
-                )
-            )
-        return results
+        return result
+    except Exception as e:
+        log.exception(f"Error querying doc {collection_name} with limit {k}: {e}")
+        raise e
 
 
-def query_doc(
+async def aquery_doc(
     collection_name: str, query_embedding: list[float], k: int, user: UserModel = None
 ):
     try:
         log.debug(f"query_doc:doc {collection_name}")
-        result = VECTOR_DB_CLIENT.search(
+        result = await VECTOR_DB_CLIENT.asearch(
             collection_name=collection_name,
             vectors=[query_embedding],
             limit=k,
@@ -167,40 +138,47 @@ def get_doc(collection_name: str, user: UserModel = None):
         raise e
 
 
-def get_enriched_texts(collection_result: GetResult) -> list[str]:
-    enriched_texts = []
-    for idx, text in enumerate(collection_result.documents[0]):
-        metadata = collection_result.metadatas[0][idx]
-        metadata_parts = [text]
-
-        # Add filename (repeat twice for extra weight in BM25 scoring)
-        if metadata.get("name"):
-            filename = metadata["name"]
-            filename_tokens = (
-                filename.replace("_", " ").replace("-", " ").replace(".", " ")
-            )
-            metadata_parts.append(
-                f"Filename: {filename} {filename_tokens} {filename_tokens}"
-            )
+async def search_collections(
+    collection_names: list[str],
+    queries: list[str],
+    embedding_function,
+    k: int,
+) -> dict[str, Optional[SearchResult]]:
+    """
+    Search all the collections for all the queries at once. The result of
+    each collection has a row per query, in order.
+    """
+    query_embeddings = await embedding_function(
+        queries, prefix=RAG_EMBEDDING_QUERY_PREFIX
+    )
+    collection_names = [name for name in dict.fromkeys(collection_names) if name]
+    log.debug(
+        f"search_collections: {len(queries)} queries across {len(collection_names)} collections"
+    )
+    return await VECTOR_DB_CLIENT.asearch_many(
+        collection_names=collection_names, vectors=query_embeddings, limit=k
+    )
 
-        # Add title if available
-        if metadata.get("title"):
-            metadata_parts.append(f"Title: {metadata['title']}")
 
-        # Add document section headings if available (from markdown splitter)
-        if metadata.get("headings") and isinstance(metadata["headings"], list):
-            headings = " > ".join(str(h) for h in metadata["headings"])
-            metadata_parts.append(f"Section: {headings}")
+def get_search_result_row(
+    search_result: Optional[SearchResult], idx: int
+) -> Optional[SearchResult]:
+    if search_result is None or idx >= len(search_result.ids or []):
+        return None
 
-        # Add source URL/path if available
-        if metadata.get("source"):
-            metadata_parts.append(f"Source: {metadata['source']}")
+    return SearchResult(
+        ids=[search_result.ids[idx]],
+        distances=[search_result.distances[idx]],
+        documents=[search_result.documents[idx]],
+        metadatas=[search_result.metadatas[idx]],
+    )
 
-        # Add snippet for web search results
-        if metadata.get("snippet"):
-            metadata_parts.append(f"Snippet: {metadata['snippet']}")
 
-        enriched_texts.append(" ".join(metadata_parts))
+def get_enriched_texts(collection_result: GetResult) -> list[str]:
+    enriched_texts = []
+    for idx, text in enumerate(collection_result.documents[0]):
+        metadata_text = get_metadata_text(collection_result.metadatas[0][idx])
+        enriched_texts.append(f"{text} {metadata_text}" if metadata_text else text)
 
     return enriched_texts
 
@@ -216,76 +194,109 @@ async def query_doc_with_hybrid_search(
     r: float,
     hybrid_bm25_weight: float,
     enable_enriched_texts: bool = False,
+    bm25_index: Optional[BM25Index] = None,
+    search_result: Optional[SearchResult] = None,
 ) -> dict:
     try:
-        # First check if collection_result has the required attributes
-        if (
-            not collection_result
-            or not hasattr(collection_result, "documents")
-            or not hasattr(collection_result, "metadatas")
-        ):
-            log.warning(f"query_doc_with_hybrid_search:no_docs {collection_name}")
-            return {"documents": [], "metadatas": [], "distances": []}
+        # The documents are only needed when there is no persisted BM25 index
+        if bm25_index is None:
+            # First check if collection_result has the required attributes
+            if (
+                not collection_result
+                or not hasattr(collection_result, "documents")
+                or not hasattr(collection_result, "metadatas")
+            ):
+                log.warning(f"query_doc_with_hybrid_search:no_docs {collection_name}")
+                return {"documents": [], "metadatas": [], "distances": []}
 
-        # Now safely check the documents content after confirming attributes exist
-        if (
-            not collection_result.documents
-            or len(collection_result.documents) == 0
-            or not collection_result.documents[0]
-        ):
-            log.warning(f"query_doc_with_hybrid_search:no_docs {collection_name}")
-            return {"documents": [], "metadatas": [], "distances": []}
+            # Now safely check the documents content after confirming attributes exist
+            if (
+                not collection_result.documents
+                or len(collection_result.documents) == 0
+                or not collection_result.documents[0]
+            ):
+                log.warning(f"query_doc_with_hybrid_search:no_docs {collection_name}")
+                return {"documents": [], "metadatas": [], "distances": []}
 
         log.debug(f"query_doc_with_hybrid_search:doc {collection_name}")
 
-        bm25_texts = (
-            get_enriched_texts(collection_result)
-            if enable_enriched_texts
-            else collection_result.documents[0]
-        )
-
-        bm25_retriever = BM25Retriever.from_texts(
-            texts=bm25_texts,
-            metadatas=collection_result.metadatas[0],
-        )
-        bm25_retriever.k = k
-
-        vector_search_retriever = VectorSearchRetriever(
-            collection_name=collection_name,
-            embedding_function=embedding_function,
-            top_k=k,
-        )
-
-        if hybrid_bm25_weight <= 0:
-            ensemble_retriever = EnsembleRetriever(
-                retrievers=[vector_search_retriever], weights=[1.0]
-            )
-        elif hybrid_bm25_weight >= 1:
-            ensemble_retriever = EnsembleRetriever(
-                retrievers=[bm25_retriever], weights=[1.0]
+        # Ranked texts and metadatas of the BM25 and vector searches, fused
+        # by weighted reciprocal rank
+        rankings = []
+        if hybrid_bm25_weight > 0:
+            if bm25_index is not None:
+                texts, metadatas = bm25_index.search(
+                    query, k, enriched=enable_enriched_texts
+                )
+            else:
+                texts, metadatas = rank_texts(
+                    (
+                        get_enriched_texts(collection_result)
+                        if enable_enriched_texts
+                        else collection_result.documents[0]
+                    ),
+                    collection_result.metadatas[0],
+                    query,
+                    k,
+                )
+            rankings.append(
+                (
+                    texts,
+                    metadatas,
+                    hybrid_bm25_weight if hybrid_bm25_weight < 1 else 1.0,
+                )
             )
-        else:
-            ensemble_retriever = EnsembleRetriever(
-                retrievers=[bm25_retriever, vector_search_retriever],
-                weights=[hybrid_bm25_weight, 1.0 - hybrid_bm25_weight],
+
+        if hybrid_bm25_weight < 1:
+            if search_result is None:
+                query_embedding = await embedding_function(
+                    query, RAG_EMBEDDING_QUERY_PREFIX
+                )
+                search_result = await VECTOR_DB_CLIENT.asearch(
+                    collection_name=collection_name,
+                    vectors=[query_embedding],
+                    limit=k,
+                )
+            rankings.append(
+                (
+                    search_result.documents[0],
+                    search_result.metadatas[0],
+                    1.0 - hybrid_bm25_weight if hybrid_bm25_weight > 0 else 1.0,
+                )
             )
 
-        compressor = RerankCompressor(
-            embedding_function=embedding_function,
-            top_n=k_reranker,
-            reranking_function=reranking_function,
-            r_score=r,
+        positions, _ = reciprocal_rank_fusion(
+            [texts for texts, _, _ in rankings],
+            [weight for _, _, weight in rankings],
         )
-
-        compression_retriever = ContextualCompressionRetriever(
-            base_compressor=compressor, base_retriever=ensemble_retriever
+        all_texts = [text for texts, _, _ in rankings for text in texts]
+        all_metadatas = [
+            metadata for _, metadatas, _ in rankings for metadata in metadatas
+        ]
+        documents = [all_texts[i] for i in positions]
+        metadatas = [all_metadatas[i] or {} for i in positions]
+
+        scores = await get_relevance_scores(
+            query, documents, embedding_function, reranking_function
         )
-
-        result = await compression_retriever.ainvoke(query)
-
-        distances = [d.metadata.get("score") for d in result]
-        documents = [d.page_content for d in result]
-        metadatas = [d.metadata for d in result]
+        if scores is not None:
+            if r:
+                keep = np.flatnonzero(scores >= r)
+            else:
+                keep = np.arange(len(scores))
+            top = keep[np.argsort(-scores[keep], kind="stable")][:k_reranker]
+
+            distances = [float(scores[i]) for i in top]
+            documents = [documents[i] for i in top]
+            metadatas = [
+                {**metadatas[i], "score": distance}
+                for i, distance in zip(top, distances)
+            ]
+        else:
+            log.warning(
+                "No valid scores found, check your reranking function. Returning original documents."
+            )
+            distances = [metadata.get("score") for metadata in metadatas]
 
         # retrieve only min(k, k_reranker) items, sort and cut by distance if k < k_reranker
         if k < k_reranker:
@@ -315,6 +326,34 @@ async def query_doc_with_hybrid_search(
         raise e
 
 
+async def get_relevance_scores(
+    query: str, documents: list[str], embedding_function, reranking_function
+) -> Optional[np.ndarray]:
+    """
+    Scores of the documents for the query, from the reranking model or else
+    the cosine similarity of their embeddings. None if reranking failed.
+    """
+    if not documents:
+        return np.empty(0)
+
+    if reranking_function is not None:
+        scores = reranking_function(query, documents)
+        if inspect.isawaitable(scores):
+            scores = await scores
+        if scores is None:
+            return None
+        return np.asarray(
+            scores.tolist() if not isinstance(scores, list) else scores,
+            dtype=np.float64,
+        )
+
+    query_embedding = await embedding_function(query, RAG_EMBEDDING_QUERY_PREFIX)
+    document_embeddings = await embedding_function(
+        documents, RAG_EMBEDDING_CONTENT_PREFIX, content=True
+    )
+    return cosine_similarity(query_embedding, document_embeddings).astype(np.float64)
+
+
 def merge_get_results(get_results: list[dict]) -> dict:
     # Initialize lists to store combined data
     combined_documents = []
@@ -405,50 +444,37 @@ async def query_collection(
     queries: list[str],
     embedding_function,
     k: int,
+    search_results: Optional[dict[str, Optional[SearchResult]]] = None,
 ) -> dict:
+    """
+    Top `k` chunks of the collections for the queries. `search_results` are
+    the results of `search_collections` for them, when already searched.
+    """
     results = []
-    error = False
 
-    def process_query_collection(collection_name, query_embedding):
+    if search_results is None:
         try:
-            if collection_name:
-                result = query_doc(
-                    collection_name=collection_name,
-                    k=k,
-                    query_embedding=query_embedding,
-                )
-                if result is not None:
-                    return result.model_dump(), None
-            return None, None
+            search_results = await search_collections(
+                collection_names, queries, embedding_function, k
+            )
         except Exception as e:
-            log.exception(f"Error when querying the collection: {e}")
-            return None, e
-
-    # Generate all query embeddings (in one call)
-    query_embeddings = await embedding_function(
-        queries, prefix=RAG_EMBEDDING_QUERY_PREFIX
-    )
-    log.debug(
-        f"query_collection: processing {len(queries)} queries across {len(collection_names)} collections"
-    )
+            log.exception(f"Error when querying the collections: {e}")
+            search_results = {}
 
-    with ThreadPoolExecutor() as executor:
-        future_results = []
-        for query_embedding in query_embeddings:
-            for collection_name in collection_names:
-                result = executor.submit(
-                    process_query_collection, collection_name, query_embedding
-                )
-                future_results.append(result)
-        task_results = [future.result() for future in future_results]
+    for collection_name in collection_names:
+        search_result = search_results.get(collection_name)
+        if search_result is None:
+            continue
 
-    for result, err in task_results:
-        if err is not None:
-            error = True
-        elif result is not None:
-            results.append(result)
+        for idx in range(len(queries)):
+            result = get_search_result_row(search_result, idx)
+            if result is not None:
+                results.append(result.model_dump())
 
-    if error and not results:
+    if collection_names and all(
+        search_results.get(collection_name) is None
+        for collection_name in collection_names
+    ):
         log.warning("All collection queries failed. No results returned.")
 
     return merge_and_sort_query_results(results, k=k)
@@ -464,29 +490,79 @@ async def query_collection_with_hybrid_search(
     r: float,
     hybrid_bm25_weight: float,
     enable_enriched_texts: bool = False,
+    search_results: Optional[dict[str, Optional[SearchResult]]] = None,
 ) -> dict:
+    """
+    Top chunks of the collections for the queries, from hybrid search.
+    `search_results` are the results of `search_collections` for them, when
+    already searched.
+    """
     results = []
     error = False
-    # Fetch collection data once per collection sequentially
-    # Avoid fetching the same data multiple times later
+    # Use the persisted BM25 index of each collection when there is one.
+    # Otherwise fetch collection data once per collection sequentially, to
+    # avoid fetching the same data multiple times later, and build the index
+    # from it in the background for the next queries
     collection_results = {}
+    bm25_indexes = {}
     for collection_name in collection_names:
         try:
+            bm25_indexes[collection_name] = BM25_INDEX_STORE.get(collection_name)
+            if bm25_indexes[collection_name] is not None:
+                collection_results[collection_name] = None
+                continue
+
             log.debug(
                 f"query_collection_with_hybrid_search:VECTOR_DB_CLIENT.get:collection {collection_name}"
             )
-            collection_results[collection_name] = VECTOR_DB_CLIENT.get(
-                collection_name=collection_name
-            )
+            # Begun before reading, so writes made meanwhile end up in the index
+            building = BM25_INDEX_STORE.begin_build(collection_name)
+            try:
+                collection_results[collection_name] = await VECTOR_DB_CLIENT.aget(
+                    collection_name=collection_name
+                )
+            except Exception:
+                if building:
+                    BM25_INDEX_STORE.abort_build(collection_name)
+                raise
+
+            if building:
+                BM25_INDEX_STORE.build_in_background(
+                    collection_name, collection_results[collection_name]
+                )
         except Exception as e:
             log.exception(f"Failed to fetch collection {collection_name}: {e}")
             collection_results[collection_name] = None
+            bm25_indexes[collection_name] = None
 
     log.info(
         f"Starting hybrid search for {len(queries)} queries in {len(collection_names)} collections..."
     )
 
-    async def process_query(collection_name, query):
+    # Prepare tasks for all collections and queries
+    # Avoid running any tasks for collections that failed to fetch data (have assigned None)
+    tasks = [
+        (collection_name, idx, query)
+        for collection_name in collection_names
+        if collection_results[collection_name] is not None
+        or bm25_indexes[collection_name] is not None
+        for idx, query in enumerate(queries)
+    ]
+
+    # The vector search of all the tasks in one go, unless only BM25 is used
+    if search_results is None and tasks and hybrid_bm25_weight < 1:
+        try:
+            search_results = await search_collections(
+                [collection_name for collection_name, _, _ in tasks],
+                queries,
+                embedding_function,
+                k,
+            )
+        except Exception as e:
+            log.exception(f"Error when searching the collections: {e}")
+    search_results = search_results or {}
+
+    async def process_query(collection_name, idx, query):
         try:
             result = await query_doc_with_hybrid_search(
                 collection_name=collection_name,
@@ -499,24 +575,22 @@ async def query_collection_with_hybrid_search(
                 r=r,
                 hybrid_bm25_weight=hybrid_bm25_weight,
                 enable_enriched_texts=enable_enriched_texts,
+                bm25_index=bm25_indexes.get(collection_name),
+                search_result=get_search_result_row(
+                    search_results.get(collection_name), idx
+                ),
             )
             return result, None
         except Exception as e:
             log.exception(f"Error when querying the collection with hybrid_search: {e}")
             return None, e
 
-    # Prepare tasks for all collections and queries
-    # Avoid running any tasks for collections that failed to fetch data (have assigned None)
-    tasks = [
-        (collection_name, query)
-        for collection_name in collection_names
-        if collection_results[collection_name] is not None
-        for query in queries
-    ]
-
     # Run all queries in parallel using asyncio.gather
     task_results = await asyncio.gather(
-        *[process_query(collection_name, query) for collection_name, query in tasks]
+        *[
+            process_query(collection_name, idx, query)
+            for collection_name, idx, query in tasks
+        ]
     )
 
     for result, err in task_results:
@@ -541,35 +615,9 @@ def generate_openai_batch_embeddings(
     prefix: str = None,
     user: UserModel = None,
 ) -> Optional[list[list[float]]]:
-    try:
-        log.debug(
-            f"generate_openai_batch_embeddings:model {model} batch size: {len(texts)}"
-        )
-        json_data = {"input": texts, "model": model}
-        if isinstance(RAG_EMBEDDING_PREFIX_FIELD_NAME, str) and isinstance(prefix, str):
-            json_data[RAG_EMBEDDING_PREFIX_FIELD_NAME] = prefix
-
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {key}",
-        }
-        if ENABLE_FORWARD_USER_INFO_HEADERS and user:
-            headers = include_user_info_headers(headers, user)
-
-        r = requests.post(
-            f"{url}/embeddings",
-            headers=headers,
-            json=json_data,
-        )
-        r.raise_for_status()
-        data = r.json()
-        if "data" in data:
-            return [elem["embedding"] for elem in data["data"]]
-        else:
-            raise "Something went wrong :/"
-    except Exception as e:
-        log.exception(f"Error generating openai batch embeddings: {e}")
-        return None
+    return EMBEDDING_SCHEDULER.run_sync(
+        agenerate_openai_batch_embeddings(model, texts, url, key, prefix, user)
+    )
 
 
 async def agenerate_openai_batch_embeddings(
@@ -579,15 +627,13 @@ async def agenerate_openai_batch_embeddings(
     key: str = "",
     prefix: str = None,
     user: UserModel = None,
+    batch_size: Optional[int] = None,
+    enable_async: bool = True,
 ) -> Optional[list[list[float]]]:
     try:
         log.debug(
             f"agenerate_openai_batch_embeddings:model {model} batch size: {len(texts)}"
         )
-        form_data = {"input": texts, "model": model}
-        if isinstance(RAG_EMBEDDING_PREFIX_FIELD_NAME, str) and isinstance(prefix, str):
-            form_data[RAG_EMBEDDING_PREFIX_FIELD_NAME] = prefix
-
         headers = {
             "Content-Type": "application/json",
             "Authorization": f"Bearer {key}",
@@ -595,16 +641,24 @@ async def agenerate_openai_batch_embeddings(
         if ENABLE_FORWARD_USER_INFO_HEADERS and user:
             headers = include_user_info_headers(headers, user)
 
-        async with aiohttp.ClientSession(trust_env=True) as session:
-            async with session.post(
+        async def embed_batch(batch: list[str]) -> list[list[float]]:
+            form_data = {"input": batch, "model": model}
+            if isinstance(RAG_EMBEDDING_PREFIX_FIELD_NAME, str) and isinstance(
+                prefix, str
+            ):
+                form_data[RAG_EMBEDDING_PREFIX_FIELD_NAME] = prefix
+
+            data = await EMBEDDING_SCHEDULER.post(
                 f"{url}/embeddings", headers=headers, json=form_data
-            ) as r:
-                r.raise_for_status()
-                data = await r.json()
-                if "data" in data:
-                    return [item["embedding"] for item in data["data"]]
-                else:
-                    raise Exception("Something went wrong :/")
+            )
+            if "data" in data:
+                return [item["embedding"] for item in data["data"]]
+            else:
+                raise Exception("Something went wrong :/")
+
+        return await EMBEDDING_SCHEDULER.embed(
+            texts, embed_batch, batch_size=batch_size, sequential=not enable_async
+        )
     except Exception as e:
         log.exception(f"Error generating openai batch embeddings: {e}")
         return None
@@ -619,43 +673,11 @@ def generate_azure_openai_batch_embeddings(
     prefix: str = None,
     user: UserModel = None,
 ) -> Optional[list[list[float]]]:
-    try:
-        log.debug(
-            f"generate_azure_openai_batch_embeddings:deployment {model} batch size: {len(texts)}"
+    return EMBEDDING_SCHEDULER.run_sync(
+        agenerate_azure_openai_batch_embeddings(
+            model, texts, url, key, version, prefix, user
         )
-        json_data = {"input": texts}
-        if isinstance(RAG_EMBEDDING_PREFIX_FIELD_NAME, str) and isinstance(prefix, str):
-            json_data[RAG_EMBEDDING_PREFIX_FIELD_NAME] = prefix
-
-        url = f"{url}/openai/deployments/{model}/embeddings?api-version={version}"
-
-        for _ in range(5):
-            headers = {
-                "Content-Type": "application/json",
-                "api-key": key,
-            }
-            if ENABLE_FORWARD_USER_INFO_HEADERS and user:
-                headers = include_user_info_headers(headers, user)
-
-            r = requests.post(
-                url,
-                headers=headers,
-                json=json_data,
-            )
-            if r.status_code == 429:
-                retry = float(r.headers.get("Retry-After", "1"))
-                time.sleep(retry)
-                continue
-            r.raise_for_status()
-            data = r.json()
-            if "data" in data:
-                return [elem["embedding"] for elem in data["data"]]
-            else:
-                raise Exception("Something went wrong :/")
-        return None
-    except Exception as e:
-        log.exception(f"Error generating azure openai batch embeddings: {e}")
-        return None
+    )
 
 
 async def agenerate_azure_openai_batch_embeddings(
@@ -666,15 +688,13 @@ async def agenerate_azure_openai_batch_embeddings(
     version: str = "",
     prefix: str = None,
     user: UserModel = None,
+    batch_size: Optional[int] = None,
+    enable_async: bool = True,
 ) -> Optional[list[list[float]]]:
     try:
         log.debug(
             f"agenerate_azure_openai_batch_embeddings:deployment {model} batch size: {len(texts)}"
         )
-        form_data = {"input": texts}
-        if isinstance(RAG_EMBEDDING_PREFIX_FIELD_NAME, str) and isinstance(prefix, str):
-            form_data[RAG_EMBEDDING_PREFIX_FIELD_NAME] = prefix
-
         full_url = f"{url}/openai/deployments/{model}/embeddings?api-version={version}"
 
         headers = {
@@ -684,14 +704,24 @@ async def agenerate_azure_openai_batch_embeddings(
         if ENABLE_FORWARD_USER_INFO_HEADERS and user:
             headers = include_user_info_headers(headers, user)
 
-        async with aiohttp.ClientSession(trust_env=True) as session:
-            async with session.post(full_url, headers=headers, json=form_data) as r:
-                r.raise_for_status()
-                data = await r.json()
-                if "data" in data:
-                    return [item["embedding"] for item in data["data"]]
-                else:
-                    raise Exception("Something went wrong :/")
+        async def embed_batch(batch: list[str]) -> list[list[float]]:
+            form_data = {"input": batch}
+            if isinstance(RAG_EMBEDDING_PREFIX_FIELD_NAME, str) and isinstance(
+                prefix, str
+            ):
+                form_data[RAG_EMBEDDING_PREFIX_FIELD_NAME] = prefix
+
+            data = await EMBEDDING_SCHEDULER.post(
+                full_url, headers=headers, json=form_data
+            )
+            if "data" in data:
+                return [item["embedding"] for item in data["data"]]
+            else:
+                raise Exception("Something went wrong :/")
+
+        return await EMBEDDING_SCHEDULER.embed(
+            texts, embed_batch, batch_size=batch_size, sequential=not enable_async
+        )
     except Exception as e:
         log.exception(f"Error generating azure openai batch embeddings: {e}")
         return None
@@ -705,36 +735,9 @@ def generate_ollama_batch_embeddings(
     prefix: str = None,
     user: UserModel = None,
 ) -> Optional[list[list[float]]]:
-    try:
-        log.debug(
-            f"generate_ollama_batch_embeddings:model {model} batch size: {len(texts)}"
-        )
-        json_data = {"input": texts, "model": model}
-        if isinstance(RAG_EMBEDDING_PREFIX_FIELD_NAME, str) and isinstance(prefix, str):
-            json_data[RAG_EMBEDDING_PREFIX_FIELD_NAME] = prefix
-
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {key}",
-        }
-        if ENABLE_FORWARD_USER_INFO_HEADERS and user:
-            headers = include_user_info_headers(headers, user)
-
-        r = requests.post(
-            f"{url}/api/embed",
-            headers=headers,
-            json=json_data,
-        )
-        r.raise_for_status()
-        data = r.json()
-
-        if "embeddings" in data:
-            return data["embeddings"]
-        else:
-            raise "Something went wrong :/"
-    except Exception as e:
-        log.exception(f"Error generating ollama batch embeddings: {e}")
-        return None
+    return EMBEDDING_SCHEDULER.run_sync(
+        agenerate_ollama_batch_embeddings(model, texts, url, key, prefix, user)
+    )
 
 
 async def agenerate_ollama_batch_embeddings(
@@ -744,15 +747,13 @@ async def agenerate_ollama_batch_embeddings(
     key: str = "",
     prefix: str = None,
     user: UserModel = None,
+    batch_size: Optional[int] = None,
+    enable_async: bool = True,
 ) -> Optional[list[list[float]]]:
     try:
         log.debug(
             f"agenerate_ollama_batch_embeddings:model {model} batch size: {len(texts)}"
         )
-        form_data = {"input": texts, "model": model}
-        if isinstance(RAG_EMBEDDING_PREFIX_FIELD_NAME, str) and isinstance(prefix, str):
-            form_data[RAG_EMBEDDING_PREFIX_FIELD_NAME] = prefix
-
         headers = {
             "Content-Type": "application/json",
             "Authorization": f"Bearer {key}",
@@ -760,16 +761,24 @@ async def agenerate_ollama_batch_embeddings(
         if ENABLE_FORWARD_USER_INFO_HEADERS and user:
             headers = include_user_info_headers(headers, user)
 
-        async with aiohttp.ClientSession(trust_env=True) as session:
-            async with session.post(
+        async def embed_batch(batch: list[str]) -> list[list[float]]:
+            form_data = {"input": batch, "model": model}
+            if isinstance(RAG_EMBEDDING_PREFIX_FIELD_NAME, str) and isinstance(
+                prefix, str
+            ):
+                form_data[RAG_EMBEDDING_PREFIX_FIELD_NAME] = prefix
+
+            data = await EMBEDDING_SCHEDULER.post(
                 f"{url}/api/embed", headers=headers, json=form_data
-            ) as r:
-                r.raise_for_status()
-                data = await r.json()
-                if "embeddings" in data:
-                    return data["embeddings"]
-                else:
-                    raise Exception("Something went wrong :/")
+            )
+            if "embeddings" in data:
+                return data["embeddings"]
+            else:
+                raise Exception("Something went wrong :/")
+
+        return await EMBEDDING_SCHEDULER.embed(
+            texts, embed_batch, batch_size=batch_size, sequential=not enable_async
+        )
     except Exception as e:
         log.exception(f"Error generating ollama batch embeddings: {e}")
         return None
@@ -784,6 +793,113 @@ def get_embedding_function(
     embedding_batch_size,
     azure_api_version=None,
     enable_async=True,
+    cache=True,
+) -> Awaitable:
+    """
+    Embedding function of the model, taking the text or texts to embed, the
+    prefix, the user and `content`, set when the texts are document chunks.
+
+    Queries go through the embedding cache unless `cache` is unset.
+    Document chunks reuse the embeddings stored when they were indexed, and
+    are kept out of the cache so that they don't push queries out of it.
+    """
+    async_embedding_function = get_uncached_embedding_function(
+        embedding_engine,
+        embedding_model,
+        embedding_function,
+        url,
+        key,
+        embedding_batch_size,
+        azure_api_version=azure_api_version,
+        enable_async=enable_async,
+    )
+
+    async def embed_missing(query, keys, embeddings, prefix, user):
+        """
+        Embed the texts of `query` whose keys are not in `embeddings`, and
+        return the embeddings generated by key along with the result.
+        """
+        texts = query if isinstance(query, list) else [query]
+        texts_by_key = {key: text for key, text in zip(keys, texts)}
+        missing = [key for key in texts_by_key if key not in embeddings]
+
+        missing_embeddings = {}
+        if missing:
+            generated = await async_embedding_function(
+                [texts_by_key[key] for key in missing], prefix=prefix, user=user
+            )
+            if not isinstance(generated, list) or len(generated) != len(missing):
+                # Failed (or partly failed) request, returned as is
+                if len(missing) == len(keys) and isinstance(query, list):
+                    return generated, {}
+                raise Exception("Failed to generate embeddings")
+
+            missing_embeddings = dict(zip(missing, generated))
+            embeddings.update(missing_embeddings)
+
+        if isinstance(query, list):
+            return [embeddings[key] for key in keys], missing_embeddings
+        return embeddings[keys[0]], missing_embeddings
+
+    async def cached_embedding_function(query, prefix=None, user=None):
+        texts = query if isinstance(query, list) else [query]
+        keys = [
+            EMBEDDING_CACHE.get_key(embedding_engine, embedding_model, prefix, text)
+            for text in texts
+        ]
+
+        embeddings = await EMBEDDING_CACHE.get_many(keys)
+        result, missing_embeddings = await embed_missing(
+            query, keys, embeddings, prefix, user
+        )
+        await EMBEDDING_CACHE.set_many(missing_embeddings)
+        return result
+
+    async def stored_embedding_function(query, prefix=None, user=None):
+        texts = query if isinstance(query, list) else [query]
+        # Keyed as at indexing time
+        keys = [
+            EMBEDDING_STORE.get_key(
+                embedding_engine, embedding_model, prefix, text.replace("\n", " ")
+            )
+            for text in texts
+        ]
+
+        embeddings = await asyncio.to_thread(EMBEDDING_STORE.get_many, keys)
+        result, missing_embeddings = await embed_missing(
+            query, keys, embeddings, prefix, user
+        )
+        if missing_embeddings:
+            await asyncio.to_thread(EMBEDDING_STORE.put_many, missing_embeddings)
+        return result
+
+    if cache and EMBEDDING_CACHE.enabled:
+        query_embedding_function = cached_embedding_function
+    else:
+        query_embedding_function = async_embedding_function
+
+    if EMBEDDING_STORE.enabled:
+        content_embedding_function = stored_embedding_function
+    else:
+        content_embedding_function = async_embedding_function
+
+    async def embedding_function(query, prefix=None, user=None, content=False):
+        if content:
+            return await content_embedding_function(query, prefix=prefix, user=user)
+        return await query_embedding_function(query, prefix=prefix, user=user)
+
+    return embedding_function
+
+
+def get_uncached_embedding_function(
+    embedding_engine,
+    embedding_model,
+    embedding_function,
+    url,
+    key,
+    embedding_batch_size,
+    azure_api_version=None,
+    enable_async=True,
 ) -> Awaitable:
     if embedding_engine == "":
         # Sentence transformers: CPU-bound sync operation
@@ -800,57 +916,22 @@ def get_embedding_function(
 
         return async_embedding_function
     elif embedding_engine in ["ollama", "openai", "azure_openai"]:
-        embedding_function = lambda query, prefix=None, user=None: generate_embeddings(
-            engine=embedding_engine,
-            model=embedding_model,
-            text=query,
-            prefix=prefix,
-            url=url,
-            key=key,
-            user=user,
-            azure_api_version=azure_api_version,
-        )
 
         async def async_embedding_function(query, prefix=None, user=None):
-            if isinstance(query, list):
-                # Create batches
-                batches = [
-                    query[i : i + embedding_batch_size]
-                    for i in range(0, len(query), embedding_batch_size)
-                ]
-
-                if enable_async:
-                    log.debug(
-                        f"generate_multiple_async: Processing {len(batches)} batches in parallel"
-                    )
-                    # Execute all batches in parallel
-                    tasks = [
-                        embedding_function(batch, prefix=prefix, user=user)
-                        for batch in batches
-                    ]
-                    batch_results = await asyncio.gather(*tasks)
-                else:
-                    log.debug(
-                        f"generate_multiple_async: Processing {len(batches)} batches sequentially"
-                    )
-                    batch_results = []
-                    for batch in batches:
-                        batch_results.append(
-                            await embedding_function(batch, prefix=prefix, user=user)
-                        )
-
-                # Flatten results
-                embeddings = []
-                for batch_embeddings in batch_results:
-                    if isinstance(batch_embeddings, list):
-                        embeddings.extend(batch_embeddings)
-
-                log.debug(
-                    f"generate_multiple_async: Generated {len(embeddings)} embeddings from {len(batches)} parallel batches"
-                )
-                return embeddings
-            else:
-                return await embedding_function(query, prefix, user)
+            # Batched, and sent in parallel when enable_async is set, by the
+            # embedding scheduler
+            return await generate_embeddings(
+                engine=embedding_engine,
+                model=embedding_model,
+                text=query,
+                prefix=prefix,
+                url=url,
+                key=key,
+                user=user,
+                azure_api_version=azure_api_version,
+                batch_size=embedding_batch_size,
+                enable_async=enable_async,
+            )
 
         return async_embedding_function
     else:
@@ -867,6 +948,8 @@ async def generate_embeddings(
     url = kwargs.get("url", "")
     key = kwargs.get("key", "")
     user = kwargs.get("user")
+    batch_size = kwargs.get("batch_size")
+    enable_async = kwargs.get("enable_async", True)
 
     if prefix is not None and RAG_EMBEDDING_PREFIX_FIELD_NAME is None:
         if isinstance(text, list):
@@ -883,12 +966,21 @@ async def generate_embeddings(
                 "key": key,
                 "prefix": prefix,
                 "user": user,
+                "batch_size": batch_size,
+                "enable_async": enable_async,
             }
         )
         return embeddings[0] if isinstance(text, str) else embeddings
     elif engine == "openai":
         embeddings = await agenerate_openai_batch_embeddings(
-            model, text if isinstance(text, list) else [text], url, key, prefix, user
+            model,
+            text if isinstance(text, list) else [text],
+            url,
+            key,
+            prefix,
+            user,
+            batch_size=batch_size,
+            enable_async=enable_async,
         )
         return embeddings[0] if isinstance(text, str) else embeddings
     elif engine == "azure_openai":
@@ -901,6 +993,8 @@ async def generate_embeddings(
             azure_api_version,
             prefix,
             user,
+            batch_size=batch_size,
+            enable_async=enable_async,
         )
         return embeddings[0] if isinstance(text, str) else embeddings
 
@@ -908,15 +1002,18 @@ async def generate_embeddings(
 def get_reranking_function(reranking_engine, reranking_model, reranking_function):
     if reranking_function is None:
         return None
-    if reranking_engine == "external":
-        return lambda query, documents, user=None: reranking_function.predict(
-            [(query, doc.page_content) for doc in documents], user=user
-        )
-    else:
-        return lambda query, documents, user=None: reranking_function.predict(
-            [(query, doc.page_content) for doc in documents]
+
+    async def rerank(query, documents: list[str], user=None):
+        return await RERANKING_SERVICE.rerank(
+            reranking_function,
+            f"{reranking_engine}:{reranking_model}",
+            query,
+            documents,
+            user=user,
         )
 
+    return rerank
+
 
 async def get_sources_from_items(
     request,
@@ -937,6 +1034,8 @@ async def get_sources_from_items(
     )
 
     extracted_collections = []
+    # Items in order, with their result or the collections to search
+    entries = []
     query_results = []
 
     for item in items:
@@ -1135,42 +1234,71 @@ async def get_sources_from_items(
                 log.debug(f"skipping {item} as it has already been extracted")
                 continue
 
-            try:
-                if full_context:
+            if full_context:
+                try:
                     query_result = get_all_items_from_collections(collection_names)
-                else:
-                    query_result = None  # Initialize to None
-                    if hybrid_search:
-                        try:
-                            query_result = await query_collection_with_hybrid_search(
-                                collection_names=collection_names,
-                                queries=queries,
-                                embedding_function=embedding_function,
-                                k=k,
-                                reranking_function=reranking_function,
-                                k_reranker=k_reranker,
-                                r=r,
-                                hybrid_bm25_weight=hybrid_bm25_weight,
-                                enable_enriched_texts=request.app.state.config.ENABLE_RAG_HYBRID_SEARCH_ENRICHED_TEXTS,
-                            )
-                        except Exception as e:
-                            log.debug(
-                                "Error when using hybrid search, using non hybrid search as fallback."
-                            )
+                except Exception as e:
+                    log.exception(e)
+
+            extracted_collections.extend(collection_names)
+
+        entries.append((item, query_result, collection_names))
 
-                    # fallback to non-hybrid search
-                    if not hybrid_search and query_result is None:
-                        query_result = await query_collection(
+    # Vector search the collections of all the items at once, so that a chat
+    # with several knowledge bases makes one search for all of them
+    search_results = None
+    searched_collections = [
+        collection_name
+        for _, query_result, collection_names in entries
+        if query_result is None
+        for collection_name in collection_names
+    ]
+    if (
+        searched_collections
+        and not full_context
+        and (not hybrid_search or hybrid_bm25_weight < 1)
+    ):
+        try:
+            search_results = await search_collections(
+                searched_collections, queries, embedding_function, k
+            )
+        except Exception as e:
+            log.exception(e)
+
+    for item, query_result, collection_names in entries:
+        if query_result is None and collection_names and not full_context:
+            try:
+                if hybrid_search:
+                    try:
+                        query_result = await query_collection_with_hybrid_search(
                             collection_names=collection_names,
                             queries=queries,
                             embedding_function=embedding_function,
                             k=k,
+                            reranking_function=reranking_function,
+                            k_reranker=k_reranker,
+                            r=r,
+                            hybrid_bm25_weight=hybrid_bm25_weight,
+                            enable_enriched_texts=request.app.state.config.ENABLE_RAG_HYBRID_SEARCH_ENRICHED_TEXTS,
+                            search_results=search_results,
                         )
+                    except Exception as e:
+                        log.debug(
+                            "Error when using hybrid search, using non hybrid search as fallback."
+                        )
+
+                # fallback to non-hybrid search
+                if not hybrid_search and query_result is None:
+                    query_result = await query_collection(
+                        collection_names=collection_names,
+                        queries=queries,
+                        embedding_function=embedding_function,
+                        k=k,
+                        search_results=search_results,
+                    )
             except Exception as e:
                 log.exception(e)
 
-            extracted_collections.extend(collection_names)
-
         if query_result:
             if "data" in item:
                 del item["data"]
@@ -1234,91 +1362,3 @@ def get_model_path(model: str, update_model: bool = False):
     except Exception as e:
         log.exception(f"Cannot determine model snapshot path: {e}")
         return model
-
-
-import operator
-from typing import Optional, Sequence
-
-from langchain_core.callbacks import Callbacks
-from langchain_core.documents import BaseDocumentCompressor, Document
-
-
-class RerankCompressor(BaseDocumentCompressor):
-    embedding_function: Any
-    top_n: int
-    reranking_function: Any
-    r_score: float
-
-    class Config:
-        extra = "forbid"
-        arbitrary_types_allowed = True
-
-    def compress_documents(
-        self,
-        documents: Sequence[Document],
-        query: str,
-        callbacks: Optional[Callbacks] = None,
-    ) -> Sequence[Document]:
-        """Compress retrieved documents given the query context.
-
-        Args:
-            documents: The retrieved documents.
-            query: The query context.
-            callbacks: Optional callbacks to run during compression.
-
-        Returns:
-            The compressed documents.
-
-        """
-        return []
-
-    async def acompress_documents(
-        self,
-        documents: Sequence[Document],
-        query: str,
-        callbacks: Optional[Callbacks] = None,
-    ) -> Sequence[Document]:
-        reranking = self.reranking_function is not None
-
-        scores = None
-        if reranking:
-            scores = await asyncio.to_thread(self.reranking_function, query, documents)
-        else:
-            from sentence_transformers import util
-
-            query_embedding = await self.embedding_function(
-                query, RAG_EMBEDDING_QUERY_PREFIX
-            )
-            document_embedding = await self.embedding_function(
-                [doc.page_content for doc in documents], RAG_EMBEDDING_CONTENT_PREFIX
-            )
-            scores = util.cos_sim(query_embedding, document_embedding)[0]
-
-        if scores is not None:
-            docs_with_scores = list(
-                zip(
-                    documents,
-                    scores.tolist() if not isinstance(scores, list) else scores,
-                )
-            )
-            if self.r_score:
-                docs_with_scores = [
-                    (d, s) for d, s in docs_with_scores if s >= self.r_score
-                ]
-
-            result = sorted(docs_with_scores, key=operator.itemgetter(1), reverse=True)
-            final_results = []
-            for doc, doc_score in result[: self.top_n]:
-                metadata = doc.metadata
-                metadata["score"] = doc_score
-                doc = Document(
-                    page_content=doc.page_content,
-                    metadata=metadata,
-                )
-                final_results.append(doc)
-            return final_results
-        else:
-            log.warning(
-                "No valid scores found, check your reranking function. Returning original documents."
-            )
-            return documents
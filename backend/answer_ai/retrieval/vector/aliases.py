@@ -0,0 +1,179 @@
+import logging
+import threading
+import time
+from typing import Optional
+
+from fastapi import FastAPI
+
+from answer_ai.env import REDIS_KEY_PREFIX
+from answer_ai.models.vector_aliases import VectorCollectionAliases
+from answer_ai.retrieval.vector.main import GetResult, SearchResult, VectorDBBase
+from answer_ai.utils.redis import get_redis_connection, listen_channel
+
+log = logging.getLogger(__name__)
+
+REDIS_VECTOR_ALIASES_CHANNEL = f"{REDIS_KEY_PREFIX}:vector:aliases:invalidate"
+
+
+class AliasedVectorDB(VectorDBBase):
+    """
+    Vector DB client resolving collection names through aliases.
+
+    An alias points a collection name to another collection, so that a
+    collection can be rebuilt under a new name and swapped in with a single
+    row update, like a knowledge reindex does. Names without an alias are
+    used as they are. Aliases are cached and reloaded every
+    `refresh_interval` seconds. With Redis, a change is published so that
+    the other workers reload them right away, the interval only makes up for
+    missed messages.
+
+    `client` is the underlying client, for operations on actual collections.
+    """
+
+    def __init__(
+        self,
+        client: VectorDBBase,
+        refresh_interval: float,
+        redis_url: str = "",
+        redis_sentinels: Optional[list] = None,
+        redis_cluster: bool = False,
+    ):
+        self.client = client
+        self.refresh_interval = refresh_interval
+        self.redis = (
+            get_redis_connection(
+                redis_url, redis_sentinels or [], redis_cluster, decode_responses=True
+            )
+            if redis_url
+            else None
+        )
+
+        self.aliases: dict[str, str] = {}
+        self.loaded_at: Optional[float] = None
+        self.lock = threading.Lock()
+        self.load_lock = threading.Lock()
+        # Bumped on every change, so that a load racing with a change is not kept
+        self.version = 0
+        self.loaded_version: Optional[int] = None
+
+    def __getattr__(self, name):
+        # Backend specific methods and attributes
+        return getattr(self.client, name)
+
+    def _is_stale(self) -> bool:
+        return (
+            self.loaded_version != self.version
+            or self.loaded_at is None
+            or time.monotonic() - self.loaded_at >= self.refresh_interval
+        )
+
+    def get_aliases(self) -> dict[str, str]:
+        if self._is_stale():
+            with self.load_lock:
+                if self._is_stale():
+                    version = self.version
+                    try:
+                        self.aliases = VectorCollectionAliases.get_aliases()
+                    except Exception as e:
+                        log.warning(f"Failed to load vector collection aliases: {e}")
+                    self.loaded_at = time.monotonic()
+                    self.loaded_version = version
+        return self.aliases
+
+    def resolve(self, collection_name: str) -> str:
+        return self.get_aliases().get(collection_name, collection_name)
+
+    def drop(self) -> None:
+        with self.lock:
+            self.version += 1
+
+    def invalidate(self) -> None:
+        """Reload the aliases on next use, in every worker."""
+        self.drop()
+        if self.redis is not None:
+            try:
+                self.redis.publish(REDIS_VECTOR_ALIASES_CHANNEL, "*")
+            except Exception as e:
+                log.warning(f"Failed to publish the vector alias invalidation: {e}")
+
+    async def listen(self, app: FastAPI) -> None:
+        # Changes missed while disconnected are made up for by a reload
+        await listen_channel(
+            app.state.redis,
+            REDIS_VECTOR_ALIASES_CHANNEL,
+            lambda data: self.drop(),
+            on_resubscribe=self.drop,
+        )
+
+    def set_alias(self, name: str, collection_name: str) -> None:
+        VectorCollectionAliases.set_alias(name, collection_name)
+        self.invalidate()
+
+    def has_collection(self, collection_name: str) -> bool:
+        return self.client.has_collection(self.resolve(collection_name))
+
+    def delete_collection(self, collection_name: str) -> None:
+        target = self.resolve(collection_name)
+        self.client.delete_collection(target)
+
+        if target != collection_name:
+            VectorCollectionAliases.delete_alias(collection_name)
+            self.invalidate()
+
+    # Arguments are passed as they are, backends have their own defaults
+    def insert(self, collection_name: str, *args, **kwargs) -> None:
+        self.client.insert(self.resolve(collection_name), *args, **kwargs)
+
+    def upsert(self, collection_name: str, *args, **kwargs) -> None:
+        self.client.upsert(self.resolve(collection_name), *args, **kwargs)
+
+    def search(self, collection_name: str, *args, **kwargs) -> Optional[SearchResult]:
+        return self.client.search(self.resolve(collection_name), *args, **kwargs)
+
+    def search_many(
+        self, collection_names: list[str], *args, **kwargs
+    ) -> dict[str, Optional[SearchResult]]:
+        targets = {name: self.resolve(name) for name in collection_names}
+        results = self.client.search_many(
+            list(dict.fromkeys(targets.values())), *args, **kwargs
+        )
+        return {name: results.get(target) for name, target in targets.items()}
+
+    def query(self, collection_name: str, *args, **kwargs) -> Optional[GetResult]:
+        return self.client.query(self.resolve(collection_name), *args, **kwargs)
+
+    def get(self, collection_name: str, *args, **kwargs) -> Optional[GetResult]:
+        return self.client.get(self.resolve(collection_name), *args, **kwargs)
+
+    def delete(self, collection_name: str, *args, **kwargs) -> None:
+        self.client.delete(self.resolve(collection_name), *args, **kwargs)
+
+    async def ainsert(self, collection_name: str, *args, **kwargs) -> None:
+        await self.client.ainsert(self.resolve(collection_name), *args, **kwargs)
+
+    async def asearch(
+        self, collection_name: str, *args, **kwargs
+    ) -> Optional[SearchResult]:
+        return await self.client.asearch(self.resolve(collection_name), *args, **kwargs)
+
+    async def asearch_many(
+        self, collection_names: list[str], *args, **kwargs
+    ) -> dict[str, Optional[SearchResult]]:
+        targets = {name: self.resolve(name) for name in collection_names}
+        results = await self.client.asearch_many(
+            list(dict.fromkeys(targets.values())), *args, **kwargs
+        )
+        return {name: results.get(target) for name, target in targets.items()}
+
+    async def aquery(
+        self, collection_name: str, *args, **kwargs
+    ) -> Optional[GetResult]:
+        return await self.client.aquery(self.resolve(collection_name), *args, **kwargs)
+
+    async def aget(self, collection_name: str, *args, **kwargs) -> Optional[GetResult]:
+        return await self.client.aget(self.resolve(collection_name), *args, **kwargs)
+
+    def reset(self) -> None:
+        self.client.reset()
+        VectorCollectionAliases.delete_all_aliases()
+        self.invalidate()
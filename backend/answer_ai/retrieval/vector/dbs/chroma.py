@@ -1,3 +1,4 @@
+import asyncio
 import chromadb
 import logging
 from chromadb import Settings
@@ -61,7 +62,9 @@ class ChromaClient(VectorDBBase):
 
     def has_collection(self, collection_name: str) -> bool:
         # Check if the collection exists based on the collection name.
-        collection_names = self.client.list_collections()
+        collection_names = [
+            collection.name for collection in self.client.list_collections()
+        ]
         return collection_name in collection_names
 
     def delete_collection(self, collection_name: str):
@@ -82,9 +85,9 @@ class ChromaClient(VectorDBBase):
 
                 # chromadb has cosine distance, 2 (worst) -> 0 (best). Re-odering to 0 -> 1
                 # https://docs.trychroma.com/docs/collections/configure cosine equation
-                distances: list = result["distances"][0]
-                distances = [2 - dist for dist in distances]
-                distances = [[dist / 2 for dist in distances]]
+                distances = [
+                    [(2 - dist) / 2 for dist in row] for row in result["distances"]
+                ]
 
                 return SearchResult(
                     **{
@@ -98,6 +101,33 @@ class ChromaClient(VectorDBBase):
         except Exception as e:
             return None
 
+    def search_many(
+        self,
+        collection_names: list[str],
+        vectors: list[list[float | int]],
+        limit: Optional[int] = None,
+    ) -> dict[str, Optional[SearchResult]]:
+        # One query per collection, with all the vectors
+        return {
+            collection_name: self.search(collection_name, vectors, limit)
+            for collection_name in collection_names
+        }
+
+    async def asearch_many(
+        self,
+        collection_names: list[str],
+        vectors: list[list[float | int]],
+        limit: Optional[int] = None,
+    ) -> dict[str, Optional[SearchResult]]:
+        collection_names = list(dict.fromkeys(collection_names))
+        results = await asyncio.gather(
+            *[
+                self.asearch(collection_name, vectors, limit)
+                for collection_name in collection_names
+            ]
+        )
+        return dict(zip(collection_names, results))
+
     def query(
         self, collection_name: str, filter: dict, limit: Optional[int] = None
     ) -> Optional[GetResult]:
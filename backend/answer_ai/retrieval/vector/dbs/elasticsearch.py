@@ -1,7 +1,7 @@
-from elasticsearch import Elasticsearch, BadRequestError
+from elasticsearch import AsyncElasticsearch, Elasticsearch, BadRequestError
 from typing import Optional
 import ssl
-from elasticsearch.helpers import bulk, scan
+from elasticsearch.helpers import async_scan, bulk, scan
 
 from answer_ai.retrieval.vector.utils import process_metadata
 from answer_ai.retrieval.vector.main import (
@@ -32,7 +32,7 @@ class ElasticsearchClient(VectorDBBase):
 
     def __init__(self):
         self.index_prefix = ELASTICSEARCH_INDEX_PREFIX
-        self.client = Elasticsearch(
+        client_kwargs = dict(
             hosts=[ELASTICSEARCH_URL],
             ca_certs=ELASTICSEARCH_CA_CERTS,
             api_key=ELASTICSEARCH_API_KEY,
@@ -44,6 +44,9 @@ class ElasticsearchClient(VectorDBBase):
             ),
             ssl_assert_fingerprint=SSL_ASSERT_FINGERPRINT,
         )
+        self.client = Elasticsearch(**client_kwargs)
+        # Used by the async methods, so that they don't take a thread each
+        self.async_client = AsyncElasticsearch(**client_kwargs)
 
     # Status: works
     def _get_index_name(self, dimension: int) -> str:
@@ -133,15 +136,29 @@ class ElasticsearchClient(VectorDBBase):
         for i in range(0, len(items), batch_size):
             yield items[i : min(i + batch_size, len(items))]
 
+    def _collection_query(self, collection_name: str) -> dict:
+        return {
+            "query": {"bool": {"filter": [{"term": {"collection": collection_name}}]}}
+        }
+
     # Status: works
     def has_collection(self, collection_name) -> bool:
-        query_body = {"query": {"bool": {"filter": []}}}
-        query_body["query"]["bool"]["filter"].append(
-            {"term": {"collection": collection_name}}
-        )
+        try:
+            result = self.client.count(
+                index=f"{self.index_prefix}*",
+                body=self._collection_query(collection_name),
+            )
+
+            return result.body["count"] > 0
+        except Exception as e:
+            return None
 
+    async def _ahas_collection(self, collection_name) -> bool:
         try:
-            result = self.client.count(index=f"{self.index_prefix}*", body=query_body)
+            result = await self.async_client.count(
+                index=f"{self.index_prefix}*",
+                body=self._collection_query(collection_name),
+            )
 
             return result.body["count"] > 0
         except Exception as e:
@@ -151,11 +168,10 @@ class ElasticsearchClient(VectorDBBase):
         query = {"query": {"term": {"collection": collection_name}}}
         self.client.delete_by_query(index=f"{self.index_prefix}*", body=query)
 
-    # Status: works
-    def search(
-        self, collection_name: str, vectors: list[list[float]], limit: int
-    ) -> Optional[SearchResult]:
-        query = {
+    def _search_query(
+        self, collection_name: str, vectors: list[list[float]], limit: Optional[int]
+    ) -> dict:
+        return {
             "size": limit,
             "_source": ["text", "metadata"],
             "query": {
@@ -173,19 +189,31 @@ class ElasticsearchClient(VectorDBBase):
             },
         }
 
+    # Status: works
+    def search(
+        self, collection_name: str, vectors: list[list[float]], limit: int
+    ) -> Optional[SearchResult]:
         result = self.client.search(
-            index=self._get_index_name(len(vectors[0])), body=query
+            index=self._get_index_name(len(vectors[0])),
+            body=self._search_query(collection_name, vectors, limit),
         )
 
         return self._result_to_search_result(result)
 
-    # Status: only tested halfwat
-    def query(
-        self, collection_name: str, filter: dict, limit: Optional[int] = None
-    ) -> Optional[GetResult]:
-        if not self.has_collection(collection_name):
-            return None
+    async def asearch(
+        self,
+        collection_name: str,
+        vectors: list[list[float]],
+        limit: Optional[int] = None,
+    ) -> Optional[SearchResult]:
+        result = await self.async_client.search(
+            index=self._get_index_name(len(vectors[0])),
+            body=self._search_query(collection_name, vectors, limit),
+        )
+
+        return self._result_to_search_result(result)
 
+    def _filter_query(self, collection_name: str, filter: dict) -> dict:
         query_body = {
             "query": {"bool": {"filter": []}},
             "_source": ["text", "metadata"],
@@ -196,13 +224,38 @@ class ElasticsearchClient(VectorDBBase):
         query_body["query"]["bool"]["filter"].append(
             {"term": {"collection": collection_name}}
         )
-        size = limit if limit else 10
+        return query_body
+
+    # Status: only tested halfwat
+    def query(
+        self, collection_name: str, filter: dict, limit: Optional[int] = None
+    ) -> Optional[GetResult]:
+        if not self.has_collection(collection_name):
+            return None
 
         try:
             result = self.client.search(
                 index=f"{self.index_prefix}*",
-                body=query_body,
-                size=size,
+                body=self._filter_query(collection_name, filter),
+                size=limit if limit else 10,
+            )
+
+            return self._result_to_get_result(result)
+
+        except Exception as e:
+            return None
+
+    async def aquery(
+        self, collection_name: str, filter: dict, limit: Optional[int] = None
+    ) -> Optional[GetResult]:
+        if not await self._ahas_collection(collection_name):
+            return None
+
+        try:
+            result = await self.async_client.search(
+                index=f"{self.index_prefix}*",
+                body=self._filter_query(collection_name, filter),
+                size=limit if limit else 10,
             )
 
             return self._result_to_get_result(result)
@@ -224,13 +277,27 @@ class ElasticsearchClient(VectorDBBase):
     def get(self, collection_name: str) -> Optional[GetResult]:
         # Get all the items in the collection.
         query = {
-            "query": {"bool": {"filter": [{"term": {"collection": collection_name}}]}},
+            **self._collection_query(collection_name),
             "_source": ["text", "metadata"],
         }
         results = list(scan(self.client, index=f"{self.index_prefix}*", query=query))
 
         return self._scan_result_to_get_result(results)
 
+    async def aget(self, collection_name: str) -> Optional[GetResult]:
+        query = {
+            **self._collection_query(collection_name),
+            "_source": ["text", "metadata"],
+        }
+        results = [
+            hit
+            async for hit in async_scan(
+                self.async_client, index=f"{self.index_prefix}*", query=query
+            )
+        ]
+
+        return self._scan_result_to_get_result(results)
+
     # Status: works
     def insert(self, collection_name: str, items: list[VectorItem]):
         if not self._has_index(dimension=len(items[0]["vector"])):
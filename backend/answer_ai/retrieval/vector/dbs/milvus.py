@@ -1,13 +1,16 @@
+from pymilvus import AsyncMilvusClient as AsyncClient
 from pymilvus import MilvusClient as Client
 from pymilvus import FieldSchema, DataType
 from pymilvus import connections, Collection
 
+import asyncio
 import json
 import logging
 from typing import Optional
 
 from answer_ai.retrieval.vector.utils import process_metadata
 from answer_ai.retrieval.vector.main import (
+    run_in_executor,
     VectorDBBase,
     VectorItem,
     SearchResult,
@@ -37,6 +40,26 @@ class MilvusClient(VectorDBBase):
         else:
             self.client = Client(uri=MILVUS_URI, db_name=MILVUS_DB, token=MILVUS_TOKEN)
 
+        # Created on first use by the async methods, as its connection binds
+        # to the running event loop
+        self.async_client: Optional[AsyncClient] = None
+        self.async_client_failed = False
+
+    def _get_async_client(self) -> Optional[AsyncClient]:
+        if self.async_client is None and not self.async_client_failed:
+            try:
+                if MILVUS_TOKEN is None:
+                    self.async_client = AsyncClient(uri=MILVUS_URI, db_name=MILVUS_DB)
+                else:
+                    self.async_client = AsyncClient(
+                        uri=MILVUS_URI, db_name=MILVUS_DB, token=MILVUS_TOKEN
+                    )
+            except Exception as e:
+                # Searches then use the shared thread pool
+                log.warning(f"Failed to create the async Milvus client: {e}")
+                self.async_client_failed = True
+        return self.async_client
+
     def _result_to_get_result(self, result) -> GetResult:
         ids = []
         documents = []
@@ -195,6 +218,51 @@ class MilvusClient(VectorDBBase):
         )
         return self._result_to_search_result(result)
 
+    async def asearch(
+        self,
+        collection_name: str,
+        vectors: list[list[float | int]],
+        limit: Optional[int] = None,
+    ) -> Optional[SearchResult]:
+        client = self._get_async_client()
+        if client is None:
+            return await run_in_executor(self.search, collection_name, vectors, limit)
+
+        collection_name = collection_name.replace("-", "_")
+        result = await client.search(
+            collection_name=f"{self.collection_prefix}_{collection_name}",
+            data=vectors,
+            limit=limit,
+            output_fields=["data", "metadata"],
+        )
+        return self._result_to_search_result(result)
+
+    async def asearch_many(
+        self,
+        collection_names: list[str],
+        vectors: list[list[float | int]],
+        limit: Optional[int] = None,
+    ) -> dict[str, Optional[SearchResult]]:
+        async def search_collection(collection_name: str) -> Optional[SearchResult]:
+            try:
+                return await self.asearch(collection_name, vectors, limit)
+            except Exception as e:
+                log.exception(f"Error searching collection {collection_name}: {e}")
+                return None
+
+        # One search per collection, with all the vectors
+        collection_names = list(dict.fromkeys(collection_names))
+        results = await asyncio.gather(
+            *[
+                search_collection(collection_name)
+                for collection_name in collection_names
+            ]
+        )
+        return dict(zip(collection_names, results))
+
+    # aquery and aget run in the shared thread pool: they page through the
+    # results with a query iterator, which the async client doesn't have
+
     def query(self, collection_name: str, filter: dict, limit: int = -1):
         connections.connect(uri=MILVUS_URI, token=MILVUS_TOKEN, db_name=MILVUS_DB)
 
@@ -1,4 +1,4 @@
-from opensearchpy import OpenSearch
+from opensearchpy import AsyncOpenSearch, OpenSearch
 from opensearchpy.helpers import bulk
 from typing import Optional
 
@@ -21,12 +21,15 @@ from answer_ai.config import (
 class OpenSearchClient(VectorDBBase):
     def __init__(self):
         self.index_prefix = "answerai"
-        self.client = OpenSearch(
+        client_kwargs = dict(
             hosts=[OPENSEARCH_URI],
             use_ssl=OPENSEARCH_SSL,
             verify_certs=OPENSEARCH_CERT_VERIFY,
             http_auth=(OPENSEARCH_USERNAME, OPENSEARCH_PASSWORD),
         )
+        self.client = OpenSearch(**client_kwargs)
+        # Used by the async methods, so that they don't take a thread each
+        self.async_client = AsyncOpenSearch(**client_kwargs)
 
     def _get_index_name(self, collection_name: str) -> str:
         return f"{self.index_prefix}_{collection_name}"
@@ -112,6 +115,26 @@ class OpenSearchClient(VectorDBBase):
         # We are simply adapting to the norms of the other DBs.
         self.client.indices.delete(index=self._get_index_name(collection_name))
 
+    def _search_query(
+        self, vectors: list[list[float | int]], limit: Optional[int]
+    ) -> dict:
+        return {
+            "size": limit,
+            "_source": ["text", "metadata"],
+            "query": {
+                "script_score": {
+                    "query": {"match_all": {}},
+                    "script": {
+                        "source": "(cosineSimilarity(params.query_value, doc[params.field]) + 1.0) / 2.0",
+                        "params": {
+                            "field": "vector",
+                            "query_value": vectors[0],
+                        },  # Assuming single query vector
+                    },
+                }
+            },
+        }
+
     def search(
         self, collection_name: str, vectors: list[list[float | int]], limit: int
     ) -> Optional[SearchResult]:
@@ -119,25 +142,9 @@ class OpenSearchClient(VectorDBBase):
             if not self.has_collection(collection_name):
                 return None
 
-            query = {
-                "size": limit,
-                "_source": ["text", "metadata"],
-                "query": {
-                    "script_score": {
-                        "query": {"match_all": {}},
-                        "script": {
-                            "source": "(cosineSimilarity(params.query_value, doc[params.field]) + 1.0) / 2.0",
-                            "params": {
-                                "field": "vector",
-                                "query_value": vectors[0],
-                            },  # Assuming single query vector
-                        },
-                    }
-                },
-            }
-
             result = self.client.search(
-                index=self._get_index_name(collection_name), body=query
+                index=self._get_index_name(collection_name),
+                body=self._search_query(vectors, limit),
             )
 
             return self._result_to_search_result(result)
@@ -145,12 +152,27 @@ class OpenSearchClient(VectorDBBase):
         except Exception as e:
             return None
 
-    def query(
-        self, collection_name: str, filter: dict, limit: Optional[int] = None
-    ) -> Optional[GetResult]:
-        if not self.has_collection(collection_name):
+    async def asearch(
+        self,
+        collection_name: str,
+        vectors: list[list[float | int]],
+        limit: Optional[int] = None,
+    ) -> Optional[SearchResult]:
+        try:
+            index = self._get_index_name(collection_name)
+            if not await self.async_client.indices.exists(index=index):
+                return None
+
+            result = await self.async_client.search(
+                index=index, body=self._search_query(vectors, limit)
+            )
+
+            return self._result_to_search_result(result)
+
+        except Exception as e:
             return None
 
+    def _filter_query(self, filter: dict) -> dict:
         query_body = {
             "query": {"bool": {"filter": []}},
             "_source": ["text", "metadata"],
@@ -160,14 +182,38 @@ class OpenSearchClient(VectorDBBase):
             query_body["query"]["bool"]["filter"].append(
                 {"term": {"metadata." + str(field) + ".keyword": value}}
             )
+        return query_body
 
-        size = limit if limit else 10000
+    def query(
+        self, collection_name: str, filter: dict, limit: Optional[int] = None
+    ) -> Optional[GetResult]:
+        if not self.has_collection(collection_name):
+            return None
 
         try:
             result = self.client.search(
                 index=self._get_index_name(collection_name),
-                body=query_body,
-                size=size,
+                body=self._filter_query(filter),
+                size=limit if limit else 10000,
+            )
+
+            return self._result_to_get_result(result)
+
+        except Exception as e:
+            return None
+
+    async def aquery(
+        self, collection_name: str, filter: dict, limit: Optional[int] = None
+    ) -> Optional[GetResult]:
+        index = self._get_index_name(collection_name)
+        if not await self.async_client.indices.exists(index=index):
+            return None
+
+        try:
+            result = await self.async_client.search(
+                index=index,
+                body=self._filter_query(filter),
+                size=limit if limit else 10000,
             )
 
             return self._result_to_get_result(result)
@@ -187,6 +233,14 @@ class OpenSearchClient(VectorDBBase):
         )
         return self._result_to_get_result(result)
 
+    async def aget(self, collection_name: str) -> Optional[GetResult]:
+        query = {"query": {"match_all": {}}, "_source": ["text", "metadata"]}
+
+        result = await self.async_client.search(
+            index=self._get_index_name(collection_name), body=query
+        )
+        return self._result_to_get_result(result)
+
     def insert(self, collection_name: str, items: list[VectorItem]):
         self._create_index_if_not_exists(
             collection_name=collection_name, dimension=len(items[0]["vector"])
@@ -1,8 +1,10 @@
 from typing import Optional, List, Dict, Any, Tuple
+import io
 import logging
 import json
 from sqlalchemy import (
     func,
+    insert,
     literal,
     cast,
     column,
@@ -25,10 +27,12 @@ from sqlalchemy.dialects.postgresql import JSONB, array
 from pgvector.sqlalchemy import Vector, HALFVEC
 from sqlalchemy.ext.mutable import MutableDict
 from sqlalchemy.exc import NoSuchTableError
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 
 
 from answer_ai.retrieval.vector.utils import process_metadata
 from answer_ai.retrieval.vector.main import (
+    run_in_executor,
     VectorDBBase,
     VectorItem,
     SearchResult,
@@ -49,7 +53,9 @@ from answer_ai.config import (
     PGVECTOR_HNSW_EF_CONSTRUCTION,
     PGVECTOR_IVFFLAT_LISTS,
     PGVECTOR_USE_HALFVEC,
+    PGVECTOR_INSERT_BATCH_SIZE,
 )
+from answer_ai.env import DATABASE_ENABLE_ASYNC
 
 
 VECTOR_LENGTH = PGVECTOR_INITIALIZE_MAX_VECTOR_LENGTH
@@ -62,6 +68,23 @@ Base = declarative_base()
 log = logging.getLogger(__name__)
 
 
+# Columns of the rows copied by inserts and upserts, in order
+CHUNK_COLUMNS = ("id", "vector", "collection_name", "text", "vmetadata")
+STAGING_TABLE = "document_chunk_staging"
+
+
+def copy_text_value(value: Optional[str]) -> str:
+    """Escape a value for COPY in text format."""
+    if value is None:
+        return "\\N"
+    return (
+        value.replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
 def pgcrypto_encrypt(val, key):
     return func.pgp_sym_encrypt(val, literal(key))
 
@@ -117,6 +140,10 @@ class PgvectorClient(VectorDBBase):
             )
             self.session = scoped_session(SessionLocal)
 
+        # Searches from the async retrieval paths go through asyncpg when it
+        # is available, everything else uses the sync session
+        self.async_engine = self._create_async_engine()
+
         try:
             # Ensure the pgvector extension is available
             # Use a conditional check to avoid permission issues on Azure PostgreSQL
@@ -180,6 +207,35 @@ class PgvectorClient(VectorDBBase):
             log.exception(f"Error during initialization: {e}")
             raise
 
+    @staticmethod
+    def _create_async_engine() -> Optional[AsyncEngine]:
+        if not DATABASE_ENABLE_ASYNC:
+            return None
+
+        if not PGVECTOR_DB_URL:
+            from answer_ai.internal.db import async_engine
+
+            return async_engine
+
+        from answer_ai.internal.db import get_async_database_url
+
+        url = get_async_database_url(PGVECTOR_DB_URL)
+        if url is None:
+            return None
+
+        if isinstance(PGVECTOR_POOL_SIZE, int):
+            if PGVECTOR_POOL_SIZE > 0:
+                return create_async_engine(
+                    url,
+                    pool_size=PGVECTOR_POOL_SIZE,
+                    max_overflow=PGVECTOR_POOL_MAX_OVERFLOW,
+                    pool_timeout=PGVECTOR_POOL_TIMEOUT,
+                    pool_recycle=PGVECTOR_POOL_RECYCLE,
+                    pool_pre_ping=True,
+                )
+            return create_async_engine(url, pool_pre_ping=True, poolclass=NullPool)
+        return create_async_engine(url, pool_pre_ping=True)
+
     @staticmethod
     def _extract_index_method(index_def: Optional[str]) -> Optional[str]:
         if not index_def:
@@ -301,55 +357,155 @@ class PgvectorClient(VectorDBBase):
             vector = vector[:VECTOR_LENGTH]
         return vector
 
+    def _chunk_rows(self, collection_name: str, items: List[VectorItem]) -> list:
+        rows = []
+        for item in items:
+            vector = self.adjust_vector_length(item["vector"])
+            if PGVECTOR_PGCRYPTO:
+                # Ensure metadata is converted to its JSON text representation
+                metadata = json.dumps(item["metadata"])
+            else:
+                metadata = json.dumps(process_metadata(item["metadata"]))
+            rows.append(
+                (
+                    item["id"],
+                    "[" + ",".join(str(value) for value in vector) + "]",
+                    collection_name,
+                    item["text"],
+                    metadata,
+                )
+            )
+        return rows
+
+    def _copy_rows(self, table: str, rows: list) -> bool:
+        """
+        Copy rows into a table with COPY FROM STDIN in text format. Returns
+        False if the driver can't, for the caller to insert them instead.
+        """
+        buffer = io.StringIO()
+        for row in rows:
+            buffer.write("\t".join(copy_text_value(value) for value in row))
+            buffer.write("\n")
+        sql = f"COPY {table} ({', '.join(CHUNK_COLUMNS)}) FROM STDIN"
+
+        dbapi_connection = self.session.connection().connection.dbapi_connection
+        cursor = dbapi_connection.cursor()
+        try:
+            if hasattr(cursor, "copy_expert"):
+                # psycopg2
+                buffer.seek(0)
+                cursor.copy_expert(sql, buffer)
+            elif hasattr(cursor, "copy"):
+                # psycopg 3
+                with cursor.copy(sql) as copy:
+                    copy.write(buffer.getvalue())
+            else:
+                return False
+        finally:
+            cursor.close()
+        return True
+
+    def _stage_rows(self, rows: list) -> None:
+        self.session.execute(
+            text(
+                f"""
+                CREATE TEMPORARY TABLE IF NOT EXISTS {STAGING_TABLE} (
+                    id TEXT, vector TEXT, collection_name TEXT,
+                    text TEXT, vmetadata TEXT
+                ) ON COMMIT DELETE ROWS
+            """
+            )
+        )
+        if not self._copy_rows(STAGING_TABLE, rows):
+            self.session.execute(
+                text(
+                    f"""
+                    INSERT INTO {STAGING_TABLE} ({', '.join(CHUNK_COLUMNS)})
+                    VALUES (:id, :vector, :collection_name, :text, :vmetadata)
+                """
+                ),
+                [dict(zip(CHUNK_COLUMNS, row)) for row in rows],
+            )
+
+    def _merge_staged_rows(self, upsert: bool) -> None:
+        vector_type = "halfvec" if USE_HALFVEC else "vector"
+        if PGVECTOR_PGCRYPTO:
+            text_expr = "pgp_sym_encrypt(text, :key)"
+            vmetadata_expr = "pgp_sym_encrypt(vmetadata, :key)"
+        else:
+            text_expr = "text"
+            vmetadata_expr = "CAST(vmetadata AS JSONB)"
+
+        # A plain insert of a duplicate id fails, as it does when copied
+        # straight into the table
+        on_conflict = ""
+        if upsert:
+            on_conflict = """
+                ON CONFLICT (id) DO UPDATE SET
+                  vector = EXCLUDED.vector,
+                  collection_name = EXCLUDED.collection_name,
+                  text = EXCLUDED.text,
+                  vmetadata = EXCLUDED.vmetadata
+            """
+
+        self.session.execute(
+            text(
+                f"""
+                INSERT INTO document_chunk ({', '.join(CHUNK_COLUMNS)})
+                SELECT id, CAST(vector AS {vector_type}), collection_name,
+                       {text_expr}, {vmetadata_expr}
+                FROM {STAGING_TABLE}
+                {on_conflict}
+            """
+            ),
+            {"key": PGVECTOR_PGCRYPTO_KEY} if PGVECTOR_PGCRYPTO else {},
+        )
+
+    def _write_items(
+        self, collection_name: str, items: List[VectorItem], upsert: bool
+    ) -> None:
+        """
+        Write the items in batches of PGVECTOR_INSERT_BATCH_SIZE rows, each
+        copied in one round-trip and committed on its own.
+
+        Plain inserts are copied into the table directly. Upserts and
+        encrypted rows are copied into a temporary table first, then merged
+        (and encrypted) by a single INSERT ... SELECT.
+        """
+        if upsert:
+            # A row can only be updated once per statement, the last wins
+            items = list({item["id"]: item for item in items}.values())
+
+        for start in range(0, len(items), PGVECTOR_INSERT_BATCH_SIZE):
+            rows = self._chunk_rows(
+                collection_name, items[start : start + PGVECTOR_INSERT_BATCH_SIZE]
+            )
+
+            if upsert or PGVECTOR_PGCRYPTO:
+                self._stage_rows(rows)
+                self._merge_staged_rows(upsert)
+            elif not self._copy_rows("document_chunk", rows):
+                self.session.execute(
+                    insert(DocumentChunk),
+                    [
+                        {
+                            **dict(zip(CHUNK_COLUMNS, row)),
+                            "vector": json.loads(row[1]),
+                            "vmetadata": json.loads(row[4]),
+                        }
+                        for row in rows
+                    ],
+                )
+            self.session.commit()
+
     def insert(self, collection_name: str, items: List[VectorItem]) -> None:
         try:
+            self._write_items(collection_name, items, upsert=False)
             if PGVECTOR_PGCRYPTO:
-                for item in items:
-                    vector = self.adjust_vector_length(item["vector"])
-                    # Use raw SQL for BYTEA/pgcrypto
-                    # Ensure metadata is converted to its JSON text representation
-                    json_metadata = json.dumps(item["metadata"])
-                    self.session.execute(
-                        text(
-                            """
-                            INSERT INTO document_chunk
-                            (id, vector, collection_name, text, vmetadata)
-                            VALUES (
-                                :id, :vector, :collection_name,
-                                pgp_sym_encrypt(:text, :key),
-                                pgp_sym_encrypt(:metadata_text, :key)
-                            )
-                            ON CONFLICT (id) DO NOTHING
-                        """
-                        ),
-                        {
-                            "id": item["id"],
-                            "vector": vector,
-                            "collection_name": collection_name,
-                            "text": item["text"],
-                            "metadata_text": json_metadata,
-                            "key": PGVECTOR_PGCRYPTO_KEY,
-                        },
-                    )
-                self.session.commit()
                 log.info(f"Encrypted & inserted {len(items)} into '{collection_name}'")
-
             else:
-                new_items = []
-                for item in items:
-                    vector = self.adjust_vector_length(item["vector"])
-                    new_chunk = DocumentChunk(
-                        id=item["id"],
-                        vector=vector,
-                        collection_name=collection_name,
-                        text=item["text"],
-                        vmetadata=process_metadata(item["metadata"]),
-                    )
-                    new_items.append(new_chunk)
-                self.session.bulk_save_objects(new_items)
-                self.session.commit()
                 log.info(
-                    f"Inserted {len(new_items)} items into collection '{collection_name}'."
+                    f"Inserted {len(items)} items into collection '{collection_name}'."
                 )
         except Exception as e:
             self.session.rollback()
@@ -358,63 +514,10 @@ class PgvectorClient(VectorDBBase):
 
     def upsert(self, collection_name: str, items: List[VectorItem]) -> None:
         try:
+            self._write_items(collection_name, items, upsert=True)
             if PGVECTOR_PGCRYPTO:
-                for item in items:
-                    vector = self.adjust_vector_length(item["vector"])
-                    json_metadata = json.dumps(item["metadata"])
-                    self.session.execute(
-                        text(
-                            """
-                            INSERT INTO document_chunk
-                            (id, vector, collection_name, text, vmetadata)
-                            VALUES (
-                                :id, :vector, :collection_name,
-                                pgp_sym_encrypt(:text, :key),
-                                pgp_sym_encrypt(:metadata_text, :key)
-                            )
-                            ON CONFLICT (id) DO UPDATE SET
-                              vector = EXCLUDED.vector,
-                              collection_name = EXCLUDED.collection_name,
-                              text = EXCLUDED.text,
-                              vmetadata = EXCLUDED.vmetadata
-                        """
-                        ),
-                        {
-                            "id": item["id"],
-                            "vector": vector,
-                            "collection_name": collection_name,
-                            "text": item["text"],
-                            "metadata_text": json_metadata,
-                            "key": PGVECTOR_PGCRYPTO_KEY,
-                        },
-                    )
-                self.session.commit()
                 log.info(f"Encrypted & upserted {len(items)} into '{collection_name}'")
             else:
-                for item in items:
-                    vector = self.adjust_vector_length(item["vector"])
-                    existing = (
-                        self.session.query(DocumentChunk)
-                        .filter(DocumentChunk.id == item["id"])
-                        .first()
-                    )
-                    if existing:
-                        existing.vector = vector
-                        existing.text = item["text"]
-                        existing.vmetadata = process_metadata(item["metadata"])
-                        existing.collection_name = (
-                            collection_name  # Update collection_name if necessary
-                        )
-                    else:
-                        new_chunk = DocumentChunk(
-                            id=item["id"],
-                            vector=vector,
-                            collection_name=collection_name,
-                            text=item["text"],
-                            vmetadata=process_metadata(item["metadata"]),
-                        )
-                        self.session.add(new_chunk)
-                self.session.commit()
                 log.info(
                     f"Upserted {len(items)} items into collection '{collection_name}'."
                 )
@@ -423,6 +526,135 @@ class PgvectorClient(VectorDBBase):
             log.exception(f"Error during upsert: {e}")
             raise
 
+    def _result_fields(self) -> list:
+        if PGVECTOR_PGCRYPTO:
+            return [
+                DocumentChunk.id,
+                pgcrypto_decrypt(DocumentChunk.text, PGVECTOR_PGCRYPTO_KEY, Text).label(
+                    "text"
+                ),
+                pgcrypto_decrypt(
+                    DocumentChunk.vmetadata, PGVECTOR_PGCRYPTO_KEY, JSONB
+                ).label("vmetadata"),
+            ]
+        return [DocumentChunk.id, DocumentChunk.text, DocumentChunk.vmetadata]
+
+    def _search_statement(
+        self,
+        collection_names: List[str],
+        vectors: List[List[float]],
+        limit: Optional[int],
+    ):
+        def vector_expr(vector):
+            return cast(array(vector), VECTOR_TYPE_FACTORY(VECTOR_LENGTH))
+
+        # Create the values for query vectors, one per collection and vector.
+        # The qid of vector i in the c-th collection is c * len(vectors) + i
+        qid_col = column("qid", Integer)
+        q_collection_col = column("q_collection_name", Text)
+        q_vector_col = column("q_vector", VECTOR_TYPE_FACTORY(VECTOR_LENGTH))
+        vector_exprs = [vector_expr(vector) for vector in vectors]
+        query_vectors = (
+            values(qid_col, q_collection_col, q_vector_col)
+            .data(
+                [
+                    (c * len(vectors) + idx, collection_name, vector)
+                    for c, collection_name in enumerate(collection_names)
+                    for idx, vector in enumerate(vector_exprs)
+                ]
+            )
+            .alias("query_vectors")
+        )
+
+        result_fields = self._result_fields()
+        result_fields.append(
+            (DocumentChunk.vector.cosine_distance(query_vectors.c.q_vector)).label(
+                "distance"
+            )
+        )
+
+        # Build the lateral subquery for each query vector
+        subq = (
+            select(*result_fields)
+            .where(DocumentChunk.collection_name == query_vectors.c.q_collection_name)
+            .order_by((DocumentChunk.vector.cosine_distance(query_vectors.c.q_vector)))
+        )
+        if limit is not None:
+            subq = subq.limit(limit)
+        subq = subq.lateral("result")
+
+        # Build the main query by joining query_vectors and the lateral subquery
+        return (
+            select(
+                query_vectors.c.qid,
+                subq.c.id,
+                subq.c.text,
+                subq.c.vmetadata,
+                subq.c.distance,
+            )
+            .select_from(query_vectors)
+            .join(subq, true())
+            .order_by(query_vectors.c.qid, subq.c.distance)
+        )
+
+    def _search_results(
+        self, results, collection_names: List[str], num_queries: int
+    ) -> Dict[str, SearchResult]:
+        ids = [[] for _ in range(len(collection_names) * num_queries)]
+        distances = [[] for _ in range(len(collection_names) * num_queries)]
+        documents = [[] for _ in range(len(collection_names) * num_queries)]
+        metadatas = [[] for _ in range(len(collection_names) * num_queries)]
+
+        for row in results:
+            qid = int(row.qid)
+            ids[qid].append(row.id)
+            # normalize and re-orders pgvec distance from [2, 0] to [0, 1] score range
+            # https://github.com/pgvector/pgvector?tab=readme-ov-file#querying
+            distances[qid].append((2.0 - row.distance) / 2.0)
+            documents[qid].append(row.text)
+            metadatas[qid].append(row.vmetadata)
+
+        search_results = {}
+        for c, collection_name in enumerate(collection_names):
+            rows = slice(c * num_queries, (c + 1) * num_queries)
+            search_results[collection_name] = SearchResult(
+                ids=ids[rows],
+                distances=distances[rows],
+                documents=documents[rows],
+                metadatas=metadatas[rows],
+            )
+        return search_results
+
+    def _query_statement(
+        self,
+        collection_name: str,
+        filter: Optional[Dict[str, Any]] = None,
+        limit: Optional[int] = None,
+    ):
+        if PGVECTOR_PGCRYPTO:
+            # decrypt then check key: JSON filter after decryption
+            vmetadata = pgcrypto_decrypt(
+                DocumentChunk.vmetadata, PGVECTOR_PGCRYPTO_KEY, JSONB
+            )
+        else:
+            vmetadata = DocumentChunk.vmetadata
+
+        where_clauses = [DocumentChunk.collection_name == collection_name]
+        for key, value in (filter or {}).items():
+            where_clauses.append(vmetadata[key].astext == str(value))
+
+        stmt = select(*self._result_fields()).where(*where_clauses)
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        return stmt
+
+    def _get_result(self, results) -> GetResult:
+        return GetResult(
+            ids=[[row.id for row in results]],
+            documents=[[row.text for row in results]],
+            metadatas=[[row.vmetadata for row in results]],
+        )
+
     def search(
         self,
         collection_name: str,
@@ -435,162 +667,129 @@ class PgvectorClient(VectorDBBase):
 
             # Adjust query vectors to VECTOR_LENGTH
             vectors = [self.adjust_vector_length(vector) for vector in vectors]
-            num_queries = len(vectors)
-
-            def vector_expr(vector):
-                return cast(array(vector), VECTOR_TYPE_FACTORY(VECTOR_LENGTH))
-
-            # Create the values for query vectors
-            qid_col = column("qid", Integer)
-            q_vector_col = column("q_vector", VECTOR_TYPE_FACTORY(VECTOR_LENGTH))
-            query_vectors = (
-                values(qid_col, q_vector_col)
-                .data(
-                    [(idx, vector_expr(vector)) for idx, vector in enumerate(vectors)]
-                )
-                .alias("query_vectors")
-            )
 
-            result_fields = [
-                DocumentChunk.id,
+            stmt = self._search_statement([collection_name], vectors, limit)
+            results = self.session.execute(stmt).all()
+
+            self.session.rollback()  # read-only transaction
+            return self._search_results(results, [collection_name], len(vectors))[
+                collection_name
             ]
-            if PGVECTOR_PGCRYPTO:
-                result_fields.append(
-                    pgcrypto_decrypt(
-                        DocumentChunk.text, PGVECTOR_PGCRYPTO_KEY, Text
-                    ).label("text")
-                )
-                result_fields.append(
-                    pgcrypto_decrypt(
-                        DocumentChunk.vmetadata, PGVECTOR_PGCRYPTO_KEY, JSONB
-                    ).label("vmetadata")
-                )
-            else:
-                result_fields.append(DocumentChunk.text)
-                result_fields.append(DocumentChunk.vmetadata)
-            result_fields.append(
-                (DocumentChunk.vector.cosine_distance(query_vectors.c.q_vector)).label(
-                    "distance"
-                )
-            )
+        except Exception as e:
+            self.session.rollback()
+            log.exception(f"Error during search: {e}")
+            return None
 
-            # Build the lateral subquery for each query vector
-            subq = (
-                select(*result_fields)
-                .where(DocumentChunk.collection_name == collection_name)
-                .order_by(
-                    (DocumentChunk.vector.cosine_distance(query_vectors.c.q_vector))
-                )
-            )
-            if limit is not None:
-                subq = subq.limit(limit)
-            subq = subq.lateral("result")
-
-            # Build the main query by joining query_vectors and the lateral subquery
-            stmt = (
-                select(
-                    query_vectors.c.qid,
-                    subq.c.id,
-                    subq.c.text,
-                    subq.c.vmetadata,
-                    subq.c.distance,
-                )
-                .select_from(query_vectors)
-                .join(subq, true())
-                .order_by(query_vectors.c.qid, subq.c.distance)
-            )
+    async def asearch(
+        self,
+        collection_name: str,
+        vectors: List[List[float]],
+        limit: Optional[int] = None,
+    ) -> Optional[SearchResult]:
+        if self.async_engine is None:
+            return await run_in_executor(self.search, collection_name, vectors, limit)
 
-            result_proxy = self.session.execute(stmt)
-            results = result_proxy.all()
+        try:
+            if not vectors:
+                return None
 
-            ids = [[] for _ in range(num_queries)]
-            distances = [[] for _ in range(num_queries)]
-            documents = [[] for _ in range(num_queries)]
-            metadatas = [[] for _ in range(num_queries)]
+            vectors = [self.adjust_vector_length(vector) for vector in vectors]
 
-            if not results:
-                return SearchResult(
-                    ids=ids,
-                    distances=distances,
-                    documents=documents,
-                    metadatas=metadatas,
-                )
+            stmt = self._search_statement([collection_name], vectors, limit)
+            async with self.async_engine.connect() as connection:
+                results = (await connection.execute(stmt)).all()
 
-            for row in results:
-                qid = int(row.qid)
-                ids[qid].append(row.id)
-                # normalize and re-orders pgvec distance from [2, 0] to [0, 1] score range
-                # https://github.com/pgvector/pgvector?tab=readme-ov-file#querying
-                distances[qid].append((2.0 - row.distance) / 2.0)
-                documents[qid].append(row.text)
-                metadatas[qid].append(row.vmetadata)
+            return self._search_results(results, [collection_name], len(vectors))[
+                collection_name
+            ]
+        except Exception as e:
+            log.exception(f"Error during search: {e}")
+            return None
+
+    def search_many(
+        self,
+        collection_names: List[str],
+        vectors: List[List[float]],
+        limit: Optional[int] = None,
+    ) -> Dict[str, Optional[SearchResult]]:
+        # A single statement for all the collections and vectors
+        try:
+            if not collection_names or not vectors:
+                return {collection_name: None for collection_name in collection_names}
+
+            collection_names = list(dict.fromkeys(collection_names))
+            vectors = [self.adjust_vector_length(vector) for vector in vectors]
+
+            stmt = self._search_statement(collection_names, vectors, limit)
+            results = self.session.execute(stmt).all()
 
             self.session.rollback()  # read-only transaction
-            return SearchResult(
-                ids=ids, distances=distances, documents=documents, metadatas=metadatas
-            )
+            return self._search_results(results, collection_names, len(vectors))
         except Exception as e:
             self.session.rollback()
             log.exception(f"Error during search: {e}")
-            return None
+            return {collection_name: None for collection_name in collection_names}
+
+    async def asearch_many(
+        self,
+        collection_names: List[str],
+        vectors: List[List[float]],
+        limit: Optional[int] = None,
+    ) -> Dict[str, Optional[SearchResult]]:
+        if self.async_engine is None:
+            return await run_in_executor(
+                self.search_many, collection_names, vectors, limit
+            )
+
+        try:
+            if not collection_names or not vectors:
+                return {collection_name: None for collection_name in collection_names}
+
+            collection_names = list(dict.fromkeys(collection_names))
+            vectors = [self.adjust_vector_length(vector) for vector in vectors]
+
+            stmt = self._search_statement(collection_names, vectors, limit)
+            async with self.async_engine.connect() as connection:
+                results = (await connection.execute(stmt)).all()
+
+            return self._search_results(results, collection_names, len(vectors))
+        except Exception as e:
+            log.exception(f"Error during search: {e}")
+            return {collection_name: None for collection_name in collection_names}
 
     def query(
         self, collection_name: str, filter: Dict[str, Any], limit: Optional[int] = None
     ) -> Optional[GetResult]:
         try:
-            if PGVECTOR_PGCRYPTO:
-                # Build where clause for vmetadata filter
-                where_clauses = [DocumentChunk.collection_name == collection_name]
-                for key, value in filter.items():
-                    # decrypt then check key: JSON filter after decryption
-                    where_clauses.append(
-                        pgcrypto_decrypt(
-                            DocumentChunk.vmetadata, PGVECTOR_PGCRYPTO_KEY, JSONB
-                        )[key].astext
-                        == str(value)
-                    )
-                stmt = select(
-                    DocumentChunk.id,
-                    pgcrypto_decrypt(
-                        DocumentChunk.text, PGVECTOR_PGCRYPTO_KEY, Text
-                    ).label("text"),
-                    pgcrypto_decrypt(
-                        DocumentChunk.vmetadata, PGVECTOR_PGCRYPTO_KEY, JSONB
-                    ).label("vmetadata"),
-                ).where(*where_clauses)
-                if limit is not None:
-                    stmt = stmt.limit(limit)
-                results = self.session.execute(stmt).all()
-            else:
-                query = self.session.query(DocumentChunk).filter(
-                    DocumentChunk.collection_name == collection_name
-                )
+            stmt = self._query_statement(collection_name, filter, limit)
+            results = self.session.execute(stmt).all()
 
-                for key, value in filter.items():
-                    query = query.filter(
-                        DocumentChunk.vmetadata[key].astext == str(value)
-                    )
+            self.session.rollback()  # read-only transaction
+            if not results:
+                return None
 
-                if limit is not None:
-                    query = query.limit(limit)
+            return self._get_result(results)
+        except Exception as e:
+            self.session.rollback()
+            log.exception(f"Error during query: {e}")
+            return None
 
-                results = query.all()
+    async def aquery(
+        self, collection_name: str, filter: Dict[str, Any], limit: Optional[int] = None
+    ) -> Optional[GetResult]:
+        if self.async_engine is None:
+            return await run_in_executor(self.query, collection_name, filter, limit)
+
+        try:
+            stmt = self._query_statement(collection_name, filter, limit)
+            async with self.async_engine.connect() as connection:
+                results = (await connection.execute(stmt)).all()
 
             if not results:
                 return None
 
-            ids = [[result.id for result in results]]
-            documents = [[result.text for result in results]]
-            metadatas = [[result.vmetadata for result in results]]
-
-            self.session.rollback()  # read-only transaction
-            return GetResult(
-                ids=ids,
-                documents=documents,
-                metadatas=metadatas,
-            )
+            return self._get_result(results)
         except Exception as e:
-            self.session.rollback()
             log.exception(f"Error during query: {e}")
             return None
 
@@ -598,43 +797,35 @@ class PgvectorClient(VectorDBBase):
         self, collection_name: str, limit: Optional[int] = None
     ) -> Optional[GetResult]:
         try:
-            if PGVECTOR_PGCRYPTO:
-                stmt = select(
-                    DocumentChunk.id,
-                    pgcrypto_decrypt(
-                        DocumentChunk.text, PGVECTOR_PGCRYPTO_KEY, Text
-                    ).label("text"),
-                    pgcrypto_decrypt(
-                        DocumentChunk.vmetadata, PGVECTOR_PGCRYPTO_KEY, JSONB
-                    ).label("vmetadata"),
-                ).where(DocumentChunk.collection_name == collection_name)
-                if limit is not None:
-                    stmt = stmt.limit(limit)
-                results = self.session.execute(stmt).all()
-                ids = [[row.id for row in results]]
-                documents = [[row.text for row in results]]
-                metadatas = [[row.vmetadata for row in results]]
-            else:
+            stmt = self._query_statement(collection_name, limit=limit)
+            results = self.session.execute(stmt).all()
 
-                query = self.session.query(DocumentChunk).filter(
-                    DocumentChunk.collection_name == collection_name
-                )
-                if limit is not None:
-                    query = query.limit(limit)
+            self.session.rollback()  # read-only transaction
+            if not results and not PGVECTOR_PGCRYPTO:
+                return None
 
-                results = query.all()
+            return self._get_result(results)
+        except Exception as e:
+            self.session.rollback()
+            log.exception(f"Error during get: {e}")
+            return None
 
-                if not results:
-                    return None
+    async def aget(
+        self, collection_name: str, limit: Optional[int] = None
+    ) -> Optional[GetResult]:
+        if self.async_engine is None:
+            return await run_in_executor(self.get, collection_name, limit)
 
-                ids = [[result.id for result in results]]
-                documents = [[result.text for result in results]]
-                metadatas = [[result.vmetadata for result in results]]
+        try:
+            stmt = self._query_statement(collection_name, limit=limit)
+            async with self.async_engine.connect() as connection:
+                results = (await connection.execute(stmt)).all()
 
-            self.session.rollback()  # read-only transaction
-            return GetResult(ids=ids, documents=documents, metadatas=metadatas)
+            if not results and not PGVECTOR_PGCRYPTO:
+                return None
+
+            return self._get_result(results)
         except Exception as e:
-            self.session.rollback()
             log.exception(f"Error during get: {e}")
             return None
 
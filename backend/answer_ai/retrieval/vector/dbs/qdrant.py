@@ -1,8 +1,9 @@
 from typing import Optional
+import asyncio
 import logging
 from urllib.parse import urlparse
 
-from qdrant_client import QdrantClient as Qclient
+from qdrant_client import AsyncQdrantClient, QdrantClient as Qclient
 from qdrant_client.http.models import PointStruct
 from qdrant_client.models import models
 
@@ -41,6 +42,7 @@ class QdrantClient(VectorDBBase):
 
         if not self.QDRANT_URI:
             self.client = None
+            self.async_client = None
             return
 
         # Unified handling for either scheme
@@ -49,7 +51,7 @@ class QdrantClient(VectorDBBase):
         http_port = parsed.port or 6333  # default REST port
 
         if self.PREFER_GRPC:
-            self.client = Qclient(
+            client_kwargs = dict(
                 host=host,
                 port=http_port,
                 grpc_port=self.GRPC_PORT,
@@ -58,11 +60,14 @@ class QdrantClient(VectorDBBase):
                 timeout=self.QDRANT_TIMEOUT,
             )
         else:
-            self.client = Qclient(
+            client_kwargs = dict(
                 url=self.QDRANT_URI,
                 api_key=self.QDRANT_API_KEY,
                 timeout=QDRANT_TIMEOUT,
             )
+        self.client = Qclient(**client_kwargs)
+        # Used by the async methods, so that they don't take a thread each
+        self.async_client = AsyncQdrantClient(**client_kwargs)
 
     def _result_to_get_result(self, points) -> GetResult:
         ids = []
@@ -83,6 +88,40 @@ class QdrantClient(VectorDBBase):
             }
         )
 
+    def _result_to_search_result(self, responses) -> SearchResult:
+        result = SearchResult(ids=[], distances=[], documents=[], metadatas=[])
+        for response in responses:
+            get_result = self._result_to_get_result(response.points)
+            result.ids.extend(get_result.ids)
+            result.documents.extend(get_result.documents)
+            result.metadatas.extend(get_result.metadatas)
+            # qdrant distance is [-1, 1], normalize to [0, 1]
+            result.distances.append(
+                [(point.score + 1.0) / 2.0 for point in response.points]
+            )
+        return result
+
+    def _search_requests(
+        self, vectors: list[list[float | int]], limit: Optional[int]
+    ) -> list[models.QueryRequest]:
+        if limit is None:
+            limit = NO_LIMIT  # otherwise qdrant would set limit to 10!
+
+        return [
+            models.QueryRequest(query=vector, limit=limit, with_payload=True)
+            for vector in vectors
+        ]
+
+    def _query_filter(self, filter: dict) -> models.Filter:
+        return models.Filter(
+            should=[
+                models.FieldCondition(
+                    key=f"metadata.{key}", match=models.MatchValue(value=value)
+                )
+                for key, value in filter.items()
+            ]
+        )
+
     def _create_collection(self, collection_name: str, dimension: int):
         collection_name_with_prefix = f"{self.collection_prefix}_{collection_name}"
         self.client.create_collection(
@@ -148,43 +187,99 @@ class QdrantClient(VectorDBBase):
         self, collection_name: str, vectors: list[list[float | int]], limit: int
     ) -> Optional[SearchResult]:
         # Search for the nearest neighbor items based on the vectors and return 'limit' number of results.
-        if limit is None:
-            limit = NO_LIMIT  # otherwise qdrant would set limit to 10!
-
         query_response = self.client.query_points(
             collection_name=f"{self.collection_prefix}_{collection_name}",
             query=vectors[0],
-            limit=limit,
+            limit=limit if limit is not None else NO_LIMIT,
         )
-        get_result = self._result_to_get_result(query_response.points)
-        return SearchResult(
-            ids=get_result.ids,
-            documents=get_result.documents,
-            metadatas=get_result.metadatas,
-            # qdrant distance is [-1, 1], normalize to [0, 1]
-            distances=[[(point.score + 1.0) / 2.0 for point in query_response.points]],
+        return self._result_to_search_result([query_response])
+
+    async def asearch(
+        self,
+        collection_name: str,
+        vectors: list[list[float | int]],
+        limit: Optional[int] = None,
+    ) -> Optional[SearchResult]:
+        query_response = await self.async_client.query_points(
+            collection_name=f"{self.collection_prefix}_{collection_name}",
+            query=vectors[0],
+            limit=limit if limit is not None else NO_LIMIT,
+        )
+        return self._result_to_search_result([query_response])
+
+    def search_many(
+        self,
+        collection_names: list[str],
+        vectors: list[list[float | int]],
+        limit: Optional[int] = None,
+    ) -> dict[str, Optional[SearchResult]]:
+        # One batch query per collection, with a request per vector
+        results = {}
+        for collection_name in collection_names:
+            try:
+                responses = self.client.query_batch_points(
+                    collection_name=f"{self.collection_prefix}_{collection_name}",
+                    requests=self._search_requests(vectors, limit),
+                )
+                results[collection_name] = self._result_to_search_result(responses)
+            except Exception as e:
+                log.exception(f"Error searching collection {collection_name}: {e}")
+                results[collection_name] = None
+        return results
+
+    async def asearch_many(
+        self,
+        collection_names: list[str],
+        vectors: list[list[float | int]],
+        limit: Optional[int] = None,
+    ) -> dict[str, Optional[SearchResult]]:
+        async def search_collection(collection_name: str) -> Optional[SearchResult]:
+            try:
+                responses = await self.async_client.query_batch_points(
+                    collection_name=f"{self.collection_prefix}_{collection_name}",
+                    requests=self._search_requests(vectors, limit),
+                )
+                return self._result_to_search_result(responses)
+            except Exception as e:
+                log.exception(f"Error searching collection {collection_name}: {e}")
+                return None
+
+        # The batch queries of the collections, gathered
+        collection_names = list(dict.fromkeys(collection_names))
+        results = await asyncio.gather(
+            *[
+                search_collection(collection_name)
+                for collection_name in collection_names
+            ]
         )
+        return dict(zip(collection_names, results))
 
     def query(self, collection_name: str, filter: dict, limit: Optional[int] = None):
         # Construct the filter string for querying
         if not self.has_collection(collection_name):
             return None
         try:
-            if limit is None:
-                limit = NO_LIMIT  # otherwise qdrant would set limit to 10!
-
-            field_conditions = []
-            for key, value in filter.items():
-                field_conditions.append(
-                    models.FieldCondition(
-                        key=f"metadata.{key}", match=models.MatchValue(value=value)
-                    )
-                )
-
             points = self.client.scroll(
                 collection_name=f"{self.collection_prefix}_{collection_name}",
-                scroll_filter=models.Filter(should=field_conditions),
-                limit=limit,
+                scroll_filter=self._query_filter(filter),
+                limit=limit if limit is not None else NO_LIMIT,
+            )
+            return self._result_to_get_result(points[0])
+        except Exception as e:
+            log.exception(f"Error querying a collection '{collection_name}': {e}")
+            return None
+
+    async def aquery(
+        self, collection_name: str, filter: dict, limit: Optional[int] = None
+    ) -> Optional[GetResult]:
+        collection_name_with_prefix = f"{self.collection_prefix}_{collection_name}"
+        if not await self.async_client.collection_exists(collection_name_with_prefix):
+            return None
+        try:
+            points = await self.async_client.scroll(
+                collection_name=collection_name_with_prefix,
+                scroll_filter=self._query_filter(filter),
+                limit=limit if limit is not None else NO_LIMIT,
             )
             return self._result_to_get_result(points[0])
         except Exception as e:
@@ -199,6 +294,13 @@ class QdrantClient(VectorDBBase):
         )
         return self._result_to_get_result(points[0])
 
+    async def aget(self, collection_name: str) -> Optional[GetResult]:
+        points = await self.async_client.scroll(
+            collection_name=f"{self.collection_prefix}_{collection_name}",
+            limit=NO_LIMIT,
+        )
+        return self._result_to_get_result(points[0])
+
     def insert(self, collection_name: str, items: list[VectorItem]):
         # Insert the items into the collection, if the collection does not exist, it will be created.
         self._create_collection_if_not_exists(collection_name, len(items[0]["vector"]))
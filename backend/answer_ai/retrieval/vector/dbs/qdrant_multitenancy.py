@@ -19,7 +19,7 @@ from answer_ai.retrieval.vector.main import (
     VectorDBBase,
     VectorItem,
 )
-from qdrant_client import QdrantClient as Qclient
+from qdrant_client import AsyncQdrantClient, QdrantClient as Qclient
 from qdrant_client.http.exceptions import UnexpectedResponse
 from qdrant_client.http.models import PointStruct
 from qdrant_client.models import models
@@ -64,8 +64,8 @@ class QdrantClient(VectorDBBase):
         host = parsed.hostname or self.QDRANT_URI
         http_port = parsed.port or 6333  # default REST port
 
-        self.client = (
-            Qclient(
+        client_kwargs = (
+            dict(
                 host=host,
                 port=http_port,
                 grpc_port=self.GRPC_PORT,
@@ -74,12 +74,15 @@ class QdrantClient(VectorDBBase):
                 timeout=self.QDRANT_TIMEOUT,
             )
             if self.PREFER_GRPC
-            else Qclient(
+            else dict(
                 url=self.QDRANT_URI,
                 api_key=self.QDRANT_API_KEY,
                 timeout=self.QDRANT_TIMEOUT,
             )
         )
+        self.client = Qclient(**client_kwargs)
+        # Used by the async methods, so that they don't take a thread each
+        self.async_client = AsyncQdrantClient(**client_kwargs)
 
         # Main collection types for multi-tenancy
         self.MEMORY_COLLECTION = f"{self.collection_prefix}_memories"
@@ -97,6 +100,15 @@ class QdrantClient(VectorDBBase):
             metadatas.append(payload["metadata"])
         return GetResult(ids=[ids], documents=[documents], metadatas=[metadatas])
 
+    def _result_to_search_result(self, query_response) -> SearchResult:
+        get_result = self._result_to_get_result(query_response.points)
+        return SearchResult(
+            ids=get_result.ids,
+            documents=get_result.documents,
+            metadatas=get_result.metadatas,
+            distances=[[(point.score + 1.0) / 2.0 for point in query_response.points]],
+        )
+
     def _get_collection_and_tenant_id(self, collection_name: str) -> Tuple[str, str]:
         """
         Maps the traditional collection name to multi-tenant collection and tenant ID.
@@ -273,13 +285,28 @@ class QdrantClient(VectorDBBase):
             limit=limit,
             query_filter=models.Filter(must=[tenant_filter]),
         )
-        get_result = self._result_to_get_result(query_response.points)
-        return SearchResult(
-            ids=get_result.ids,
-            documents=get_result.documents,
-            metadatas=get_result.metadatas,
-            distances=[[(point.score + 1.0) / 2.0 for point in query_response.points]],
+        return self._result_to_search_result(query_response)
+
+    async def asearch(
+        self,
+        collection_name: str,
+        vectors: List[List[float | int]],
+        limit: Optional[int] = None,
+    ) -> Optional[SearchResult]:
+        if not self.client or not vectors:
+            return None
+        mt_collection, tenant_id = self._get_collection_and_tenant_id(collection_name)
+        if not await self.async_client.collection_exists(collection_name=mt_collection):
+            log.debug(f"Collection {mt_collection} doesn't exist, search returns None")
+            return None
+
+        query_response = await self.async_client.query_points(
+            collection_name=mt_collection,
+            query=vectors[0],
+            limit=limit,
+            query_filter=models.Filter(must=[_tenant_filter(tenant_id)]),
         )
+        return self._result_to_search_result(query_response)
 
     def query(
         self, collection_name: str, filter: Dict[str, Any], limit: Optional[int] = None
@@ -305,6 +332,27 @@ class QdrantClient(VectorDBBase):
         )
         return self._result_to_get_result(points[0])
 
+    async def aquery(
+        self, collection_name: str, filter: Dict[str, Any], limit: Optional[int] = None
+    ) -> Optional[GetResult]:
+        if not self.client:
+            return None
+        mt_collection, tenant_id = self._get_collection_and_tenant_id(collection_name)
+        if not await self.async_client.collection_exists(collection_name=mt_collection):
+            log.debug(f"Collection {mt_collection} doesn't exist, query returns None")
+            return None
+        if limit is None:
+            limit = NO_LIMIT
+        field_conditions = [_metadata_filter(k, v) for k, v in filter.items()]
+        points = await self.async_client.scroll(
+            collection_name=mt_collection,
+            scroll_filter=models.Filter(
+                must=[_tenant_filter(tenant_id), *field_conditions]
+            ),
+            limit=limit,
+        )
+        return self._result_to_get_result(points[0])
+
     def get(self, collection_name: str) -> Optional[GetResult]:
         """
         Get all items in a collection with tenant isolation.
@@ -323,6 +371,20 @@ class QdrantClient(VectorDBBase):
         )
         return self._result_to_get_result(points[0])
 
+    async def aget(self, collection_name: str) -> Optional[GetResult]:
+        if not self.client:
+            return None
+        mt_collection, tenant_id = self._get_collection_and_tenant_id(collection_name)
+        if not await self.async_client.collection_exists(collection_name=mt_collection):
+            log.debug(f"Collection {mt_collection} doesn't exist, get returns None")
+            return None
+        points = await self.async_client.scroll(
+            collection_name=mt_collection,
+            scroll_filter=models.Filter(must=[_tenant_filter(tenant_id)]),
+            limit=NO_LIMIT,
+        )
+        return self._result_to_get_result(points[0])
+
     def upsert(self, collection_name: str, items: List[VectorItem]):
         """
         Upsert items with tenant ID.
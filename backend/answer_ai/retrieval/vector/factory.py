@@ -1,7 +1,16 @@
+from answer_ai.retrieval.vector.aliases import AliasedVectorDB
 from answer_ai.retrieval.vector.main import VectorDBBase
 from answer_ai.retrieval.vector.type import VectorType
+from answer_ai.env import (
+    REDIS_CLUSTER,
+    REDIS_SENTINEL_HOSTS,
+    REDIS_SENTINEL_PORT,
+    REDIS_URL,
+)
+from answer_ai.utils.redis import get_sentinels_from_env
 from answer_ai.config import (
     VECTOR_DB,
+    VECTOR_DB_ALIAS_REFRESH_INTERVAL,
     ENABLE_QDRANT_MULTITENANCY_MODE,
     ENABLE_MILVUS_MULTITENANCY_MODE,
 )
@@ -75,4 +84,10 @@ class Vector:
                 raise ValueError(f"Unsupported vector type: {vector_type}")
 
 
-VECTOR_DB_CLIENT = Vector.get_vector(VECTOR_DB)
+VECTOR_DB_CLIENT = AliasedVectorDB(
+    Vector.get_vector(VECTOR_DB),
+    refresh_interval=VECTOR_DB_ALIAS_REFRESH_INTERVAL,
+    redis_url=REDIS_URL,
+    redis_sentinels=get_sentinels_from_env(REDIS_SENTINEL_HOSTS, REDIS_SENTINEL_PORT),
+    redis_cluster=REDIS_CLUSTER,
+)
@@ -1,6 +1,28 @@
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
 from pydantic import BaseModel
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from answer_ai.config import VECTOR_DB_THREAD_POOL_SIZE
+
+log = logging.getLogger(__name__)
+
+# Shared by all backends, so that blocking vector DB calls made from the
+# event loop are bounded instead of each taking a thread of their own
+VECTOR_DB_EXECUTOR = ThreadPoolExecutor(
+    max_workers=VECTOR_DB_THREAD_POOL_SIZE, thread_name_prefix="vector-db"
+)
+
+
+async def run_in_executor(func: Callable, *args, **kwargs) -> Any:
+    """Run a blocking vector DB call in the shared executor."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        VECTOR_DB_EXECUTOR, functools.partial(func, *args, **kwargs)
+    )
 
 
 class VectorItem(BaseModel):
@@ -20,6 +42,29 @@ class SearchResult(GetResult):
     distances: Optional[List[List[float | int]]]
 
 
+def merge_search_results(
+    results: List[Optional[SearchResult]],
+) -> Optional[SearchResult]:
+    """Stack single vector search results into one, a row per vector."""
+    if all(result is None for result in results):
+        return None
+
+    merged = SearchResult(ids=[], distances=[], documents=[], metadatas=[])
+    for result in results:
+        if result is None or not result.ids:
+            merged.ids.append([])
+            merged.distances.append([])
+            merged.documents.append([])
+            merged.metadatas.append([])
+            continue
+
+        merged.ids.append(result.ids[0])
+        merged.distances.append(result.distances[0] if result.distances else [])
+        merged.documents.append(result.documents[0] if result.documents else [])
+        merged.metadatas.append(result.metadatas[0] if result.metadatas else [])
+    return merged
+
+
 class VectorDBBase(ABC):
     """
     Abstract base class for all vector database backends.
@@ -29,6 +74,10 @@ class VectorDBBase(ABC):
 
     Any custom vector database integration must inherit from this class and
     implement all abstract methods.
+
+    The async methods (`a`-prefixed) are used by the retrieval paths running
+    on the event loop. By default they run the sync methods in a shared
+    thread pool, backends with an async driver override them.
     """
 
     @abstractmethod
@@ -84,3 +133,90 @@ class VectorDBBase(ABC):
     def reset(self) -> None:
         """Reset the vector database by removing all collections or those matching a condition."""
         pass
+
+    def search_many(
+        self,
+        collection_names: List[str],
+        vectors: List[List[Union[float, int]]],
+        limit: Optional[int] = None,
+    ) -> Dict[str, Optional[SearchResult]]:
+        """
+        Search several collections for the same vectors. The result of each
+        collection has a row per vector, or is None if it can't be searched.
+
+        Backends override this to answer in fewer round-trips, by default
+        each vector is searched on its own, as not every backend's `search`
+        handles more than one.
+        """
+        results = {}
+        for collection_name in collection_names:
+            try:
+                results[collection_name] = merge_search_results(
+                    [
+                        self.search(collection_name, [vector], limit)
+                        for vector in vectors
+                    ]
+                )
+            except Exception as e:
+                log.exception(f"Error searching collection {collection_name}: {e}")
+                results[collection_name] = None
+        return results
+
+    async def ainsert(self, collection_name: str, items: List[VectorItem]) -> None:
+        """Insert a list of vector items into a collection without blocking."""
+        await run_in_executor(self.insert, collection_name, items)
+
+    async def asearch(
+        self,
+        collection_name: str,
+        vectors: List[List[Union[float, int]]],
+        limit: Optional[int] = None,
+    ) -> Optional[SearchResult]:
+        """Search for similar vectors in a collection without blocking."""
+        return await run_in_executor(self.search, collection_name, vectors, limit)
+
+    async def aquery(
+        self, collection_name: str, filter: Dict, limit: Optional[int] = None
+    ) -> Optional[GetResult]:
+        """Query vectors from a collection using metadata filter without blocking."""
+        return await run_in_executor(self.query, collection_name, filter, limit)
+
+    async def aget(self, collection_name: str) -> Optional[GetResult]:
+        """Retrieve all vectors from a collection without blocking."""
+        return await run_in_executor(self.get, collection_name)
+
+    async def asearch_many(
+        self,
+        collection_names: List[str],
+        vectors: List[List[Union[float, int]]],
+        limit: Optional[int] = None,
+    ) -> Dict[str, Optional[SearchResult]]:
+        """
+        Search several collections for the same vectors without blocking.
+
+        By default the searches of each collection and vector are gathered,
+        backends override this along with `search_many`.
+        """
+
+        async def search_collection(collection_name: str) -> Optional[SearchResult]:
+            try:
+                return merge_search_results(
+                    await asyncio.gather(
+                        *[
+                            self.asearch(collection_name, [vector], limit)
+                            for vector in vectors
+                        ]
+                    )
+                )
+            except Exception as e:
+                log.exception(f"Error searching collection {collection_name}: {e}")
+                return None
+
+        collection_names = list(dict.fromkeys(collection_names))
+        results = await asyncio.gather(
+            *[
+                search_collection(collection_name)
+                for collection_name in collection_names
+            ]
+        )
+        return dict(zip(collection_names, results))
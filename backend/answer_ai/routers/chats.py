@@ -37,7 +37,7 @@ router = APIRouter()
 
 @router.get("/", response_model=list[ChatTitleIdResponse])
 @router.get("/list", response_model=list[ChatTitleIdResponse])
-def get_session_user_chat_list(
+async def get_session_user_chat_list(
     user=Depends(get_verified_user),
     page: Optional[int] = None,
     include_pinned: Optional[bool] = False,
@@ -48,7 +48,7 @@ def get_session_user_chat_list(
             limit = 60
             skip = (page - 1) * limit
 
-            return Chats.get_chat_title_id_list_by_user_id(
+            return await Chats.aget_chat_title_id_list_by_user_id(
                 user.id,
                 include_folders=include_folders,
                 include_pinned=include_pinned,
@@ -56,7 +56,7 @@ def get_session_user_chat_list(
                 limit=limit,
             )
         else:
-            return Chats.get_chat_title_id_list_by_user_id(
+            return await Chats.aget_chat_title_id_list_by_user_id(
                 user.id, include_folders=include_folders, include_pinned=include_pinned
             )
     except Exception as e:
@@ -507,7 +507,7 @@ async def get_shared_chat_by_id(share_id: str, user=Depends(get_verified_user)):
     if user.role == "user" or (user.role == "admin" and not ENABLE_ADMIN_CHAT_ACCESS):
         chat = Chats.get_chat_by_share_id(share_id)
     elif user.role == "admin" and ENABLE_ADMIN_CHAT_ACCESS:
-        chat = Chats.get_chat_by_id(share_id)
+        chat = await Chats.aget_chat_by_id(share_id)
 
     if chat:
         return ChatResponse(**chat.model_dump())
@@ -552,7 +552,7 @@ async def get_user_chat_list_by_tag_name(
 
 @router.get("/{id}", response_model=Optional[ChatResponse])
 async def get_chat_by_id(id: str, user=Depends(get_verified_user)):
-    chat = Chats.get_chat_by_id_and_user_id(id, user.id)
+    chat = await Chats.aget_chat_by_id_and_user_id(id, user.id)
 
     if chat:
         return ChatResponse(**chat.model_dump())
@@ -572,7 +572,7 @@ async def get_chat_by_id(id: str, user=Depends(get_verified_user)):
 async def update_chat_by_id(
     id: str, form_data: ChatForm, user=Depends(get_verified_user)
 ):
-    chat = Chats.get_chat_by_id_and_user_id(id, user.id)
+    chat = await Chats.aget_chat_by_id_and_user_id(id, user.id)
     if chat:
         updated_chat = {**chat.chat, **form_data.chat}
         chat = Chats.update_chat_by_id(id, updated_chat)
@@ -595,7 +595,7 @@ class MessageForm(BaseModel):
 async def update_chat_message_by_id(
     id: str, message_id: str, form_data: MessageForm, user=Depends(get_verified_user)
 ):
-    chat = Chats.get_chat_by_id(id)
+    chat = await Chats.aget_chat_by_id(id)
 
     if not chat:
         raise HTTPException(
@@ -653,7 +653,7 @@ class EventForm(BaseModel):
 async def send_chat_message_event_by_id(
     id: str, message_id: str, form_data: EventForm, user=Depends(get_verified_user)
 ):
-    chat = Chats.get_chat_by_id(id)
+    chat = await Chats.aget_chat_by_id(id)
 
     if not chat:
         raise HTTPException(
@@ -693,7 +693,7 @@ async def send_chat_message_event_by_id(
 @router.delete("/{id}", response_model=bool)
 async def delete_chat_by_id(request: Request, id: str, user=Depends(get_verified_user)):
     if user.role == "admin":
-        chat = Chats.get_chat_by_id(id)
+        chat = await Chats.aget_chat_by_id(id)
         for tag in chat.meta.get("tags", []):
             if Chats.count_chats_by_tag_name_and_user_id(tag, user.id) == 1:
                 Tags.delete_tag_by_name_and_user_id(tag, user.id)
@@ -710,7 +710,7 @@ async def delete_chat_by_id(request: Request, id: str, user=Depends(get_verified
                 detail=ERROR_MESSAGES.ACCESS_PROHIBITED,
             )
 
-        chat = Chats.get_chat_by_id(id)
+        chat = await Chats.aget_chat_by_id(id)
         for tag in chat.meta.get("tags", []):
             if Chats.count_chats_by_tag_name_and_user_id(tag, user.id) == 1:
                 Tags.delete_tag_by_name_and_user_id(tag, user.id)
@@ -726,7 +726,7 @@ async def delete_chat_by_id(request: Request, id: str, user=Depends(get_verified
 
 @router.get("/{id}/pinned", response_model=Optional[bool])
 async def get_pinned_status_by_id(id: str, user=Depends(get_verified_user)):
-    chat = Chats.get_chat_by_id_and_user_id(id, user.id)
+    chat = await Chats.aget_chat_by_id_and_user_id(id, user.id)
     if chat:
         return chat.pinned
     else:
@@ -742,7 +742,7 @@ async def get_pinned_status_by_id(id: str, user=Depends(get_verified_user)):
 
 @router.post("/{id}/pin", response_model=Optional[ChatResponse])
 async def pin_chat_by_id(id: str, user=Depends(get_verified_user)):
-    chat = Chats.get_chat_by_id_and_user_id(id, user.id)
+    chat = await Chats.aget_chat_by_id_and_user_id(id, user.id)
     if chat:
         chat = Chats.toggle_chat_pinned_by_id(id)
         return chat
@@ -765,7 +765,7 @@ class CloneForm(BaseModel):
 async def clone_chat_by_id(
     form_data: CloneForm, id: str, user=Depends(get_verified_user)
 ):
-    chat = Chats.get_chat_by_id_and_user_id(id, user.id)
+    chat = await Chats.aget_chat_by_id_and_user_id(id, user.id)
     if chat:
         updated_chat = {
             **chat.chat,
@@ -811,7 +811,7 @@ async def clone_chat_by_id(
 async def clone_shared_chat_by_id(id: str, user=Depends(get_verified_user)):
 
     if user.role == "admin":
-        chat = Chats.get_chat_by_id(id)
+        chat = await Chats.aget_chat_by_id(id)
     else:
         chat = Chats.get_chat_by_share_id(id)
 
@@ -858,7 +858,7 @@ async def clone_shared_chat_by_id(id: str, user=Depends(get_verified_user)):
 
 @router.post("/{id}/archive", response_model=Optional[ChatResponse])
 async def archive_chat_by_id(id: str, user=Depends(get_verified_user)):
-    chat = Chats.get_chat_by_id_and_user_id(id, user.id)
+    chat = await Chats.aget_chat_by_id_and_user_id(id, user.id)
     if chat:
         chat = Chats.toggle_chat_archive_by_id(id)
 
@@ -899,7 +899,7 @@ async def share_chat_by_id(request: Request, id: str, user=Depends(get_verified_
             detail=ERROR_MESSAGES.ACCESS_PROHIBITED,
         )
 
-    chat = Chats.get_chat_by_id_and_user_id(id, user.id)
+    chat = await Chats.aget_chat_by_id_and_user_id(id, user.id)
 
     if chat:
         if chat.share_id:
@@ -928,7 +928,7 @@ async def share_chat_by_id(request: Request, id: str, user=Depends(get_verified_
 
 @router.delete("/{id}/share", response_model=Optional[bool])
 async def delete_shared_chat_by_id(id: str, user=Depends(get_verified_user)):
-    chat = Chats.get_chat_by_id_and_user_id(id, user.id)
+    chat = await Chats.aget_chat_by_id_and_user_id(id, user.id)
     if chat:
         if not chat.share_id:
             return False
@@ -957,7 +957,7 @@ class ChatFolderIdForm(BaseModel):
 async def update_chat_folder_id_by_id(
     id: str, form_data: ChatFolderIdForm, user=Depends(get_verified_user)
 ):
-    chat = Chats.get_chat_by_id_and_user_id(id, user.id)
+    chat = await Chats.aget_chat_by_id_and_user_id(id, user.id)
     if chat:
         chat = Chats.update_chat_folder_id_by_id_and_user_id(
             id, user.id, form_data.folder_id
@@ -976,7 +976,7 @@ async def update_chat_folder_id_by_id(
 
 @router.get("/{id}/tags", response_model=list[TagModel])
 async def get_chat_tags_by_id(id: str, user=Depends(get_verified_user)):
-    chat = Chats.get_chat_by_id_and_user_id(id, user.id)
+    chat = await Chats.aget_chat_by_id_and_user_id(id, user.id)
     if chat:
         tags = chat.meta.get("tags", [])
         return Tags.get_tags_by_ids_and_user_id(tags, user.id)
@@ -995,7 +995,7 @@ async def get_chat_tags_by_id(id: str, user=Depends(get_verified_user)):
 async def add_tag_by_id_and_tag_name(
     id: str, form_data: TagForm, user=Depends(get_verified_user)
 ):
-    chat = Chats.get_chat_by_id_and_user_id(id, user.id)
+    chat = await Chats.aget_chat_by_id_and_user_id(id, user.id)
     if chat:
         tags = chat.meta.get("tags", [])
         tag_id = form_data.name.replace(" ", "_").lower()
@@ -1011,7 +1011,7 @@ async def add_tag_by_id_and_tag_name(
                 id, user.id, form_data.name
             )
 
-        chat = Chats.get_chat_by_id_and_user_id(id, user.id)
+        chat = await Chats.aget_chat_by_id_and_user_id(id, user.id)
         tags = chat.meta.get("tags", [])
         return Tags.get_tags_by_ids_and_user_id(tags, user.id)
     else:
@@ -1029,14 +1029,14 @@ async def add_tag_by_id_and_tag_name(
 async def delete_tag_by_id_and_tag_name(
     id: str, form_data: TagForm, user=Depends(get_verified_user)
 ):
-    chat = Chats.get_chat_by_id_and_user_id(id, user.id)
+    chat = await Chats.aget_chat_by_id_and_user_id(id, user.id)
     if chat:
         Chats.delete_tag_by_id_and_user_id_and_tag_name(id, user.id, form_data.name)
 
         if Chats.count_chats_by_tag_name_and_user_id(form_data.name, user.id) == 0:
             Tags.delete_tag_by_name_and_user_id(form_data.name, user.id)
 
-        chat = Chats.get_chat_by_id_and_user_id(id, user.id)
+        chat = await Chats.aget_chat_by_id_and_user_id(id, user.id)
         tags = chat.meta.get("tags", [])
         return Tags.get_tags_by_ids_and_user_id(tags, user.id)
     else:
@@ -1052,7 +1052,7 @@ async def delete_tag_by_id_and_tag_name(
 
 @router.delete("/{id}/tags/all", response_model=Optional[bool])
 async def delete_all_tags_by_id(id: str, user=Depends(get_verified_user)):
-    chat = Chats.get_chat_by_id_and_user_id(id, user.id)
+    chat = await Chats.aget_chat_by_id_and_user_id(id, user.id)
     if chat:
         Chats.delete_all_tags_by_id_and_user_id(id, user.id)
 
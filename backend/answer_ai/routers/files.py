@@ -25,6 +25,7 @@ from fastapi.responses import FileResponse, StreamingResponse
 
 from answer_ai.constants import ERROR_MESSAGES
 from answer_ai.retrieval.vector.factory import VECTOR_DB_CLIENT
+from answer_ai.retrieval.bm25 import BM25_INDEX_STORE
 
 from answer_ai.models.channels import Channels
 from answer_ai.models.users import Users
@@ -37,10 +38,16 @@ from answer_ai.models.files import (
 from answer_ai.models.chats import Chats
 from answer_ai.models.knowledge import Knowledges
 from answer_ai.models.groups import Groups
+from answer_ai.models.ingestion_jobs import IngestionJobs
 
 
 from answer_ai.routers.retrieval import ProcessFileForm, process_file
 from answer_ai.routers.audio import transcribe
+from answer_ai.retrieval.ingestion import (
+    INGESTION_WORKER,
+    IngestionError,
+    report_ingestion_stage,
+)
 
 from answer_ai.storage.provider import Storage
 
@@ -109,47 +116,42 @@ def has_access_to_file(
 ############################
 
 
-def process_uploaded_file(request, file, file_path, file_item, file_metadata, user):
-    try:
-        if file.content_type:
-            stt_supported_content_types = getattr(
-                request.app.state.config, "STT_SUPPORTED_CONTENT_TYPES", []
-            )
+def process_uploaded_file(request, file_item, user):
+    """
+    Extract, embed and index an uploaded file, raises on failure. Run by the
+    ingestion workers, or in the request when not processing in background.
+    """
+    content_type = file_item.meta.get("content_type")
+    if content_type:
+        stt_supported_content_types = getattr(
+            request.app.state.config, "STT_SUPPORTED_CONTENT_TYPES", []
+        )
 
-            if strict_match_mime_type(stt_supported_content_types, file.content_type):
-                file_path = Storage.get_file(file_path)
-                result = transcribe(request, file_path, file_metadata, user)
+        if strict_match_mime_type(stt_supported_content_types, content_type):
+            report_ingestion_stage("loading")
+            file_path = Storage.get_file(file_item.path)
+            result = transcribe(
+                request, file_path, file_item.meta.get("data", {}), user
+            )
 
-                process_file(
-                    request,
-                    ProcessFileForm(
-                        file_id=file_item.id, content=result.get("text", "")
-                    ),
-                    user=user,
-                )
-            elif (not file.content_type.startswith(("image/", "video/"))) or (
-                request.app.state.config.CONTENT_EXTRACTION_ENGINE == "external"
-            ):
-                process_file(request, ProcessFileForm(file_id=file_item.id), user=user)
-            else:
-                raise Exception(
-                    f"File type {file.content_type} is not supported for processing"
-                )
-        else:
-            log.info(
-                f"File type {file.content_type} is not provided, but trying to process anyway"
+            process_file(
+                request,
+                ProcessFileForm(file_id=file_item.id, content=result.get("text", "")),
+                user=user,
             )
+        elif (not content_type.startswith(("image/", "video/"))) or (
+            request.app.state.config.CONTENT_EXTRACTION_ENGINE == "external"
+        ):
             process_file(request, ProcessFileForm(file_id=file_item.id), user=user)
-
-    except Exception as e:
-        log.error(f"Error processing file: {file_item.id}")
-        Files.update_file_data_by_id(
-            file_item.id,
-            {
-                "status": "failed",
-                "error": str(e.detail) if hasattr(e, "detail") else str(e),
-            },
+        else:
+            raise IngestionError(
+                f"File type {content_type} is not supported for processing"
+            )
+    else:
+        log.info(
+            f"File type {content_type} is not provided, but trying to process anyway"
         )
+        process_file(request, ProcessFileForm(file_id=file_item.id), user=user)
 
 
 @router.post("/", response_model=FileModelResponse)
@@ -259,25 +261,24 @@ def upload_file_handler(
 
         if process:
             if background_tasks and process_in_background:
-                background_tasks.add_task(
-                    process_uploaded_file,
-                    request,
-                    file,
-                    file_path,
-                    file_item,
-                    file_metadata,
-                    user,
-                )
+                # Processed by the ingestion workers, see retrieval/ingestion.py
+                IngestionJobs.insert_new_job(file_item.id, user.id)
+                INGESTION_WORKER.notify()
                 return {"status": True, **file_item.model_dump()}
             else:
-                process_uploaded_file(
-                    request,
-                    file,
-                    file_path,
-                    file_item,
-                    file_metadata,
-                    user,
-                )
+                try:
+                    process_uploaded_file(request, file_item, user)
+                except Exception as e:
+                    log.error(f"Error processing file: {file_item.id}")
+                    Files.update_file_data_by_id(
+                        file_item.id,
+                        {
+                            "status": "failed",
+                            "error": (
+                                str(e.detail) if hasattr(e, "detail") else str(e)
+                            ),
+                        },
+                    )
                 return {"status": True, **file_item.model_dump()}
         else:
             if file_item:
@@ -370,6 +371,7 @@ async def delete_all_files(user=Depends(get_admin_user)):
         try:
             Storage.delete_all_files()
             VECTOR_DB_CLIENT.reset()
+            BM25_INDEX_STORE.reset()
         except Exception as e:
             log.exception(e)
             log.error("Error deleting files")
@@ -413,6 +415,27 @@ async def get_file_by_id(id: str, user=Depends(get_verified_user)):
         )
 
 
+def get_file_process_status_event(file: FileModel) -> Optional[dict]:
+    data = file.data or {}
+    status = data.get("status")
+
+    # A queued or running job outranks the status left by a failed attempt
+    job = IngestionJobs.get_job_by_file_id(file.id)
+    if job is not None:
+        event = {"status": "pending", "stage": job.stage, "attempts": job.attempts}
+        if job.error:
+            event["error"] = job.error
+        return event
+
+    if not status:
+        return None
+
+    event = {"status": status}
+    if status == "failed":
+        event["error"] = data.get("error")
+    return event
+
+
 @router.get("/{id}/process/status")
 async def get_file_process_status(
     id: str, stream: bool = Query(False), user=Depends(get_verified_user)
@@ -438,16 +461,11 @@ async def get_file_process_status(
                     for _ in range(MAX_FILE_PROCESSING_DURATION):
                         file_item = Files.get_file_by_id(file_item.id)
                         if file_item:
-                            data = file_item.model_dump().get("data", {})
-                            status = data.get("status")
-
-                            if status:
-                                event = {"status": status}
-                                if status == "failed":
-                                    event["error"] = data.get("error")
+                            event = get_file_process_status_event(file_item)
 
+                            if event:
                                 yield f"data: {json.dumps(event)}\n\n"
-                                if status in ("completed", "failed"):
+                                if event["status"] in ("completed", "failed"):
                                     break
                             else:
                                 # Legacy
@@ -462,7 +480,7 @@ async def get_file_process_status(
                 media_type="text/event-stream",
             )
         else:
-            return {"status": file.data.get("status", "pending")}
+            return get_file_process_status_event(file) or {"status": "pending"}
     else:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -750,6 +768,7 @@ async def delete_file_by_id(id: str, user=Depends(get_verified_user)):
             try:
                 Storage.delete_file(file.path)
                 VECTOR_DB_CLIENT.delete(collection_name=f"file-{id}")
+                BM25_INDEX_STORE.delete_collection(collection_name=f"file-{id}")
             except Exception as e:
                 log.exception(e)
                 log.error("Error deleting files")
@@ -23,6 +23,7 @@ from answer_ai.config import CACHE_DIR
 from answer_ai.constants import ERROR_MESSAGES
 from fastapi import APIRouter, Depends, HTTPException, Request, status
 from answer_ai.utils.auth import get_admin_user, get_verified_user
+from answer_ai.utils.model_catalog import MODEL_CATALOG
 from pydantic import BaseModel, HttpUrl
 
 
@@ -212,6 +213,7 @@ async def create_new_function(
                 Functions.update_function_metadata_by_id(id, {"toggle": True})
 
             if function:
+                await MODEL_CATALOG.invalidate(request.app)
                 return function
             else:
                 raise HTTPException(
@@ -255,7 +257,9 @@ async def get_function_by_id(id: str, user=Depends(get_admin_user)):
 
 
 @router.post("/id/{id}/toggle", response_model=Optional[FunctionModel])
-async def toggle_function_by_id(id: str, user=Depends(get_admin_user)):
+async def toggle_function_by_id(
+    request: Request, id: str, user=Depends(get_admin_user)
+):
     function = Functions.get_function_by_id(id)
     if function:
         function = Functions.update_function_by_id(
@@ -263,6 +267,7 @@ async def toggle_function_by_id(id: str, user=Depends(get_admin_user)):
         )
 
         if function:
+            await MODEL_CATALOG.invalidate(request.app)
             return function
         else:
             raise HTTPException(
@@ -331,6 +336,7 @@ async def update_function_by_id(
             Functions.update_function_metadata_by_id(id, {"toggle": True})
 
         if function:
+            await MODEL_CATALOG.invalidate(request.app)
             return function
         else:
             raise HTTPException(
@@ -361,6 +367,8 @@ async def delete_function_by_id(
         if id in FUNCTIONS:
             del FUNCTIONS[id]
 
+        await MODEL_CATALOG.invalidate(request.app)
+
     return result
 
 
@@ -13,7 +13,13 @@ from answer_ai.models.knowledge import (
     KnowledgeUserResponse,
 )
 from answer_ai.models.files import Files, FileModel, FileMetadataResponse
+from answer_ai.models.knowledge_reindex import (
+    KnowledgeReindexes,
+    KnowledgeReindexProgressResponse,
+)
 from answer_ai.retrieval.vector.factory import VECTOR_DB_CLIENT
+from answer_ai.retrieval.bm25 import BM25_INDEX_STORE
+from answer_ai.retrieval.reindex import KNOWLEDGE_REINDEXER
 from answer_ai.routers.retrieval import (
     process_file,
     ProcessFileForm,
@@ -203,54 +209,30 @@ async def reindex_knowledge_files(request: Request, user=Depends(get_verified_us
             detail=ERROR_MESSAGES.UNAUTHORIZED,
         )
 
-    knowledge_bases = Knowledges.get_knowledge_bases()
+    # Runs in the background, see retrieval/reindex.py
+    reindex = await run_in_threadpool(KNOWLEDGE_REINDEXER.create, user.id)
+    log.info(f"Starting knowledge reindex {reindex.id}")
+    KNOWLEDGE_REINDEXER.start(request.app)
+    return True
 
-    log.info(f"Starting reindexing for {len(knowledge_bases)} knowledge bases")
 
-    for knowledge_base in knowledge_bases:
-        try:
-            files = Knowledges.get_files_by_id(knowledge_base.id)
-            try:
-                if VECTOR_DB_CLIENT.has_collection(collection_name=knowledge_base.id):
-                    VECTOR_DB_CLIENT.delete_collection(
-                        collection_name=knowledge_base.id
-                    )
-            except Exception as e:
-                log.error(f"Error deleting collection {knowledge_base.id}: {str(e)}")
-                continue  # Skip, don't raise
-
-            failed_files = []
-            for file in files:
-                try:
-                    await run_in_threadpool(
-                        process_file,
-                        request,
-                        ProcessFileForm(
-                            file_id=file.id, collection_name=knowledge_base.id
-                        ),
-                        user=user,
-                    )
-                except Exception as e:
-                    log.error(
-                        f"Error processing file {file.filename} (ID: {file.id}): {str(e)}"
-                    )
-                    failed_files.append({"file_id": file.id, "error": str(e)})
-                    continue
+@router.get(
+    "/reindex/status", response_model=Optional[KnowledgeReindexProgressResponse]
+)
+async def get_reindex_status(user=Depends(get_verified_user)):
+    if user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=ERROR_MESSAGES.UNAUTHORIZED,
+        )
 
-        except Exception as e:
-            log.error(f"Error processing knowledge base {knowledge_base.id}: {str(e)}")
-            # Don't raise, just continue
-            continue
+    reindex = KnowledgeReindexes.get_latest_reindex()
+    if reindex is None:
+        return None
 
-        if failed_files:
-            log.warning(
-                f"Failed to process {len(failed_files)} files in knowledge base {knowledge_base.id}"
-            )
-            for failed in failed_files:
-                log.warning(f"File ID: {failed['file_id']}, Error: {failed['error']}")
-
-    log.info(f"Reindexing completed.")
-    return True
+    return KnowledgeReindexProgressResponse(
+        **reindex.model_dump(), files=KnowledgeReindexes.get_progress(reindex.id)
+    )
 
 
 ############################
@@ -507,6 +489,9 @@ def update_file_from_knowledge_by_id(
     VECTOR_DB_CLIENT.delete(
         collection_name=knowledge.id, filter={"file_id": form_data.file_id}
     )
+    BM25_INDEX_STORE.delete(
+        collection_name=knowledge.id, filter={"file_id": form_data.file_id}
+    )
 
     # Add content to the vector database
     try:
@@ -582,6 +567,13 @@ def remove_file_from_knowledge_by_id(
         VECTOR_DB_CLIENT.delete(
             collection_name=knowledge.id, filter={"hash": file.hash}
         )  # Remove by hash as well in case of duplicates
+
+        BM25_INDEX_STORE.delete(
+            collection_name=knowledge.id, filter={"file_id": form_data.file_id}
+        )
+        BM25_INDEX_STORE.delete(
+            collection_name=knowledge.id, filter={"hash": file.hash}
+        )
     except Exception as e:
         log.debug("This was most likely caused by bypassing embedding processing")
         log.debug(e)
@@ -593,6 +585,7 @@ def remove_file_from_knowledge_by_id(
             file_collection = f"file-{form_data.file_id}"
             if VECTOR_DB_CLIENT.has_collection(collection_name=file_collection):
                 VECTOR_DB_CLIENT.delete_collection(collection_name=file_collection)
+            BM25_INDEX_STORE.delete_collection(collection_name=file_collection)
         except Exception as e:
             log.debug("This was most likely caused by bypassing embedding processing")
             log.debug(e)
@@ -669,6 +662,7 @@ async def delete_knowledge_by_id(id: str, user=Depends(get_verified_user)):
     # Clean up vector DB
     try:
         VECTOR_DB_CLIENT.delete_collection(collection_name=id)
+        BM25_INDEX_STORE.delete_collection(collection_name=id)
     except Exception as e:
         log.debug(e)
         pass
@@ -702,6 +696,7 @@ async def reset_knowledge_by_id(id: str, user=Depends(get_verified_user)):
 
     try:
         VECTOR_DB_CLIENT.delete_collection(collection_name=id)
+        BM25_INDEX_STORE.delete_collection(collection_name=id)
     except Exception as e:
         log.debug(e)
         pass
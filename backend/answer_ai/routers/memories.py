@@ -87,7 +87,7 @@ async def query_memory(
 
     vector = await request.app.state.EMBEDDING_FUNCTION(form_data.content, user=user)
 
-    results = VECTOR_DB_CLIENT.search(
+    results = await VECTOR_DB_CLIENT.asearch(
         collection_name=f"user-memory-{user.id}",
         vectors=[vector],
         limit=form_data.k,
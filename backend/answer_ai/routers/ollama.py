@@ -1,12 +1,7 @@
-# TODO: Implement a more intelligent load balancing mechanism for distributing requests among multiple backend instances.
-# Current implementation uses a simple round-robin approach (random.choice). Consider incorporating algorithms like weighted round-robin,
-# least connections, or least response time for better resource utilization and performance optimization.
-
 import asyncio
 import json
 import logging
 import os
-import random
 import re
 import time
 from datetime import datetime
@@ -18,6 +13,9 @@ from aiocache import cached
 import requests
 
 from answer_ai.utils.headers import include_user_info_headers
+from answer_ai.utils.backend_routing import BACKEND_ROUTER, BackendRequest
+from answer_ai.utils.http_client import HTTP_CLIENT_POOL
+from answer_ai.utils.model_catalog import MODEL_CATALOG
 from answer_ai.models.chats import Chats
 from answer_ai.models.users import UserModel
 
@@ -76,10 +74,17 @@ log = logging.getLogger(__name__)
 ##########################################
 
 
-async def send_get_request(url, key=None, user: UserModel = None):
-    timeout = aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT_MODEL_LIST)
+async def send_get_request(
+    url,
+    key=None,
+    user: UserModel = None,
+    timeout=AIOHTTP_CLIENT_TIMEOUT_MODEL_LIST,
+    base_url: Optional[str] = None,
+):
+    """GET `url`, recording the backend health under its `base_url`."""
+    timeout = aiohttp.ClientTimeout(total=timeout)
     try:
-        async with aiohttp.ClientSession(timeout=timeout, trust_env=True) as session:
+        async with HTTP_CLIENT_POOL.session(url) as session:
             headers = {
                 "Content-Type": "application/json",
                 **({"Authorization": f"Bearer {key}"} if key else {}),
@@ -92,22 +97,55 @@ async def send_get_request(url, key=None, user: UserModel = None):
                 url,
                 headers=headers,
                 ssl=AIOHTTP_CLIENT_SESSION_SSL,
+                timeout=timeout,
             ) as response:
-                return await response.json()
+                res = await response.json()
+                BACKEND_ROUTER.record_health(base_url or url, ok=True)
+                return res
     except Exception as e:
         # Handle connection error here
         log.error(f"Connection error: {e}")
+        BACKEND_ROUTER.record_health(base_url or url, ok=False)
         return None
 
 
+async def get_model_list(
+    url: str,
+    key: Optional[str] = None,
+    user: UserModel = None,
+    api_config=None,
+    base_url: Optional[str] = None,
+):
+    """Model list of a connection, from the model catalog."""
+    api_config = api_config or {}
+    return await MODEL_CATALOG.get(
+        MODEL_CATALOG.get_key(
+            url, key, user.id if ENABLE_FORWARD_USER_INFO_HEADERS and user else None
+        ),
+        lambda: send_get_request(
+            url,
+            key,
+            user=user,
+            timeout=api_config.get(
+                "model_list_timeout", AIOHTTP_CLIENT_TIMEOUT_MODEL_LIST
+            ),
+            base_url=base_url,
+        ),
+        ttl=api_config.get("model_list_ttl"),
+    )
+
+
 async def cleanup_response(
     response: Optional[aiohttp.ClientResponse],
     session: Optional[aiohttp.ClientSession],
+    backend: Optional[BackendRequest] = None,
 ):
     if response:
         response.close()
     if session:
-        await session.close()
+        await HTTP_CLIENT_POOL.release_session(session)
+    if backend:
+        backend.done()
 
 
 async def send_post_request(
@@ -118,13 +156,14 @@ async def send_post_request(
     content_type: Optional[str] = None,
     user: UserModel = None,
     metadata: Optional[dict] = None,
+    base_url: Optional[str] = None,
 ):
 
     r = None
+    streaming = False
+    backend = BACKEND_ROUTER.begin(base_url or url)
     try:
-        session = aiohttp.ClientSession(
-            trust_env=True, timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT)
-        )
+        session = HTTP_CLIENT_POOL.get_session(url)
 
         headers = {
             "Content-Type": "application/json",
@@ -141,12 +180,14 @@ async def send_post_request(
             data=payload,
             headers=headers,
             ssl=AIOHTTP_CLIENT_SESSION_SSL,
+            timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT),
         )
+        backend.responded(r.status)
 
         if r.ok is False:
             try:
                 res = await r.json()
-                await cleanup_response(r, session)
+                await cleanup_response(r, session, backend)
                 if "error" in res:
                     raise HTTPException(status_code=r.status, detail=res["error"])
             except HTTPException as e:
@@ -165,12 +206,13 @@ async def send_post_request(
             if content_type:
                 response_headers["Content-Type"] = content_type
 
+            streaming = True
             return StreamingResponse(
                 r.content,
                 status_code=r.status,
                 headers=response_headers,
                 background=BackgroundTask(
-                    cleanup_response, response=r, session=session
+                    cleanup_response, response=r, session=session, backend=backend
                 ),
             )
         else:
@@ -180,6 +222,8 @@ async def send_post_request(
     except HTTPException as e:
         raise e  # Re-raise HTTPException to be handled by FastAPI
     except Exception as e:
+        if r is None:
+            backend.failed()
         detail = f"Ollama: {e}"
 
         raise HTTPException(
@@ -187,8 +231,8 @@ async def send_post_request(
             detail=detail if e else "ANSWERAI: Server Connection Error",
         )
     finally:
-        if not stream:
-            await cleanup_response(r, session)
+        if not streaming:
+            await cleanup_response(r, session, backend)
 
 
 def get_api_key(idx, url, configs):
@@ -296,6 +340,8 @@ async def update_config(
         if key in keys
     }
 
+    await MODEL_CATALOG.invalidate(request.app)
+
     return {
         "ENABLE_OLLAMA_API": request.app.state.config.ENABLE_OLLAMA_API,
         "OLLAMA_BASE_URLS": request.app.state.config.OLLAMA_BASE_URLS,
@@ -332,7 +378,9 @@ async def get_all_models(request: Request, user: UserModel = None):
             if (str(idx) not in request.app.state.config.OLLAMA_API_CONFIGS) and (
                 url not in request.app.state.config.OLLAMA_API_CONFIGS  # Legacy support
             ):
-                request_tasks.append(send_get_request(f"{url}/api/tags", user=user))
+                request_tasks.append(
+                    get_model_list(f"{url}/api/tags", user=user, base_url=url)
+                )
             else:
                 api_config = request.app.state.config.OLLAMA_API_CONFIGS.get(
                     str(idx),
@@ -346,7 +394,13 @@ async def get_all_models(request: Request, user: UserModel = None):
 
                 if enable:
                     request_tasks.append(
-                        send_get_request(f"{url}/api/tags", key, user=user)
+                        get_model_list(
+                            f"{url}/api/tags",
+                            key,
+                            user=user,
+                            api_config=api_config,
+                            base_url=url,
+                        )
                     )
                 else:
                     request_tasks.append(asyncio.ensure_future(asyncio.sleep(0, None)))
@@ -498,7 +552,9 @@ async def get_ollama_loaded_models(request: Request, user=Depends(get_admin_user
             if (str(idx) not in request.app.state.config.OLLAMA_API_CONFIGS) and (
                 url not in request.app.state.config.OLLAMA_API_CONFIGS  # Legacy support
             ):
-                request_tasks.append(send_get_request(f"{url}/api/ps", user=user))
+                request_tasks.append(
+                    send_get_request(f"{url}/api/ps", user=user, base_url=url)
+                )
             else:
                 api_config = request.app.state.config.OLLAMA_API_CONFIGS.get(
                     str(idx),
@@ -512,7 +568,7 @@ async def get_ollama_loaded_models(request: Request, user=Depends(get_admin_user
 
                 if enable:
                     request_tasks.append(
-                        send_get_request(f"{url}/api/ps", key, user=user)
+                        send_get_request(f"{url}/api/ps", key, user=user, base_url=url)
                     )
                 else:
                     request_tasks.append(asyncio.ensure_future(asyncio.sleep(0, None)))
@@ -535,6 +591,10 @@ async def get_ollama_loaded_models(request: Request, user=Depends(get_admin_user
                     if prefix_id:
                         model["model"] = f"{prefix_id}.{model['model']}"
 
+                BACKEND_ROUTER.set_loaded_models(
+                    url, [model["model"] for model in response.get("models", [])]
+                )
+
         models = {
             "models": merge_ollama_models_lists(
                 map(
@@ -573,6 +633,7 @@ async def get_ollama_versions(request: Request, url_idx: Optional[int] = None):
                         send_get_request(
                             f"{url}/api/version",
                             key,
+                            base_url=url,
                         )
                     )
 
@@ -676,6 +737,7 @@ async def unload_model(
         try:
             res = await send_post_request(
                 url=f"{url}/api/generate",
+                base_url=url,
                 payload=json.dumps(payload),
                 stream=False,
                 key=key,
@@ -714,6 +776,7 @@ async def pull_model(
 
     return await send_post_request(
         url=f"{url}/api/pull",
+        base_url=url,
         payload=json.dumps(payload),
         key=get_api_key(url_idx, url, request.app.state.config.OLLAMA_API_CONFIGS),
         user=user,
@@ -751,6 +814,7 @@ async def push_model(
 
     return await send_post_request(
         url=f"{url}/api/push",
+        base_url=url,
         payload=form_data.model_dump_json(exclude_none=True).encode(),
         key=get_api_key(url_idx, url, request.app.state.config.OLLAMA_API_CONFIGS),
         user=user,
@@ -778,6 +842,7 @@ async def create_model(
 
     return await send_post_request(
         url=f"{url}/api/create",
+        base_url=url,
         payload=form_data.model_dump_json(exclude_none=True).encode(),
         key=get_api_key(url_idx, url, request.app.state.config.OLLAMA_API_CONFIGS),
         user=user,
@@ -830,6 +895,7 @@ async def copy_model(
         r.raise_for_status()
 
         log.debug(f"r.text: {r.text}")
+        await MODEL_CATALOG.invalidate(request.app)
         return True
     except Exception as e:
         log.exception(e)
@@ -896,6 +962,7 @@ async def delete_model(
         r.raise_for_status()
 
         log.debug(f"r.text: {r.text}")
+        await MODEL_CATALOG.invalidate(request.app)
         return True
     except Exception as e:
         log.exception(e)
@@ -933,7 +1000,7 @@ async def show_model_info(
             detail=ERROR_MESSAGES.MODEL_NOT_FOUND(model),
         )
 
-    url_idx = random.choice(models[model]["urls"])
+    url_idx = get_url_idx(request, model)
 
     url = request.app.state.config.OLLAMA_BASE_URLS[url_idx]
     key = get_api_key(url_idx, url, request.app.state.config.OLLAMA_API_CONFIGS)
@@ -1003,7 +1070,7 @@ async def embed(
             model = f"{model}:latest"
 
         if model in models:
-            url_idx = random.choice(models[model]["urls"])
+            url_idx = get_url_idx(request, model)
         else:
             raise HTTPException(
                 status_code=400,
@@ -1085,7 +1152,7 @@ async def embeddings(
             model = f"{model}:latest"
 
         if model in models:
-            url_idx = random.choice(models[model]["urls"])
+            url_idx = get_url_idx(request, model)
         else:
             raise HTTPException(
                 status_code=400,
@@ -1173,7 +1240,7 @@ async def generate_completion(
             model = f"{model}:latest"
 
         if model in models:
-            url_idx = random.choice(models[model]["urls"])
+            url_idx = get_url_idx(request, model)
         else:
             raise HTTPException(
                 status_code=400,
@@ -1192,6 +1259,7 @@ async def generate_completion(
 
     return await send_post_request(
         url=f"{url}/api/generate",
+        base_url=url,
         payload=form_data.model_dump_json(exclude_none=True).encode(),
         key=get_api_key(url_idx, url, request.app.state.config.OLLAMA_API_CONFIGS),
         user=user,
@@ -1232,6 +1300,15 @@ class GenerateChatCompletionForm(BaseModel):
     )
 
 
+def get_url_idx(request: Request, model: str) -> int:
+    """Backend to send a request for `model` to, picked by the routing policy."""
+    return BACKEND_ROUTER.select(
+        request.app.state.config.OLLAMA_BASE_URLS,
+        request.app.state.OLLAMA_MODELS[model].get("urls", []),
+        model,
+    )
+
+
 async def get_ollama_url(request: Request, model: str, url_idx: Optional[int] = None):
     if url_idx is None:
         models = request.app.state.OLLAMA_MODELS
@@ -1240,7 +1317,7 @@ async def get_ollama_url(request: Request, model: str, url_idx: Optional[int] =
                 status_code=400,
                 detail=ERROR_MESSAGES.MODEL_NOT_FOUND(model),
             )
-        url_idx = random.choice(models[model].get("urls", []))
+        url_idx = get_url_idx(request, model)
     url = request.app.state.config.OLLAMA_BASE_URLS[url_idx]
     return url, url_idx
 
@@ -1327,6 +1404,7 @@ async def generate_chat_completion(
 
     return await send_post_request(
         url=f"{url}/api/chat",
+        base_url=url,
         payload=json.dumps(payload),
         stream=form_data.stream,
         key=get_api_key(url_idx, url, request.app.state.config.OLLAMA_API_CONFIGS),
@@ -1434,6 +1512,7 @@ async def generate_openai_completion(
 
     return await send_post_request(
         url=f"{url}/v1/completions",
+        base_url=url,
         payload=json.dumps(payload),
         stream=payload.get("stream", False),
         key=get_api_key(url_idx, url, request.app.state.config.OLLAMA_API_CONFIGS),
@@ -1516,6 +1595,7 @@ async def generate_openai_chat_completion(
 
     return await send_post_request(
         url=f"{url}/v1/chat/completions",
+        base_url=url,
         payload=json.dumps(payload),
         stream=payload.get("stream", False),
         key=get_api_key(url_idx, url, request.app.state.config.OLLAMA_API_CONFIGS),
@@ -30,6 +30,7 @@ from answer_ai.env import (
     AIOHTTP_CLIENT_TIMEOUT,
     AIOHTTP_CLIENT_TIMEOUT_MODEL_LIST,
     ENABLE_FORWARD_USER_INFO_HEADERS,
+    ENABLE_OPENAI_API_ROUTING,
     BYPASS_MODEL_ACCESS_CONTROL,
 )
 from answer_ai.models.users import UserModel
@@ -49,6 +50,9 @@ from answer_ai.utils.misc import (
 from answer_ai.utils.auth import get_admin_user, get_verified_user
 from answer_ai.utils.access_control import has_access
 from answer_ai.utils.headers import include_user_info_headers
+from answer_ai.utils.backend_routing import BACKEND_ROUTER, BackendRequest
+from answer_ai.utils.http_client import HTTP_CLIENT_POOL
+from answer_ai.utils.model_catalog import MODEL_CATALOG
 
 
 log = logging.getLogger(__name__)
@@ -61,10 +65,17 @@ log = logging.getLogger(__name__)
 ##########################################
 
 
-async def send_get_request(url, key=None, user: UserModel = None):
-    timeout = aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT_MODEL_LIST)
+async def send_get_request(
+    url,
+    key=None,
+    user: UserModel = None,
+    timeout=AIOHTTP_CLIENT_TIMEOUT_MODEL_LIST,
+    base_url: Optional[str] = None,
+):
+    """GET `url`, recording the connection health under its `base_url`."""
+    timeout = aiohttp.ClientTimeout(total=timeout)
     try:
-        async with aiohttp.ClientSession(timeout=timeout, trust_env=True) as session:
+        async with HTTP_CLIENT_POOL.session(url) as session:
             headers = {
                 **({"Authorization": f"Bearer {key}"} if key else {}),
             }
@@ -76,22 +87,55 @@ async def send_get_request(url, key=None, user: UserModel = None):
                 url,
                 headers=headers,
                 ssl=AIOHTTP_CLIENT_SESSION_SSL,
+                timeout=timeout,
             ) as response:
-                return await response.json()
+                res = await response.json()
+                BACKEND_ROUTER.record_health(base_url or url, ok=True)
+                return res
     except Exception as e:
         # Handle connection error here
         log.error(f"Connection error: {e}")
+        BACKEND_ROUTER.record_health(base_url or url, ok=False)
         return None
 
 
+async def get_model_list(
+    url: str,
+    key: Optional[str] = None,
+    user: UserModel = None,
+    api_config=None,
+    base_url: Optional[str] = None,
+):
+    """Model list of a connection, from the model catalog."""
+    api_config = api_config or {}
+    return await MODEL_CATALOG.get(
+        MODEL_CATALOG.get_key(
+            url, key, user.id if ENABLE_FORWARD_USER_INFO_HEADERS and user else None
+        ),
+        lambda: send_get_request(
+            url,
+            key,
+            user=user,
+            timeout=api_config.get(
+                "model_list_timeout", AIOHTTP_CLIENT_TIMEOUT_MODEL_LIST
+            ),
+            base_url=base_url,
+        ),
+        ttl=api_config.get("model_list_ttl"),
+    )
+
+
 async def cleanup_response(
     response: Optional[aiohttp.ClientResponse],
     session: Optional[aiohttp.ClientSession],
+    backend: Optional[BackendRequest] = None,
 ):
     if response:
         response.close()
     if session:
-        await session.close()
+        await HTTP_CLIENT_POOL.release_session(session)
+    if backend:
+        backend.done()
 
 
 def openai_reasoning_model_handler(payload):
@@ -257,6 +301,8 @@ async def update_config(
         if key in keys
     }
 
+    await MODEL_CATALOG.invalidate(request.app)
+
     return {
         "ENABLE_OPENAI_API": request.app.state.config.ENABLE_OPENAI_API,
         "OPENAI_API_BASE_URLS": request.app.state.config.OPENAI_API_BASE_URLS,
@@ -340,6 +386,15 @@ async def speech(request: Request, user=Depends(get_verified_user)):
         raise HTTPException(status_code=401, detail=ERROR_MESSAGES.OPENAI_NOT_FOUND)
 
 
+def get_url_idx(request: Request, model: dict) -> int:
+    """Connection to send a request for `model` to, picked by the routing policy."""
+    return BACKEND_ROUTER.select(
+        request.app.state.config.OPENAI_API_BASE_URLS,
+        model.get("urls", [model["urlIdx"]]),
+        model.get("id"),
+    )
+
+
 async def get_all_models_responses(request: Request, user: UserModel) -> list:
     if not request.app.state.config.ENABLE_OPENAI_API:
         return []
@@ -363,10 +418,11 @@ async def get_all_models_responses(request: Request, user: UserModel) -> list:
             url not in request.app.state.config.OPENAI_API_CONFIGS  # Legacy support
         ):
             request_tasks.append(
-                send_get_request(
+                get_model_list(
                     f"{url}/models",
                     request.app.state.config.OPENAI_API_KEYS[idx],
                     user=user,
+                    base_url=url,
                 )
             )
         else:
@@ -383,10 +439,12 @@ async def get_all_models_responses(request: Request, user: UserModel) -> list:
             if enable:
                 if len(model_ids) == 0:
                     request_tasks.append(
-                        send_get_request(
+                        get_model_list(
                             f"{url}/models",
                             request.app.state.config.OPENAI_API_KEYS[idx],
                             user=user,
+                            api_config=api_config,
+                            base_url=url,
                         )
                     )
                 else:
@@ -525,7 +583,10 @@ async def get_all_models(request: Request, user: UserModel) -> dict[str, list]:
                             "openai": model,
                             "connection_type": model.get("connection_type", "external"),
                             "urlIdx": idx,
+                            "urls": [idx],
                         }
+                    elif model_id and ENABLE_OPENAI_API_ROUTING:
+                        models[model_id]["urls"].append(idx)
 
         return models
 
@@ -557,10 +618,7 @@ async def get_models(
         )
 
         r = None
-        async with aiohttp.ClientSession(
-            trust_env=True,
-            timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT_MODEL_LIST),
-        ) as session:
+        async with HTTP_CLIENT_POOL.session(url) as session:
             try:
                 headers, cookies = await get_headers_and_cookies(
                     request, url, key, api_config, user=user
@@ -577,6 +635,9 @@ async def get_models(
                         headers=headers,
                         cookies=cookies,
                         ssl=AIOHTTP_CLIENT_SESSION_SSL,
+                        timeout=aiohttp.ClientTimeout(
+                            total=AIOHTTP_CLIENT_TIMEOUT_MODEL_LIST
+                        ),
                     ) as r:
                         if r.status != 200:
                             # Extract response error details if available
@@ -850,7 +911,7 @@ async def generate_chat_completion(
     await get_all_models(request, user=user)
     model = request.app.state.OPENAI_MODELS.get(model_id)
     if model:
-        idx = model["urlIdx"]
+        idx = get_url_idx(request, model)
     else:
         raise HTTPException(
             status_code=404,
@@ -924,11 +985,10 @@ async def generate_chat_completion(
     session = None
     streaming = False
     response = None
+    backend = BACKEND_ROUTER.begin(url)
 
     try:
-        session = aiohttp.ClientSession(
-            trust_env=True, timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT)
-        )
+        session = HTTP_CLIENT_POOL.get_session(request_url)
 
         r = await session.request(
             method="POST",
@@ -937,7 +997,9 @@ async def generate_chat_completion(
             headers=headers,
             cookies=cookies,
             ssl=AIOHTTP_CLIENT_SESSION_SSL,
+            timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT),
         )
+        backend.responded(r.status)
 
         # Check if response is SSE
         if "text/event-stream" in r.headers.get("Content-Type", ""):
@@ -947,7 +1009,7 @@ async def generate_chat_completion(
                 status_code=r.status,
                 headers=dict(r.headers),
                 background=BackgroundTask(
-                    cleanup_response, response=r, session=session
+                    cleanup_response, response=r, session=session, backend=backend
                 ),
             )
         else:
@@ -966,6 +1028,8 @@ async def generate_chat_completion(
             return response
     except Exception as e:
         log.exception(e)
+        if r is None:
+            backend.failed()
 
         raise HTTPException(
             status_code=r.status if r else 500,
@@ -973,7 +1037,7 @@ async def generate_chat_completion(
         )
     finally:
         if not streaming:
-            await cleanup_response(r, session)
+            await cleanup_response(r, session, backend)
 
 
 async def embeddings(request: Request, form_data: dict, user):
@@ -996,7 +1060,7 @@ async def embeddings(request: Request, form_data: dict, user):
     model_id = form_data.get("model")
     models = request.app.state.OPENAI_MODELS
     if model_id in models:
-        idx = models[model_id]["urlIdx"]
+        idx = get_url_idx(request, models[model_id])
 
     url = request.app.state.config.OPENAI_API_BASE_URLS[idx]
     key = request.app.state.config.OPENAI_API_KEYS[idx]
@@ -1012,8 +1076,9 @@ async def embeddings(request: Request, form_data: dict, user):
     headers, cookies = await get_headers_and_cookies(
         request, url, key, api_config, user=user
     )
+    backend = BACKEND_ROUTER.begin(url)
     try:
-        session = aiohttp.ClientSession(trust_env=True)
+        session = HTTP_CLIENT_POOL.get_session(url)
         r = await session.request(
             method="POST",
             url=f"{url}/embeddings",
@@ -1021,6 +1086,7 @@ async def embeddings(request: Request, form_data: dict, user):
             headers=headers,
             cookies=cookies,
         )
+        backend.responded(r.status)
 
         if "text/event-stream" in r.headers.get("Content-Type", ""):
             streaming = True
@@ -1029,7 +1095,7 @@ async def embeddings(request: Request, form_data: dict, user):
                 status_code=r.status,
                 headers=dict(r.headers),
                 background=BackgroundTask(
-                    cleanup_response, response=r, session=session
+                    cleanup_response, response=r, session=session, backend=backend
                 ),
             )
         else:
@@ -1049,13 +1115,15 @@ async def embeddings(request: Request, form_data: dict, user):
             return response_data
     except Exception as e:
         log.exception(e)
+        if r is None:
+            backend.failed()
         raise HTTPException(
             status_code=r.status if r else 500,
             detail="ANSWERAI: Server Connection Error",
         )
     finally:
         if not streaming:
-            await cleanup_response(r, session)
+            await cleanup_response(r, session, backend)
 
 
 @router.api_route("/{path:path}", methods=["GET", "POST", "PUT", "DELETE"])
@@ -1103,7 +1171,7 @@ async def proxy(path: str, request: Request, user=Depends(get_verified_user)):
         else:
             request_url = f"{url}/{path}"
 
-        session = aiohttp.ClientSession(trust_env=True)
+        session = HTTP_CLIENT_POOL.get_session(request_url)
         r = await session.request(
             method=request.method,
             url=request_url,
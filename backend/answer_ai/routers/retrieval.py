@@ -4,9 +4,11 @@ import mimetypes
 import os
 import shutil
 import asyncio
+import itertools
 
 import re
 import uuid
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 from datetime import datetime
 from pathlib import Path
 from typing import Iterator, List, Optional, Sequence, Union
@@ -42,6 +44,10 @@ from answer_ai.storage.provider import Storage
 
 
 from answer_ai.retrieval.vector.factory import VECTOR_DB_CLIENT
+from answer_ai.retrieval.bm25 import BM25_INDEX_STORE
+from answer_ai.retrieval.embedding_scheduler import EMBEDDING_SCHEDULER
+from answer_ai.retrieval.embedding_store import EMBEDDING_STORE
+from answer_ai.retrieval.ingestion import report_ingestion_stage
 
 # Document loaders
 from answer_ai.retrieval.loaders.main import Loader
@@ -82,7 +88,7 @@ from answer_ai.retrieval.utils import (
     get_model_path,
     query_collection,
     query_collection_with_hybrid_search,
-    query_doc,
+    aquery_doc,
     query_doc_with_hybrid_search,
 )
 from answer_ai.retrieval.vector.utils import filter_metadata
@@ -101,6 +107,7 @@ from answer_ai.config import (
     UPLOAD_DIR,
     DEFAULT_LOCALE,
     RAG_EMBEDDING_CONTENT_PREFIX,
+    RAG_EMBEDDING_WINDOW_SIZE,
     RAG_EMBEDDING_QUERY_PREFIX,
 )
 from answer_ai.env import (
@@ -1266,6 +1273,73 @@ async def update_rag_config(
 ####################################
 
 
+def split_docs(request: Request, docs: list[Document]) -> Iterator[Document]:
+    """Split documents into chunks lazily, one document at a time."""
+    if request.app.state.config.TEXT_SPLITTER in ["", "character"]:
+        text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=request.app.state.config.CHUNK_SIZE,
+            chunk_overlap=request.app.state.config.CHUNK_OVERLAP,
+            add_start_index=True,
+        )
+        for doc in docs:
+            yield from text_splitter.split_documents([doc])
+    elif request.app.state.config.TEXT_SPLITTER == "token":
+        log.info(
+            f"Using token text splitter: {request.app.state.config.TIKTOKEN_ENCODING_NAME}"
+        )
+
+        tiktoken.get_encoding(str(request.app.state.config.TIKTOKEN_ENCODING_NAME))
+        text_splitter = TokenTextSplitter(
+            encoding_name=str(request.app.state.config.TIKTOKEN_ENCODING_NAME),
+            chunk_size=request.app.state.config.CHUNK_SIZE,
+            chunk_overlap=request.app.state.config.CHUNK_OVERLAP,
+            add_start_index=True,
+        )
+        for doc in docs:
+            yield from text_splitter.split_documents([doc])
+    elif request.app.state.config.TEXT_SPLITTER == "markdown_header":
+        log.info("Using markdown header text splitter")
+
+        # Define headers to split on - covering most common markdown header levels
+        headers_to_split_on = [
+            ("#", "Header 1"),
+            ("##", "Header 2"),
+            ("###", "Header 3"),
+            ("####", "Header 4"),
+            ("#####", "Header 5"),
+            ("######", "Header 6"),
+        ]
+
+        markdown_splitter = MarkdownHeaderTextSplitter(
+            headers_to_split_on=headers_to_split_on,
+            strip_headers=False,  # Keep headers in content for context
+        )
+        text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=request.app.state.config.CHUNK_SIZE,
+            chunk_overlap=request.app.state.config.CHUNK_OVERLAP,
+            add_start_index=True,
+        )
+
+        for doc in docs:
+            md_header_splits = markdown_splitter.split_text(doc.page_content)
+            md_header_splits = text_splitter.split_documents(md_header_splits)
+
+            # Convert back to Document objects, preserving original metadata
+            for split_chunk in md_header_splits:
+                headings_list = []
+                # Extract header values in order based on headers_to_split_on
+                for _, header_meta_key_name in headers_to_split_on:
+                    if header_meta_key_name in split_chunk.metadata:
+                        headings_list.append(split_chunk.metadata[header_meta_key_name])
+
+                yield Document(
+                    page_content=split_chunk.page_content,
+                    metadata={**doc.metadata, "headings": headings_list},
+                )
+    else:
+        raise ValueError(ERROR_MESSAGES.DEFAULT("Invalid text splitter"))
+
+
 def save_docs_to_vector_db(
     request: Request,
     docs,
@@ -1276,6 +1350,15 @@ def save_docs_to_vector_db(
     add: bool = False,
     user=None,
 ) -> bool:
+    """
+    Split documents, embed their chunks and insert them into a collection.
+
+    Chunks are processed by windows of RAG_EMBEDDING_WINDOW_SIZE: each window
+    is inserted as soon as it is embedded, while the next one is embedded, so
+    memory use is bounded by the window size rather than by the documents.
+    Windows already inserted are deleted again if a later one fails.
+    """
+
     def _get_docs_info(docs: list[Document]) -> str:
         docs_info = set()
 
@@ -1310,97 +1393,26 @@ def save_docs_to_vector_db(
                 raise ValueError(ERROR_MESSAGES.DUPLICATE_CONTENT)
 
     if split:
-        if request.app.state.config.TEXT_SPLITTER in ["", "character"]:
-            text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=request.app.state.config.CHUNK_SIZE,
-                chunk_overlap=request.app.state.config.CHUNK_OVERLAP,
-                add_start_index=True,
-            )
-            docs = text_splitter.split_documents(docs)
-        elif request.app.state.config.TEXT_SPLITTER == "token":
-            log.info(
-                f"Using token text splitter: {request.app.state.config.TIKTOKEN_ENCODING_NAME}"
-            )
-
-            tiktoken.get_encoding(str(request.app.state.config.TIKTOKEN_ENCODING_NAME))
-            text_splitter = TokenTextSplitter(
-                encoding_name=str(request.app.state.config.TIKTOKEN_ENCODING_NAME),
-                chunk_size=request.app.state.config.CHUNK_SIZE,
-                chunk_overlap=request.app.state.config.CHUNK_OVERLAP,
-                add_start_index=True,
-            )
-            docs = text_splitter.split_documents(docs)
-        elif request.app.state.config.TEXT_SPLITTER == "markdown_header":
-            log.info("Using markdown header text splitter")
-
-            # Define headers to split on - covering most common markdown header levels
-            headers_to_split_on = [
-                ("#", "Header 1"),
-                ("##", "Header 2"),
-                ("###", "Header 3"),
-                ("####", "Header 4"),
-                ("#####", "Header 5"),
-                ("######", "Header 6"),
-            ]
-
-            markdown_splitter = MarkdownHeaderTextSplitter(
-                headers_to_split_on=headers_to_split_on,
-                strip_headers=False,  # Keep headers in content for context
-            )
-
-            md_split_docs = []
-            for doc in docs:
-                md_header_splits = markdown_splitter.split_text(doc.page_content)
-                text_splitter = RecursiveCharacterTextSplitter(
-                    chunk_size=request.app.state.config.CHUNK_SIZE,
-                    chunk_overlap=request.app.state.config.CHUNK_OVERLAP,
-                    add_start_index=True,
-                )
-                md_header_splits = text_splitter.split_documents(md_header_splits)
-
-                # Convert back to Document objects, preserving original metadata
-                for split_chunk in md_header_splits:
-                    headings_list = []
-                    # Extract header values in order based on headers_to_split_on
-                    for _, header_meta_key_name in headers_to_split_on:
-                        if header_meta_key_name in split_chunk.metadata:
-                            headings_list.append(
-                                split_chunk.metadata[header_meta_key_name]
-                            )
-
-                    md_split_docs.append(
-                        Document(
-                            page_content=split_chunk.page_content,
-                            metadata={**doc.metadata, "headings": headings_list},
-                        )
-                    )
-
-            docs = md_split_docs
-        else:
-            raise ValueError(ERROR_MESSAGES.DEFAULT("Invalid text splitter"))
+        report_ingestion_stage("splitting")
+        chunks = split_docs(request, docs)
+    else:
+        chunks = iter(docs)
 
-    if len(docs) == 0:
+    windows = iter(
+        lambda: list(itertools.islice(chunks, RAG_EMBEDDING_WINDOW_SIZE)), []
+    )
+    # Split the first window before touching the collection
+    window = next(windows, None)
+    if window is None:
         raise ValueError(ERROR_MESSAGES.EMPTY_CONTENT)
 
-    texts = [sanitize_text_for_db(doc.page_content) for doc in docs]
-    metadatas = [
-        {
-            **doc.metadata,
-            **(metadata if metadata else {}),
-            "embedding_config": {
-                "engine": request.app.state.config.RAG_EMBEDDING_ENGINE,
-                "model": request.app.state.config.RAG_EMBEDDING_MODEL,
-            },
-        }
-        for doc in docs
-    ]
-
     try:
         if VECTOR_DB_CLIENT.has_collection(collection_name=collection_name):
             log.info(f"collection {collection_name} already exists")
 
             if overwrite:
                 VECTOR_DB_CLIENT.delete_collection(collection_name=collection_name)
+                BM25_INDEX_STORE.delete_collection(collection_name=collection_name)
                 log.info(f"deleting existing collection {collection_name}")
             elif add is False:
                 log.info(
@@ -1409,6 +1421,7 @@ def save_docs_to_vector_db(
                 return True
 
         log.info(f"generating embeddings for {collection_name}")
+        report_ingestion_stage("embedding")
         embedding_function = get_embedding_function(
             request.app.state.config.RAG_EMBEDDING_ENGINE,
             request.app.state.config.RAG_EMBEDDING_MODEL,
@@ -1438,35 +1451,117 @@ def save_docs_to_vector_db(
                 else None
             ),
             enable_async=request.app.state.config.ENABLE_ASYNC_EMBEDDING,
+            # Document chunks would only push query embeddings out of the cache
+            cache=False,
         )
 
-        # Run async embedding in sync context
-        embeddings = asyncio.run(
-            embedding_function(
-                list(map(lambda x: x.replace("\n", " "), texts)),
-                prefix=RAG_EMBEDDING_CONTENT_PREFIX,
-                user=user,
-            )
-        )
-        log.info(f"embeddings generated {len(embeddings)} for {len(texts)} items")
-
-        items = [
-            {
-                "id": str(uuid.uuid4()),
-                "text": text,
-                "vector": embeddings[idx],
-                "metadata": metadatas[idx],
+        def embed_window(window: list[Document]) -> tuple[list[dict], int]:
+            texts = [sanitize_text_for_db(doc.page_content) for doc in window]
+
+            # Reuse the stored embeddings of chunks already embedded by this model
+            embedding_texts = list(map(lambda x: x.replace("\n", " "), texts))
+            embedding_keys = [
+                EMBEDDING_STORE.get_key(
+                    request.app.state.config.RAG_EMBEDDING_ENGINE,
+                    request.app.state.config.RAG_EMBEDDING_MODEL,
+                    RAG_EMBEDDING_CONTENT_PREFIX,
+                    text,
+                )
+                for text in embedding_texts
+            ]
+            stored_embeddings = EMBEDDING_STORE.get_many(embedding_keys)
+
+            missing = {
+                key: text
+                for key, text in zip(embedding_keys, embedding_texts)
+                if key not in stored_embeddings
             }
-            for idx, text in enumerate(texts)
-        ]
+            if missing:
+                # Run async embedding in sync context, on the application loop
+                missing_embeddings = EMBEDDING_SCHEDULER.run_sync(
+                    embedding_function(
+                        list(missing.values()),
+                        prefix=RAG_EMBEDDING_CONTENT_PREFIX,
+                        user=user,
+                    )
+                )
+                if len(missing_embeddings) != len(missing):
+                    raise ValueError(
+                        f"Generated {len(missing_embeddings)} embeddings for {len(missing)} items"
+                    )
 
-        log.info(f"adding to collection {collection_name}")
-        VECTOR_DB_CLIENT.insert(
-            collection_name=collection_name,
-            items=items,
-        )
+                missing_embeddings = dict(zip(missing, missing_embeddings))
+                EMBEDDING_STORE.put_many(missing_embeddings)
+                stored_embeddings.update(missing_embeddings)
+
+            items = [
+                {
+                    "id": str(uuid.uuid4()),
+                    "text": text,
+                    "vector": stored_embeddings[embedding_keys[idx]],
+                    "metadata": {
+                        **window[idx].metadata,
+                        **(metadata if metadata else {}),
+                        "embedding_config": {
+                            "engine": request.app.state.config.RAG_EMBEDDING_ENGINE,
+                            "model": request.app.state.config.RAG_EMBEDDING_MODEL,
+                        },
+                    },
+                }
+                for idx, text in enumerate(texts)
+            ]
+            return items, len(missing)
+
+        def insert_window(items: list[dict]) -> None:
+            VECTOR_DB_CLIENT.insert(
+                collection_name=collection_name,
+                items=items,
+            )
+            BM25_INDEX_STORE.insert(collection_name=collection_name, items=items)
+
+        inserted_ids: list[list[str]] = []
+        total = generated = 0
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            insert_future: Optional[Future] = None
+            try:
+                for window in itertools.chain([window], windows):
+                    items, window_generated = embed_window(window)
+                    total += len(items)
+                    generated += window_generated
+
+                    # The previous window is inserted while this one is embedded
+                    if insert_future is not None:
+                        insert_future.result()
+                    inserted_ids.append([item["id"] for item in items])
+                    insert_future = executor.submit(insert_window, items)
+
+                log.info(
+                    f"embeddings generated {generated} for {total} items, "
+                    f"{total - generated} reused"
+                )
+                log.info(f"adding to collection {collection_name}")
+                report_ingestion_stage("inserting")
+                insert_future.result()
+            except Exception:
+                if insert_future is not None:
+                    wait([insert_future])
+                if inserted_ids:
+                    log.info(f"removing partly added items from {collection_name}")
+                for ids in inserted_ids:
+                    try:
+                        VECTOR_DB_CLIENT.delete(
+                            collection_name=collection_name, ids=ids
+                        )
+                        BM25_INDEX_STORE.delete(
+                            collection_name=collection_name, ids=ids
+                        )
+                    except Exception as e:
+                        log.warning(
+                            f"Failed to remove items from {collection_name}: {e}"
+                        )
+                raise
 
-        log.info(f"added {len(items)} items to collection {collection_name}")
+        log.info(f"added {total} items to collection {collection_name}")
         return True
     except Exception as e:
         log.exception(e)
@@ -1479,6 +1574,38 @@ class ProcessFileForm(BaseModel):
     collection_name: Optional[str] = None
 
 
+def get_file_collection_docs(file: FileModel) -> list[Document]:
+    """
+    Documents of a processed file to add to a collection: the chunks of its
+    own collection, or its content if it has none.
+    """
+    result = VECTOR_DB_CLIENT.query(
+        collection_name=f"file-{file.id}", filter={"file_id": file.id}
+    )
+
+    if result is not None and len(result.ids[0]) > 0:
+        return [
+            Document(
+                page_content=result.documents[0][idx],
+                metadata=result.metadatas[0][idx],
+            )
+            for idx, id in enumerate(result.ids[0])
+        ]
+
+    return [
+        Document(
+            page_content=file.data.get("content", ""),
+            metadata={
+                **file.meta,
+                "name": file.filename,
+                "created_by": file.user_id,
+                "file_id": file.id,
+                "source": file.filename,
+            },
+        )
+    ]
+
+
 @router.post("/process/file")
 def process_file(
     request: Request,
@@ -1510,6 +1637,9 @@ def process_file(
                     VECTOR_DB_CLIENT.delete_collection(
                         collection_name=f"file-{file.id}"
                     )
+                    BM25_INDEX_STORE.delete_collection(
+                        collection_name=f"file-{file.id}"
+                    )
                 except:
                     # Audio file upload pipeline
                     pass
@@ -1532,38 +1662,14 @@ def process_file(
                 # Check if the file has already been processed and save the content
                 # Usage: /knowledge/{id}/file/add, /knowledge/{id}/file/update
 
-                result = VECTOR_DB_CLIENT.query(
-                    collection_name=f"file-{file.id}", filter={"file_id": file.id}
-                )
-
-                if result is not None and len(result.ids[0]) > 0:
-                    docs = [
-                        Document(
-                            page_content=result.documents[0][idx],
-                            metadata=result.metadatas[0][idx],
-                        )
-                        for idx, id in enumerate(result.ids[0])
-                    ]
-                else:
-                    docs = [
-                        Document(
-                            page_content=file.data.get("content", ""),
-                            metadata={
-                                **file.meta,
-                                "name": file.filename,
-                                "created_by": file.user_id,
-                                "file_id": file.id,
-                                "source": file.filename,
-                            },
-                        )
-                    ]
-
+                docs = get_file_collection_docs(file)
                 text_content = file.data.get("content", "")
             else:
                 # Process the file and save the content
                 # Usage: /files/
                 file_path = file.path
                 if file_path:
+                    report_ingestion_stage("loading")
                     file_path = Storage.get_file(file_path)
                     loader = Loader(
                         engine=request.app.state.config.CONTENT_EXTRACTION_ENGINE,
@@ -2279,15 +2385,15 @@ async def query_doc_handler(
             form_data.hybrid is None or form_data.hybrid
         ):
             collection_results = {}
-            collection_results[form_data.collection_name] = VECTOR_DB_CLIENT.get(
+            collection_results[form_data.collection_name] = await VECTOR_DB_CLIENT.aget(
                 collection_name=form_data.collection_name
             )
             return await query_doc_with_hybrid_search(
                 collection_name=form_data.collection_name,
                 collection_result=collection_results[form_data.collection_name],
                 query=form_data.query,
-                embedding_function=lambda query, prefix: request.app.state.EMBEDDING_FUNCTION(
-                    query, prefix=prefix, user=user
+                embedding_function=lambda query, prefix, **kwargs: request.app.state.EMBEDDING_FUNCTION(
+                    query, prefix=prefix, user=user, **kwargs
                 ),
                 k=form_data.k if form_data.k else request.app.state.config.TOP_K,
                 reranking_function=(
@@ -2317,7 +2423,7 @@ async def query_doc_handler(
             query_embedding = await request.app.state.EMBEDDING_FUNCTION(
                 form_data.query, prefix=RAG_EMBEDDING_QUERY_PREFIX, user=user
             )
-            return query_doc(
+            return await aquery_doc(
                 collection_name=form_data.collection_name,
                 query_embedding=query_embedding,
                 k=form_data.k if form_data.k else request.app.state.config.TOP_K,
@@ -2355,8 +2461,8 @@ async def query_collection_handler(
             return await query_collection_with_hybrid_search(
                 collection_names=form_data.collection_names,
                 queries=[form_data.query],
-                embedding_function=lambda query, prefix: request.app.state.EMBEDDING_FUNCTION(
-                    query, prefix=prefix, user=user
+                embedding_function=lambda query, prefix, **kwargs: request.app.state.EMBEDDING_FUNCTION(
+                    query, prefix=prefix, user=user, **kwargs
                 ),
                 k=form_data.k if form_data.k else request.app.state.config.TOP_K,
                 reranking_function=(
@@ -2390,8 +2496,8 @@ async def query_collection_handler(
             return await query_collection(
                 collection_names=form_data.collection_names,
                 queries=[form_data.query],
-                embedding_function=lambda query, prefix: request.app.state.EMBEDDING_FUNCTION(
-                    query, prefix=prefix, user=user
+                embedding_function=lambda query, prefix, **kwargs: request.app.state.EMBEDDING_FUNCTION(
+                    query, prefix=prefix, user=user, **kwargs
                 ),
                 k=form_data.k if form_data.k else request.app.state.config.TOP_K,
             )
@@ -2427,6 +2533,10 @@ def delete_entries_from_collection(form_data: DeleteForm, user=Depends(get_admin
                 collection_name=form_data.collection_name,
                 metadata={"hash": hash},
             )
+            BM25_INDEX_STORE.delete(
+                collection_name=form_data.collection_name,
+                filter={"hash": hash},
+            )
             return {"status": True}
         else:
             return {"status": False}
@@ -2438,6 +2548,8 @@ def delete_entries_from_collection(form_data: DeleteForm, user=Depends(get_admin
 @router.post("/reset/db")
 def reset_vector_db(user=Depends(get_admin_user)):
     VECTOR_DB_CLIENT.reset()
+    BM25_INDEX_STORE.reset()
+    EMBEDDING_STORE.reset()
     Knowledges.delete_all_knowledge()
 
 
@@ -11,8 +11,8 @@ import pycrdt as Y
 
 from answer_ai.models.users import Users, UserNameResponse
 from answer_ai.models.channels import Channels
-from answer_ai.models.chats import Chats
 from answer_ai.models.notes import Notes, NoteUpdateForm
+from answer_ai.utils.chat_buffer import chat_message_write_buffer
 from answer_ai.utils.redis import (
     get_sentinels_from_env,
     get_sentinel_url_from_env,
@@ -37,9 +37,19 @@ from answer_ai.env import (
     WEBSOCKET_SERVER_PING_INTERVAL,
     WEBSOCKET_SERVER_LOGGING,
     WEBSOCKET_SERVER_ENGINEIO_LOGGING,
+    WEBSOCKET_SESSION_TTL,
 )
 from answer_ai.utils.auth import decode_token
-from answer_ai.socket.utils import RedisDict, RedisLock, YdocManager
+from answer_ai.utils.auth_cache import LAST_ACTIVE_WRITER
+from answer_ai.socket.utils import (
+    RedisDict,
+    RedisLock,
+    RedisSessionPool,
+    RedisUsagePool,
+    SessionPool,
+    UsagePool,
+    YdocManager,
+)
 from answer_ai.tasks import create_task, stop_item_tasks
 from answer_ai.utils.redis import get_redis_connection
 from answer_ai.utils.access_control import has_access, get_users_with_access
@@ -55,6 +65,7 @@ log = logging.getLogger(__name__)
 
 
 REDIS = None
+REDIS_BINARY = None
 
 # Configure CORS for Socket.IO
 SOCKETIO_CORS_ORIGINS = "*" if CORS_ALLOW_ORIGIN == ["*"] else CORS_ALLOW_ORIGIN
@@ -112,6 +123,16 @@ if WEBSOCKET_MANAGER == "redis":
         redis_cluster=WEBSOCKET_REDIS_CLUSTER,
         async_mode=True,
     )
+    # Yjs documents are stored as binary
+    REDIS_BINARY = get_redis_connection(
+        redis_url=WEBSOCKET_REDIS_URL,
+        redis_sentinels=get_sentinels_from_env(
+            WEBSOCKET_SENTINEL_HOSTS, WEBSOCKET_SENTINEL_PORT
+        ),
+        redis_cluster=WEBSOCKET_REDIS_CLUSTER,
+        async_mode=True,
+        decode_responses=False,
+    )
 
     redis_sentinels = get_sentinels_from_env(
         WEBSOCKET_SENTINEL_HOSTS, WEBSOCKET_SENTINEL_PORT
@@ -124,14 +145,16 @@ if WEBSOCKET_MANAGER == "redis":
         redis_cluster=WEBSOCKET_REDIS_CLUSTER,
     )
 
-    SESSION_POOL = RedisDict(
+    SESSION_POOL = RedisSessionPool(
         f"{REDIS_KEY_PREFIX}:session_pool",
+        ttl=WEBSOCKET_SESSION_TTL,
         redis_url=WEBSOCKET_REDIS_URL,
         redis_sentinels=redis_sentinels,
         redis_cluster=WEBSOCKET_REDIS_CLUSTER,
     )
-    USAGE_POOL = RedisDict(
-        f"{REDIS_KEY_PREFIX}:usage_pool",
+    USAGE_POOL = RedisUsagePool(
+        f"{REDIS_KEY_PREFIX}:usage",
+        ttl=TIMEOUT_DURATION,
         redis_url=WEBSOCKET_REDIS_URL,
         redis_sentinels=redis_sentinels,
         redis_cluster=WEBSOCKET_REDIS_CLUSTER,
@@ -150,8 +173,8 @@ if WEBSOCKET_MANAGER == "redis":
 else:
     MODELS = {}
 
-    SESSION_POOL = {}
-    USAGE_POOL = {}
+    SESSION_POOL = SessionPool()
+    USAGE_POOL = UsagePool(ttl=TIMEOUT_DURATION)
 
     aquire_func = release_func = renew_func = lambda: True
 
@@ -159,6 +182,7 @@ else:
 YDOC_MANAGER = YdocManager(
     redis=REDIS,
     redis_key_prefix=f"{REDIS_KEY_PREFIX}:ydoc:documents",
+    redis_binary=REDIS_BINARY,
 )
 
 
@@ -189,26 +213,12 @@ async def periodic_usage_pool_cleanup():
                 log.error(f"Unable to renew cleanup lock. Exiting usage pool cleanup.")
                 raise Exception("Unable to renew usage pool cleanup lock.")
 
-            now = int(time.time())
-            send_usage = False
-            for model_id, connections in list(USAGE_POOL.items()):
-                # Creating a list of sids to remove if they have timed out
-                expired_sids = [
-                    sid
-                    for sid, details in connections.items()
-                    if now - details["updated_at"] > TIMEOUT_DURATION
-                ]
-
-                for sid in expired_sids:
-                    del connections[sid]
-
-                if not connections:
-                    log.debug(f"Cleaning up model {model_id} from usage pool")
-                    del USAGE_POOL[model_id]
-                else:
-                    USAGE_POOL[model_id] = connections
-
-                send_usage = True
+            # Only expired entries are visited
+            USAGE_POOL.cleanup()
+            expired = SESSION_POOL.cleanup()
+            if expired:
+                log.debug(f"Cleaned up {expired} expired sessions")
+
             await asyncio.sleep(TIMEOUT_DURATION)
     finally:
         release_func()
@@ -222,7 +232,7 @@ app = socketio.ASGIApp(
 
 def get_models_in_use():
     # List models that are currently in use
-    models_in_use = list(USAGE_POOL.keys())
+    models_in_use = USAGE_POOL.get_model_ids()
     return models_in_use
 
 
@@ -246,7 +256,7 @@ def get_user_ids_from_room(room):
     active_session_ids = get_session_ids_from_room(room)
 
     active_user_ids = list(
-        set([SESSION_POOL.get(session_id)["id"] for session_id in active_session_ids])
+        {user["id"] for user in SESSION_POOL.get_many(active_session_ids) if user}
     )
     return active_user_ids
 
@@ -286,15 +296,8 @@ async def enter_room_for_users(room: str, user_ids: list[str]):
 @sio.on("usage")
 async def usage(sid, data):
     if sid in SESSION_POOL:
-        model_id = data["model"]
-        # Record the timestamp for the last update
-        current_time = int(time.time())
-
-        # Store the new usage data and task
-        USAGE_POOL[model_id] = {
-            **(USAGE_POOL[model_id] if model_id in USAGE_POOL else {}),
-            sid: {"updated_at": current_time},
-        }
+        # Push back the expiry of the model usage
+        USAGE_POOL.touch(data["model"])
 
 
 @sio.event
@@ -304,7 +307,7 @@ async def connect(sid, environ, auth):
         data = decode_token(auth["token"])
 
         if data is not None and "id" in data:
-            user = Users.get_user_by_id(data["id"])
+            user = await Users.aget_user_by_id(data["id"])
 
         if user:
             SESSION_POOL[sid] = user.model_dump(
@@ -324,7 +327,7 @@ async def user_join(sid, data):
     if data is None or "id" not in data:
         return
 
-    user = Users.get_user_by_id(data["id"])
+    user = await Users.aget_user_by_id(data["id"])
     if not user:
         return
 
@@ -353,7 +356,8 @@ async def user_join(sid, data):
 async def heartbeat(sid, data):
     user = SESSION_POOL.get(sid)
     if user:
-        Users.update_last_active_by_id(user["id"])
+        SESSION_POOL.touch(sid)
+        LAST_ACTIVE_WRITER.touch(user["id"])
 
 
 @sio.on("join-channels")
@@ -366,7 +370,7 @@ async def join_channel(sid, data):
     if data is None or "id" not in data:
         return
 
-    user = Users.get_user_by_id(data["id"])
+    user = await Users.aget_user_by_id(data["id"])
     if not user:
         return
 
@@ -387,7 +391,7 @@ async def join_note(sid, data):
     if token_data is None or "id" not in token_data:
         return
 
-    user = Users.get_user_by_id(token_data["id"])
+    user = await Users.aget_user_by_id(token_data["id"])
     if not user:
         return
 
@@ -443,6 +447,23 @@ async def channel_events(sid, data):
         Channels.update_member_last_read_at(data["channel_id"], user["id"])
 
 
+async def get_document_state(document_id: str, state_vector=None) -> dict:
+    """
+    The Yjs document as a single update. A client which sent the state
+    vector of its copy only gets what it misses, along with the state vector
+    of the server to send back what the server misses.
+    """
+    state = await YDOC_MANAGER.get_state(document_id)
+    if not state_vector:
+        return {"state": list(state)}  # Convert bytes to list for JSON
+
+    return {
+        "state": list(Y.get_update(state, bytes(state_vector))),
+        "state_vector": list(Y.get_state(state)),
+        "incremental": True,
+    }
+
+
 @sio.on("ydoc:document:join")
 async def ydoc_document_join(sid, data):
     """Handle user joining a document"""
@@ -482,19 +503,12 @@ async def ydoc_document_join(sid, data):
 
         active_session_ids = get_session_ids_from_room(f"doc_{document_id}")
 
-        # Get the Yjs document state
-        ydoc = Y.Doc()
-        updates = await YDOC_MANAGER.get_updates(document_id)
-        for update in updates:
-            ydoc.apply_update(bytes(update))
-
-        # Encode the entire document state as an update
-        state_update = ydoc.get_update()
+        state = await get_document_state(document_id, data.get("state_vector"))
         await sio.emit(
             "ydoc:document:state",
             {
                 "document_id": document_id,
-                "state": list(state_update),  # Convert bytes to list for JSON
+                **state,
                 "sessions": active_session_ids,
             },
             room=sid,
@@ -558,20 +572,12 @@ async def yjs_document_state(sid, data):
             log.warning(f"Document {document_id} not found")
             return
 
-        # Get the Yjs document state
-        ydoc = Y.Doc()
-        updates = await YDOC_MANAGER.get_updates(document_id)
-        for update in updates:
-            ydoc.apply_update(bytes(update))
-
-        # Encode the entire document state as an update
-        state_update = ydoc.get_update()
-
+        state = await get_document_state(document_id, data.get("state_vector"))
         await sio.emit(
             "ydoc:document:state",
             {
                 "document_id": document_id,
-                "state": list(state_update),  # Convert bytes to list for JSON
+                **state,
                 "sessions": active_session_ids,
             },
             room=sid,
@@ -711,35 +717,25 @@ def get_event_emitter(request_info, update_db=True):
             and not request_info.get("chat_id", "").startswith("local:")
         ):
 
+            # Buffered, appended in place by the database on flush
             if "type" in event_data and event_data["type"] == "status":
-                Chats.add_message_status_to_chat_by_id_and_message_id(
+                chat_message_write_buffer.append(
                     request_info["chat_id"],
                     request_info["message_id"],
-                    event_data.get("data", {}),
+                    append={"statusHistory": [event_data.get("data", {})]},
                 )
 
             if "type" in event_data and event_data["type"] == "message":
-                message = Chats.get_message_by_id_and_message_id(
+                chat_message_write_buffer.append(
                     request_info["chat_id"],
                     request_info["message_id"],
+                    content=event_data.get("data", {}).get("content", ""),
                 )
 
-                if message:
-                    content = message.get("content", "")
-                    content += event_data.get("data", {}).get("content", "")
-
-                    Chats.upsert_message_to_chat_by_id_and_message_id(
-                        request_info["chat_id"],
-                        request_info["message_id"],
-                        {
-                            "content": content,
-                        },
-                    )
-
             if "type" in event_data and event_data["type"] == "replace":
                 content = event_data.get("data", {}).get("content", "")
 
-                Chats.upsert_message_to_chat_by_id_and_message_id(
+                chat_message_write_buffer.put(
                     request_info["chat_id"],
                     request_info["message_id"],
                     {
@@ -748,56 +744,26 @@ def get_event_emitter(request_info, update_db=True):
                 )
 
             if "type" in event_data and event_data["type"] == "embeds":
-                message = Chats.get_message_by_id_and_message_id(
+                chat_message_write_buffer.append(
                     request_info["chat_id"],
                     request_info["message_id"],
-                )
-
-                embeds = event_data.get("data", {}).get("embeds", [])
-                embeds.extend(message.get("embeds", []))
-
-                Chats.upsert_message_to_chat_by_id_and_message_id(
-                    request_info["chat_id"],
-                    request_info["message_id"],
-                    {
-                        "embeds": embeds,
-                    },
+                    prepend={"embeds": event_data.get("data", {}).get("embeds", [])},
                 )
 
             if "type" in event_data and event_data["type"] == "files":
-                message = Chats.get_message_by_id_and_message_id(
+                chat_message_write_buffer.append(
                     request_info["chat_id"],
                     request_info["message_id"],
-                )
-
-                files = event_data.get("data", {}).get("files", [])
-                files.extend(message.get("files", []))
-
-                Chats.upsert_message_to_chat_by_id_and_message_id(
-                    request_info["chat_id"],
-                    request_info["message_id"],
-                    {
-                        "files": files,
-                    },
+                    prepend={"files": event_data.get("data", {}).get("files", [])},
                 )
 
             if event_data.get("type") in ["source", "citation"]:
                 data = event_data.get("data", {})
                 if data.get("type") == None:
-                    message = Chats.get_message_by_id_and_message_id(
-                        request_info["chat_id"],
-                        request_info["message_id"],
-                    )
-
-                    sources = message.get("sources", [])
-                    sources.append(data)
-
-                    Chats.upsert_message_to_chat_by_id_and_message_id(
+                    chat_message_write_buffer.append(
                         request_info["chat_id"],
                         request_info["message_id"],
-                        {
-                            "sources": sources,
-                        },
+                        append={"sources": [data]},
                     )
 
     if (
@@ -1,10 +1,38 @@
+import asyncio
 import json
+import logging
+import time
 import uuid
 from answer_ai.utils.redis import get_redis_connection
-from answer_ai.env import REDIS_KEY_PREFIX
+from answer_ai.env import REDIS_KEY_PREFIX, YDOC_COMPACTION_THRESHOLD
 from typing import Optional, List, Tuple
 import pycrdt as Y
 
+log = logging.getLogger(__name__)
+
+
+def decode_update(update: bytes) -> bytes:
+    # Updates were stored as JSON lists of ints before binary storage
+    if update[:1] == b"[":
+        try:
+            return bytes(json.loads(update))
+        except ValueError:
+            pass
+    return update
+
+
+# Sets the snapshot of a document and drops the updates merged into it, in
+# one step so that readers never see both or neither, unless the document
+# was cleared meanwhile
+COMPACT_DOCUMENT_SCRIPT = """
+if redis.call("EXISTS", KEYS[1]) == 0 then
+    return 0
+end
+redis.call("SET", KEYS[2], ARGV[1])
+redis.call("LTRIM", KEYS[1], ARGV[2], -1)
+return 1
+"""
+
 
 class RedisLock:
     def __init__(
@@ -117,53 +145,337 @@ class RedisDict:
         return self[key]
 
 
+class SessionPool(dict):
+    """Sessions by sid, in memory for a single process."""
+
+    def get_many(self, keys):
+        return [self.get(key) for key in keys]
+
+    def touch(self, key):
+        pass
+
+    def cleanup(self) -> int:
+        return 0
+
+
+class RedisSessionPool(RedisDict):
+    """
+    Sessions by sid, shared by every process. The expiry of each session,
+    pushed back on every heartbeat, is kept in a sorted set so that sessions
+    left by a process which died are dropped without scanning all sessions.
+    """
+
+    def __init__(self, name, ttl, redis_url, redis_sentinels=[], redis_cluster=False):
+        super().__init__(name, redis_url, redis_sentinels, redis_cluster)
+        self.expiry_name = f"{name}:expiry"
+        self.ttl = ttl
+
+    def __setitem__(self, key, value):
+        pipe = self.redis.pipeline()
+        pipe.hset(self.name, key, json.dumps(value))
+        if self.ttl:
+            pipe.zadd(self.expiry_name, {key: time.time() + self.ttl})
+        pipe.execute()
+
+    def __delitem__(self, key):
+        pipe = self.redis.pipeline()
+        pipe.hdel(self.name, key)
+        pipe.zrem(self.expiry_name, key)
+        result, _ = pipe.execute()
+        if result == 0:
+            raise KeyError(key)
+
+    def get_many(self, keys):
+        """Sessions of `keys` in one round-trip, None for unknown ones."""
+        if not keys:
+            return []
+        return [
+            json.loads(value) if value is not None else None
+            for value in self.redis.hmget(self.name, keys)
+        ]
+
+    def touch(self, key):
+        if self.ttl:
+            self.redis.zadd(self.expiry_name, {key: time.time() + self.ttl}, xx=True)
+
+    def cleanup(self) -> int:
+        """Drop the expired sessions, returns how many were dropped."""
+        if not self.ttl:
+            return 0
+
+        expired = self.redis.zrangebyscore(self.expiry_name, "-inf", time.time())
+        if expired:
+            pipe = self.redis.pipeline()
+            pipe.hdel(self.name, *expired)
+            pipe.zrem(self.expiry_name, *expired)
+            pipe.execute()
+        return len(expired)
+
+
+class UsagePool:
+    """Models in use, by the expiry of their last usage, in memory."""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.models = {}
+
+    def touch(self, model_id):
+        self.models[model_id] = time.time() + self.ttl
+
+    def get_model_ids(self):
+        now = time.time()
+        return [
+            model_id for model_id, expires_at in self.models.items() if expires_at > now
+        ]
+
+    def cleanup(self) -> int:
+        now = time.time()
+        expired = [
+            model_id
+            for model_id, expires_at in self.models.items()
+            if expires_at <= now
+        ]
+        for model_id in expired:
+            del self.models[model_id]
+        return len(expired)
+
+
+class RedisUsagePool:
+    """
+    Models in use, shared by every process, as a sorted set of model ids by
+    the expiry of their last usage. The set expires with its last usage.
+    """
+
+    def __init__(self, name, ttl, redis_url, redis_sentinels=[], redis_cluster=False):
+        self.name = name
+        self.ttl = ttl
+        self.redis = get_redis_connection(
+            redis_url,
+            redis_sentinels,
+            redis_cluster=redis_cluster,
+            decode_responses=True,
+        )
+
+    def touch(self, model_id):
+        pipe = self.redis.pipeline()
+        pipe.zadd(self.name, {model_id: time.time() + self.ttl})
+        pipe.expire(self.name, max(int(self.ttl) * 2, 1))
+        pipe.execute()
+
+    def get_model_ids(self):
+        return self.redis.zrangebyscore(self.name, f"({time.time()}", "+inf")
+
+    def cleanup(self) -> int:
+        return self.redis.zremrangebyscore(self.name, "-inf", time.time())
+
+
 class YdocManager:
+    """
+    Yjs documents being edited, as a snapshot merging their past updates
+    and the log of updates appended since.
+
+    Once the log holds `compaction_threshold` updates, it is merged into the
+    snapshot in the background, so the size of a document and the time to
+    load it follow its content rather than its edit history. With Redis,
+    updates and snapshots are stored as binary through `redis_binary`, a
+    connection which doesn't decode responses.
+
+    The Redis keys of a document share the document id as hash tag, so that
+    they are in one Redis Cluster slot and can be read and compacted
+    together. Documents still under the former untagged keys are read from
+    them too, and moved to the tagged keys by their next compaction.
+    """
+
     def __init__(
         self,
         redis=None,
         redis_key_prefix: str = f"{REDIS_KEY_PREFIX}:ydoc:documents",
+        redis_binary=None,
+        compaction_threshold: int = YDOC_COMPACTION_THRESHOLD,
     ):
         self._updates = {}
+        self._states = {}
         self._users = {}
         self._redis = redis
+        self._redis_binary = redis_binary if redis_binary is not None else redis
         self._redis_key_prefix = redis_key_prefix
+        self._compaction_threshold = compaction_threshold
+        self._compactions = {}
+
+    def _get_key(self, document_id: str, name: str) -> str:
+        return f"{self._redis_key_prefix}:{{{document_id}}}:{name}"
+
+    def _get_legacy_key(self, document_id: str, name: str) -> str:
+        return f"{self._redis_key_prefix}:{document_id}:{name}"
+
+    async def _get_legacy_updates(self, document_id: str) -> List[bytes]:
+        """Snapshot and updates of the document under the untagged keys."""
+        pipe = self._redis_binary.pipeline(transaction=False)
+        pipe.get(self._get_legacy_key(document_id, "state"))
+        pipe.lrange(self._get_legacy_key(document_id, "updates"), 0, -1)
+        state, updates = await pipe.execute()
+
+        updates = [decode_update(update) for update in updates]
+        return [state, *updates] if state else updates
+
+    async def _move_legacy_updates(self, document_id: str):
+        """Append the content of the untagged keys to the log, as one update."""
+        updates = await self._get_legacy_updates(document_id)
+        if not updates:
+            return
+
+        merged = await asyncio.to_thread(Y.merge_updates, *updates)
+        await self._redis_binary.rpush(self._get_key(document_id, "updates"), merged)
+        await self._redis.delete(
+            self._get_legacy_key(document_id, "updates"),
+            self._get_legacy_key(document_id, "state"),
+        )
 
     async def append_to_updates(self, document_id: str, update: bytes):
         document_id = document_id.replace(":", "_")
         if self._redis:
-            redis_key = f"{self._redis_key_prefix}:{document_id}:updates"
-            await self._redis.rpush(redis_key, json.dumps(list(update)))
+            redis_key = self._get_key(document_id, "updates")
+            length = await self._redis_binary.rpush(redis_key, bytes(update))
         else:
             if document_id not in self._updates:
                 self._updates[document_id] = []
-            self._updates[document_id].append(update)
+            self._updates[document_id].append(bytes(update))
+            length = len(self._updates[document_id])
+
+        if self._compaction_threshold and length >= self._compaction_threshold:
+            self.start_compaction(document_id)
 
     async def get_updates(self, document_id: str) -> List[bytes]:
+        """
+        Snapshot of the document, if any, followed by the updates since.
+        Updates of the untagged keys come first, updates merge in any order.
+        """
         document_id = document_id.replace(":", "_")
 
+        legacy_updates = []
         if self._redis:
-            redis_key = f"{self._redis_key_prefix}:{document_id}:updates"
-            updates = await self._redis.lrange(redis_key, 0, -1)
-            return [bytes(json.loads(update)) for update in updates]
+            redis_key = self._get_key(document_id, "updates")
+            redis_state_key = self._get_key(document_id, "state")
+
+            # Read before the tagged keys, which a compaction moves them to
+            legacy_updates = await self._get_legacy_updates(document_id)
+
+            # Read at once, so a compaction doesn't land in between
+            pipe = self._redis_binary.pipeline(transaction=True)
+            pipe.get(redis_state_key)
+            pipe.lrange(redis_key, 0, -1)
+            state, updates = await pipe.execute()
+
+            updates = [decode_update(update) for update in updates]
         else:
-            return self._updates.get(document_id, [])
+            state = self._states.get(document_id)
+            updates = list(self._updates.get(document_id, []))
+
+        if legacy_updates or (
+            self._compaction_threshold and len(updates) >= self._compaction_threshold
+        ):
+            self.start_compaction(document_id)
+
+        return [*legacy_updates, *([state] if state else []), *updates]
+
+    async def get_state(self, document_id: str) -> bytes:
+        """The document as a single update."""
+        updates = await self.get_updates(document_id)
+        if not updates:
+            return Y.Doc().get_update()
+        elif len(updates) == 1:
+            return updates[0]
+        return Y.merge_updates(*updates)
+
+    def start_compaction(self, document_id: str):
+        task = self._compactions.get(document_id)
+        if task is None or task.done():
+            self._compactions[document_id] = asyncio.create_task(
+                self.compact_document(document_id)
+            )
+
+    async def compact_document(self, document_id: str):
+        """Merge the update log of the document into its snapshot."""
+        document_id = document_id.replace(":", "_")
+
+        try:
+            if self._redis:
+                redis_key = self._get_key(document_id, "updates")
+                redis_state_key = self._get_key(document_id, "state")
+                redis_lock_key = self._get_key(document_id, "compaction")
+
+                # One worker compacts a document at a time
+                if not await self._redis.set(redis_lock_key, "1", nx=True, ex=60):
+                    return
+
+                try:
+                    await self._move_legacy_updates(document_id)
+
+                    state = await self._redis_binary.get(redis_state_key)
+                    updates = await self._redis_binary.lrange(redis_key, 0, -1)
+                    if not updates:
+                        return
+
+                    updates = [decode_update(update) for update in updates]
+                    merged = await asyncio.to_thread(
+                        Y.merge_updates, *([state] if state else []), *updates
+                    )
+
+                    # Updates appended meanwhile are kept
+                    await self._redis_binary.eval(
+                        COMPACT_DOCUMENT_SCRIPT,
+                        2,
+                        redis_key,
+                        redis_state_key,
+                        merged,
+                        len(updates),
+                    )
+                finally:
+                    await self._redis.delete(redis_lock_key)
+            else:
+                updates = self._updates.get(document_id, [])
+                if not updates:
+                    return
+
+                state = self._states.get(document_id)
+                count = len(updates)
+                merged = await asyncio.to_thread(
+                    Y.merge_updates, *([state] if state else []), *updates[:count]
+                )
+                if self._updates.get(document_id) is not updates:
+                    # Cleared meanwhile
+                    return
+
+                self._states[document_id] = merged
+                del updates[:count]
+        except Exception as e:
+            log.warning(f"Failed to compact document {document_id}: {e}")
 
     async def document_exists(self, document_id: str) -> bool:
         document_id = document_id.replace(":", "_")
 
         if self._redis:
-            redis_key = f"{self._redis_key_prefix}:{document_id}:updates"
-            return await self._redis.exists(redis_key) > 0
+            return (
+                await self._redis.exists(
+                    self._get_key(document_id, "updates"),
+                    self._get_key(document_id, "state"),
+                    self._get_legacy_key(document_id, "updates"),
+                    self._get_legacy_key(document_id, "state"),
+                )
+                > 0
+            )
         else:
-            return document_id in self._updates
+            return document_id in self._updates or document_id in self._states
 
     async def get_users(self, document_id: str) -> List[str]:
         document_id = document_id.replace(":", "_")
 
         if self._redis:
-            redis_key = f"{self._redis_key_prefix}:{document_id}:users"
-            users = await self._redis.smembers(redis_key)
-            return list(users)
+            users = await self._redis.smembers(self._get_key(document_id, "users"))
+            legacy_users = await self._redis.smembers(
+                self._get_legacy_key(document_id, "users")
+            )
+            return list(users | legacy_users)
         else:
             return self._users.get(document_id, [])
 
@@ -171,8 +483,7 @@ class YdocManager:
         document_id = document_id.replace(":", "_")
 
         if self._redis:
-            redis_key = f"{self._redis_key_prefix}:{document_id}:users"
-            await self._redis.sadd(redis_key, user_id)
+            await self._redis.sadd(self._get_key(document_id, "users"), user_id)
         else:
             if document_id not in self._users:
                 self._users[document_id] = set()
@@ -182,8 +493,8 @@ class YdocManager:
         document_id = document_id.replace(":", "_")
 
         if self._redis:
-            redis_key = f"{self._redis_key_prefix}:{document_id}:users"
-            await self._redis.srem(redis_key, user_id)
+            await self._redis.srem(self._get_key(document_id, "users"), user_id)
+            await self._redis.srem(self._get_legacy_key(document_id, "users"), user_id)
         else:
             if document_id in self._users and user_id in self._users[document_id]:
                 self._users[document_id].remove(user_id)
@@ -199,7 +510,7 @@ class YdocManager:
                 if key.endswith(":users"):
                     await self._redis.srem(key, user_id)
 
-                    document_id = key.split(":")[-2]
+                    document_id = key.split(":")[-2].strip("{}")
                     if len(await self.get_users(document_id)) == 0:
                         await self.clear_document(document_id)
 
@@ -216,12 +527,17 @@ class YdocManager:
         document_id = document_id.replace(":", "_")
 
         if self._redis:
-            redis_key = f"{self._redis_key_prefix}:{document_id}:updates"
-            await self._redis.delete(redis_key)
-            redis_users_key = f"{self._redis_key_prefix}:{document_id}:users"
-            await self._redis.delete(redis_users_key)
+            await self._redis.delete(
+                *[
+                    get_key(document_id, name)
+                    for get_key in (self._get_key, self._get_legacy_key)
+                    for name in ("updates", "state", "users")
+                ]
+            )
         else:
             if document_id in self._updates:
                 del self._updates[document_id]
+            if document_id in self._states:
+                del self._states[document_id]
             if document_id in self._users:
                 del self._users[document_id]
@@ -0,0 +1,177 @@
+import importlib.util
+from pathlib import Path
+
+import pytest
+import sqlalchemy as sa
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+
+import answer_ai
+
+VERSIONS_DIR = Path(answer_ai.__file__).parent / "migrations" / "versions"
+
+
+def load_migration(name: str):
+    spec = importlib.util.spec_from_file_location(name, VERSIONS_DIR / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+add_chat_message_table = load_migration("f3b2a7c81d4e_add_chat_message_table")
+add_chat_message_search_index = load_migration(
+    "8d1e4c2b9f6a_add_chat_message_search_index"
+)
+
+CHAT = {
+    "title": "New Chat",
+    "history": {
+        "currentId": "2",
+        "messages": {
+            "1": {
+                "id": "1",
+                "parentId": None,
+                "role": "user",
+                "content": "Hello there",
+                "timestamp": 1700000000,
+            },
+            "2": {
+                "id": "2",
+                "parentId": "1",
+                "role": "assistant",
+                "content": "General Kenobi",
+                "timestamp": 1700000005,
+            },
+        },
+    },
+    "messages": [],
+}
+
+
+def run(engine, migration):
+    with engine.begin() as conn:
+        with Operations.context(MigrationContext.configure(conn)):
+            migration()
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = sa.create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    with engine.begin() as conn:
+        conn.execute(sa.text("CREATE TABLE chat (id VARCHAR PRIMARY KEY, chat JSON)"))
+        conn.execute(
+            sa.text("INSERT INTO chat (id, chat) VALUES (:id, :chat)"),
+            [
+                {"id": "chat", "chat": sa.JSON().bind_processor(engine.dialect)(CHAT)},
+                {"id": "legacy", "chat": '{"title": "No history"}'},
+            ],
+        )
+    yield engine
+    engine.dispose()
+
+
+def get_chats(conn) -> dict:
+    rows = conn.execute(sa.text("SELECT id, json(chat) AS chat FROM chat"))
+    return {
+        row.id: sa.JSON().result_processor(conn.dialect, None)(row.chat) for row in rows
+    }
+
+
+def search(conn, query: str) -> list[str]:
+    rows = conn.execute(
+        sa.text(
+            "SELECT message.message_id FROM chat_message_fts "
+            "JOIN chat_message AS message ON message.rowid = chat_message_fts.rowid "
+            "WHERE chat_message_fts MATCH :query ORDER BY message.message_id"
+        ),
+        {"query": query},
+    )
+    return [row.message_id for row in rows]
+
+
+class TestAddChatMessageTable:
+    def test_backfill(self, engine):
+        run(engine, add_chat_message_table.upgrade)
+
+        with engine.connect() as conn:
+            rows = conn.execute(
+                sa.text(
+                    "SELECT chat_id, message_id, parent_id, role, content, created_at "
+                    "FROM chat_message ORDER BY message_id"
+                )
+            ).fetchall()
+            assert [tuple(row) for row in rows] == [
+                ("chat", "1", None, "user", "Hello there", 1700000000),
+                ("chat", "2", "1", "assistant", "General Kenobi", 1700000005),
+            ]
+
+            chats = get_chats(conn)
+            assert chats["chat"] == {
+                "title": "New Chat",
+                "history": {"currentId": "2"},
+            }
+            assert chats["legacy"] == {"title": "No history"}
+
+    def test_downgrade(self, engine):
+        run(engine, add_chat_message_table.upgrade)
+        run(engine, add_chat_message_table.downgrade)
+
+        with engine.connect() as conn:
+            chats = get_chats(conn)
+            assert chats["chat"]["history"] == CHAT["history"]
+            assert chats["chat"]["messages"] == [
+                CHAT["history"]["messages"]["1"],
+                CHAT["history"]["messages"]["2"],
+            ]
+            assert chats["legacy"] == {"title": "No history"}
+            assert not sa.inspect(conn).has_table("chat_message")
+
+
+class TestAddChatMessageSearchIndex:
+    @pytest.fixture(autouse=True)
+    def upgrade(self, engine):
+        run(engine, add_chat_message_table.upgrade)
+        run(engine, add_chat_message_search_index.upgrade)
+
+    def test_rebuild(self, engine):
+        with engine.connect() as conn:
+            assert search(conn, '"kenobi"*') == ["2"]
+
+    def test_prefix_matching(self, engine):
+        with engine.connect() as conn:
+            assert search(conn, '"gen"*') == ["2"]
+            assert search(conn, '"HEL"*') == ["1"]
+            # Words are matched by prefix, not as substrings
+            assert search(conn, '"enobi"*') == []
+            assert search(conn, '"hello"* "kenobi"*') == []
+
+    def test_triggers(self, engine):
+        with engine.begin() as conn:
+            conn.execute(
+                sa.text(
+                    "UPDATE chat_message SET content = 'You are a bold one' "
+                    "WHERE message_id = '2'"
+                )
+            )
+            assert search(conn, '"kenobi"*') == []
+            assert search(conn, '"bold"*') == ["2"]
+
+            conn.execute(sa.text("DELETE FROM chat_message WHERE message_id = '2'"))
+            assert search(conn, '"bold"*') == []
+
+            conn.execute(
+                sa.text(
+                    "INSERT INTO chat_message "
+                    "(id, chat_id, message_id, role, content, created_at, updated_at) "
+                    "VALUES ('new', 'chat', '3', 'user', 'Bolder still', 0, 0)"
+                )
+            )
+            assert search(conn, '"bold"*') == ["3"]
+
+    def test_downgrade(self, engine):
+        run(engine, add_chat_message_search_index.downgrade)
+
+        with engine.connect() as conn:
+            inspector = sa.inspect(conn)
+            assert not inspector.has_table("chat_message_fts")
+            assert inspector.has_table("chat_message")
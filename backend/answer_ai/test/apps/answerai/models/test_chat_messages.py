@@ -0,0 +1,216 @@
+import uuid
+
+import pytest
+
+from answer_ai.internal.db import get_db
+from answer_ai.models.chats import Chat, ChatForm, ChatMessage, Chats
+
+
+def get_chat(title: str = "New Chat") -> dict:
+    return {
+        "title": title,
+        "models": ["model"],
+        "history": {
+            "currentId": "3",
+            "messages": {
+                "1": {
+                    "id": "1",
+                    "parentId": None,
+                    "childrenIds": ["2", "3"],
+                    "role": "user",
+                    "content": "Hello there",
+                },
+                "2": {
+                    "id": "2",
+                    "parentId": "1",
+                    "childrenIds": [],
+                    "role": "assistant",
+                    "content": "Regenerated away",
+                },
+                "3": {
+                    "id": "3",
+                    "parentId": "1",
+                    "childrenIds": [],
+                    "role": "assistant",
+                    "content": "General Kenobi",
+                },
+            },
+        },
+    }
+
+
+class TestSplitChat:
+    def test_round_trip(self):
+        chat = get_chat()
+        stored, messages_map = Chats._split_chat(chat)
+
+        assert messages_map == chat["history"]["messages"]
+        assert stored == {
+            "title": "New Chat",
+            "models": ["model"],
+            "history": {"currentId": "3"},
+        }
+
+        assembled = Chats._assemble_chat(stored, messages_map)
+        assert assembled["history"] == chat["history"]
+        # The current branch only
+        assert [message["id"] for message in assembled["messages"]] == ["1", "3"]
+
+    def test_messages_list_is_dropped(self):
+        chat = {**get_chat(), "messages": [{"id": "stale"}]}
+        stored, _ = Chats._split_chat(chat)
+        assert "messages" not in stored
+
+    def test_not_split(self):
+        for chat in [
+            {"title": "New Chat"},
+            {"history": None},
+            {"history": {"currentId": None}},
+            {"history": {"messages": []}},
+        ]:
+            assert Chats._split_chat(chat) == (chat, None)
+
+    def test_input_is_not_mutated(self):
+        chat = get_chat()
+        Chats._split_chat(chat)
+        assert "messages" in chat["history"]
+
+
+@pytest.fixture
+def user_id():
+    user_id = str(uuid.uuid4())
+    yield user_id
+    Chats.delete_chats_by_user_id(user_id)
+
+
+class TestChatMessages:
+    def test_insert_and_get(self, user_id):
+        chat = Chats.insert_new_chat(user_id, ChatForm(chat=get_chat()))
+
+        with get_db() as db:
+            rows = db.query(ChatMessage).filter_by(chat_id=chat.id).all()
+            assert {row.message_id: row.content for row in rows} == {
+                "1": "Hello there",
+                "2": "Regenerated away",
+                "3": "General Kenobi",
+            }
+            assert {row.message_id: row.parent_id for row in rows} == {
+                "1": None,
+                "2": "1",
+                "3": "1",
+            }
+
+        chat = Chats.get_chat_by_id(chat.id)
+        assert chat.chat["history"]["messages"] == get_chat()["history"]["messages"]
+        assert [message["id"] for message in chat.chat["messages"]] == ["1", "3"]
+
+    def test_update(self, user_id):
+        chat = Chats.insert_new_chat(user_id, ChatForm(chat=get_chat()))
+
+        updated = get_chat()
+        del updated["history"]["messages"]["2"]
+        updated["history"]["messages"]["3"]["content"] = "You are a bold one"
+        Chats.update_chat_by_id(chat.id, updated)
+
+        chat = Chats.get_chat_by_id(chat.id)
+        assert chat.chat["history"]["messages"] == updated["history"]["messages"]
+
+    def test_upsert_message(self, user_id):
+        chat = Chats.insert_new_chat(user_id, ChatForm(chat=get_chat()))
+        Chats.upsert_message_to_chat_by_id_and_message_id(
+            chat.id, "3", {"content": "Edited"}
+        )
+
+        chat = Chats.get_chat_by_id(chat.id)
+        assert chat.chat["history"]["messages"]["3"]["content"] == "Edited"
+        assert chat.chat["history"]["messages"]["3"]["role"] == "assistant"
+
+    def test_append(self, user_id):
+        chat = Chats.insert_new_chat(user_id, ChatForm(chat=get_chat()))
+        Chats.append_to_message_by_id_and_message_id(
+            chat.id,
+            "3",
+            content="!",
+            append={"statusHistory": [{"done": True}]},
+            prepend={"files": [{"id": "file"}]},
+        )
+
+        message = Chats.get_chat_by_id(chat.id).chat["history"]["messages"]["3"]
+        assert message["content"] == "General Kenobi!"
+        assert message["statusHistory"] == [{"done": True}]
+        assert message["files"] == [{"id": "file"}]
+
+    def test_append_bumps_chat_updated_at(self, user_id):
+        chat = Chats.insert_new_chat(user_id, ChatForm(chat=get_chat()))
+        with get_db() as db:
+            db.query(Chat).filter_by(id=chat.id).update({"updated_at": 0})
+            db.commit()
+
+        Chats.append_to_message_by_id_and_message_id(chat.id, "3", content="!")
+        assert Chats.get_chat_by_id(chat.id).updated_at > 0
+
+    def test_append_skips_missing_message(self, user_id):
+        chat = Chats.insert_new_chat(user_id, ChatForm(chat=get_chat()))
+        for prepend in [None, {"files": [{"id": "file"}]}]:
+            Chats.append_to_message_by_id_and_message_id(
+                chat.id,
+                "missing",
+                append={"statusHistory": [{"done": True}]},
+                prepend=prepend,
+            )
+
+        chat = Chats.get_chat_by_id(chat.id)
+        assert "missing" not in chat.chat["history"]["messages"]
+
+        Chats.append_to_message_by_id_and_message_id(
+            chat.id, "missing", content="Hello", upsert=True
+        )
+        chat = Chats.get_chat_by_id(chat.id)
+        assert chat.chat["history"]["messages"]["missing"]["content"] == "Hello"
+
+
+class TestSearch:
+    def search(self, user_id: str, search_text: str) -> list[str]:
+        chats = Chats.get_chats_by_user_id_and_search_text(user_id, search_text)
+        return [chat.id for chat in chats]
+
+    def test_message_word_prefix(self, user_id):
+        chat = Chats.insert_new_chat(user_id, ChatForm(chat=get_chat()))
+
+        assert self.search(user_id, "kenobi") == [chat.id]
+        assert self.search(user_id, "Gen") == [chat.id]
+        # Every word must match within the same message
+        assert self.search(user_id, "general ken") == [chat.id]
+        # Messages of other branches are searched too
+        assert self.search(user_id, "regenerated") == [chat.id]
+
+    def test_message_word_prefix_only(self, user_id):
+        Chats.insert_new_chat(user_id, ChatForm(chat=get_chat()))
+
+        # Words are matched by prefix, not as substrings
+        assert self.search(user_id, "enobi") == []
+        assert self.search(user_id, "hello grievous") == []
+        assert self.search(user_id, "hello kenobi") == []
+
+    def test_title_substring(self, user_id):
+        chat = Chats.insert_new_chat(
+            user_id, ChatForm(chat=get_chat(title="Star Wars quotes"))
+        )
+        assert self.search(user_id, "wars quo") == [chat.id]
+        assert self.search(user_id, "ars") == [chat.id]
+
+    def test_index_follows_updates(self, user_id):
+        chat = Chats.insert_new_chat(user_id, ChatForm(chat=get_chat()))
+
+        updated = get_chat()
+        updated["history"]["messages"]["3"]["content"] = "You are a bold one"
+        Chats.update_chat_by_id(chat.id, updated)
+        assert self.search(user_id, "kenobi") == []
+        assert self.search(user_id, "bold") == [chat.id]
+
+        Chats.delete_chat_by_id(chat.id)
+        assert self.search(user_id, "bold") == []
+
+    def test_other_user(self, user_id):
+        Chats.insert_new_chat(user_id, ChatForm(chat=get_chat()))
+        assert self.search(str(uuid.uuid4()), "kenobi") == []
@@ -0,0 +1,101 @@
+import time
+import uuid
+
+import pytest
+
+from answer_ai.internal.db import get_db
+from answer_ai.models.files import FileForm, Files
+from answer_ai.models.ingestion_jobs import IngestionJob, IngestionJobs
+
+
+@pytest.fixture
+def file_id():
+    # Jobs are claimed from the whole queue
+    with get_db() as db:
+        db.query(IngestionJob).delete()
+        db.commit()
+
+    file = Files.insert_new_file(
+        "user",
+        FileForm(id=str(uuid.uuid4()), filename="test.txt", path="/tmp/test.txt"),
+    )
+    yield file.id
+    IngestionJobs.delete_jobs_by_file_id(file.id)
+    Files.delete_file_by_id(file.id)
+
+
+class TestIngestionJobs:
+    def test_claim(self, file_id):
+        job = IngestionJobs.insert_new_job(file_id, "user")
+        assert (job.status, job.stage, job.attempts) == ("pending", "queued", 0)
+
+        claimed = IngestionJobs.claim_next_job("a", lease=60)
+        assert claimed.id == job.id
+        assert (claimed.status, claimed.attempts, claimed.worker_id) == (
+            "running",
+            1,
+            "a",
+        )
+        assert claimed.locked_until >= int(time.time()) + 59
+
+        # Held by the lease
+        assert IngestionJobs.claim_next_job("b", lease=60) is None
+
+    def test_claim_empty(self, file_id):
+        assert IngestionJobs.claim_next_job("a", lease=60) is None
+
+    def test_renew_lease(self, file_id):
+        job = IngestionJobs.insert_new_job(file_id, "user")
+        IngestionJobs.claim_next_job("a", lease=10)
+
+        assert IngestionJobs.renew_job_lease(job.id, "a", lease=60)
+        assert IngestionJobs.get_job_by_file_id(file_id).locked_until >= (
+            int(time.time()) + 59
+        )
+        assert not IngestionJobs.renew_job_lease(job.id, "b", lease=60)
+
+    def test_takeover_after_lease_expires(self, file_id):
+        job = IngestionJobs.insert_new_job(file_id, "user")
+        IngestionJobs.claim_next_job("a", lease=-1)
+
+        claimed = IngestionJobs.claim_next_job("b", lease=60)
+        assert (claimed.id, claimed.worker_id, claimed.attempts) == (job.id, "b", 2)
+
+        # The previous worker lost the job
+        assert not IngestionJobs.renew_job_lease(job.id, "a", lease=60)
+        assert not IngestionJobs.update_job_stage(job.id, "a", "embedding")
+        assert not IngestionJobs.delete_job(job.id, "a")
+        assert IngestionJobs.update_job_stage(job.id, "b", "embedding")
+        assert IngestionJobs.get_job_by_file_id(file_id).stage == "embedding"
+
+    def test_retry(self, file_id):
+        job = IngestionJobs.insert_new_job(file_id, "user")
+        IngestionJobs.claim_next_job("a", lease=60)
+        IngestionJobs.update_job_stage(job.id, "a", "embedding")
+
+        assert IngestionJobs.retry_job(job.id, "a", "boom", delay=60)
+        job = IngestionJobs.get_job_by_file_id(file_id)
+        assert (job.status, job.stage, job.error, job.worker_id) == (
+            "pending",
+            "queued",
+            "boom",
+            None,
+        )
+        # Not before the delay
+        assert IngestionJobs.claim_next_job("b", lease=60) is None
+
+    def test_retry_without_delay(self, file_id):
+        job = IngestionJobs.insert_new_job(file_id, "user")
+        IngestionJobs.claim_next_job("a", lease=60)
+        IngestionJobs.retry_job(job.id, "a", "boom", delay=0)
+
+        claimed = IngestionJobs.claim_next_job("b", lease=60)
+        assert (claimed.id, claimed.attempts, claimed.error) == (job.id, 2, "boom")
+
+    def test_delete_job(self, file_id):
+        job = IngestionJobs.insert_new_job(file_id, "user")
+        IngestionJobs.claim_next_job("a", lease=60)
+
+        assert not IngestionJobs.delete_job(job.id, "b")
+        assert IngestionJobs.delete_job(job.id, "a")
+        assert IngestionJobs.get_job_by_file_id(file_id) is None
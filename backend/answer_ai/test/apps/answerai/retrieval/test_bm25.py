@@ -0,0 +1,131 @@
+import pytest
+
+from answer_ai.retrieval.bm25 import BM25Index, BM25IndexStore, rank_texts, tokenize
+from answer_ai.retrieval.vector.main import GetResult
+
+ITEMS = [
+    {
+        "id": "1",
+        "text": "The quick brown fox jumps over the lazy dog",
+        "metadata": {"file_id": "a", "name": "animals.txt"},
+    },
+    {
+        "id": "2",
+        "text": "A fox is a small omnivorous mammal, the fox hunts at night",
+        "metadata": {"file_id": "a", "name": "animals.txt"},
+    },
+    {
+        "id": "3",
+        "text": "Python is a programming language",
+        "metadata": {"file_id": "b", "name": "python_guide.md"},
+    },
+]
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = BM25Index(tmp_path / "index.db")
+    index.create()
+    index.add(ITEMS)
+    return index
+
+
+class TestBM25Index:
+    def test_search(self, index):
+        texts, metadatas = index.search("fox", k=10)
+        # The chunk with the term twice ranks first
+        assert texts == [ITEMS[1]["text"], ITEMS[0]["text"]]
+        assert metadatas == [ITEMS[1]["metadata"], ITEMS[0]["metadata"]]
+
+    def test_search_k(self, index):
+        texts, _ = index.search("fox", k=1)
+        assert texts == [ITEMS[1]["text"]]
+
+    def test_search_no_match(self, index):
+        assert index.search("elephant", k=10) == ([], [])
+        assert index.search("!!", k=10) == ([], [])
+
+    def test_search_enriched(self, index):
+        # Filenames are only scored with enriched texts
+        assert index.search("guide", k=10) == ([], [])
+        texts, _ = index.search("guide", k=10, enriched=True)
+        assert texts == [ITEMS[2]["text"]]
+
+    def test_add_replaces(self, index):
+        index.add([{**ITEMS[2], "text": "Python eats a fox"}])
+        texts, _ = index.search("programming", k=10)
+        assert texts == []
+        texts, _ = index.search("fox", k=10)
+        assert "Python eats a fox" in texts
+
+    def test_remove_by_ids(self, index):
+        assert index.remove(ids=["2"]) == 1
+        texts, _ = index.search("fox", k=10)
+        assert texts == [ITEMS[0]["text"]]
+
+    def test_remove_by_filter(self, index):
+        assert index.remove(filter={"file_id": "a"}) == 2
+        assert index.search("fox", k=10) == ([], [])
+        texts, _ = index.search("python", k=10)
+        assert texts == [ITEMS[2]["text"]]
+
+    def test_remove_nothing(self, index):
+        # Empty ids or filters don't wipe the index
+        assert index.remove() == 0
+        assert index.remove(ids=[]) == 0
+        assert index.remove(filter={}) == 0
+        texts, _ = index.search("fox python", k=10)
+        assert len(texts) == 3
+
+    def test_rank_texts_matches_index(self, index):
+        texts = [item["text"] for item in ITEMS]
+        metadatas = [item["metadata"] for item in ITEMS]
+        for query in ["fox", "the fox", "python language", "lazy mammal"]:
+            assert rank_texts(texts, metadatas, query, k=10) == index.search(
+                query, k=10
+            )
+
+
+class TestBM25IndexStore:
+    @pytest.fixture
+    def store(self, tmp_path):
+        return BM25IndexStore(str(tmp_path))
+
+    def build(self, store, writes=lambda: None):
+        assert store.begin_build("collection")
+        # Writes made while the items are read are replayed by the build
+        writes()
+        return store.build(
+            "collection",
+            GetResult(
+                ids=[[item["id"] for item in ITEMS]],
+                documents=[[item["text"] for item in ITEMS]],
+                metadatas=[[item["metadata"] for item in ITEMS]],
+            ),
+        )
+
+    def test_delete(self, store):
+        self.build(store)
+        store.delete("collection", ids=["1", "2"])
+        store.delete("collection", ids=[])
+        store.delete("collection", filter={})
+        texts, _ = store.get("collection").search("fox python", k=10)
+        assert texts == [ITEMS[2]["text"]]
+
+    def test_delete_during_build(self, store):
+        def writes():
+            store.delete("collection", ids=[])
+            store.delete("collection", filter={"file_id": "b"})
+
+        index = self.build(store, writes)
+        texts, _ = index.search("fox python", k=10)
+        assert texts == [ITEMS[1]["text"], ITEMS[0]["text"]]
+
+    def test_delete_collection(self, store):
+        self.build(store)
+        store.delete_collection("collection")
+        assert store.get("collection") is None
+
+
+def test_tokenize():
+    assert tokenize("Hello, World! it's 2024") == ["hello", "world", "it", "s", "2024"]
@@ -0,0 +1,97 @@
+import aiohttp
+import pytest
+
+from answer_ai.retrieval.embedding_scheduler import CHARS_PER_TOKEN, EmbeddingScheduler
+
+
+def get_scheduler(max_batch_tokens: int = 0) -> EmbeddingScheduler:
+    return EmbeddingScheduler(
+        concurrency=4, max_batch_tokens=max_batch_tokens, max_retries=0
+    )
+
+
+def get_too_large_error() -> aiohttp.ClientResponseError:
+    return aiohttp.ClientResponseError(
+        request_info=None, history=(), status=413, message="Payload Too Large"
+    )
+
+
+class TestGetBatches:
+    def test_batch_size(self):
+        batches = get_scheduler().get_batches(["a", "b", "c", "d", "e"], 2)
+        assert batches == [["a", "b"], ["c", "d"], ["e"]]
+
+    def test_empty(self):
+        assert get_scheduler().get_batches([], 2) == []
+
+    def test_max_batch_tokens(self):
+        # 10 estimated tokens each
+        text = "x" * (9 * CHARS_PER_TOKEN)
+        batches = get_scheduler(max_batch_tokens=25).get_batches([text] * 5, 10)
+        assert batches == [[text] * 2, [text] * 2, [text]]
+
+    def test_text_over_max_batch_tokens(self):
+        # A text larger than the token budget still gets a batch of its own
+        text = "x" * (100 * CHARS_PER_TOKEN)
+        batches = get_scheduler(max_batch_tokens=25).get_batches(["a", text, "b"], 10)
+        assert batches == [["a"], [text], ["b"]]
+
+
+class TestEmbed:
+    @pytest.mark.asyncio
+    async def test_batches_in_order(self):
+        sent = []
+
+        async def embed_batch(batch):
+            sent.append(batch)
+            return [[float(text)] for text in batch]
+
+        texts = [str(i) for i in range(5)]
+        embeddings = await get_scheduler().embed(texts, embed_batch, batch_size=2)
+        assert embeddings == [[0.0], [1.0], [2.0], [3.0], [4.0]]
+        assert sorted(map(len, sent)) == [1, 2, 2]
+
+    @pytest.mark.asyncio
+    async def test_too_large_batch_is_split(self):
+        sent = []
+
+        async def embed_batch(batch):
+            sent.append(batch)
+            if len(batch) > 2:
+                raise get_too_large_error()
+            return [[float(text)] for text in batch]
+
+        texts = [str(i) for i in range(5)]
+        embeddings = await get_scheduler().embed(texts, embed_batch, sequential=True)
+        assert embeddings == [[float(i)] for i in range(5)]
+        assert sent == [texts, ["0", "1"], ["2", "3", "4"], ["2"], ["3", "4"]]
+
+    @pytest.mark.asyncio
+    async def test_too_large_single_text_raises(self):
+        async def embed_batch(batch):
+            raise get_too_large_error()
+
+        with pytest.raises(aiohttp.ClientResponseError):
+            await get_scheduler().embed(["a", "b"], embed_batch)
+
+    @pytest.mark.asyncio
+    async def test_other_errors_are_not_split(self):
+        sent = []
+
+        async def embed_batch(batch):
+            sent.append(batch)
+            raise aiohttp.ClientResponseError(
+                request_info=None, history=(), status=400, message="Bad Request"
+            )
+
+        with pytest.raises(aiohttp.ClientResponseError):
+            await get_scheduler().embed(["a", "b"], embed_batch)
+        assert sent == [["a", "b"]]
+
+    @pytest.mark.asyncio
+    async def test_wrong_count_raises(self):
+        async def embed_batch(batch):
+            return [[0.0]]
+
+        with pytest.raises(Exception):
+            await get_scheduler().embed(["a", "b"], embed_batch)
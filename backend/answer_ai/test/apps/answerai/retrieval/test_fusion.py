@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from answer_ai.retrieval.fusion import RRF_C, cosine_similarity, reciprocal_rank_fusion
+
+
+class TestReciprocalRankFusion:
+    def test_empty(self):
+        positions, scores = reciprocal_rank_fusion([[], []], [0.5, 0.5])
+        assert positions.size == 0
+        assert scores.size == 0
+
+    def test_single_ranking(self):
+        positions, scores = reciprocal_rank_fusion([["a", "b", "c"]], [1.0])
+        assert positions.tolist() == [0, 1, 2]
+        assert scores == pytest.approx(
+            [1 / (1 + RRF_C), 1 / (2 + RRF_C), 1 / (3 + RRF_C)]
+        )
+
+    def test_fused(self):
+        # Keys are returned as their position in the concatenated rankings
+        rankings = [["a", "b", "c"], ["c", "d", "a"]]
+        positions, scores = reciprocal_rank_fusion(rankings, [0.5, 0.5])
+
+        keys = [key for ranking in rankings for key in ranking]
+        assert [keys[position] for position in positions] == ["a", "c", "b", "d"]
+        assert scores[0] == pytest.approx(0.5 / (1 + RRF_C) + 0.5 / (3 + RRF_C))
+        assert scores[1] == pytest.approx(0.5 / (3 + RRF_C) + 0.5 / (1 + RRF_C))
+
+    def test_weights(self):
+        rankings = [["a", "b"], ["b", "a"]]
+        positions, _ = reciprocal_rank_fusion(rankings, [0.2, 0.8])
+        assert positions.tolist() == [1, 0]
+
+    def test_ties_keep_first_occurrence(self):
+        rankings = [["a", "b"], ["b", "a"]]
+        positions, scores = reciprocal_rank_fusion(rankings, [0.5, 0.5])
+        assert positions.tolist() == [0, 1]
+        assert scores[0] == pytest.approx(scores[1])
+
+    def test_duplicates_in_ranking(self):
+        positions, scores = reciprocal_rank_fusion([["a", "a", "b"]], [1.0])
+        assert positions.tolist() == [0, 2]
+        assert scores[0] == pytest.approx(1 / (1 + RRF_C) + 1 / (2 + RRF_C))
+
+
+def test_cosine_similarity():
+    similarities = cosine_similarity([1, 0], [[2, 0], [0, 3], [1, 1], [0, 0]])
+    assert similarities == pytest.approx([1.0, 0.0, np.sqrt(0.5), 0.0], abs=1e-6)
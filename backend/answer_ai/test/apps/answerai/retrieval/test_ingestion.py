@@ -0,0 +1,176 @@
+import asyncio
+import time
+import uuid
+
+import pytest
+
+import answer_ai.routers.files
+from answer_ai.constants import ERROR_MESSAGES
+from answer_ai.internal.db import get_db
+from answer_ai.models.files import FileForm, Files
+from answer_ai.models.ingestion_jobs import IngestionJob, IngestionJobs
+from answer_ai.models.users import Users
+from answer_ai.retrieval.ingestion import (
+    IngestionError,
+    IngestionWorker,
+    get_retry_delay,
+    report_ingestion_stage,
+)
+from answer_ai.routers.files import get_file_process_status_event
+
+
+class FakeProcess:
+    """`process_uploaded_file` failing with the given errors, in order."""
+
+    def __init__(self, *errors: Exception):
+        self.errors = list(errors)
+        self.calls = []
+        self.stages = []
+
+    def __call__(self, request, file, user):
+        self.calls.append(file.id)
+        report_ingestion_stage("embedding")
+        self.stages.append(IngestionJobs.get_job_by_file_id(file.id).stage)
+        if self.errors:
+            raise self.errors.pop(0)
+
+
+@pytest.fixture
+def file_id(monkeypatch):
+    with get_db() as db:
+        db.query(IngestionJob).delete()
+        db.commit()
+
+    monkeypatch.setattr(Users, "get_user_by_id", lambda id: object())
+    file = Files.insert_new_file(
+        "user",
+        FileForm(id=str(uuid.uuid4()), filename="test.txt", path="/tmp/test.txt"),
+    )
+    yield file.id
+    IngestionJobs.delete_jobs_by_file_id(file.id)
+    Files.delete_file_by_id(file.id)
+
+
+async def run_worker(worker: IngestionWorker, until, timeout: float = 5) -> None:
+    task = asyncio.create_task(worker.run(app=None))
+    try:
+        deadline = time.monotonic() + timeout
+        while not await asyncio.to_thread(until):
+            assert time.monotonic() < deadline, "worker timed out"
+            await asyncio.sleep(0.01)
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+
+def get_worker(max_attempts: int = 3) -> IngestionWorker:
+    return IngestionWorker(
+        concurrency=2, lease=60, max_attempts=max_attempts, poll_interval=0.01
+    )
+
+
+def test_get_retry_delay():
+    assert [get_retry_delay(attempts) for attempts in range(1, 7)] == [
+        10,
+        20,
+        40,
+        80,
+        160,
+        300,
+    ]
+
+
+class TestIngestionWorker:
+    @pytest.mark.asyncio
+    async def test_process(self, file_id, monkeypatch):
+        process = FakeProcess()
+        monkeypatch.setattr(answer_ai.routers.files, "process_uploaded_file", process)
+
+        IngestionJobs.insert_new_job(file_id, "user")
+        await run_worker(
+            get_worker(), lambda: IngestionJobs.get_job_by_file_id(file_id) is None
+        )
+        assert process.calls == [file_id]
+        assert process.stages == ["embedding"]
+
+    @pytest.mark.asyncio
+    async def test_retry(self, file_id, monkeypatch):
+        process = FakeProcess(Exception("Connection refused"))
+        monkeypatch.setattr(answer_ai.routers.files, "process_uploaded_file", process)
+
+        IngestionJobs.insert_new_job(file_id, "user")
+        await run_worker(
+            get_worker(),
+            lambda: IngestionJobs.get_job_by_file_id(file_id).status == "pending"
+            and process.calls,
+        )
+
+        job = IngestionJobs.get_job_by_file_id(file_id)
+        assert (job.attempts, job.error) == (1, "Connection refused")
+        assert job.run_after >= int(time.time()) + get_retry_delay(1) - 1
+
+        # Reported as pending while a retry is queued
+        Files.update_file_data_by_id(file_id, {"status": "failed", "error": "old"})
+        assert get_file_process_status_event(Files.get_file_by_id(file_id)) == {
+            "status": "pending",
+            "stage": "queued",
+            "attempts": 1,
+            "error": "Connection refused",
+        }
+
+    @pytest.mark.asyncio
+    async def test_retry_until_max_attempts(self, file_id, monkeypatch):
+        process = FakeProcess(Exception("a"), Exception("b"))
+        monkeypatch.setattr(answer_ai.routers.files, "process_uploaded_file", process)
+        # Retried right away
+        monkeypatch.setattr(
+            "answer_ai.retrieval.ingestion.get_retry_delay", lambda attempts: 0
+        )
+
+        IngestionJobs.insert_new_job(file_id, "user")
+        await run_worker(
+            get_worker(max_attempts=2),
+            lambda: IngestionJobs.get_job_by_file_id(file_id) is None,
+        )
+        assert process.calls == [file_id, file_id]
+        assert Files.get_file_by_id(file_id).data == {"status": "failed", "error": "b"}
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        "error",
+        [Exception(ERROR_MESSAGES.EMPTY_CONTENT), IngestionError("Not supported")],
+    )
+    async def test_non_retryable_error(self, file_id, monkeypatch, error):
+        process = FakeProcess(error)
+        monkeypatch.setattr(answer_ai.routers.files, "process_uploaded_file", process)
+
+        IngestionJobs.insert_new_job(file_id, "user")
+        await run_worker(
+            get_worker(), lambda: IngestionJobs.get_job_by_file_id(file_id) is None
+        )
+        assert process.calls == [file_id]
+        assert Files.get_file_by_id(file_id).data == {
+            "status": "failed",
+            "error": str(error),
+        }
+        assert get_file_process_status_event(Files.get_file_by_id(file_id)) == {
+            "status": "failed",
+            "error": str(error),
+        }
+
+    @pytest.mark.asyncio
+    async def test_taken_over_past_max_attempts(self, file_id, monkeypatch):
+        process = FakeProcess()
+        monkeypatch.setattr(answer_ai.routers.files, "process_uploaded_file", process)
+
+        # Claimed by workers that died while processing it
+        job = IngestionJobs.insert_new_job(file_id, "user")
+        for worker_id in ["a", "b"]:
+            IngestionJobs.claim_next_job(worker_id, lease=-1)
+
+        await run_worker(
+            get_worker(max_attempts=2),
+            lambda: IngestionJobs.get_job_by_file_id(file_id) is None,
+        )
+        assert process.calls == []
+        assert Files.get_file_by_id(file_id).data["status"] == "failed"
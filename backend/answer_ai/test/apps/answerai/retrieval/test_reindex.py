@@ -0,0 +1,407 @@
+import time
+import uuid
+from typing import Optional
+
+import pytest
+
+import answer_ai.routers.retrieval
+from answer_ai.internal.db import get_db
+from answer_ai.models.files import FileModel
+from answer_ai.models.knowledge_reindex import KnowledgeReindex, KnowledgeReindexes
+from answer_ai.models.users import Users
+from answer_ai.models.vector_aliases import VectorCollectionAliases
+from answer_ai.retrieval import reindex as reindex_module
+from answer_ai.retrieval.bm25 import BM25IndexStore
+from answer_ai.retrieval.reindex import (
+    REINDEX_FILE_ATTEMPTS,
+    KnowledgeReindexer,
+    get_shadow_collection_name,
+)
+from answer_ai.retrieval.vector.aliases import (
+    REDIS_VECTOR_ALIASES_CHANNEL,
+    AliasedVectorDB,
+)
+from answer_ai.retrieval.vector.main import GetResult, SearchResult, VectorDBBase
+
+
+class FakeVectorDB(VectorDBBase):
+    """Collections of items in memory, searched by insertion order."""
+
+    def __init__(self):
+        self.collections: dict[str, list[dict]] = {}
+
+    def _to_result(self, items: list[dict]) -> GetResult:
+        return GetResult(
+            ids=[[item["id"] for item in items]],
+            documents=[[item["text"] for item in items]],
+            metadatas=[[item["metadata"] for item in items]],
+        )
+
+    def has_collection(self, collection_name: str) -> bool:
+        return collection_name in self.collections
+
+    def delete_collection(self, collection_name: str) -> None:
+        self.collections.pop(collection_name, None)
+
+    def insert(self, collection_name: str, items: list[dict]) -> None:
+        self.collections.setdefault(collection_name, []).extend(items)
+
+    def upsert(self, collection_name: str, items: list[dict]) -> None:
+        ids = {item["id"] for item in items}
+        self.delete(collection_name, ids=list(ids))
+        self.insert(collection_name, items)
+
+    def search(
+        self, collection_name: str, vectors: list, limit: int
+    ) -> Optional[SearchResult]:
+        items = self.collections.get(collection_name)
+        if items is None:
+            return None
+        result = self._to_result(items[:limit])
+        return SearchResult(**result.model_dump(), distances=[[1.0] * len(items)])
+
+    def query(
+        self, collection_name: str, filter: dict, limit: Optional[int] = None
+    ) -> Optional[GetResult]:
+        items = [
+            item
+            for item in self.collections.get(collection_name, [])
+            if all(item["metadata"].get(key) == value for key, value in filter.items())
+        ]
+        return self._to_result(items[:limit])
+
+    def get(self, collection_name: str) -> Optional[GetResult]:
+        items = self.collections.get(collection_name)
+        return self._to_result(items) if items is not None else None
+
+    def delete(
+        self,
+        collection_name: str,
+        ids: Optional[list[str]] = None,
+        filter: Optional[dict] = None,
+    ) -> None:
+        self.collections[collection_name] = [
+            item
+            for item in self.collections.get(collection_name, [])
+            if not (
+                (ids and item["id"] in ids)
+                or (
+                    filter
+                    and all(
+                        item["metadata"].get(key) == value
+                        for key, value in filter.items()
+                    )
+                )
+            )
+        ]
+
+    def reset(self) -> None:
+        self.collections = {}
+
+    def get_file_ids(self, collection_name: str) -> list[str]:
+        return sorted(
+            item["metadata"]["file_id"]
+            for item in self.collections.get(collection_name, [])
+        )
+
+
+class FakeRedis:
+    def __init__(self):
+        self.messages = []
+
+    def publish(self, channel, message):
+        self.messages.append((channel, message))
+
+
+def get_item(file_id: str) -> dict:
+    return {
+        "id": str(uuid.uuid4()),
+        "text": f"Content of {file_id}",
+        "vector": [0.0],
+        "metadata": {"file_id": file_id},
+    }
+
+
+def get_file(file_id: str) -> FileModel:
+    now = int(time.time())
+    return FileModel(
+        id=file_id,
+        user_id="user",
+        filename=f"{file_id}.txt",
+        data={"content": f"Content of {file_id}"},
+        created_at=now,
+        updated_at=now,
+    )
+
+
+class FakeKnowledges:
+    def __init__(self, files: dict[str, list[str]]):
+        self.files = files
+
+    def get_knowledge_bases(self):
+        return [type("Knowledge", (), {"id": id}) for id in self.files]
+
+    def get_knowledge_by_id(self, id: str):
+        return type("Knowledge", (), {"id": id}) if id in self.files else None
+
+    def get_files_by_id(self, id: str) -> list[FileModel]:
+        return [get_file(file_id) for file_id in self.files.get(id, [])]
+
+
+class FakeSave:
+    """`save_docs_to_vector_db` failing the given number of times per file."""
+
+    def __init__(self, vector_db: FakeVectorDB, failures: Optional[dict] = None):
+        self.vector_db = vector_db
+        self.failures = dict(failures or {})
+        self.calls = []
+
+    def __call__(self, request, docs, collection_name, metadata, add, user):
+        file_id = metadata["file_id"]
+        self.calls.append(file_id)
+        if self.failures.get(file_id):
+            self.failures[file_id] -= 1
+            raise Exception(f"Failed to embed {file_id}")
+        self.vector_db.insert(collection_name, [get_item(file_id)])
+
+
+@pytest.fixture
+def knowledge_id():
+    knowledge_id = str(uuid.uuid4())
+    yield knowledge_id
+    VectorCollectionAliases.delete_alias(knowledge_id)
+
+
+@pytest.fixture
+def vector_db(monkeypatch, tmp_path):
+    # The active reindex is looked up in the whole table
+    with get_db() as db:
+        db.query(KnowledgeReindex).delete()
+        db.commit()
+
+    vector_db = FakeVectorDB()
+    monkeypatch.setattr(
+        reindex_module,
+        "VECTOR_DB_CLIENT",
+        AliasedVectorDB(vector_db, refresh_interval=60),
+    )
+    monkeypatch.setattr(
+        reindex_module, "BM25_INDEX_STORE", BM25IndexStore(str(tmp_path))
+    )
+    monkeypatch.setattr(reindex_module, "get_retry_delay", lambda attempts: 0)
+    monkeypatch.setattr(Users, "get_user_by_id", lambda id: object())
+    monkeypatch.setattr(
+        answer_ai.routers.retrieval,
+        "get_file_collection_docs",
+        lambda file: [file.id],
+    )
+    return vector_db
+
+
+def setup_knowledge(monkeypatch, vector_db, knowledge_id, file_ids, failures=None):
+    monkeypatch.setattr(
+        reindex_module, "Knowledges", FakeKnowledges({knowledge_id: file_ids})
+    )
+    vector_db.insert(knowledge_id, [get_item(file_id) for file_id in file_ids])
+
+    save = FakeSave(vector_db, failures)
+    monkeypatch.setattr(answer_ai.routers.retrieval, "save_docs_to_vector_db", save)
+    return save
+
+
+def get_reindexer() -> KnowledgeReindexer:
+    return KnowledgeReindexer(concurrency=2, lease=60, grace=0)
+
+
+class TestKnowledgeReindexer:
+    @pytest.mark.asyncio
+    async def test_swap(self, monkeypatch, vector_db, knowledge_id):
+        save = setup_knowledge(monkeypatch, vector_db, knowledge_id, ["a", "b"])
+        reindexer = get_reindexer()
+
+        reindex = reindexer.create("user")
+        await reindexer.run(None, reindex.id)
+
+        shadow_name = get_shadow_collection_name(knowledge_id, reindex.id)
+        assert reindex_module.VECTOR_DB_CLIENT.resolve(knowledge_id) == shadow_name
+        assert sorted(save.calls) == ["a", "b"]
+        assert vector_db.get_file_ids(shadow_name) == ["a", "b"]
+        # The replaced collection is deleted after the grace delay
+        assert not vector_db.has_collection(knowledge_id)
+
+        reindex = KnowledgeReindexes.get_reindex_by_id(reindex.id)
+        assert reindex.status == "completed"
+        assert reindex.data["retired"] == [knowledge_id]
+        assert reindex.data["skipped"] == {}
+
+    @pytest.mark.asyncio
+    async def test_failed_file_keeps_current_index(
+        self, monkeypatch, vector_db, knowledge_id
+    ):
+        save = setup_knowledge(
+            monkeypatch, vector_db, knowledge_id, ["a", "b"], failures={"b": 10}
+        )
+        reindexer = get_reindexer()
+
+        reindex = reindexer.create("user")
+        await reindexer.run(None, reindex.id)
+
+        assert reindex_module.VECTOR_DB_CLIENT.resolve(knowledge_id) == knowledge_id
+        assert vector_db.get_file_ids(knowledge_id) == ["a", "b"]
+        assert save.calls.count("b") == REINDEX_FILE_ATTEMPTS
+        # The shadow collection is dropped
+        shadow_name = get_shadow_collection_name(knowledge_id, reindex.id)
+        assert not vector_db.has_collection(shadow_name)
+
+        reindex = KnowledgeReindexes.get_reindex_by_id(reindex.id)
+        assert reindex.status == "completed"
+        assert reindex.data["skipped"] == {knowledge_id: ["b"]}
+
+    @pytest.mark.asyncio
+    async def test_retried_file(self, monkeypatch, vector_db, knowledge_id):
+        save = setup_knowledge(
+            monkeypatch, vector_db, knowledge_id, ["a", "b"], failures={"b": 1}
+        )
+        reindexer = get_reindexer()
+
+        reindex = reindexer.create("user")
+        await reindexer.run(None, reindex.id)
+
+        shadow_name = get_shadow_collection_name(knowledge_id, reindex.id)
+        assert reindex_module.VECTOR_DB_CLIENT.resolve(knowledge_id) == shadow_name
+        assert save.calls.count("b") == 2
+        # Without the chunks of the failed attempt
+        assert vector_db.get_file_ids(shadow_name) == ["a", "b"]
+
+    @pytest.mark.asyncio
+    async def test_resume_after_interruption(
+        self, monkeypatch, vector_db, knowledge_id
+    ):
+        save = setup_knowledge(monkeypatch, vector_db, knowledge_id, ["a", "b", "c"])
+        reindex = get_reindexer().create("user")
+        shadow_name = get_shadow_collection_name(knowledge_id, reindex.id)
+
+        # A process died while reindexing "b", after "a" was done
+        KnowledgeReindexes.claim_reindex(reindex.id, "dead", lease=-1)
+        vector_db.insert(shadow_name, [get_item("a"), get_item("b")])
+        KnowledgeReindexes.update_file_status(
+            reindex.id, knowledge_id, ["a"], "completed"
+        )
+        KnowledgeReindexes.update_file_status(
+            reindex.id, knowledge_id, ["b"], "running"
+        )
+
+        await get_reindexer().resume(None)
+
+        assert sorted(save.calls) == ["b", "c"]
+        assert vector_db.get_file_ids(shadow_name) == ["a", "b", "c"]
+        assert reindex_module.VECTOR_DB_CLIENT.resolve(knowledge_id) == shadow_name
+        assert KnowledgeReindexes.get_reindex_by_id(reindex.id).status == "completed"
+
+    @pytest.mark.asyncio
+    async def test_resume_held_by_another_process(
+        self, monkeypatch, vector_db, knowledge_id
+    ):
+        save = setup_knowledge(monkeypatch, vector_db, knowledge_id, ["a"])
+        reindex = get_reindexer().create("user")
+        KnowledgeReindexes.claim_reindex(reindex.id, "other", lease=60)
+
+        await get_reindexer().run(None, reindex.id)
+        assert save.calls == []
+        assert KnowledgeReindexes.get_reindex_by_id(reindex.id).worker_id == "other"
+
+    @pytest.mark.asyncio
+    async def test_resume_after_swap(self, monkeypatch, vector_db, knowledge_id):
+        save = setup_knowledge(monkeypatch, vector_db, knowledge_id, ["a"])
+        reindex = get_reindexer().create("user")
+        shadow_name = get_shadow_collection_name(knowledge_id, reindex.id)
+
+        # Swapped in before the process died
+        vector_db.insert(shadow_name, [get_item("a")])
+        reindex_module.VECTOR_DB_CLIENT.set_alias(knowledge_id, shadow_name)
+        KnowledgeReindexes.claim_reindex(reindex.id, "dead", lease=-1)
+
+        await get_reindexer().resume(None)
+        assert save.calls == []
+        assert vector_db.get_file_ids(shadow_name) == ["a"]
+
+    @pytest.mark.asyncio
+    async def test_files_removed_during_reindex(
+        self, monkeypatch, vector_db, knowledge_id
+    ):
+        save = setup_knowledge(monkeypatch, vector_db, knowledge_id, ["a", "b"])
+        reindex = get_reindexer().create("user")
+        shadow_name = get_shadow_collection_name(knowledge_id, reindex.id)
+
+        vector_db.insert(shadow_name, [get_item("b")])
+        KnowledgeReindexes.update_file_status(
+            reindex.id, knowledge_id, ["b"], "completed"
+        )
+        reindex_module.Knowledges.files[knowledge_id] = ["a"]
+
+        await get_reindexer().run(None, reindex.id)
+        assert save.calls == ["a"]
+        assert vector_db.get_file_ids(shadow_name) == ["a"]
+
+
+class TestAliasedVectorDB:
+    @pytest.fixture
+    def db(self, knowledge_id):
+        vector_db = FakeVectorDB()
+        vector_db.insert(knowledge_id, [get_item("old")])
+        vector_db.insert("new", [get_item("new")])
+        return AliasedVectorDB(vector_db, refresh_interval=60)
+
+    def test_resolve(self, db, knowledge_id):
+        assert db.resolve(knowledge_id) == knowledge_id
+        assert db.get(knowledge_id).documents == [["Content of old"]]
+
+        db.set_alias(knowledge_id, "new")
+        assert db.resolve(knowledge_id) == "new"
+        assert db.get(knowledge_id).documents == [["Content of new"]]
+        assert db.has_collection(knowledge_id)
+
+    def test_search_many(self, db, knowledge_id):
+        db.set_alias(knowledge_id, "new")
+        results = db.search_many([knowledge_id, "new"], [[0.0]], limit=10)
+        assert results[knowledge_id].documents == [["Content of new"]]
+        assert results["new"].documents == [["Content of new"]]
+
+    def test_delete_collection(self, db, knowledge_id):
+        db.set_alias(knowledge_id, "new")
+        db.delete_collection(knowledge_id)
+
+        assert not db.client.has_collection("new")
+        assert db.resolve(knowledge_id) == knowledge_id
+        assert VectorCollectionAliases.get_aliases().get(knowledge_id) is None
+
+    def test_change_of_another_process(self, db, knowledge_id):
+        assert db.resolve(knowledge_id) == knowledge_id
+
+        VectorCollectionAliases.set_alias(knowledge_id, "new")
+        # Cached until told about the change
+        assert db.resolve(knowledge_id) == knowledge_id
+        db.drop()
+        assert db.resolve(knowledge_id) == "new"
+
+    def test_change_during_load(self, db, knowledge_id, monkeypatch):
+        get_aliases = VectorCollectionAliases.get_aliases
+
+        def get_aliases_racing():
+            aliases = get_aliases()
+            # A change published while the aliases are read
+            VectorCollectionAliases.set_alias(knowledge_id, "new")
+            db.drop()
+            return aliases
+
+        monkeypatch.setattr(VectorCollectionAliases, "get_aliases", get_aliases_racing)
+        assert db.resolve(knowledge_id) == knowledge_id
+
+        monkeypatch.setattr(VectorCollectionAliases, "get_aliases", get_aliases)
+        assert db.resolve(knowledge_id) == "new"
+
+    def test_changes_are_published(self, db, knowledge_id):
+        db.redis = FakeRedis()
+        db.set_alias(knowledge_id, "new")
+        db.delete_collection(knowledge_id)
+        assert db.redis.messages == [(REDIS_VECTOR_ALIASES_CHANNEL, "*")] * 2
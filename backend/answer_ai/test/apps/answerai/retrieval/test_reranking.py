@@ -0,0 +1,224 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from answer_ai.retrieval.reranking import RerankingService
+
+
+class FakeReranker:
+    """A local model scoring `len(query) * 10 + int(document)`."""
+
+    def __init__(self, fail: bool = False, single_query: bool = False):
+        self.fail = fail
+        self.single_query = single_query
+        self.calls = []
+
+    def predict(self, pairs):
+        self.calls.append(list(pairs))
+        if self.fail:
+            raise Exception("CUDA out of memory")
+        return np.array([get_score(query, document) for query, document in pairs])
+
+
+class FakeExternalReranker:
+    def __init__(self):
+        self.calls = []
+
+    async def apredict(self, pairs, user=None):
+        self.calls.append(list(pairs))
+        return [get_score(query, document) for query, document in pairs]
+
+
+def get_score(query: str, document: str) -> float:
+    return float(len(query) * 10 + int(document))
+
+
+def get_service(**kwargs) -> RerankingService:
+    return RerankingService(
+        **{
+            "batch_size": 100,
+            "batch_wait": 0.01,
+            "threads": 1,
+            "cache_size": 100,
+            "cache_ttl": 60,
+            **kwargs,
+        }
+    )
+
+
+async def rerank(service, reranker, query, documents):
+    return await asyncio.wait_for(
+        service.rerank(reranker, "model", query, documents), timeout=5
+    )
+
+
+class TestRerankingService:
+    @pytest.mark.asyncio
+    async def test_batches_concurrent_queries(self):
+        service = get_service()
+        reranker = FakeReranker()
+
+        results = await asyncio.gather(
+            rerank(service, reranker, "a", ["1", "2"]),
+            rerank(service, reranker, "bb", ["3"]),
+            rerank(service, reranker, "ccc", ["4", "5", "6"]),
+        )
+        # One forward pass, its scores split back to each caller
+        assert len(reranker.calls) == 1
+        assert len(reranker.calls[0]) == 6
+        assert results == [[11.0, 12.0], [23.0], [34.0, 35.0, 36.0]]
+        assert service.forward_passes == 1
+
+    @pytest.mark.asyncio
+    async def test_full_batch_runs_without_waiting(self):
+        service = get_service(batch_size=2, batch_wait=60)
+        reranker = FakeReranker()
+
+        results = await asyncio.gather(
+            rerank(service, reranker, "a", ["1", "2"]),
+            rerank(service, reranker, "b", ["3"]),
+            rerank(service, reranker, "c", ["4"]),
+        )
+        assert [len(pairs) for pairs in reranker.calls] == [2, 2]
+        assert results == [[11.0, 12.0], [13.0], [14.0]]
+
+    @pytest.mark.asyncio
+    async def test_error_is_propagated_to_every_waiter(self):
+        service = get_service()
+        reranker = FakeReranker(fail=True)
+
+        results = await asyncio.gather(
+            rerank(service, reranker, "a", ["1"]),
+            rerank(service, reranker, "b", ["2"]),
+        )
+        assert len(reranker.calls) == 1
+        assert results == [None, None]
+
+        with pytest.raises(Exception, match="CUDA out of memory"):
+            await service.predict_batched(reranker, None, [("a", "1")])
+
+        # Failed scores are not cached
+        reranker.fail = False
+        assert await rerank(service, reranker, "a", ["1"]) == [11.0]
+
+    @pytest.mark.asyncio
+    async def test_wrong_number_of_scores(self):
+        service = get_service()
+        reranker = FakeReranker()
+        reranker.predict = lambda pairs: [1.0]
+
+        assert await rerank(service, reranker, "a", ["1", "2"]) is None
+
+    @pytest.mark.asyncio
+    async def test_single_query_models_are_batched_per_query(self):
+        service = get_service()
+        reranker = FakeReranker(single_query=True)
+
+        results = await asyncio.gather(
+            rerank(service, reranker, "a", ["1"]),
+            rerank(service, reranker, "bb", ["2", "3"]),
+            rerank(service, reranker, "a", ["4"]),
+        )
+        assert results == [[11.0], [22.0, 23.0], [14.0]]
+        assert sorted(reranker.calls) == [
+            [("a", "1"), ("a", "4")],
+            [("bb", "2"), ("bb", "3")],
+        ]
+
+    @pytest.mark.asyncio
+    async def test_models_are_batched_apart(self):
+        service = get_service()
+        rerankers = [FakeReranker(), FakeReranker()]
+
+        await asyncio.gather(
+            *[rerank(service, reranker, "a", ["1"]) for reranker in rerankers]
+        )
+        assert [reranker.calls for reranker in rerankers] == [
+            [[("a", "1")]],
+            [[("a", "1")]],
+        ]
+
+    @pytest.mark.asyncio
+    async def test_cache(self):
+        service = get_service()
+        reranker = FakeReranker()
+
+        assert await rerank(service, reranker, "a", ["1", "2"]) == [11.0, 12.0]
+        assert (service.hits, service.misses) == (0, 2)
+
+        # Only the documents not scored yet are
+        assert await rerank(service, reranker, "a", ["2", "3", "1"]) == [
+            12.0,
+            13.0,
+            11.0,
+        ]
+        assert reranker.calls[-1] == [("a", "3")]
+        assert (service.hits, service.misses) == (2, 3)
+
+        assert await rerank(service, reranker, "a", ["3", "1"]) == [13.0, 11.0]
+        assert len(reranker.calls) == 2
+        assert (service.hits, service.misses) == (4, 3)
+
+    @pytest.mark.asyncio
+    async def test_cache_by_model_and_query(self):
+        service = get_service()
+        reranker = FakeReranker()
+
+        await rerank(service, reranker, "a", ["1"])
+        await rerank(service, reranker, "b", ["1"])
+        await service.rerank(reranker, "other", "a", ["1"])
+        assert len(reranker.calls) == 3
+        assert service.hits == 0
+
+    @pytest.mark.asyncio
+    async def test_cache_expiry(self):
+        service = get_service(cache_ttl=-1)
+        reranker = FakeReranker()
+
+        await rerank(service, reranker, "a", ["1"])
+        await rerank(service, reranker, "a", ["1"])
+        assert len(reranker.calls) == 2
+        assert len(service.entries) == 1
+
+    @pytest.mark.asyncio
+    async def test_cache_eviction(self):
+        service = get_service(cache_size=2)
+        reranker = FakeReranker()
+
+        await rerank(service, reranker, "a", ["1", "2"])
+        # Used last, "1" is kept over "2"
+        await rerank(service, reranker, "a", ["1"])
+        await rerank(service, reranker, "a", ["3"])
+        assert len(service.entries) == 2
+
+        await rerank(service, reranker, "a", ["1", "2"])
+        assert reranker.calls[-1] == [("a", "2")]
+
+    @pytest.mark.asyncio
+    async def test_cache_disabled(self):
+        service = get_service(cache_size=0)
+        reranker = FakeReranker()
+
+        await rerank(service, reranker, "a", ["1"])
+        await rerank(service, reranker, "a", ["1"])
+        assert len(reranker.calls) == 2
+        assert len(service.entries) == 0
+
+    @pytest.mark.asyncio
+    async def test_external_engine(self):
+        service = get_service()
+        reranker = FakeExternalReranker()
+
+        assert await rerank(service, reranker, "a", ["1", "2"]) == [11.0, 12.0]
+        assert await rerank(service, reranker, "a", ["2"]) == [12.0]
+        assert reranker.calls == [[("a", "1"), ("a", "2")]]
+        assert service.forward_passes == 0
+
+    @pytest.mark.asyncio
+    async def test_no_documents(self):
+        service = get_service()
+        reranker = FakeReranker()
+
+        assert await rerank(service, reranker, "a", []) == []
+        assert reranker.calls == []
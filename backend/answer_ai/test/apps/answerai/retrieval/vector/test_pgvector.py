@@ -0,0 +1,65 @@
+from answer_ai.retrieval.vector.dbs.pgvector import PgvectorClient, copy_text_value
+
+
+class FakeSession:
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, statement, params=None):
+        self.statements.append(" ".join(str(statement).split()))
+
+
+class FakeClient:
+    """Stands in for a connected client, recording the statements run."""
+
+    def __init__(self):
+        self.session = FakeSession()
+
+
+class TestCopyTextValue:
+    def test_none(self):
+        assert copy_text_value(None) == "\\N"
+
+    def test_plain(self):
+        assert copy_text_value("hello world") == "hello world"
+        assert copy_text_value("") == ""
+
+    def test_escapes(self):
+        assert copy_text_value("a\tb\nc\rd") == "a\\tb\\nc\\rd"
+
+    def test_backslash_first(self):
+        # Backslashes are escaped before the other characters, not after
+        assert copy_text_value("C:\\new") == "C:\\\\new"
+        assert copy_text_value("\\N") == "\\\\N"
+        assert copy_text_value("\\\n") == "\\\\\\n"
+
+    def test_round_trip(self):
+        # Unescaped as PostgreSQL's COPY text format does
+        def unescape(value: str) -> str:
+            escapes = {"\\": "\\", "t": "\t", "n": "\n", "r": "\r"}
+            result = []
+            chars = iter(value)
+            for char in chars:
+                result.append(escapes[next(chars)] if char == "\\" else char)
+            return "".join(result)
+
+        for value in ["x", "a\tb", "line\nline", "\\", "\\N", '{"a": "b\\\\c"}']:
+            assert unescape(copy_text_value(value)) == value
+
+
+class TestMergeStagedRows:
+    def test_insert_fails_on_duplicates(self):
+        client = FakeClient()
+        PgvectorClient._merge_staged_rows(client, upsert=False)
+
+        # Like rows copied straight into the table, not silently dropped
+        [statement] = client.session.statements
+        assert statement.startswith("INSERT INTO document_chunk")
+        assert "ON CONFLICT" not in statement
+
+    def test_upsert(self):
+        client = FakeClient()
+        PgvectorClient._merge_staged_rows(client, upsert=True)
+
+        [statement] = client.session.statements
+        assert "ON CONFLICT (id) DO UPDATE SET" in statement
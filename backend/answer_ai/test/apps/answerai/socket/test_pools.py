@@ -0,0 +1,197 @@
+import fakeredis
+import pytest
+
+from answer_ai.socket import utils as socket_utils
+from answer_ai.socket.utils import (
+    RedisSessionPool,
+    RedisUsagePool,
+    SessionPool,
+    UsagePool,
+)
+
+
+class FakeClock:
+    """Stands in for the `time` module of the pools."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(socket_utils, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    redis = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(
+        socket_utils, "get_redis_connection", lambda *args, **kwargs: redis
+    )
+    return redis
+
+
+def get_session_pool(ttl: float = 60) -> RedisSessionPool:
+    return RedisSessionPool("test:session_pool", ttl, "redis://localhost:6379/0")
+
+
+def get_usage_pool(ttl: float = 60) -> RedisUsagePool:
+    return RedisUsagePool("test:usage_pool", ttl, "redis://localhost:6379/0")
+
+
+class TestSessionPool:
+    def test_get_many(self):
+        pool = SessionPool()
+        pool["a"] = {"id": "user-a"}
+        pool["b"] = {"id": "user-b"}
+
+        assert pool.get_many(["b", "unknown", "a"]) == [
+            {"id": "user-b"},
+            None,
+            {"id": "user-a"},
+        ]
+        assert pool.get_many([]) == []
+
+    def test_no_expiry(self, clock):
+        pool = SessionPool()
+        pool["a"] = {"id": "user-a"}
+        pool.touch("a")
+
+        clock.now += 3600
+        assert pool.cleanup() == 0
+        assert "a" in pool
+
+
+class TestRedisSessionPool:
+    def test_get_many(self, redis, clock):
+        pool = get_session_pool()
+        pool["a"] = {"id": "user-a"}
+        pool["b"] = {"id": "user-b"}
+
+        assert pool.get_many(["b", "unknown", "a"]) == [
+            {"id": "user-b"},
+            None,
+            {"id": "user-a"},
+        ]
+        assert pool.get_many([]) == []
+
+    def test_cleanup(self, redis, clock):
+        pool = get_session_pool(ttl=60)
+        pool["a"] = {"id": "user-a"}
+        clock.now += 30
+        pool["b"] = {"id": "user-b"}
+
+        clock.now += 30
+        assert pool.cleanup() == 1
+        assert "a" not in pool
+        assert pool.get("b") == {"id": "user-b"}
+        assert redis.zrange(pool.expiry_name, 0, -1) == ["b"]
+
+        clock.now += 30
+        assert pool.cleanup() == 1
+        assert len(pool) == 0
+        assert pool.cleanup() == 0
+
+    def test_touch(self, redis, clock):
+        pool = get_session_pool(ttl=60)
+        pool["a"] = {"id": "user-a"}
+
+        clock.now += 50
+        pool.touch("a")
+        clock.now += 50
+        assert pool.cleanup() == 0
+        assert pool.get("a") == {"id": "user-a"}
+
+    def test_touch_unknown_session(self, redis, clock):
+        pool = get_session_pool(ttl=60)
+        pool["a"] = {"id": "user-a"}
+        del pool["a"]
+
+        # A heartbeat racing the disconnect doesn't bring the session back
+        pool.touch("a")
+        assert redis.zcard(pool.expiry_name) == 0
+        assert "a" not in pool
+
+    def test_delete(self, redis, clock):
+        pool = get_session_pool()
+        pool["a"] = {"id": "user-a"}
+
+        del pool["a"]
+        assert redis.zcard(pool.expiry_name) == 0
+        with pytest.raises(KeyError):
+            del pool["a"]
+
+    def test_no_ttl(self, redis, clock):
+        pool = get_session_pool(ttl=0)
+        pool["a"] = {"id": "user-a"}
+        pool.touch("a")
+
+        clock.now += 3600
+        assert redis.exists(pool.expiry_name) == 0
+        assert pool.cleanup() == 0
+        assert "a" in pool
+
+
+class TestUsagePool:
+    def test_usage(self, clock):
+        pool = UsagePool(ttl=60)
+        pool.touch("llama3")
+        clock.now += 30
+        pool.touch("mistral")
+
+        assert sorted(pool.get_model_ids()) == ["llama3", "mistral"]
+
+        clock.now += 30
+        assert pool.get_model_ids() == ["mistral"]
+        assert pool.cleanup() == 1
+        assert pool.models.keys() == {"mistral"}
+
+    def test_touch_extends_usage(self, clock):
+        pool = UsagePool(ttl=60)
+        pool.touch("llama3")
+        clock.now += 50
+        pool.touch("llama3")
+
+        clock.now += 50
+        assert pool.get_model_ids() == ["llama3"]
+        assert pool.cleanup() == 0
+
+
+class TestRedisUsagePool:
+    def test_usage(self, redis, clock):
+        pool = get_usage_pool(ttl=60)
+        pool.touch("llama3")
+        clock.now += 30
+        pool.touch("mistral")
+
+        assert sorted(pool.get_model_ids()) == ["llama3", "mistral"]
+
+        clock.now += 30
+        assert pool.get_model_ids() == ["mistral"]
+        assert pool.cleanup() == 1
+        assert redis.zrange(pool.name, 0, -1) == ["mistral"]
+
+    def test_touch_extends_usage(self, redis, clock):
+        pool = get_usage_pool(ttl=60)
+        pool.touch("llama3")
+        clock.now += 50
+        pool.touch("llama3")
+
+        clock.now += 50
+        assert pool.get_model_ids() == ["llama3"]
+        assert pool.cleanup() == 0
+
+    def test_set_expires_with_last_usage(self, redis, clock):
+        pool = get_usage_pool(ttl=60)
+        pool.touch("llama3")
+        assert redis.ttl(pool.name) == 120
+
+        # Pushed back by every usage
+        redis.expire(pool.name, 5)
+        pool.touch("mistral")
+        assert redis.ttl(pool.name) == 120
@@ -0,0 +1,191 @@
+import json
+
+import fakeredis
+import pycrdt as Y
+import pytest
+
+from answer_ai.socket.utils import YdocManager
+
+PREFIX = "test:ydoc:documents"
+
+
+def get_text(update: bytes) -> str:
+    doc = Y.Doc()
+    doc.apply_update(update)
+    return str(doc.get("content", type=Y.Text))
+
+
+class Editor:
+    """A client editing a document, yielding one update per edit."""
+
+    def __init__(self):
+        self.doc = Y.Doc()
+        self.text = self.doc.get("content", type=Y.Text)
+
+    def insert(self, value: str) -> bytes:
+        state = self.doc.get_state()
+        self.text += value
+        return self.doc.get_update(state)
+
+
+def get_redis_manager(**kwargs) -> YdocManager:
+    server = fakeredis.FakeServer()
+    return YdocManager(
+        redis=fakeredis.FakeAsyncRedis(server=server, decode_responses=True),
+        redis_key_prefix=PREFIX,
+        redis_binary=fakeredis.FakeAsyncRedis(server=server),
+        **kwargs,
+    )
+
+
+class TestYdocManager:
+    @pytest.mark.asyncio
+    async def test_no_compaction_below_threshold(self):
+        manager = YdocManager(compaction_threshold=3)
+        editor = Editor()
+
+        await manager.append_to_updates("doc", editor.insert("a"))
+        await manager.append_to_updates("doc", editor.insert("b"))
+
+        assert manager._compactions == {}
+        assert len(await manager.get_updates("doc")) == 2
+        assert get_text(await manager.get_state("doc")) == "ab"
+
+    @pytest.mark.asyncio
+    async def test_compaction(self):
+        manager = YdocManager(compaction_threshold=3)
+        editor = Editor()
+
+        for value in "abc":
+            await manager.append_to_updates("doc", editor.insert(value))
+        await manager._compactions["doc"]
+
+        assert manager._updates["doc"] == []
+        assert get_text(manager._states["doc"]) == "abc"
+
+        await manager.append_to_updates("doc", editor.insert("d"))
+        updates = await manager.get_updates("doc")
+        # The snapshot, followed by the updates since
+        assert len(updates) == 2
+        assert get_text(await manager.get_state("doc")) == "abcd"
+
+    @pytest.mark.asyncio
+    async def test_updates_appended_during_compaction_are_kept(self):
+        manager = YdocManager(compaction_threshold=3)
+        editor = Editor()
+
+        for value in "abc":
+            await manager.append_to_updates("doc", editor.insert(value))
+        # Appended before the compaction gets to run
+        await manager.append_to_updates("doc", editor.insert("d"))
+        await manager._compactions["doc"]
+
+        assert get_text(await manager.get_state("doc")) == "abcd"
+
+    @pytest.mark.asyncio
+    async def test_clear_during_compaction(self):
+        manager = YdocManager(compaction_threshold=3)
+        editor = Editor()
+
+        for value in "abc":
+            await manager.append_to_updates("doc", editor.insert(value))
+        await manager.clear_document("doc")
+        await manager._compactions["doc"]
+
+        assert not await manager.document_exists("doc")
+        assert get_text(await manager.get_state("doc")) == ""
+
+    @pytest.mark.asyncio
+    async def test_compaction_disabled(self):
+        manager = YdocManager(compaction_threshold=0)
+        editor = Editor()
+
+        for value in "abcde":
+            await manager.append_to_updates("doc", editor.insert(value))
+
+        assert manager._compactions == {}
+        assert len(await manager.get_updates("doc")) == 5
+        assert get_text(await manager.get_state("doc")) == "abcde"
+
+
+class TestRedisYdocManager:
+    @pytest.mark.asyncio
+    async def test_keys_share_hash_tag(self):
+        manager = get_redis_manager(compaction_threshold=3)
+        editor = Editor()
+
+        await manager.add_user("note:1", "sid")
+        for value in "abc":
+            await manager.append_to_updates("note:1", editor.insert(value))
+        await manager._compactions["note_1"]
+
+        # One Redis Cluster slot for all the keys of a document
+        assert set(await manager._redis.keys("*")) == {
+            f"{PREFIX}:{{note_1}}:state",
+            f"{PREFIX}:{{note_1}}:users",
+        }
+        assert await manager.get_users("note:1") == ["sid"]
+        assert get_text(await manager.get_state("note:1")) == "abc"
+
+    @pytest.mark.asyncio
+    async def test_compaction(self):
+        manager = get_redis_manager(compaction_threshold=3)
+        editor = Editor()
+
+        for value in "abcd":
+            await manager.append_to_updates("doc", editor.insert(value))
+        await manager._compactions["doc"]
+
+        assert len(await manager.get_updates("doc")) == 1
+        assert get_text(await manager.get_state("doc")) == "abcd"
+
+    @pytest.mark.asyncio
+    async def test_legacy_keys(self):
+        manager = get_redis_manager(compaction_threshold=3)
+        editor = Editor()
+
+        # Written untagged, with JSON updates, by a previous version
+        redis = manager._redis_binary
+        await redis.set(f"{PREFIX}:doc:state", editor.insert("a"))
+        await redis.rpush(f"{PREFIX}:doc:updates", json.dumps(list(editor.insert("b"))))
+        await manager._redis.sadd(f"{PREFIX}:doc:users", "old")
+        await manager.add_user("doc", "new")
+        await manager.append_to_updates("doc", editor.insert("c"))
+
+        assert await manager.document_exists("doc")
+        assert sorted(await manager.get_users("doc")) == ["new", "old"]
+        assert get_text(await manager.get_state("doc")) == "abc"
+
+        # Moved to the tagged keys by the compaction started on read
+        await manager._compactions["doc"]
+        assert await redis.exists(f"{PREFIX}:doc:state", f"{PREFIX}:doc:updates") == 0
+        assert len(await manager.get_updates("doc")) == 1
+        assert get_text(await manager.get_state("doc")) == "abc"
+
+    @pytest.mark.asyncio
+    async def test_clear_document(self):
+        manager = get_redis_manager()
+        editor = Editor()
+
+        await manager._redis_binary.set(f"{PREFIX}:doc:state", editor.insert("a"))
+        await manager.append_to_updates("doc", editor.insert("b"))
+        await manager.add_user("doc", "sid")
+
+        await manager.clear_document("doc")
+        assert not await manager.document_exists("doc")
+        assert await manager._redis.keys("*") == []
+
+    @pytest.mark.asyncio
+    async def test_remove_user_from_all_documents(self):
+        manager = get_redis_manager()
+        editor = Editor()
+
+        for document_id in ("a", "b"):
+            await manager.append_to_updates(document_id, editor.insert("x"))
+            await manager.add_user(document_id, "sid")
+        await manager.add_user("b", "other")
+
+        await manager.remove_user_from_all_documents("sid")
+        assert not await manager.document_exists("a")
+        assert await manager.document_exists("b")
+        assert await manager.get_users("b") == ["other"]
@@ -0,0 +1,75 @@
+import asyncio
+import threading
+
+import pytest
+
+from answer_ai.models.users import Users
+from answer_ai.utils.auth_cache import LastActiveWriter
+
+
+class FakeUsers:
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.written = []
+        self.batches = []
+        self.event = threading.Event()
+
+    def update_last_active_by_id(self, id):
+        self.written.append((id, threading.current_thread()))
+        self.event.set()
+        if self.fail:
+            raise Exception("database is down")
+
+    def update_last_active_by_ids(self, last_active_by_id):
+        self.batches.append(last_active_by_id)
+
+
+@pytest.fixture
+def users(monkeypatch):
+    users = FakeUsers()
+    for name in ("update_last_active_by_id", "update_last_active_by_ids"):
+        monkeypatch.setattr(Users, name, getattr(users, name))
+    return users
+
+
+class TestLastActiveWriter:
+    @pytest.mark.asyncio
+    async def test_touch_without_batching(self, users):
+        writer = LastActiveWriter(interval=0)
+        writer.start()
+
+        writer.touch("a")
+
+        # Written in a worker thread, the event loop doesn't wait on it
+        await asyncio.to_thread(users.event.wait, 5)
+        [(id, thread)] = users.written
+        assert id == "a"
+        assert thread is not threading.current_thread()
+
+    @pytest.mark.asyncio
+    async def test_touch_without_batching_failure(self, users):
+        users.fail = True
+        writer = LastActiveWriter(interval=0)
+
+        writer.touch("a")
+        await asyncio.to_thread(users.event.wait, 5)
+        assert [id for id, _ in users.written] == ["a"]
+
+    def test_touch_outside_event_loop(self, monkeypatch):
+        written = []
+        monkeypatch.setattr(Users, "update_last_active_by_id", written.append)
+
+        LastActiveWriter(interval=0).touch("a")
+        assert written == ["a"]
+
+    @pytest.mark.asyncio
+    async def test_touch_batches(self, users):
+        writer = LastActiveWriter(interval=60)
+        writer.start()
+
+        writer.touch("a")
+        writer.touch("b")
+        assert users.written == []
+
+        await writer.close()
+        assert [sorted(batch) for batch in users.batches] == [["a", "b"]]
@@ -0,0 +1,188 @@
+import time
+
+import pytest
+
+from answer_ai.utils.backend_routing import (
+    AFFINITY_MAX_EXTRA_REQUESTS,
+    LATENCY_EWMA_ALPHA,
+    BackendRouter,
+)
+
+URLS = ["http://a:11434", "http://b:11434", "http://c:11434"]
+
+
+def get_router(policy: str = "least_requests", **kwargs) -> BackendRouter:
+    return BackendRouter(
+        policy=policy,
+        model_affinity=kwargs.get("model_affinity", False),
+        eject_failures=kwargs.get("eject_failures", 3),
+        eject_duration=kwargs.get("eject_duration", 60),
+    )
+
+
+def set_latency(router: BackendRouter, url: str, latency: float) -> None:
+    router.get_backend(url).latency = latency
+
+
+class TestBackendRouter:
+    def test_single_backend(self):
+        router = get_router()
+        router.begin(URLS[1])
+        assert router.select(URLS, [1], "llama3") == 1
+
+    def test_least_requests(self):
+        router = get_router()
+        router.begin(URLS[0])
+        router.begin(URLS[0])
+        router.begin(URLS[1])
+        assert router.select(URLS, [0, 1, 2], "llama3") == 2
+        assert router.select(URLS, [0, 1], "llama3") == 1
+
+    def test_least_requests_counts_in_flight(self):
+        router = get_router()
+        request = router.begin(URLS[0])
+        router.begin(URLS[1])
+        assert router.get_backend(URLS[0]).in_flight == 1
+
+        request.done()
+        request.done()
+        assert router.get_backend(URLS[0]).in_flight == 0
+        assert router.get_backend(URLS[0]).requests == 1
+        assert router.select(URLS, [0, 1], "llama3") == 0
+
+    def test_lowest_latency(self):
+        router = get_router("latency")
+        set_latency(router, URLS[0], 0.5)
+        set_latency(router, URLS[1], 0.1)
+        set_latency(router, URLS[2], 0.3)
+        assert router.select(URLS, [0, 1, 2], "llama3") == 1
+
+        # Weighted by the requests in flight: 0.1 * 4 > 0.3 * 1
+        for _ in range(3):
+            router.begin(URLS[1])
+        assert router.select(URLS, [0, 1, 2], "llama3") == 2
+
+    def test_lowest_latency_tries_new_backends_first(self):
+        router = get_router("latency")
+        set_latency(router, URLS[0], 0.1)
+        assert router.select(URLS, [0, 1], "llama3") == 1
+
+    def test_latency_moving_average(self):
+        router = get_router("latency")
+
+        request = router.begin(URLS[0])
+        request.started_at -= 1.0
+        request.responded(200)
+        request.done()
+        assert router.get_backend(URLS[0]).latency == pytest.approx(1.0, abs=0.05)
+
+        request = router.begin(URLS[0])
+        request.started_at -= 2.0
+        request.responded(200)
+        assert router.get_backend(URLS[0]).latency == pytest.approx(
+            1.0 + LATENCY_EWMA_ALPHA * (2.0 - 1.0), abs=0.05
+        )
+
+    def test_random(self):
+        router = get_router("random")
+        picks = {router.select(URLS, [0, 2], "llama3") for _ in range(100)}
+        assert picks == {0, 2}
+
+    def test_unknown_policy(self):
+        assert get_router("fastest").policy == "least_requests"
+
+    def test_register_policy(self):
+        router = get_router("last")
+        router.register_policy("last", lambda candidates: candidates[-1][0])
+        router.policy = "last"
+        assert router.select(URLS, [0, 1, 2], "llama3") == 2
+
+    def test_ejection_and_recovery(self):
+        router = get_router(eject_failures=2)
+        router.begin(URLS[1])
+
+        request = router.begin(URLS[0])
+        request.failed()
+        request.done()
+        assert router.select(URLS, [0, 1], "llama3") == 0
+
+        # Left out after failing twice in a row, despite being less busy
+        router.record_health(URLS[0], ok=False)
+        assert router.get_backend(URLS[0]).is_ejected()
+        assert router.select(URLS, [0, 1], "llama3") == 1
+
+        # Back as soon as it answers
+        router.record_health(URLS[0], ok=True)
+        assert not router.get_backend(URLS[0]).is_ejected()
+        assert router.select(URLS, [0, 1], "llama3") == 0
+        assert router.get_backend(URLS[0]).errors == 2
+
+    def test_ejection_expires(self):
+        router = get_router(eject_failures=1, eject_duration=10)
+        router.begin(URLS[1])
+        request = router.begin(URLS[0])
+        request.responded(503)
+        request.done()
+        assert router.select(URLS, [0, 1], "llama3") == 1
+
+        router.get_backend(URLS[0]).ejected_until = time.monotonic() - 1
+        assert router.select(URLS, [0, 1], "llama3") == 0
+
+    def test_client_errors_are_not_failures(self):
+        router = get_router(eject_failures=1)
+        router.begin(URLS[0]).responded(404)
+        assert not router.get_backend(URLS[0]).is_ejected()
+
+    def test_all_ejected(self):
+        router = get_router(eject_failures=1)
+        router.begin(URLS[0])
+        for url in URLS[:2]:
+            router.record_health(url, ok=False)
+        assert router.select(URLS, [0, 1], "llama3") == 1
+
+    def test_ejection_disabled(self):
+        router = get_router(eject_failures=0)
+        for _ in range(10):
+            router.record_health(URLS[0], ok=False)
+        assert not router.get_backend(URLS[0]).is_ejected()
+
+    def test_model_affinity(self):
+        router = get_router(model_affinity=True)
+        router.set_loaded_models(URLS[2], ["llama3"])
+        router.begin(URLS[2])
+        assert router.select(URLS, [0, 1, 2], "llama3") == 2
+        assert router.select(URLS, [0, 1, 2], "mistral") in (0, 1)
+
+    def test_model_affinity_busy_backend(self):
+        router = get_router(model_affinity=True)
+        router.set_loaded_models(URLS[2], ["llama3"])
+        for _ in range(AFFINITY_MAX_EXTRA_REQUESTS):
+            router.begin(URLS[2])
+        assert router.select(URLS, [0, 1, 2], "llama3") == 2
+
+        # Much busier than the others
+        router.begin(URLS[2])
+        assert router.select(URLS, [0, 1, 2], "llama3") in (0, 1)
+
+    def test_model_affinity_disabled(self):
+        router = get_router()
+        router.set_loaded_models(URLS[2], ["llama3"])
+        router.begin(URLS[2])
+        assert router.select(URLS, [0, 2], "llama3") == 0
+
+    def test_backends_by_base_url(self):
+        router = get_router(eject_failures=1)
+        urls = ["http://gateway/team-a/v1", "http://gateway/team-b/v1/"]
+        router.begin(urls[0])
+        router.record_health("http://gateway/team-b/v1", ok=False)
+
+        assert router.get_backend(urls[1]) is router.get_backend(urls[1].rstrip("/"))
+        assert router.get_backend(urls[0]).in_flight == 1
+        assert router.get_backend(urls[1]).in_flight == 0
+        assert not router.get_backend(urls[0]).is_ejected()
+        assert router.select(urls, [0, 1], None) == 0
+
+        assert set(router.get_stats()["backends"]) == {
+            "http://gateway/team-a/v1",
+            "http://gateway/team-b/v1",
+        }
@@ -0,0 +1,190 @@
+import asyncio
+import threading
+
+import pytest
+
+from answer_ai.utils import chat_buffer
+from answer_ai.utils.chat_buffer import ChatMessageWriteBuffer
+
+
+class FakeChats:
+    def __init__(self, fail: int = 0):
+        self.fail = fail
+        self.upserts = []
+        self.appends = []
+
+    def upsert_chat_message_by_id_and_message_id(self, chat_id, message_id, message):
+        if self.fail:
+            self.fail -= 1
+            raise Exception("database is down")
+        self.upserts.append((chat_id, message_id, dict(message)))
+
+    def append_to_message_by_id_and_message_id(
+        self, chat_id, message_id, content="", append=None, prepend=None
+    ):
+        self.appends.append((chat_id, message_id, content, append, prepend))
+
+
+class BlockingWrite:
+    """`_write` holding the first write until released."""
+
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.contents = []
+
+    def __call__(self, key, batch):
+        self.started.set()
+        self.release.wait(5)
+        if self.fail:
+            raise Exception("database is down")
+        self.contents.append(batch["message"]["content"])
+
+
+@pytest.fixture
+def chats(monkeypatch):
+    chats = FakeChats()
+    monkeypatch.setattr(chat_buffer, "Chats", chats)
+    return chats
+
+
+class TestChatMessageWriteBuffer:
+    @pytest.mark.asyncio
+    async def test_coalesces_updates(self, chats):
+        buffer = ChatMessageWriteBuffer(flush_interval=60, flush_bytes=1 << 20)
+
+        buffer.put("c", "m", {"content": "a", "model": "x"})
+        buffer.put("c", "m", {"content": "ab"})
+        buffer.append("c", "m", content="c")
+        buffer.append("c", "m", append={"sources": [1]})
+        buffer.append("c", "m", append={"sources": [2]}, prepend={"files": [3]})
+        await asyncio.sleep(0)
+        assert chats.upserts == [] and chats.appends == []
+
+        await buffer.flush("c", "m")
+        assert chats.upserts == [("c", "m", {"content": "abc", "model": "x"})]
+        assert chats.appends == [("c", "m", "", {"sources": [1, 2]}, {"files": [3]})]
+        assert buffer.entries == {}
+
+    @pytest.mark.asyncio
+    async def test_put_replaces_appended_fields(self, chats):
+        buffer = ChatMessageWriteBuffer(flush_interval=60, flush_bytes=1 << 20)
+
+        buffer.append("c", "m", content="old", append={"sources": [1]})
+        buffer.put("c", "m", {"content": "new"})
+
+        await buffer.flush("c", "m")
+        assert chats.upserts == [("c", "m", {"content": "new"})]
+        assert chats.appends == [("c", "m", "", {"sources": [1]}, {})]
+
+    @pytest.mark.asyncio
+    async def test_put_counts_unwritten_bytes(self, chats):
+        buffer = ChatMessageWriteBuffer(flush_interval=60, flush_bytes=100)
+        key = ("c", "m")
+
+        # The whole accumulated content is put on every delta
+        content = "x" * 60
+        buffer.put("c", "m", {"content": content})
+        await asyncio.sleep(0)
+        assert chats.upserts == []
+
+        content += "x" * 40
+        buffer.put("c", "m", {"content": content})
+        await buffer.entries[key]["task"]
+        assert chats.upserts == [("c", "m", {"content": content})]
+
+        # Only the growth since the last write counts
+        content += "0123456789"
+        buffer.put("c", "m", {"content": content})
+        assert buffer._get_size(buffer.entries[key]) == 10
+        assert not buffer.entries[key]["wakeup"].is_set()
+
+        await buffer.flush("c", "m")
+        assert chats.upserts[-1] == ("c", "m", {"content": content})
+
+    @pytest.mark.asyncio
+    async def test_put_during_write_counts_unwritten_bytes(self, monkeypatch):
+        buffer = ChatMessageWriteBuffer(flush_interval=60, flush_bytes=100)
+        write = BlockingWrite()
+        monkeypatch.setattr(buffer, "_write", write)
+
+        content = "x" * 100
+        buffer.put("c", "m", {"content": content})
+        await asyncio.to_thread(write.started.wait, 5)
+
+        # Put while the first write is running
+        entry = buffer.entries[("c", "m")]
+        for _ in range(5):
+            content += "0123456789"
+            buffer.put("c", "m", {"content": content})
+        assert buffer._get_size(entry) == 50
+        assert not entry["wakeup"].is_set()
+
+        write.release.set()
+        await buffer.flush("c", "m")
+        assert write.contents == ["x" * 100, content]
+
+    @pytest.mark.asyncio
+    async def test_failed_write_counts_bytes_again(self, monkeypatch):
+        buffer = ChatMessageWriteBuffer(flush_interval=60, flush_bytes=100)
+        write = BlockingWrite(fail=True)
+        monkeypatch.setattr(buffer, "_write", write)
+
+        content = "x" * 100
+        buffer.put("c", "m", {"content": content})
+        await asyncio.to_thread(write.started.wait, 5)
+
+        entry = buffer.entries[("c", "m")]
+        content += "0123456789"
+        buffer.put("c", "m", {"content": content})
+        assert buffer._get_size(entry) == 10
+
+        write.release.set()
+        for _ in range(100):
+            if not entry["written"]:
+                break
+            await asyncio.sleep(0.01)
+        # Nothing was written, the whole content counts
+        assert entry["written"] == {}
+        assert buffer._get_size(entry) == 110
+        entry["task"].cancel()
+
+    @pytest.mark.asyncio
+    async def test_append_counts_bytes(self, chats):
+        buffer = ChatMessageWriteBuffer(flush_interval=60, flush_bytes=100)
+
+        buffer.append("c", "m", content="x" * 60)
+        await asyncio.sleep(0.01)
+        assert chats.appends == []
+
+        buffer.append("c", "m", content="x" * 60)
+        await asyncio.sleep(0.01)
+        assert chats.appends == [("c", "m", "x" * 120, {}, {})]
+
+    @pytest.mark.asyncio
+    async def test_interval_flush(self, chats):
+        buffer = ChatMessageWriteBuffer(flush_interval=0.05, flush_bytes=1 << 20)
+
+        buffer.put("c", "m", {"content": "a"})
+        await asyncio.sleep(0.01)
+        assert chats.upserts == []
+
+        await asyncio.sleep(0.1)
+        assert chats.upserts == [("c", "m", {"content": "a"})]
+        assert buffer.entries == {}
+
+    @pytest.mark.asyncio
+    async def test_forced_flush_keeps_failed_updates(self, chats):
+        chats.fail = 1
+        buffer = ChatMessageWriteBuffer(flush_interval=0.05, flush_bytes=1 << 20)
+
+        buffer.put("c", "m", {"content": "a"})
+        await buffer.flush("c", "m")
+        assert chats.upserts == []
+        assert ("c", "m") in buffer.entries
+
+        # Retried in the background
+        await asyncio.sleep(0.1)
+        assert chats.upserts == [("c", "m", {"content": "a"})]
+        assert buffer.entries == {}
@@ -0,0 +1,140 @@
+import uuid
+
+import pytest
+
+from answer_ai.models.groups import GroupForm, Groups
+from answer_ai.models.models import ModelForm, ModelMeta, ModelParams, Models
+from answer_ai.utils.model_access import (
+    MODEL_ACCESS_INDEX,
+    ModelAccess,
+    ModelAccessIndex,
+)
+
+
+class TestModelAccess:
+    def test_public(self):
+        access = ModelAccess("owner", None)
+        assert access.can_read("user", frozenset())
+
+    def test_owner(self):
+        access = ModelAccess("owner", {})
+        assert access.can_read("owner", frozenset())
+        assert not access.can_read("user", frozenset())
+
+    def test_user_ids(self):
+        access = ModelAccess("owner", {"read": {"user_ids": ["user"]}})
+        assert access.can_read("user", frozenset())
+        assert not access.can_read("other", frozenset())
+
+    def test_group_ids(self):
+        access = ModelAccess("owner", {"read": {"group_ids": ["a", "b"]}})
+        assert access.can_read("user", frozenset(["b", "c"]))
+        assert not access.can_read("user", frozenset(["c"]))
+        assert not access.can_read("user", frozenset())
+
+    def test_empty_read(self):
+        access = ModelAccess("owner", {"read": None, "write": {}})
+        assert not access.can_read("user", frozenset(["a"]))
+
+
+class TestModelAccessIndex:
+    def test_load_is_in_memory(self, monkeypatch):
+        index = ModelAccessIndex(redis_url="", redis_sentinels=[], redis_cluster=False)
+        loads = []
+        monkeypatch.setattr(Models, "get_all_models", lambda: loads.append(1) or [])
+        monkeypatch.setattr(Groups, "get_user_group_ids_map", lambda: {})
+
+        index.can_read("user", "model")
+        index.get_user_group_ids("user")
+        assert len(loads) == 1
+
+        index.invalidate()
+        index.has_model("model")
+        assert len(loads) == 2
+
+    def test_drop_during_build_is_not_lost(self, monkeypatch):
+        index = ModelAccessIndex(redis_url="", redis_sentinels=[], redis_cluster=False)
+
+        def get_all_models():
+            # A change committed while the index is being built
+            index.drop()
+            return []
+
+        monkeypatch.setattr(Models, "get_all_models", get_all_models)
+        monkeypatch.setattr(Groups, "get_user_group_ids_map", lambda: {})
+
+        index.load()
+        assert index.built_version != index.version
+
+
+@pytest.fixture
+def model():
+    id = f"test-model-{uuid.uuid4()}"
+    Models.insert_new_model(
+        ModelForm(
+            id=id,
+            name="Test",
+            meta=ModelMeta(),
+            params=ModelParams(),
+            access_control={},
+        ),
+        user_id="owner",
+    )
+    yield id
+    Models.delete_model_by_id(id)
+
+
+@pytest.fixture
+def group():
+    group = Groups.insert_new_group(
+        "owner", GroupForm(name=f"test-group-{uuid.uuid4()}", description="")
+    )
+    yield group.id
+    Groups.delete_group_by_id(group.id)
+
+
+class TestModelAccessInvalidation:
+    def test_model_access_change(self, model):
+        user_id = str(uuid.uuid4())
+        assert not MODEL_ACCESS_INDEX.can_read(user_id, model)
+
+        form = ModelForm(**Models.get_model_by_id(model).model_dump())
+        form.access_control = {"read": {"user_ids": [user_id]}}
+        Models.update_model_by_id(model, form)
+        assert MODEL_ACCESS_INDEX.can_read(user_id, model)
+
+        form.access_control = None
+        Models.update_model_by_id(model, form)
+        assert MODEL_ACCESS_INDEX.can_read(str(uuid.uuid4()), model)
+
+    def test_model_delete(self, model):
+        assert MODEL_ACCESS_INDEX.has_model(model)
+        Models.delete_model_by_id(model)
+        assert not MODEL_ACCESS_INDEX.has_model(model)
+
+    def test_group_membership_change(self, model, group):
+        user_id = str(uuid.uuid4())
+        form = ModelForm(**Models.get_model_by_id(model).model_dump())
+        form.access_control = {"read": {"group_ids": [group]}}
+        Models.update_model_by_id(model, form)
+        assert not MODEL_ACCESS_INDEX.can_read(user_id, model)
+
+        Groups.add_users_to_group(group, [user_id])
+        assert MODEL_ACCESS_INDEX.get_user_group_ids(user_id) == frozenset([group])
+        assert MODEL_ACCESS_INDEX.can_read(user_id, model)
+
+        Groups.remove_users_from_group(group, [user_id])
+        assert MODEL_ACCESS_INDEX.get_user_group_ids(user_id) == frozenset()
+        assert not MODEL_ACCESS_INDEX.can_read(user_id, model)
+
+    def test_group_members_set(self, model, group):
+        user_id = str(uuid.uuid4())
+        form = ModelForm(**Models.get_model_by_id(model).model_dump())
+        form.access_control = {"read": {"group_ids": [group]}}
+        Models.update_model_by_id(model, form)
+
+        Groups.set_group_user_ids_by_id(group, [user_id])
+        assert MODEL_ACCESS_INDEX.can_read(user_id, model)
+
+        Groups.delete_group_by_id(group)
+        assert not MODEL_ACCESS_INDEX.can_read(user_id, model)
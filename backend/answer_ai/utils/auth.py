@@ -23,6 +23,7 @@ from opentelemetry import trace
 
 
 from answer_ai.utils.access_control import has_permission
+from answer_ai.utils.auth_cache import AUTH_USER_CACHE, LAST_ACTIVE_WRITER
 from answer_ai.models.users import Users
 
 from answer_ai.constants import ERROR_MESSAGES
@@ -314,7 +315,7 @@ async def get_current_user(
                     detail="Invalid token",
                 )
 
-            user = Users.get_user_by_id(data["id"])
+            user = AUTH_USER_CACHE.get_user_by_id(data["id"])
             if user is None:
                 raise HTTPException(
                     status_code=status.HTTP_401_UNAUTHORIZED,
@@ -339,10 +340,9 @@ async def get_current_user(
                     current_span.set_attribute("client.user.role", user.role)
                     current_span.set_attribute("client.auth.type", "jwt")
 
-                # Refresh the user's last active timestamp asynchronously
+                # Refresh the user's last active timestamp in the next batch
                 # to prevent blocking the request
-                if background_tasks:
-                    background_tasks.add_task(Users.update_last_active_by_id, user.id)
+                LAST_ACTIVE_WRITER.touch(user.id)
             return user
         else:
             raise HTTPException(
@@ -365,7 +365,7 @@ async def get_current_user(
 
 
 def get_current_user_by_api_key(request, api_key: str):
-    user = Users.get_user_by_api_key(api_key)
+    user = AUTH_USER_CACHE.get_user_by_api_key(api_key)
 
     if user is None:
         raise HTTPException(
@@ -393,7 +393,7 @@ def get_current_user_by_api_key(request, api_key: str):
         current_span.set_attribute("client.user.role", user.role)
         current_span.set_attribute("client.auth.type", "api_key")
 
-    Users.update_last_active_by_id(user.id)
+    LAST_ACTIVE_WRITER.touch(user.id)
     return user
 
 
@@ -0,0 +1,230 @@
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from typing import Optional
+
+from fastapi import FastAPI
+
+from answer_ai.env import (
+    AUTH_USER_CACHE_TTL,
+    REDIS_CLUSTER,
+    REDIS_KEY_PREFIX,
+    REDIS_SENTINEL_HOSTS,
+    REDIS_SENTINEL_PORT,
+    REDIS_URL,
+    USER_LAST_ACTIVE_FLUSH_INTERVAL,
+)
+from answer_ai.utils.redis import (
+    get_redis_connection,
+    get_sentinels_from_env,
+    listen_channel,
+)
+
+log = logging.getLogger(__name__)
+
+REDIS_AUTH_USER_CACHE_CHANNEL = f"{REDIS_KEY_PREFIX}:auth:users:invalidate"
+
+# Expired entries are dropped once the cache holds more entries than this
+MAX_ENTRIES = 10000
+
+
+class CachedUser:
+    def __init__(self, user, ttl: float):
+        self.user = user
+        self.expires_at = time.monotonic() + ttl
+
+
+class AuthUserCache:
+    """
+    Users of authenticated requests, and the users of API keys, cached for
+    `ttl` seconds so that most requests don't load their user from the
+    database.
+
+    The user table drops the cached user on every change of a user or of
+    its API key, in this process and, through Redis pub/sub, in the other
+    workers. The TTL bounds how long a worker which missed an invalidation
+    can serve a stale user.
+    """
+
+    def __init__(
+        self,
+        ttl: float,
+        redis_url: str,
+        redis_sentinels: list,
+        redis_cluster: bool,
+    ):
+        self.ttl = ttl
+        self.redis = (
+            get_redis_connection(
+                redis_url, redis_sentinels, redis_cluster, decode_responses=True
+            )
+            if redis_url
+            else None
+        )
+
+        self.lock = threading.Lock()
+        # Bumped on every invalidation, so that a user loaded before it is
+        # not cached
+        self.version = 0
+        self.users: dict[str, CachedUser] = {}
+        # API key hash to user id
+        self.api_keys: dict[str, tuple[str, float]] = {}
+
+    def get_user_by_id(self, id: str):
+        from answer_ai.models.users import Users
+
+        if self.ttl <= 0:
+            return Users.get_user_by_id(id)
+
+        entry = self.users.get(id)
+        if entry is not None and entry.expires_at > time.monotonic():
+            return entry.user.model_copy(deep=True)
+
+        version = self.version
+        user = Users.get_user_by_id(id)
+        if user is not None:
+            self.set_user(user, version)
+        return user
+
+    def get_user_by_api_key(self, api_key: str):
+        from answer_ai.models.users import Users
+
+        if self.ttl <= 0:
+            return Users.get_user_by_api_key(api_key)
+
+        key_hash = hashlib.sha256(api_key.encode()).hexdigest()
+        entry = self.api_keys.get(key_hash)
+        if entry is not None and entry[1] > time.monotonic():
+            return self.get_user_by_id(entry[0])
+
+        version = self.version
+        user = Users.get_user_by_api_key(api_key)
+        if user is not None and self.set_user(user, version):
+            self.api_keys[key_hash] = (user.id, time.monotonic() + self.ttl)
+        return user
+
+    def set_user(self, user, version: int) -> bool:
+        with self.lock:
+            if version != self.version:
+                return False
+
+            if len(self.users) + len(self.api_keys) >= MAX_ENTRIES:
+                self.prune()
+            self.users[user.id] = CachedUser(user.model_copy(deep=True), self.ttl)
+            return True
+
+    def prune(self) -> None:
+        now = time.monotonic()
+        self.users = {
+            id: entry for id, entry in self.users.items() if entry.expires_at > now
+        }
+        self.api_keys = {
+            key_hash: entry
+            for key_hash, entry in self.api_keys.items()
+            if entry[1] > now
+        }
+
+    def drop(self, id: Optional[str] = None) -> None:
+        with self.lock:
+            self.version += 1
+            if id is None:
+                self.users = {}
+                self.api_keys = {}
+            else:
+                self.users.pop(id, None)
+                self.api_keys = {
+                    key_hash: entry
+                    for key_hash, entry in self.api_keys.items()
+                    if entry[0] != id
+                }
+
+    def invalidate(self, id: Optional[str] = None) -> None:
+        """Drop the cached user `id`, or all users, in every worker."""
+        self.drop(id)
+        if self.redis is not None:
+            try:
+                self.redis.publish(REDIS_AUTH_USER_CACHE_CHANNEL, id or "*")
+            except Exception as e:
+                log.warning(f"Failed to publish the user cache invalidation: {e}")
+
+    async def listen(self, app: FastAPI) -> None:
+        # Invalidations missed while disconnected are made up for by dropping all
+        await listen_channel(
+            app.state.redis,
+            REDIS_AUTH_USER_CACHE_CHANNEL,
+            lambda data: self.drop(None if data == "*" else data),
+            on_resubscribe=self.drop,
+        )
+
+
+class LastActiveWriter:
+    """
+    Last active times of users, written to the database in one batch every
+    `interval` seconds instead of on each request.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+
+        self.pending: dict[str, int] = {}
+        self.task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self.interval > 0:
+            self.task = asyncio.create_task(self.run())
+
+    async def close(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+        await self.flush()
+
+    def touch(self, user_id: str) -> None:
+        if self.task is not None:
+            self.pending[user_id] = int(time.time())
+            return
+
+        # Not batching, written right away but off the event loop
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.write(user_id)
+            return
+        loop.run_in_executor(None, self.write, user_id)
+
+    def write(self, user_id: str) -> None:
+        from answer_ai.models.users import Users
+
+        try:
+            Users.update_last_active_by_id(user_id)
+        except Exception as e:
+            log.warning(f"Failed to write the last active time of {user_id}: {e}")
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+
+    async def flush(self) -> None:
+        from answer_ai.models.users import Users
+
+        pending, self.pending = self.pending, {}
+        if not pending:
+            return
+
+        try:
+            await asyncio.to_thread(Users.update_last_active_by_ids, pending)
+        except Exception as e:
+            log.warning(f"Failed to write the last active time of users: {e}")
+
+
+AUTH_USER_CACHE = AuthUserCache(
+    ttl=AUTH_USER_CACHE_TTL,
+    redis_url=REDIS_URL,
+    redis_sentinels=get_sentinels_from_env(REDIS_SENTINEL_HOSTS, REDIS_SENTINEL_PORT),
+    redis_cluster=REDIS_CLUSTER,
+)
+
+LAST_ACTIVE_WRITER = LastActiveWriter(interval=USER_LAST_ACTIVE_FLUSH_INTERVAL)
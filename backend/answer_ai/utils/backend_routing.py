@@ -0,0 +1,214 @@
+import logging
+import random
+import time
+from typing import Callable, Optional
+
+from answer_ai.env import (
+    ENABLE_LLM_ROUTING_MODEL_AFFINITY,
+    LLM_ROUTING_EJECT_DURATION,
+    LLM_ROUTING_EJECT_FAILURES,
+    LLM_ROUTING_POLICY,
+)
+
+log = logging.getLogger(__name__)
+
+# Weight of the latest request in the moving average of a backend latency
+LATENCY_EWMA_ALPHA = 0.3
+
+# A backend with the model loaded is preferred, unless it has more requests
+# in flight than this over the least busy backend
+AFFINITY_MAX_EXTRA_REQUESTS = 4
+
+
+class BackendState:
+    def __init__(self):
+        self.in_flight = 0
+        # Moving average of the time to the response headers, in seconds
+        self.latency: Optional[float] = None
+        self.requests = 0
+        self.errors = 0
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.loaded_models: set[str] = set()
+
+    def is_ejected(self) -> bool:
+        return self.ejected_until > time.monotonic()
+
+
+# A policy picks the index of a backend among (index, state) candidates
+RoutingPolicy = Callable[[list[tuple[int, BackendState]]], int]
+
+
+def pick_random(candidates: list[tuple[int, BackendState]]) -> int:
+    return random.choice(candidates)[0]
+
+
+def pick_least_requests(candidates: list[tuple[int, BackendState]]) -> int:
+    least = min(state.in_flight for _, state in candidates)
+    return random.choice([idx for idx, state in candidates if state.in_flight == least])
+
+
+def pick_lowest_latency(candidates: list[tuple[int, BackendState]]) -> int:
+    # Latency weighted by the requests in flight, backends without any
+    # latency yet are tried first
+    def get_cost(state: BackendState) -> float:
+        return (state.latency or 0.0) * (state.in_flight + 1)
+
+    lowest = min(get_cost(state) for _, state in candidates)
+    return random.choice(
+        [idx for idx, state in candidates if get_cost(state) == lowest]
+    )
+
+
+class BackendRequest:
+    """A request in flight to a backend, to report its outcome to the router."""
+
+    def __init__(self, router: "BackendRouter", state: BackendState):
+        self.router = router
+        self.state = state
+        self.started_at = time.monotonic()
+        self.finished = False
+
+        state.in_flight += 1
+        state.requests += 1
+
+    def responded(self, status: int) -> None:
+        """Record the response of the backend, once its headers are received."""
+        latency = time.monotonic() - self.started_at
+        if self.state.latency is None:
+            self.state.latency = latency
+        else:
+            self.state.latency += LATENCY_EWMA_ALPHA * (latency - self.state.latency)
+
+        self.router.record(self.state, ok=status < 500)
+
+    def failed(self) -> None:
+        """Record a request which got no response from the backend."""
+        self.router.record(self.state, ok=False)
+
+    def done(self) -> None:
+        if not self.finished:
+            self.finished = True
+            self.state.in_flight -= 1
+
+
+class BackendRouter:
+    """
+    Picks the backend a request for a model is sent to, among the backends
+    (Ollama or OpenAI connections) serving that model.
+
+    The policy picks among the healthy backends: `least_requests` (the least
+    requests in flight), `latency` (the lowest moving average latency,
+    weighted by the requests in flight) or `random`. Other policies can be
+    added with `register_policy`. With model affinity, backends which have
+    the model loaded in memory (from Ollama `/api/ps`) are preferred unless
+    they are much busier than the others.
+
+    A backend failing `eject_failures` times in a row, on requests or model
+    list fetches, is left out for `eject_duration` seconds or until it
+    answers again. If every backend of a model is ejected, all are used.
+
+    Backends are told apart by their configured base URL, so connections
+    sharing a host under different paths keep their own state. The state is
+    kept per process.
+    """
+
+    def __init__(
+        self,
+        policy: str,
+        model_affinity: bool,
+        eject_failures: int,
+        eject_duration: float,
+    ):
+        self.policies: dict[str, RoutingPolicy] = {
+            "least_requests": pick_least_requests,
+            "latency": pick_lowest_latency,
+            "random": pick_random,
+        }
+        if policy not in self.policies:
+            log.warning(f"Unknown routing policy {policy}, using least_requests")
+            policy = "least_requests"
+
+        self.policy = policy
+        self.model_affinity = model_affinity
+        self.eject_failures = eject_failures
+        self.eject_duration = eject_duration
+
+        self.backends: dict[str, BackendState] = {}
+
+    def register_policy(self, name: str, policy: RoutingPolicy) -> None:
+        self.policies[name] = policy
+
+    def get_backend(self, base_url: str) -> BackendState:
+        key = base_url.rstrip("/")
+        if key not in self.backends:
+            self.backends[key] = BackendState()
+        return self.backends[key]
+
+    def select(self, urls: list[str], idxs: list[int], model: Optional[str]) -> int:
+        """Index of the backend, among `idxs` of `urls`, to send a request to."""
+        if len(idxs) == 1:
+            return idxs[0]
+
+        candidates = [(idx, self.get_backend(urls[idx])) for idx in idxs]
+        candidates = [
+            candidate for candidate in candidates if not candidate[1].is_ejected()
+        ] or candidates
+
+        if self.model_affinity and model:
+            least = min(state.in_flight for _, state in candidates)
+            loaded = [
+                (idx, state)
+                for idx, state in candidates
+                if model in state.loaded_models
+                and state.in_flight <= least + AFFINITY_MAX_EXTRA_REQUESTS
+            ]
+            candidates = loaded or candidates
+
+        return self.policies[self.policy](candidates)
+
+    def begin(self, base_url: str) -> BackendRequest:
+        return BackendRequest(self, self.get_backend(base_url))
+
+    def record(self, state: BackendState, ok: bool) -> None:
+        if ok:
+            state.consecutive_failures = 0
+            state.ejected_until = 0.0
+            return
+
+        state.errors += 1
+        state.consecutive_failures += 1
+        if self.eject_failures and state.consecutive_failures >= self.eject_failures:
+            state.ejected_until = time.monotonic() + self.eject_duration
+
+    def record_health(self, base_url: str, ok: bool) -> None:
+        """Record the outcome of a request checking the backend, like a model list."""
+        self.record(self.get_backend(base_url), ok)
+
+    def set_loaded_models(self, base_url: str, models: list[str]) -> None:
+        self.get_backend(base_url).loaded_models = set(models)
+
+    def get_stats(self) -> dict:
+        return {
+            "policy": self.policy,
+            "model_affinity": self.model_affinity,
+            "backends": {
+                base_url: {
+                    "in_flight": state.in_flight,
+                    "latency": state.latency,
+                    "requests": state.requests,
+                    "errors": state.errors,
+                    "ejected": state.is_ejected(),
+                    "loaded_models": sorted(state.loaded_models),
+                }
+                for base_url, state in self.backends.items()
+            },
+        }
+
+
+BACKEND_ROUTER = BackendRouter(
+    policy=LLM_ROUTING_POLICY,
+    model_affinity=ENABLE_LLM_ROUTING_MODEL_AFFINITY,
+    eject_failures=LLM_ROUTING_EJECT_FAILURES,
+    eject_duration=LLM_ROUTING_EJECT_DURATION,
+)
@@ -0,0 +1,252 @@
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from answer_ai.models.chats import Chats
+from answer_ai.env import (
+    REALTIME_CHAT_SAVE_FLUSH_BYTES,
+    REALTIME_CHAT_SAVE_FLUSH_INTERVAL,
+)
+
+log = logging.getLogger(__name__)
+
+# Written sizes kept for messages with nothing pending, between two writes
+MAX_WRITTEN_SIZES = 1024
+
+
+def get_value_size(value) -> int:
+    return len(value) if isinstance(value, str) else 1
+
+
+def get_message_size(message: dict, written: Optional[dict] = None) -> int:
+    """Size of the fields of a message, less the size already written of them."""
+    written = written or {}
+    return sum(
+        max(get_value_size(value) - written.get(field, 0), 1)
+        for field, value in message.items()
+    )
+
+
+class ChatMessageWriteBuffer:
+    """
+    Write-behind buffer for chat message saves.
+
+    Updates are coalesced per (chat_id, message_id) and written in a worker
+    thread once the time or byte budget is reached, so the event loop never
+    waits on the database while a response is streaming. `put` merges fields
+    into the message, `append` adds to its content and list fields (status
+    history, sources, files...). `flush` writes whatever is left and waits for
+    it, which callers do when the stream ends.
+
+    The byte budget counts what is not written yet: a field put again (the
+    whole content of a streamed answer) only counts its growth since it was
+    last written, appended content and items count in full.
+    """
+
+    def __init__(self, flush_interval: float = 1.0, flush_bytes: int = 16384):
+        self.flush_interval = flush_interval
+        self.flush_bytes = flush_bytes
+        self.entries: dict[tuple[str, str], dict] = {}
+        # Sizes of the message fields last written, by field
+        self.written: dict[tuple[str, str], dict[str, int]] = {}
+
+    def _get_entry(self, key: tuple[str, str]) -> dict:
+        entry = self.entries.get(key)
+        if entry is None:
+            entry = {
+                "message": {},
+                "content": "",
+                "append": {},
+                "prepend": {},
+                "written": self.written.pop(key, {}),
+                "flushed_at": time.monotonic(),
+                "force": False,
+                "wakeup": asyncio.Event(),
+                "task": None,
+            }
+            self.entries[key] = entry
+        return entry
+
+    def _get_size(self, entry: dict) -> int:
+        return (
+            get_message_size(entry["message"], entry["written"])
+            + len(entry["content"])
+            + sum(len(items) for items in entry["append"].values())
+            + sum(len(items) for items in entry["prepend"].values())
+        )
+
+    def _schedule(self, key: tuple[str, str], entry: dict) -> None:
+        if self._get_size(entry) >= self.flush_bytes:
+            entry["wakeup"].set()
+
+        if entry["task"] is None:
+            entry["task"] = asyncio.create_task(self._flush_entry(key, entry))
+
+    def put(self, chat_id: str, message_id: str, message: dict) -> None:
+        key = (chat_id, message_id)
+        entry = self._get_entry(key)
+
+        # Fields set here replace anything appended to them before
+        for field in message:
+            entry["append"].pop(field, None)
+            entry["prepend"].pop(field, None)
+        if "content" in message:
+            entry["content"] = ""
+
+        entry["message"].update(message)
+        self._schedule(key, entry)
+
+    def append(
+        self,
+        chat_id: str,
+        message_id: str,
+        content: Optional[str] = None,
+        append: Optional[dict[str, list]] = None,
+        prepend: Optional[dict[str, list]] = None,
+    ) -> None:
+        key = (chat_id, message_id)
+        entry = self._get_entry(key)
+        pending = entry["message"]
+
+        if content:
+            if isinstance(pending.get("content"), str):
+                pending["content"] += content
+            else:
+                entry["content"] += content
+
+        for field, items in (append or {}).items():
+            if isinstance(pending.get(field), list):
+                pending[field] = pending[field] + items
+            else:
+                entry["append"][field] = entry["append"].get(field, []) + items
+
+        for field, items in (prepend or {}).items():
+            if isinstance(pending.get(field), list):
+                pending[field] = items + pending[field]
+            else:
+                entry["prepend"][field] = items + entry["prepend"].get(field, [])
+
+        self._schedule(key, entry)
+
+    def _has_pending(self, entry: dict) -> bool:
+        return bool(
+            entry["message"] or entry["content"] or entry["append"] or entry["prepend"]
+        )
+
+    def _write(self, key: tuple[str, str], batch: dict) -> None:
+        chat_id, message_id = key
+        if batch["message"]:
+            Chats.upsert_chat_message_by_id_and_message_id(
+                chat_id, message_id, batch["message"]
+            )
+            batch["message"] = {}
+
+        if batch["content"] or batch["append"] or batch["prepend"]:
+            Chats.append_to_message_by_id_and_message_id(
+                chat_id,
+                message_id,
+                content=batch["content"],
+                append=batch["append"],
+                prepend=batch["prepend"],
+            )
+
+    async def _flush_entry(self, key: tuple[str, str], entry: dict) -> None:
+        failed = False
+        try:
+            while self._has_pending(entry):
+                delay = entry["flushed_at"] + self.flush_interval - time.monotonic()
+                if delay > 0 and not entry["force"] and not entry["wakeup"].is_set():
+                    try:
+                        await asyncio.wait_for(entry["wakeup"].wait(), timeout=delay)
+                    except asyncio.TimeoutError:
+                        pass
+
+                batch = {
+                    field: entry[field]
+                    for field in ("message", "content", "append", "prepend")
+                }
+                entry.update(message={}, content="", append={}, prepend={})
+                entry["wakeup"].clear()
+                entry["flushed_at"] = time.monotonic()
+
+                # Counted as written right away, so updates put while the write
+                # runs are measured against it
+                previous = {
+                    field: entry["written"].get(field) for field in batch["message"]
+                }
+                entry["written"].update(
+                    {
+                        field: get_value_size(value)
+                        for field, value in batch["message"].items()
+                    }
+                )
+                try:
+                    await asyncio.to_thread(self._write, key, batch)
+                except Exception as e:
+                    log.exception(f"Error saving chat message {key}: {e}")
+
+                    for field, size in previous.items():
+                        if size is None:
+                            entry["written"].pop(field, None)
+                        else:
+                            entry["written"][field] = size
+
+                    # Keep the failed (older) updates in front of newer ones
+                    for field, value in batch["message"].items():
+                        entry["message"].setdefault(field, value)
+                    entry["content"] = batch["content"] + entry["content"]
+                    for field, items in batch["append"].items():
+                        entry["append"][field] = items + entry["append"].get(field, [])
+                    for field, items in batch["prepend"].items():
+                        entry["prepend"][field] = (
+                            entry["prepend"].get(field, []) + items
+                        )
+
+                    if entry["force"]:
+                        # Don't hold the waiting `flush`, retry in the background
+                        failed = True
+                        break
+        finally:
+            entry["task"] = None
+            if self.entries.get(key) is entry:
+                if not self._has_pending(entry):
+                    del self.entries[key]
+                    if not entry["force"]:
+                        self._keep_written(key, entry["written"])
+                elif failed:
+                    entry["force"] = False
+                    entry["task"] = asyncio.create_task(self._flush_entry(key, entry))
+
+    def _keep_written(self, key: tuple[str, str], written: dict[str, int]) -> None:
+        if not written:
+            return
+        self.written[key] = written
+        while len(self.written) > MAX_WRITTEN_SIZES:
+            self.written.pop(next(iter(self.written)))
+
+    async def flush(self, chat_id: str, message_id: str) -> None:
+        """Write all buffered updates of a message and wait until they are saved."""
+        self.written.pop((chat_id, message_id), None)
+        entry = self.entries.get((chat_id, message_id))
+        if entry is None:
+            return
+
+        entry["force"] = True
+        entry["wakeup"].set()
+
+        if entry["task"] is None and self._has_pending(entry):
+            entry["task"] = asyncio.create_task(
+                self._flush_entry((chat_id, message_id), entry)
+            )
+
+        task: Optional[asyncio.Task] = entry["task"]
+        if task is not None:
+            # Shielded so a cancelled stream still persists its last state
+            await asyncio.shield(task)
+
+
+chat_message_write_buffer = ChatMessageWriteBuffer(
+    flush_interval=REALTIME_CHAT_SAVE_FLUSH_INTERVAL,
+    flush_bytes=REALTIME_CHAT_SAVE_FLUSH_BYTES,
+)
@@ -0,0 +1,133 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Optional
+
+import aiohttp
+from yarl import URL
+
+from answer_ai.env import (
+    AIOHTTP_CLIENT_POOL_KEEPALIVE_TIMEOUT,
+    AIOHTTP_CLIENT_POOL_SIZE,
+)
+
+log = logging.getLogger(__name__)
+
+
+class PoolStats:
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.connections_created = 0
+        self.connections_reused = 0
+        # Requests which waited for a free connection, the pool is too small
+        # if this keeps growing
+        self.queued = 0
+
+    def get_trace_config(self) -> aiohttp.TraceConfig:
+        trace_config = aiohttp.TraceConfig()
+
+        def count(attribute: str):
+            async def callback(session, context, params):
+                setattr(self, attribute, getattr(self, attribute) + 1)
+
+            return callback
+
+        trace_config.on_request_start.append(count("requests"))
+        trace_config.on_request_exception.append(count("errors"))
+        trace_config.on_connection_create_end.append(count("connections_created"))
+        trace_config.on_connection_reuseconn.append(count("connections_reused"))
+        trace_config.on_connection_queued_start.append(count("queued"))
+        return trace_config
+
+
+class HTTPClientPool:
+    """
+    Client sessions kept for the lifetime of the application, one per backend
+    origin (scheme, host and port), so that requests to LLM backends reuse
+    keep-alive connections and cached DNS lookups instead of connecting anew.
+
+    Each session holds at most `size` connections, idle ones are closed after
+    `keepalive_timeout` seconds. Sessions don't keep cookies, so that cookies
+    of a backend response are not sent along requests of other users.
+
+    Code running on another loop than the application's one, like a sync
+    route calling `asyncio.run`, gets a new session closed on release.
+    """
+
+    def __init__(self, size: int, keepalive_timeout: float):
+        self.size = size
+        self.keepalive_timeout = keepalive_timeout
+
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.sessions: dict[str, aiohttp.ClientSession] = {}
+        self.stats: dict[str, PoolStats] = {}
+
+    def start(self) -> None:
+        self.loop = asyncio.get_running_loop()
+
+    async def close(self) -> None:
+        sessions = list(self.sessions.values())
+        self.sessions = {}
+        self.loop = None
+        for session in sessions:
+            await session.close()
+
+    def get_session(self, url: str) -> aiohttp.ClientSession:
+        """Session for requests to `url`, to give back with `release_session`."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+
+        if loop is None or loop is not self.loop:
+            return aiohttp.ClientSession(trust_env=True)
+
+        origin = str(URL(url).origin())
+        session = self.sessions.get(origin)
+        if session is None or session.closed:
+            stats = self.stats.setdefault(origin, PoolStats())
+            session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.size,
+                    limit_per_host=self.size,
+                    keepalive_timeout=self.keepalive_timeout,
+                ),
+                cookie_jar=aiohttp.DummyCookieJar(),
+                trace_configs=[stats.get_trace_config()],
+                trust_env=True,
+            )
+            self.sessions[origin] = session
+        return session
+
+    async def release_session(self, session: aiohttp.ClientSession) -> None:
+        if session not in self.sessions.values():
+            await session.close()
+
+    @asynccontextmanager
+    async def session(self, url: str):
+        session = self.get_session(url)
+        try:
+            yield session
+        finally:
+            await self.release_session(session)
+
+    def get_stats(self) -> dict:
+        return {
+            "size": self.size,
+            "keepalive_timeout": self.keepalive_timeout,
+            "backends": {
+                origin: {
+                    **vars(stats),
+                    "open": origin in self.sessions
+                    and not self.sessions[origin].closed,
+                }
+                for origin, stats in self.stats.items()
+            },
+        }
+
+
+HTTP_CLIENT_POOL = HTTPClientPool(
+    size=AIOHTTP_CLIENT_POOL_SIZE,
+    keepalive_timeout=AIOHTTP_CLIENT_POOL_KEEPALIVE_TIMEOUT,
+)
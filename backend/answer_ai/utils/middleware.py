@@ -57,6 +57,7 @@ from answer_ai.routers.pipelines import (
 from answer_ai.routers.memories import query_memory, QueryMemoryForm
 
 from answer_ai.utils.webhook import post_webhook
+from answer_ai.utils.chat_buffer import chat_message_write_buffer
 from answer_ai.utils.files import (
     convert_markdown_base64_images,
     get_file_url_from_base64,
@@ -765,7 +766,7 @@ async def chat_image_generation_handler(
     if chat_id.startswith("local:"):
         message_list = form_data.get("messages", [])
     else:
-        chat = Chats.get_chat_by_id_and_user_id(chat_id, user.id)
+        chat = await Chats.aget_chat_by_id_and_user_id(chat_id, user.id)
         await __event_emitter__(
             {
                 "type": "status",
@@ -1007,8 +1008,8 @@ async def chat_completion_files_handler(
                 request=request,
                 items=files,
                 queries=queries,
-                embedding_function=lambda query, prefix: request.app.state.EMBEDDING_FUNCTION(
-                    query, prefix=prefix, user=user
+                embedding_function=lambda query, prefix, **kwargs: request.app.state.EMBEDDING_FUNCTION(
+                    query, prefix=prefix, user=user, **kwargs
                 ),
                 k=request.app.state.config.TOP_K,
                 reranking_function=(
@@ -1220,7 +1221,7 @@ async def process_chat_payload(request, form_data, user, metadata, model):
     # Check if the request has chat_id and is inside of a folder
     chat_id = metadata.get("chat_id", None)
     if chat_id and user:
-        chat = Chats.get_chat_by_id_and_user_id(chat_id, user.id)
+        chat = await Chats.aget_chat_by_id_and_user_id(chat_id, user.id)
         if chat and chat.folder_id:
             folder = Folders.get_folder_by_id_and_user_id(chat.folder_id, user.id)
 
@@ -1645,7 +1646,7 @@ async def process_chat_response(
         messages = []
 
         if "chat_id" in metadata and not metadata["chat_id"].startswith("local:"):
-            messages_map = Chats.get_messages_map_by_chat_id(metadata["chat_id"])
+            messages_map = await Chats.aget_messages_map_by_chat_id(metadata["chat_id"])
             message = messages_map.get(metadata["message_id"]) if messages_map else None
 
             message_list = get_message_list(messages_map, metadata["message_id"])
@@ -1735,7 +1736,7 @@ async def process_chat_response(
                             )
 
                             if not metadata.get("chat_id", "").startswith("local:"):
-                                Chats.upsert_message_to_chat_by_id_and_message_id(
+                                Chats.upsert_chat_message_by_id_and_message_id(
                                     metadata["chat_id"],
                                     metadata["message_id"],
                                     {
@@ -1905,7 +1906,7 @@ async def process_chat_response(
                         else:
                             error = str(error)
 
-                        Chats.upsert_message_to_chat_by_id_and_message_id(
+                        Chats.upsert_chat_message_by_id_and_message_id(
                             metadata["chat_id"],
                             metadata["message_id"],
                             {
@@ -1921,7 +1922,7 @@ async def process_chat_response(
                             )
 
                     if "selected_model_id" in response_data:
-                        Chats.upsert_message_to_chat_by_id_and_message_id(
+                        Chats.upsert_chat_message_by_id_and_message_id(
                             metadata["chat_id"],
                             metadata["message_id"],
                             {
@@ -1941,7 +1942,9 @@ async def process_chat_response(
                                 }
                             )
 
-                            title = Chats.get_chat_title_by_id(metadata["chat_id"])
+                            title = await Chats.aget_chat_title_by_id(
+                                metadata["chat_id"]
+                            )
 
                             await event_emitter(
                                 {
@@ -1955,7 +1958,7 @@ async def process_chat_response(
                             )
 
                             # Save message in the database
-                            Chats.upsert_message_to_chat_by_id_and_message_id(
+                            Chats.upsert_chat_message_by_id_and_message_id(
                                 metadata["chat_id"],
                                 metadata["message_id"],
                                 {
@@ -1965,8 +1968,10 @@ async def process_chat_response(
                             )
 
                             # Send a webhook notification if the user is not active
-                            if not Users.is_user_active(user.id):
-                                webhook_url = Users.get_user_webhook_url_by_id(user.id)
+                            if not await Users.ais_user_active(user.id):
+                                webhook_url = await Users.aget_user_webhook_url_by_id(
+                                    user.id
+                                )
                                 if webhook_url:
                                     await post_webhook(
                                         request.app.state.ANSWERAI_NAME,
@@ -2430,7 +2435,7 @@ async def process_chat_response(
 
                 return content, content_blocks, end_flag
 
-            message = Chats.get_message_by_id_and_message_id(
+            message = await Chats.aget_message_by_id_and_message_id(
                 metadata["chat_id"], metadata["message_id"]
             )
 
@@ -2486,7 +2491,7 @@ async def process_chat_response(
                     )
 
                     # Save message in the database
-                    Chats.upsert_message_to_chat_by_id_and_message_id(
+                    Chats.upsert_chat_message_by_id_and_message_id(
                         metadata["chat_id"],
                         metadata["message_id"],
                         {
@@ -2562,7 +2567,7 @@ async def process_chat_response(
 
                                 if "selected_model_id" in data:
                                     model_id = data["selected_model_id"]
-                                    Chats.upsert_message_to_chat_by_id_and_message_id(
+                                    chat_message_write_buffer.put(
                                         metadata["chat_id"],
                                         metadata["message_id"],
                                         {
@@ -2669,6 +2674,10 @@ async def process_chat_response(
                                         delta.get("images", []), request, metadata, user
                                     )
                                     if image_urls:
+                                        await chat_message_write_buffer.flush(
+                                            metadata["chat_id"],
+                                            metadata["message_id"],
+                                        )
                                         message_files = Chats.add_message_files_by_id_and_message_id(
                                             metadata["chat_id"],
                                             metadata["message_id"],
@@ -2804,8 +2813,8 @@ async def process_chat_response(
                                                 break
 
                                         if ENABLE_REALTIME_CHAT_SAVE:
-                                            # Save message in the database
-                                            Chats.upsert_message_to_chat_by_id_and_message_id(
+                                            # Save message in the database (write-behind)
+                                            chat_message_write_buffer.put(
                                                 metadata["chat_id"],
                                                 metadata["message_id"],
                                                 {
@@ -3252,26 +3261,28 @@ async def process_chat_response(
                             log.debug(e)
                             break
 
-                title = Chats.get_chat_title_by_id(metadata["chat_id"])
+                title = await Chats.aget_chat_title_by_id(metadata["chat_id"])
                 data = {
                     "done": True,
                     "content": serialize_content_blocks(content_blocks),
                     "title": title,
                 }
 
-                if not ENABLE_REALTIME_CHAT_SAVE:
-                    # Save message in the database
-                    Chats.upsert_message_to_chat_by_id_and_message_id(
-                        metadata["chat_id"],
-                        metadata["message_id"],
-                        {
-                            "content": serialize_content_blocks(content_blocks),
-                        },
-                    )
+                # Save message in the database, along with any buffered updates
+                chat_message_write_buffer.put(
+                    metadata["chat_id"],
+                    metadata["message_id"],
+                    {
+                        "content": serialize_content_blocks(content_blocks),
+                    },
+                )
+                await chat_message_write_buffer.flush(
+                    metadata["chat_id"], metadata["message_id"]
+                )
 
                 # Send a webhook notification if the user is not active
-                if not Users.is_user_active(user.id):
-                    webhook_url = Users.get_user_webhook_url_by_id(user.id)
+                if not await Users.ais_user_active(user.id):
+                    webhook_url = await Users.aget_user_webhook_url_by_id(user.id)
                     if webhook_url:
                         await post_webhook(
                             request.app.state.ANSWERAI_NAME,
@@ -3297,15 +3308,17 @@ async def process_chat_response(
                 log.warning("Task was cancelled!")
                 await event_emitter({"type": "chat:tasks:cancel"})
 
-                if not ENABLE_REALTIME_CHAT_SAVE:
-                    # Save message in the database
-                    Chats.upsert_message_to_chat_by_id_and_message_id(
-                        metadata["chat_id"],
-                        metadata["message_id"],
-                        {
-                            "content": serialize_content_blocks(content_blocks),
-                        },
-                    )
+                # Save message in the database, along with any buffered updates
+                chat_message_write_buffer.put(
+                    metadata["chat_id"],
+                    metadata["message_id"],
+                    {
+                        "content": serialize_content_blocks(content_blocks),
+                    },
+                )
+                await chat_message_write_buffer.flush(
+                    metadata["chat_id"], metadata["message_id"]
+                )
 
             if response.background is not None:
                 await response.background()
@@ -0,0 +1,140 @@
+import logging
+import threading
+from typing import Optional
+
+from fastapi import FastAPI
+
+from answer_ai.env import (
+    REDIS_CLUSTER,
+    REDIS_KEY_PREFIX,
+    REDIS_SENTINEL_HOSTS,
+    REDIS_SENTINEL_PORT,
+    REDIS_URL,
+)
+from answer_ai.utils.redis import (
+    get_redis_connection,
+    get_sentinels_from_env,
+    listen_channel,
+)
+
+log = logging.getLogger(__name__)
+
+REDIS_MODEL_ACCESS_CHANNEL = f"{REDIS_KEY_PREFIX}:models:access:invalidate"
+
+
+class ModelAccess:
+    def __init__(self, owner_id: Optional[str], access_control: Optional[dict]):
+        self.owner_id = owner_id
+        # Models without access control can be read by every user
+        self.public = access_control is None
+
+        read = (access_control or {}).get("read", {}) or {}
+        self.user_ids = frozenset(read.get("user_ids", []) or [])
+        self.group_ids = frozenset(read.get("group_ids", []) or [])
+
+    def can_read(self, user_id: str, user_group_ids: frozenset) -> bool:
+        return (
+            self.public
+            or user_id == self.owner_id
+            or user_id in self.user_ids
+            or not self.group_ids.isdisjoint(user_group_ids)
+        )
+
+
+class ModelAccessIndex:
+    """
+    Read access of the models and group memberships of the users, kept in
+    memory so that filtering the models of a user takes set lookups instead
+    of database queries.
+
+    The index is built on first use and rebuilt after `invalidate`, which
+    the model and group tables call on every change. With Redis, the other
+    workers are told to rebuild through pub/sub.
+    """
+
+    def __init__(self, redis_url: str, redis_sentinels: list, redis_cluster: bool):
+        self.redis = (
+            get_redis_connection(
+                redis_url, redis_sentinels, redis_cluster, decode_responses=True
+            )
+            if redis_url
+            else None
+        )
+
+        self.lock = threading.Lock()
+        self.build_lock = threading.Lock()
+        # Bumped on every invalidation, so that a build racing with a change
+        # is not kept
+        self.version = 0
+        self.built_version: Optional[int] = None
+
+        self.models: dict[str, ModelAccess] = {}
+        self.user_group_ids: dict[str, frozenset] = {}
+
+    def drop(self) -> None:
+        with self.lock:
+            self.version += 1
+
+    def invalidate(self) -> None:
+        """Rebuild the index on next use, in every worker."""
+        self.drop()
+        if self.redis is not None:
+            try:
+                self.redis.publish(REDIS_MODEL_ACCESS_CHANNEL, "*")
+            except Exception as e:
+                log.warning(f"Failed to publish the model access invalidation: {e}")
+
+    async def listen(self, app: FastAPI) -> None:
+        # Invalidations missed while disconnected are made up for by a rebuild
+        await listen_channel(
+            app.state.redis,
+            REDIS_MODEL_ACCESS_CHANNEL,
+            lambda data: self.drop(),
+            on_resubscribe=self.drop,
+        )
+
+    def load(self) -> None:
+        if self.built_version == self.version:
+            return
+
+        with self.build_lock:
+            version = self.version
+            if self.built_version == version:
+                return
+
+            from answer_ai.models.groups import Groups
+            from answer_ai.models.models import Models
+
+            self.models = {
+                model.id: ModelAccess(model.user_id, model.access_control)
+                for model in Models.get_all_models()
+            }
+            self.user_group_ids = {
+                user_id: frozenset(group_ids)
+                for user_id, group_ids in Groups.get_user_group_ids_map().items()
+            }
+            self.built_version = version
+            log.debug(f"Built the model access index of {len(self.models)} models")
+
+    def get_user_group_ids(self, user_id: str) -> frozenset:
+        self.load()
+        return self.user_group_ids.get(user_id, frozenset())
+
+    def has_model(self, model_id: str) -> bool:
+        self.load()
+        return model_id in self.models
+
+    def can_read(self, user_id: str, model_id: str) -> bool:
+        """Whether the user can read the model, which must be in the database."""
+        self.load()
+        access = self.models.get(model_id)
+        return access is not None and access.can_read(
+            user_id, self.user_group_ids.get(user_id, frozenset())
+        )
+
+
+MODEL_ACCESS_INDEX = ModelAccessIndex(
+    redis_url=REDIS_URL,
+    redis_sentinels=get_sentinels_from_env(REDIS_SENTINEL_HOSTS, REDIS_SENTINEL_PORT),
+    redis_cluster=REDIS_CLUSTER,
+)
@@ -0,0 +1,124 @@
+import asyncio
+import copy
+import hashlib
+import logging
+import time
+from typing import Awaitable, Callable, Optional
+
+from fastapi import FastAPI
+from redis.asyncio import Redis
+
+from answer_ai.env import MODEL_LIST_CACHE_TTL, REDIS_KEY_PREFIX
+from answer_ai.utils.redis import listen_channel
+
+log = logging.getLogger(__name__)
+
+REDIS_MODEL_CATALOG_CHANNEL = f"{REDIS_KEY_PREFIX}:models:invalidate"
+
+# Seconds a failed model list fetch is cached for, so that a dead connection
+# is retried in the background rather than on every request
+ERROR_TTL = 10.0
+
+
+class CatalogEntry:
+    def __init__(self, value, ttl: float):
+        self.value = value
+        self.expires_at = time.monotonic() + ttl
+
+
+class ModelCatalog:
+    """
+    Model lists of the Ollama and OpenAI connections, served
+    stale-while-revalidate.
+
+    A model list is fetched once, then served from memory for its TTL. Past
+    it, the stale list is still served while a refresh runs in the
+    background, so a slow or dead connection only delays the first request
+    for its models. Concurrent requests for a missing list share one fetch.
+
+    `invalidate` drops every list and the cached base models, in this
+    process and in the other workers through Redis pub/sub, for when admins
+    change connections, models or functions.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.entries: dict[str, CatalogEntry] = {}
+        self.refreshes: dict[str, asyncio.Task] = {}
+
+    def start(self) -> None:
+        self.loop = asyncio.get_running_loop()
+
+    def get_key(self, url: str, key: Optional[str], user_id: Optional[str]) -> str:
+        key_hash = hashlib.sha256(key.encode()).hexdigest() if key else ""
+        return f"{url}:{key_hash}:{user_id or ''}"
+
+    async def get(
+        self,
+        key: str,
+        fetch: Callable[[], Awaitable],
+        ttl: Optional[float] = None,
+    ):
+        """
+        Model list cached under `key`, fetched with `fetch` which returns None
+        on failure. Callers get their own copy, which they may modify.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0 or asyncio.get_running_loop() is not self.loop:
+            return await fetch()
+
+        entry = self.entries.get(key)
+        if entry is None:
+            value = await asyncio.shield(self.refresh(key, fetch, ttl))
+        else:
+            if entry.expires_at <= time.monotonic():
+                self.refresh(key, fetch, ttl)
+            value = entry.value
+
+        return copy.deepcopy(value)
+
+    def refresh(self, key: str, fetch: Callable[[], Awaitable], ttl: float):
+        task = self.refreshes.get(key)
+        if task is None:
+
+            async def run():
+                try:
+                    value = await fetch()
+                    self.entries[key] = CatalogEntry(
+                        value, ttl if value is not None else min(ttl, ERROR_TTL)
+                    )
+                    return value
+                finally:
+                    self.refreshes.pop(key, None)
+
+            task = asyncio.create_task(run())
+            self.refreshes[key] = task
+        return task
+
+    def clear(self, app: FastAPI) -> None:
+        self.entries = {}
+        app.state.BASE_MODELS = []
+
+    async def invalidate(self, app: FastAPI) -> None:
+        self.clear(app)
+
+        redis: Optional[Redis] = getattr(app.state, "redis", None)
+        if redis is not None:
+            try:
+                await redis.publish(REDIS_MODEL_CATALOG_CHANNEL, "invalidate")
+            except Exception as e:
+                log.warning(f"Failed to publish the model catalog invalidation: {e}")
+
+    async def listen(self, app: FastAPI) -> None:
+        # Invalidations missed while disconnected are made up for by clearing
+        await listen_channel(
+            app.state.redis,
+            REDIS_MODEL_CATALOG_CHANNEL,
+            lambda _: self.clear(app),
+            on_resubscribe=lambda: self.clear(app),
+        )
+
+
+MODEL_CATALOG = ModelCatalog(ttl=MODEL_LIST_CACHE_TTL)
@@ -13,7 +13,6 @@ from answer_ai.functions import get_function_models
 
 from answer_ai.models.functions import Functions
 from answer_ai.models.models import Models
-from answer_ai.models.groups import Groups
 
 
 from answer_ai.utils.plugin import (
@@ -21,6 +20,8 @@ from answer_ai.utils.plugin import (
     get_function_module_from_cache,
 )
 from answer_ai.utils.access_control import has_access
+from answer_ai.utils.model_access import MODEL_ACCESS_INDEX
+from answer_ai.utils.model_catalog import MODEL_CATALOG
 
 
 from answer_ai.config import (
@@ -79,6 +80,9 @@ async def get_all_base_models(request: Request, user: UserModel = None):
 
 
 async def get_all_models(request, refresh: bool = False, user: UserModel = None):
+    if refresh:
+        MODEL_CATALOG.clear(request.app)
+
     if (
         request.app.state.MODELS
         and request.app.state.BASE_MODELS
@@ -345,19 +349,11 @@ def check_model_access(user, model):
             access_control=model.get("info", {})
             .get("meta", {})
             .get("access_control", {}),
+            user_group_ids=MODEL_ACCESS_INDEX.get_user_group_ids(user.id),
         ):
             raise Exception("Model not found")
-    else:
-        model_info = Models.get_model_by_id(model.get("id"))
-        if not model_info:
-            raise Exception("Model not found")
-        elif not (
-            user.id == model_info.user_id
-            or has_access(
-                user.id, type="read", access_control=model_info.access_control
-            )
-        ):
-            raise Exception("Model not found")
+    elif not MODEL_ACCESS_INDEX.can_read(user.id, model.get("id")):
+        raise Exception("Model not found")
 
 
 def get_filtered_models(models, user):
@@ -366,14 +362,8 @@ def get_filtered_models(models, user):
         user.role == "user"
         or (user.role == "admin" and not BYPASS_ADMIN_ACCESS_CONTROL)
     ) and not BYPASS_MODEL_ACCESS_CONTROL:
-        model_ids = [model["id"] for model in models if not model.get("arena")]
-        model_infos = {
-            model_info.id: model_info
-            for model_info in Models.get_models_by_ids(model_ids)
-        }
-
         filtered_models = []
-        user_group_ids = {group.id for group in Groups.get_groups_by_member_id(user.id)}
+        user_group_ids = MODEL_ACCESS_INDEX.get_user_group_ids(user.id)
         for model in models:
             if model.get("arena"):
                 if has_access(
@@ -387,19 +377,8 @@ def get_filtered_models(models, user):
                     filtered_models.append(model)
                 continue
 
-            model_info = model_infos.get(model["id"], None)
-            if model_info:
-                if (
-                    (user.role == "admin" and BYPASS_ADMIN_ACCESS_CONTROL)
-                    or user.id == model_info.user_id
-                    or has_access(
-                        user.id,
-                        type="read",
-                        access_control=model_info.access_control,
-                        user_group_ids=user_group_ids,
-                    )
-                ):
-                    filtered_models.append(model)
+            if MODEL_ACCESS_INDEX.can_read(user.id, model["id"]):
+                filtered_models.append(model)
 
         return filtered_models
     else:
@@ -1,4 +1,6 @@
+import asyncio
 import inspect
+from typing import Callable, Optional
 from urllib.parse import urlparse
 
 import logging
@@ -19,6 +21,10 @@ log = logging.getLogger(__name__)
 
 _CONNECTION_CACHE = {}
 
+# Delays (seconds) before subscribing again to a channel after losing it
+LISTEN_RETRY_DELAY_MIN = 1
+LISTEN_RETRY_DELAY_MAX = 30
+
 
 class SentinelRedisProxy:
     def __init__(self, sentinel, service, *, async_mode: bool = True, **kw):
@@ -231,3 +237,54 @@ def get_sentinel_url_from_env(redis_url, sentinel_hosts_env, sentinel_port_env):
         f"{host}:{sentinel_port_env}" for host in sentinel_hosts_env.split(",")
     )
     return f"redis+sentinel://{auth_part}{hosts_part}/{redis_config['db']}/{redis_config['service']}"
+
+
+async def listen_channel(
+    redis,
+    channel: str,
+    on_message: Callable[[str], None],
+    on_resubscribe: Optional[Callable[[], None]] = None,
+) -> None:
+    """
+    Call `on_message` with the data of each message published on `channel`.
+
+    When the connection is lost, the channel is subscribed to again with a
+    growing delay, then `on_resubscribe` is called: messages published
+    meanwhile were missed.
+    """
+    delay = LISTEN_RETRY_DELAY_MIN
+    subscribed = False
+    while True:
+        pubsub = redis.pubsub()
+        try:
+            await pubsub.subscribe(channel)
+            if subscribed and on_resubscribe is not None:
+                on_resubscribe()
+            subscribed = True
+            delay = LISTEN_RETRY_DELAY_MIN
+
+            async for message in pubsub.listen():
+                if message["type"] != "message":
+                    continue
+
+                data = message["data"]
+                if isinstance(data, bytes):
+                    data = data.decode()
+                try:
+                    on_message(data)
+                except Exception as e:
+                    log.exception(f"Error handling a message of {channel}: {e}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log.warning(
+                f"Lost the subscription to {channel}, subscribing again in {delay}s: {e}"
+            )
+        finally:
+            try:
+                await pubsub.aclose()
+            except Exception:
+                pass
+
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, LISTEN_RETRY_DELAY_MAX)
@@ -8,6 +8,7 @@ Metrics collected:
 
 * http.server.requests (counter)
 * http.server.duration (histogram, milliseconds)
+* answerai.rag.embedding_cache.hits / .misses (counters)
 
 Attributes used: http.method, http.route, http.status_code
 
@@ -46,6 +47,7 @@ from answer_ai.env import (
     OTEL_METRICS_EXPORTER_OTLP_INSECURE,
 )
 from answer_ai.models.users import Users
+from answer_ai.retrieval.embedding_cache import EMBEDDING_CACHE
 
 _EXPORT_INTERVAL_MILLIS = 10_000  # 10 seconds
 
@@ -101,6 +103,12 @@ def _build_meter_provider(resource: Resource) -> MeterProvider:
         View(
             instrument_name="answerai.users.active.today",
         ),
+        View(
+            instrument_name="answerai.rag.embedding_cache.hits",
+        ),
+        View(
+            instrument_name="answerai.rag.embedding_cache.misses",
+        ),
     ]
 
     provider = MeterProvider(
@@ -173,6 +181,30 @@ def setup_metrics(app: FastAPI, resource: Resource) -> None:
         callbacks=[observe_users_active_today],
     )
 
+    def observe_embedding_cache_hits(
+        options: metrics.CallbackOptions,
+    ) -> Sequence[metrics.Observation]:
+        return [metrics.Observation(value=EMBEDDING_CACHE.hits)]
+
+    def observe_embedding_cache_misses(
+        options: metrics.CallbackOptions,
+    ) -> Sequence[metrics.Observation]:
+        return [metrics.Observation(value=EMBEDDING_CACHE.misses)]
+
+    meter.create_observable_counter(
+        name="answerai.rag.embedding_cache.hits",
+        description="Embeddings served from the query embedding cache",
+        unit="1",
+        callbacks=[observe_embedding_cache_hits],
+    )
+
+    meter.create_observable_counter(
+        name="answerai.rag.embedding_cache.misses",
+        description="Embeddings missing from the query embedding cache",
+        unit="1",
+        callbacks=[observe_embedding_cache_misses],
+    )
+
     # FastAPI middleware
     @app.middleware("http")
     async def _metrics_middleware(request: Request, call_next):
@@ -0,0 +1,554 @@
+"""Benchmark of concurrent streamed chats through one worker.
+
+Starts the app in-process (uvicorn, on its own thread and loop) against the
+mock backend of `benchmark/mock_backend.py` (in a subprocess), then drives
+concurrent chats through `/api/chat/completions`, which runs
+`process_chat_payload` -> `generate_chat_completion` -> `process_chat_response`.
+
+With `--socket` chats are sent with a socket session and their responses are
+read from the socket events, as the UI does; realtime save only applies to
+this path. Without it, the completion is read from the streamed HTTP response.
+`--filters` adds a global filter function with inlet, stream and outlet hooks.
+
+Reports tokens/s, time to first token, inter-chunk latency, event loop lag of
+the app and its database writes.
+
+    cd backend
+    python -m benchmark.chat_streaming --concurrency 50 --token-rate 50 --socket
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from typing import Optional
+
+import aiohttp
+
+from benchmark import mock_backend
+
+FILTER_FUNCTION = """
+class Filter:
+    def inlet(self, body: dict) -> dict:
+        return body
+
+    def stream(self, event: dict) -> dict:
+        return event
+
+    def outlet(self, body: dict) -> dict:
+        return body
+"""
+
+
+class ChatResult:
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.first_token_at: Optional[float] = None
+        self.chunk_times: list[float] = []
+        self.tokens = 0
+        self.done_at: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def on_chunk(self) -> None:
+        now = time.perf_counter()
+        if self.first_token_at is None:
+            self.first_token_at = now
+        self.chunk_times.append(now)
+
+
+class LoopLagMonitor:
+    """Lateness of a timer on the app's event loop, sampled every `interval`."""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.lags: list[float] = []
+        self.running = True
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while self.running:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.lags.append(max(loop.time() - expected, 0.0))
+
+
+class DBWriteCounter:
+    def __init__(self):
+        self.counts: dict[str, int] = {}
+
+    def listen(self, engine) -> None:
+        from sqlalchemy import event
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def _count(conn, cursor, statement, parameters, context, executemany):
+            keyword = statement.lstrip().split(None, 1)[0].upper()
+            if keyword in ("INSERT", "UPDATE", "DELETE", "REPLACE"):
+                self.counts[keyword] = self.counts.get(keyword, 0) + 1
+
+    def reset(self) -> None:
+        self.counts = {}
+
+
+async def raise_for_status(r: aiohttp.ClientResponse) -> None:
+    if r.status >= 400:
+        raise Exception(f"{r.method} {r.url.path} {r.status}: {await r.text()}")
+
+
+def percentile(values: list[float], p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--rounds", type=int, default=1, help="chats per client")
+    parser.add_argument("--backend", choices=["openai", "ollama"], default="openai")
+    parser.add_argument("--tokens", type=int, default=256)
+    parser.add_argument("--chunk-size", type=int, default=1, help="tokens per chunk")
+    parser.add_argument(
+        "--token-rate", type=float, default=0, help="tokens/s per chat, 0 unbounded"
+    )
+    parser.add_argument("--socket", action="store_true", help="emit over socket.io")
+    parser.add_argument("--realtime-save", action="store_true")
+    parser.add_argument("--filters", action="store_true")
+    parser.add_argument("--timeout", type=float, default=300, help="per chat")
+    parser.add_argument("--port", type=int, default=18080)
+    parser.add_argument("--mock-port", type=int, default=11500)
+    parser.add_argument("--data-dir", default=None)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    return parser.parse_args()
+
+
+def configure_environment(args: argparse.Namespace, mock_url: str) -> None:
+    # Read when answer_ai is imported
+    os.environ.update(
+        {
+            "DATA_DIR": args.data_dir or tempfile.mkdtemp(prefix="answerai-bench-"),
+            "ANSWERAI_SECRET_KEY": "benchmark",
+            "GLOBAL_LOG_LEVEL": os.environ.get("GLOBAL_LOG_LEVEL", "WARNING"),
+            "ENABLE_REALTIME_CHAT_SAVE": str(args.realtime_save),
+            "ENABLE_OPENAI_API": str(args.backend == "openai"),
+            "OPENAI_API_BASE_URL": f"{mock_url}/v1",
+            "OPENAI_API_KEY": "mock",
+            "ENABLE_OLLAMA_API": str(args.backend == "ollama"),
+            "OLLAMA_BASE_URL": mock_url,
+            # No embedding model to load at startup
+            "RAG_EMBEDDING_ENGINE": "openai",
+            "RAG_OPENAI_API_BASE_URL": f"{mock_url}/v1",
+            "ENABLE_VERSION_UPDATE_CHECK": "False",
+        }
+    )
+
+
+async def wait_for_url(url: str, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while True:
+            try:
+                async with session.get(url) as r:
+                    if r.status < 500:
+                        return
+            except aiohttp.ClientError:
+                pass
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"{url} did not start")
+            await asyncio.sleep(0.2)
+
+
+def start_app(port: int) -> tuple[asyncio.AbstractEventLoop, object]:
+    import uvicorn
+
+    from answer_ai.main import app
+
+    server = uvicorn.Server(
+        uvicorn.Config(
+            app, host="127.0.0.1", port=port, log_level="warning", lifespan="on"
+        )
+    )
+    loop = asyncio.new_event_loop()
+    threading.Thread(
+        target=loop.run_until_complete, args=(server.serve(),), daemon=True
+    ).start()
+    return loop, server
+
+
+def create_user() -> tuple[str, str]:
+    from answer_ai.models.auths import Auths
+    from answer_ai.utils.auth import create_token, get_password_hash
+
+    user = Auths.insert_new_auth(
+        email=f"benchmark-{uuid.uuid4().hex[:8]}@localhost",
+        password=get_password_hash("benchmark"),
+        name="Benchmark",
+        role="admin",
+    )
+    return user.id, create_token({"id": user.id})
+
+
+def create_filter(user_id: str) -> None:
+    from answer_ai.models.functions import FunctionForm, FunctionMeta, Functions
+
+    Functions.insert_new_function(
+        user_id,
+        "filter",
+        FunctionForm(
+            id="benchmark_filter",
+            name="Benchmark Filter",
+            content=FILTER_FUNCTION,
+            meta=FunctionMeta(description="No-op filter"),
+        ),
+    )
+    Functions.update_function_by_id(
+        "benchmark_filter", {"is_active": True, "is_global": True}
+    )
+
+
+async def create_chat(
+    session: aiohttp.ClientSession, base_url: str, model: str
+) -> dict:
+    """Create a chat with a user message and the assistant message to complete."""
+    user_message_id = str(uuid.uuid4())
+    message_id = str(uuid.uuid4())
+    user_message = {
+        "id": user_message_id,
+        "parentId": None,
+        "childrenIds": [message_id],
+        "role": "user",
+        "content": "Write a long answer.",
+        "timestamp": int(time.time()),
+    }
+    history = {
+        "currentId": message_id,
+        "messages": {
+            user_message_id: user_message,
+            message_id: {
+                "id": message_id,
+                "parentId": user_message_id,
+                "childrenIds": [],
+                "role": "assistant",
+                "content": "",
+                "model": model,
+                "timestamp": int(time.time()),
+            },
+        },
+    }
+
+    async with session.post(
+        f"{base_url}/api/v1/chats/new",
+        json={"chat": {"title": "Benchmark", "models": [model], "history": history}},
+    ) as r:
+        await raise_for_status(r)
+        chat = await r.json()
+
+    return {
+        "model": model,
+        "messages": [{"role": "user", "content": user_message["content"]}],
+        "stream": True,
+        "chat_id": chat["id"],
+        "id": message_id,
+        "parent_id": user_message_id,
+        "parent_message": user_message,
+    }
+
+
+async def run_http_chat(
+    session: aiohttp.ClientSession, base_url: str, model: str
+) -> ChatResult:
+    form_data = await create_chat(session, base_url, model)
+    result = ChatResult()
+    content = ""
+
+    async with session.post(f"{base_url}/api/chat/completions", json=form_data) as r:
+        await raise_for_status(r)
+        async for line in r.content:
+            line = line.decode().strip()
+            if not line.startswith("data:") or line == "data: [DONE]":
+                continue
+            try:
+                data = json.loads(line[len("data:") :])
+            except json.JSONDecodeError:
+                continue
+
+            delta = (data.get("choices") or [{}])[0].get("delta", {})
+            if delta.get("content"):
+                content += delta["content"]
+                result.on_chunk()
+
+    result.done_at = time.perf_counter()
+    result.tokens = len(content.split())
+    return result
+
+
+class SocketChats:
+    """One socket.io session shared by all chats, events dispatched by chat id."""
+
+    def __init__(self, timeout: float):
+        import socketio
+
+        self.timeout = timeout
+        self.sio = socketio.AsyncClient()
+        self.chats: dict[str, tuple[ChatResult, asyncio.Future]] = {}
+        self.sio.on("events", self.on_event)
+
+    async def connect(self, base_url: str, token: str) -> None:
+        await self.sio.connect(
+            base_url,
+            socketio_path="/ws/socket.io",
+            auth={"token": token},
+            transports=["websocket"],
+        )
+
+    async def on_event(self, event: dict) -> None:
+        chat = self.chats.get(event.get("chat_id"))
+        data = event.get("data", {})
+        if chat is None or data.get("type") != "chat:completion":
+            return
+
+        result, done = chat
+        completion = data.get("data", {})
+        if completion.get("done"):
+            result.done_at = time.perf_counter()
+            result.tokens = len((completion.get("content") or "").split())
+            if not done.done():
+                done.set_result(None)
+        elif completion.get("content") or any(
+            choice.get("delta", {}).get("content")
+            for choice in completion.get("choices", [])
+        ):
+            # Raw completion chunks are forwarded when saving in realtime
+            result.on_chunk()
+        elif completion.get("error") and not done.done():
+            result.error = str(completion["error"])
+            done.set_result(None)
+
+    async def run_chat(
+        self, session: aiohttp.ClientSession, base_url: str, model: str
+    ) -> ChatResult:
+        form_data = await create_chat(session, base_url, model)
+        chat_id = form_data["chat_id"]
+        result = ChatResult()
+        done = asyncio.get_running_loop().create_future()
+        self.chats[chat_id] = (result, done)
+
+        try:
+            async with session.post(
+                f"{base_url}/api/chat/completions",
+                json={**form_data, "session_id": self.sio.get_sid(namespace="/")},
+            ) as r:
+                await raise_for_status(r)
+                await r.read()
+            await asyncio.wait_for(done, timeout=self.timeout)
+        finally:
+            del self.chats[chat_id]
+        return result
+
+
+async def run_benchmark(args: argparse.Namespace) -> dict:
+    mock_url = f"http://127.0.0.1:{args.mock_port}"
+    configure_environment(args, mock_url)
+
+    mock = multiprocessing.Process(
+        target=mock_backend.run,
+        kwargs={
+            "port": args.mock_port,
+            "tokens": args.tokens,
+            "chunk_size": args.chunk_size,
+            "token_rate": args.token_rate,
+        },
+        daemon=True,
+    )
+    mock.start()
+
+    try:
+        await wait_for_url(f"{mock_url}/api/version")
+
+        app_loop, server = start_app(args.port)
+        base_url = f"http://127.0.0.1:{args.port}"
+        await wait_for_url(f"{base_url}/health")
+
+        from answer_ai.internal.db import async_engine, engine
+
+        db_writes = DBWriteCounter()
+        db_writes.listen(engine)
+        if async_engine is not None:
+            db_writes.listen(async_engine.sync_engine)
+
+        user_id, token = create_user()
+        if args.filters:
+            create_filter(user_id)
+
+        model = mock_backend.MODEL_ID
+        if args.backend == "ollama":
+            model = f"{model}:latest"
+
+        connector = aiohttp.TCPConnector(limit=0)
+        async with aiohttp.ClientSession(
+            connector=connector,
+            headers={"Authorization": f"Bearer {token}"},
+            timeout=aiohttp.ClientTimeout(total=args.timeout),
+        ) as session:
+            async with session.get(f"{base_url}/api/models") as r:
+                await raise_for_status(r)
+
+            socket_chats = None
+            if args.socket:
+                socket_chats = SocketChats(args.timeout)
+                await socket_chats.connect(base_url, token)
+
+            async def client() -> list[ChatResult]:
+                results = []
+                for _ in range(args.rounds):
+                    try:
+                        if socket_chats is not None:
+                            result = await socket_chats.run_chat(
+                                session, base_url, model
+                            )
+                        else:
+                            result = await run_http_chat(session, base_url, model)
+                    except Exception as e:
+                        result = ChatResult()
+                        result.error = repr(e)
+                    results.append(result)
+                return results
+
+            lag_monitor = LoopLagMonitor()
+            lag_future = asyncio.run_coroutine_threadsafe(lag_monitor.run(), app_loop)
+            db_writes.reset()
+
+            started_at = time.perf_counter()
+            results = [
+                result
+                for results in await asyncio.gather(
+                    *[client() for _ in range(args.concurrency)]
+                )
+                for result in results
+            ]
+            elapsed = time.perf_counter() - started_at
+
+            lag_monitor.running = False
+            await asyncio.wrap_future(lag_future)
+
+            # Buffered realtime saves land after the last chunk
+            if args.socket:
+                await asyncio.sleep(1)
+            writes = dict(db_writes.counts)
+
+            if socket_chats is not None:
+                await socket_chats.sio.disconnect()
+
+        server.should_exit = True
+    finally:
+        mock.terminate()
+
+    return get_report(args, results, elapsed, lag_monitor.lags, writes)
+
+
+def get_report(
+    args: argparse.Namespace,
+    results: list[ChatResult],
+    elapsed: float,
+    lags: list[float],
+    writes: dict[str, int],
+) -> dict:
+    completed = [r for r in results if r.error is None and r.done_at is not None]
+    ttfts = [r.first_token_at - r.started_at for r in completed if r.first_token_at]
+    gaps = [
+        later - earlier
+        for r in completed
+        for earlier, later in zip(r.chunk_times, r.chunk_times[1:])
+    ]
+    tokens = sum(r.tokens for r in completed)
+    total_writes = sum(writes.values())
+
+    return {
+        "config": {
+            "concurrency": args.concurrency,
+            "rounds": args.rounds,
+            "backend": args.backend,
+            "tokens": args.tokens,
+            "chunk_size": args.chunk_size,
+            "token_rate": args.token_rate,
+            "socket": args.socket,
+            "realtime_save": args.realtime_save,
+            "filters": args.filters,
+        },
+        "chats": len(results),
+        "errors": len(results) - len(completed),
+        "error_samples": list({r.error for r in results if r.error})[:3],
+        "elapsed_s": elapsed,
+        "tokens": tokens,
+        "tokens_per_s": tokens / elapsed if elapsed else 0.0,
+        "ttft_ms": {
+            "p50": percentile(ttfts, 50) * 1000,
+            "p99": percentile(ttfts, 99) * 1000,
+            "mean": statistics.fmean(ttfts) * 1000 if ttfts else 0.0,
+        },
+        "inter_chunk_ms": {
+            "p50": percentile(gaps, 50) * 1000,
+            "p99": percentile(gaps, 99) * 1000,
+            "max": max(gaps, default=0.0) * 1000,
+        },
+        "loop_lag_ms": {
+            "p50": percentile(lags, 50) * 1000,
+            "p99": percentile(lags, 99) * 1000,
+            "max": max(lags, default=0.0) * 1000,
+        },
+        "db_writes": {
+            **writes,
+            "total": total_writes,
+            "per_chat": total_writes / len(results) if results else 0.0,
+        },
+    }
+
+
+def print_report(report: dict) -> None:
+    config = report["config"]
+    print(
+        "concurrency={concurrency} rounds={rounds} backend={backend} "
+        "tokens={tokens} chunk_size={chunk_size} token_rate={token_rate} "
+        "socket={socket} realtime_save={realtime_save} "
+        "filters={filters}".format(**config)
+    )
+    print(
+        f"chats: {report['chats']} ({report['errors']} errors) "
+        f"in {report['elapsed_s']:.2f}s"
+    )
+    for error in report["error_samples"]:
+        print(f"  error: {error}")
+    print(f"tokens/s: {report['tokens_per_s']:.0f} ({report['tokens']} tokens)")
+    for name, label in (
+        ("ttft_ms", "time to first token"),
+        ("inter_chunk_ms", "inter-chunk latency"),
+        ("loop_lag_ms", "event loop lag"),
+    ):
+        values = " ".join(f"{key}={value:.1f}" for key, value in report[name].items())
+        print(f"{label} (ms): {values}")
+    writes = " ".join(
+        f"{key}={value:.1f}" if isinstance(value, float) else f"{key}={value}"
+        for key, value in report["db_writes"].items()
+    )
+    print(f"db writes: {writes}")
+
+
+def main() -> None:
+    args = parse_args()
+    report = asyncio.run(run_benchmark(args))
+    if args.json:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
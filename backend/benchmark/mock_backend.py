@@ -0,0 +1,174 @@
+"""Mock OpenAI and Ollama backends streaming generated tokens.
+
+Serves `/v1/models` and `/v1/chat/completions` (OpenAI, SSE) and `/api/tags`,
+`/api/version` and `/api/chat` (Ollama, NDJSON). Every completion streams
+`tokens` words, `chunk_size` per chunk, at `token_rate` tokens per second
+(0 streams as fast as possible).
+
+    python -m benchmark.mock_backend --port 11500 --token-rate 50
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import uuid
+
+from aiohttp import web
+
+MODEL_ID = "mock-model"
+
+
+def get_chunks(tokens: int, chunk_size: int):
+    for i in range(0, tokens, chunk_size):
+        yield "".join(f"tok{j} " for j in range(i, min(i + chunk_size, tokens)))
+
+
+def create_app(
+    tokens: int = 256, chunk_size: int = 1, token_rate: float = 0
+) -> web.Application:
+    delay = chunk_size / token_rate if token_rate > 0 else 0
+
+    async def openai_models(request: web.Request) -> web.Response:
+        return web.json_response(
+            {
+                "object": "list",
+                "data": [
+                    {
+                        "id": MODEL_ID,
+                        "object": "model",
+                        "created": int(time.time()),
+                        "owned_by": "mock",
+                    }
+                ],
+            }
+        )
+
+    async def openai_chat_completions(request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+
+        def get_chunk(delta: dict, finish_reason=None) -> bytes:
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": body.get("model", MODEL_ID),
+                "choices": [
+                    {"index": 0, "delta": delta, "finish_reason": finish_reason}
+                ],
+            }
+            return f"data: {json.dumps(chunk)}\n\n".encode()
+
+        if not body.get("stream"):
+            content = "".join(get_chunks(tokens, tokens))
+            return web.json_response(
+                {
+                    "id": completion_id,
+                    "object": "chat.completion",
+                    "created": created,
+                    "model": body.get("model", MODEL_ID),
+                    "choices": [
+                        {
+                            "index": 0,
+                            "message": {"role": "assistant", "content": content},
+                            "finish_reason": "stop",
+                        }
+                    ],
+                }
+            )
+
+        response = web.StreamResponse(
+            headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"}
+        )
+        await response.prepare(request)
+        await response.write(get_chunk({"role": "assistant", "content": ""}))
+        for content in get_chunks(tokens, chunk_size):
+            if delay:
+                await asyncio.sleep(delay)
+            await response.write(get_chunk({"content": content}))
+        await response.write(get_chunk({}, finish_reason="stop"))
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    async def ollama_tags(request: web.Request) -> web.Response:
+        return web.json_response(
+            {
+                "models": [
+                    {
+                        "name": f"{MODEL_ID}:latest",
+                        "model": f"{MODEL_ID}:latest",
+                        "modified_at": "2024-01-01T00:00:00Z",
+                        "size": 0,
+                        "digest": "",
+                        "details": {},
+                    }
+                ]
+            }
+        )
+
+    async def ollama_version(request: web.Request) -> web.Response:
+        return web.json_response({"version": "0.0.0"})
+
+    async def ollama_chat(request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        model = body.get("model", f"{MODEL_ID}:latest")
+
+        def get_chunk(content: str, done: bool = False) -> bytes:
+            chunk = {
+                "model": model,
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                "message": {"role": "assistant", "content": content},
+                "done": done,
+            }
+            if done:
+                chunk.update(done_reason="stop", eval_count=tokens)
+            return f"{json.dumps(chunk)}\n".encode()
+
+        response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+        await response.prepare(request)
+        for content in get_chunks(tokens, chunk_size):
+            if delay:
+                await asyncio.sleep(delay)
+            await response.write(get_chunk(content))
+        await response.write(get_chunk("", done=True))
+        await response.write_eof()
+        return response
+
+    app = web.Application()
+    app.router.add_get("/v1/models", openai_models)
+    app.router.add_post("/v1/chat/completions", openai_chat_completions)
+    app.router.add_get("/api/tags", ollama_tags)
+    app.router.add_get("/api/version", ollama_version)
+    app.router.add_post("/api/chat", ollama_chat)
+    return app
+
+
+def run(
+    host: str = "127.0.0.1",
+    port: int = 11500,
+    tokens: int = 256,
+    chunk_size: int = 1,
+    token_rate: float = 0,
+) -> None:
+    web.run_app(
+        create_app(tokens=tokens, chunk_size=chunk_size, token_rate=token_rate),
+        host=host,
+        port=port,
+        print=None,
+        access_log=None,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11500)
+    parser.add_argument("--tokens", type=int, default=256)
+    parser.add_argument("--chunk-size", type=int, default=1)
+    parser.add_argument("--token-rate", type=float, default=0)
+    args = parser.parse_args()
+
+    run(args.host, args.port, args.tokens, args.chunk_size, args.token_rate)
@@ -41,6 +41,8 @@ export class SocketIOCollaborationProvider {
 	private readonly awareness = new SimpleAwareness(this.doc);
 	private isConnected = false;
 	private synced = false;
+	// Whether the document was received once, to only sync changes on rejoin
+	private joined = false;
 	private editor: Editor | null = null;
 	private editorContentGetter: EditorContentGetter | null = null;
 
@@ -90,7 +92,9 @@ export class SocketIOCollaborationProvider {
 			document_id: this.documentId,
 			user_id: this.user?.id,
 			user_name: this.user?.name,
-			user_color: userColor
+			user_color: userColor,
+			// When rejoining, only ask for what is missing from our copy
+			...(this.joined ? { state_vector: Array.from(Y.encodeStateVector(this.doc)) } : {})
 		});
 
 		// Set user awareness info
@@ -123,7 +127,23 @@ export class SocketIOCollaborationProvider {
 					if (data.state) {
 						const state = new Uint8Array(data.state);
 
-						if (state.length === 2 && state[0] === 0 && state[1] === 0) {
+						if (data.incremental) {
+							Y.applyUpdate(this.doc, state, 'server');
+
+							// Send back the changes the server misses, like edits made offline
+							const missing = Y.encodeStateAsUpdate(
+								this.doc,
+								new Uint8Array(data.state_vector ?? [])
+							);
+							if (!(missing.length === 2 && missing[0] === 0 && missing[1] === 0)) {
+								this.socket.emit('ydoc:document:update', {
+									document_id: this.documentId,
+									user_id: this.user?.id,
+									socket_id: this.socket.id,
+									update: Array.from(missing)
+								});
+							}
+						} else if (state.length === 2 && state[0] === 0 && state[1] === 0) {
 							// Empty state, check if we have content to initialize
 							// check if editor empty as well
 							// const editor = await getEditorInstance();
@@ -154,6 +174,7 @@ export class SocketIOCollaborationProvider {
 						}
 					}
 					this.synced = true;
+					this.joined = true;
 				} catch (error) {
 					console.error('Error applying Yjs state:', error);
 